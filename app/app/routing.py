@@ -1,5 +1,10 @@
-from channels.routing import ProtocolTypeRouter
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
 
-application = ProtocolTypeRouter({
+import institute.routing
 
+application = ProtocolTypeRouter({
+    'websocket': AllowedHostsOriginValidator(
+        URLRouter(institute.routing.websocket_urlpatterns)
+    ),
 })
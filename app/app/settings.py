@@ -174,11 +174,119 @@ CHANNEL_LAYERS = {
     },
 }
 
+# For django cache
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://127.0.0.1:6379/1",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        },
+    },
+}
+
+# For token authentication cache (timeouts in seconds)
+AUTH_TOKEN_LOCAL_CACHE_SIZE = 2048
+AUTH_TOKEN_LOCAL_CACHE_TIMEOUT = 30
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 60
+
+# Maximum lifetime of cached institute license in seconds
+INSTITUTE_LICENSE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# For institute, class and subject slug identity map (timeouts in seconds)
+SLUG_CACHE_TIMEOUT = 60 * 60 * 24
+SLUG_LOCAL_CACHE_SIZE = 4096
+SLUG_LOCAL_CACHE_TIMEOUT = 60
+
+# For bulk student import
+STUDENT_IMPORT_MAX_ROWS = 10000
+STUDENT_IMPORT_CHUNK_SIZE = 500
+
+# For question bank import, questions of one file are added in one transaction
+QUESTION_BANK_MAX_QUESTIONS = 10000
+
+# Mandatory subjects of larger classes are filled by a background job
+SUBJECT_ENROLLMENT_SYNC_LIMIT = 500
+
+# Lifetime of cached question paper snapshot in seconds
+PAPER_SNAPSHOT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Scheduled tests are warmed up this many minutes before they start
+TEST_WARMUP_MINUTES = 10
+
+# Test passwords are hashed in a pool of this many processes (None uses
+# number of cpus), credential sheet can be downloaded for this many seconds
+TEST_CREDENTIAL_HASH_WORKERS = None
+TEST_CREDENTIAL_SHEET_TIMEOUT = 10 * 60
+
+# Auto grading of typed tests
+NUMERIC_ANSWER_TOLERANCE = 1e-6
+GRADING_CHUNK_SIZE = 5000
+
+# Connected students get remaining test time every this many seconds
+EXAM_TIME_SYNC_INTERVAL = 30
+
+# Autosaved answers are buffered in redis and flushed in batches
+AUTOSAVE_FLUSH_BATCH = 500
+AUTOSAVE_TTL = 60 * 60 * 24
+
+# Buffered login events of tests are inserted in batches of this size
+LOGIN_STATS_INGEST_BATCH = 1000
+
+# Failed video transcoding is retried this many times with exponential
+# backoff starting at TRANSCODING_RETRY_DELAY seconds
+TRANSCODING_MAX_RETRIES = 3
+TRANSCODING_RETRY_DELAY = 60
+
+# Rendition still encoding after this many seconds is taken to be
+# abandoned by crashed worker and is encoded again when redelivered
+TRANSCODING_CLAIM_TIMEOUT = 60 * 60 * 6
+
+# Encoding progress of each rendition is sent to uploading teacher at
+# most once in this many seconds
+TRANSCODING_PROGRESS_INTERVAL = 2
+
+# Resumable uploads take chunks of at most this many bytes and are
+# removed if not completed within CHUNKED_UPLOAD_EXPIRY seconds
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRY = 60 * 60 * 24
+
+# Exported roster files are removed this many seconds after they are written
+EXPORT_EXPIRY = 60 * 60 * 24
+
 # For django celery
 CELERY_BROKER_URL = 'amqp://rabbitmq'
 CELERY_RESULT_BACKEND = 'django-db'
 CELERY_CACHE_BACKEND = 'django-cache'
 CELERY_TASK_SERIALIZER = 'json'
+# Videos are transcoded by workers of transcoding queue only, their
+# concurrency caps encodes per node
+CELERY_TASK_ROUTES = {
+    'institute.tasks.transcode_video': {'queue': 'transcoding'},
+    'institute.tasks.encode_video_rendition': {'queue': 'transcoding'}
+}
+CELERY_BEAT_SCHEDULE = {
+    'warm-up-scheduled-tests': {
+        'task': 'institute.tasks.warm_up_scheduled_tests',
+        'schedule': 60.0
+    },
+    'flush-autosaved-answers': {
+        'task': 'institute.tasks.flush_autosaved_answers',
+        'schedule': 5.0
+    },
+    'ingest-login-stats': {
+        'task': 'institute.tasks.ingest_login_stats',
+        'schedule': 10.0
+    },
+    'expire-roster-exports': {
+        'task': 'institute.tasks.expire_roster_exports',
+        'schedule': 60.0 * 60
+    },
+    'expire-chunked-uploads': {
+        'task': 'institute.tasks.expire_chunked_uploads',
+        'schedule': 60.0 * 60
+    }
+}
 
 # For razorpay
 client = razorpay.Client(auth=(os.environ.get('RAZORPAY_TEST_KEY_ID'),
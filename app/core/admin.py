@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext as _
 from core import models
+from core.authentication import invalidate_user_tokens
 
 
 class CustomUserAdmin(UserAdmin):
@@ -9,18 +10,22 @@ class CustomUserAdmin(UserAdmin):
     def activate_accounts(self, request, queryset):
         """Activates selected accounts"""
         queryset.update(is_active=True)
+        invalidate_user_tokens(queryset.values_list('pk', flat=True))
 
     def deactivate_accounts(self, request, queryset):
         """Deactivates selected accounts"""
         queryset.update(is_active=False)
+        invalidate_user_tokens(queryset.values_list('pk', flat=True))
 
     def add_staff_permission(self, request, queryset):
         """Adds staff permission to selected accounts"""
         queryset.update(is_staff=True)
+        invalidate_user_tokens(queryset.values_list('pk', flat=True))
 
     def remove_staff_permission(self, request, queryset):
         """Adds staff permission to selected accounts"""
         queryset.update(is_staff=False)
+        invalidate_user_tokens(queryset.values_list('pk', flat=True))
 
     activate_accounts.short_description = 'Activate accounts'
     deactivate_accounts.short_description = 'Deactivate accounts'
@@ -299,7 +304,12 @@ admin.site.register(models.SubjectAdditionalReadingUseCaseLink)
 admin.site.register(models.SubjectLectureMaterials)
 admin.site.register(models.SubjectLectureImageMaterial)
 admin.site.register(models.SubjectLecturePdfMaterial)
+admin.site.register(models.MediaBlob)
 admin.site.register(models.SubjectLectureLinkMaterial)
+admin.site.register(models.SubjectLectureVideoMaterial)
+admin.site.register(models.VideoTranscodingJob)
+admin.site.register(models.VideoRenditionJob)
+admin.site.register(models.ChunkedUpload)
 admin.site.register(models.SubjectLectureLiveClass)
 admin.site.register(models.SubjectLectureUseCaseObjectives)
 admin.site.register(models.SubjectLectureAssignment)
@@ -320,7 +330,11 @@ admin.site.register(models.SubjectTestNumericCorrectAnswer)
 admin.site.register(models.SubjectTestAssertionCorrectAnswer)
 admin.site.register(models.SubjectTestFillInTheBlankCorrectAnswer)
 admin.site.register(models.StudentTestCredential)
+admin.site.register(models.StudentTestSubmission)
+admin.site.register(models.StudentConceptMastery)
+admin.site.register(models.ClassConceptMastery)
 admin.site.register(models.StudentTestLoginStats)
+admin.site.register(models.StudentTestLoginRollup)
 
 admin.site.register(models.InstituteStudents)
 admin.site.register(models.InstituteClassStudents)
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import ugettext as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Size and lifetime of per process token cache. Entries of other
+# processes can not be evicted, so keep the lifetime short.
+LOCAL_CACHE_SIZE = getattr(settings, 'AUTH_TOKEN_LOCAL_CACHE_SIZE', 2048)
+LOCAL_CACHE_TIMEOUT = getattr(settings, 'AUTH_TOKEN_LOCAL_CACHE_TIMEOUT', 30)
+
+# Lifetime of token in shared (redis) cache in seconds
+SHARED_CACHE_TIMEOUT = getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60 * 60)
+
+# User fields that are never stored in cache
+UNCACHED_USER_FIELDS = ('password', )
+
+
+def _token_cache_key(key):
+    return 'auth-token:' + key
+
+
+def _user_token_cache_key(user_pk):
+    return 'auth-token-user:' + str(user_pk)
+
+
+class LocalLRUCache:
+    """Small thread safe in process LRU cache with per entry expiry"""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_token_cache = LocalLRUCache(LOCAL_CACHE_SIZE, LOCAL_CACHE_TIMEOUT)
+
+
+def _dump_user(user):
+    """Returns cacheable field values of user"""
+    return {
+        f.attname: getattr(user, f.attname)
+        for f in user._meta.concrete_fields
+        if f.attname not in UNCACHED_USER_FIELDS
+    }
+
+
+def _load_user(data):
+    """
+    Builds user instance from cached field values. Fields which are
+    not cached are deferred and loaded from database on access.
+    """
+    return get_user_model().from_db(
+        'default', list(data.keys()), list(data.values()))
+
+
+def cache_token(key, user):
+    """Stores token and user in local and shared cache"""
+    data = _dump_user(user)
+    local_token_cache.set(key, data)
+    cache.set_many({
+        _token_cache_key(key): data,
+        _user_token_cache_key(user.pk): key
+    }, SHARED_CACHE_TIMEOUT)
+    return data
+
+
+def get_cached_token_user(key):
+    """
+    Returns user of token checking local cache, shared cache
+    and database in order. Returns None if token does not exist.
+    """
+    data = local_token_cache.get(key)
+
+    if data is None:
+        data = cache.get(_token_cache_key(key))
+        if data is not None:
+            local_token_cache.set(key, data)
+
+    if data is None:
+        token = Token.objects.select_related('user').filter(key=key).first()
+        if not token:
+            return None
+        data = cache_token(key, token.user)
+
+    return _load_user(data)
+
+
+def get_or_create_token_key(user):
+    """Returns token key of user creating it if it does not exist"""
+    key = cache.get(_user_token_cache_key(user.pk))
+
+    if not key:
+        token, created = Token.objects.get_or_create(user=user)
+        key = token.key
+        cache_token(key, user)
+
+    return key
+
+
+def invalidate_token(key, user_pk=None):
+    """Removes token from local and shared cache"""
+    local_token_cache.delete(key)
+    keys = [_token_cache_key(key)]
+    if user_pk is not None:
+        keys.append(_user_token_cache_key(user_pk))
+    cache.delete_many(keys)
+
+
+def invalidate_user_tokens(user_pks):
+    """Removes cached tokens of users. Used after bulk updates of users."""
+    user_pks = list(user_pks)
+    if not user_pks:
+        return
+
+    for user_pk, key in Token.objects.filter(
+        user__pk__in=user_pks
+    ).values_list('user', 'key'):
+        invalidate_token(key, user_pk)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that resolves tokens from in process cache,
+    then shared cache and only then from database.
+    """
+
+    def authenticate_credentials(self, key):
+        user = get_cached_token_user(key)
+
+        if not user:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+
+        return user, Token(key=key, user=user)
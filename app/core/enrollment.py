@@ -0,0 +1,111 @@
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from core import models
+
+# Mandatory subject created in a class with more students than this is
+# filled by a background job instead of inside the request
+ENROLLMENT_SYNC_LIMIT = getattr(settings, 'SUBJECT_ENROLLMENT_SYNC_LIMIT', 500)
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _column(model, field):
+    return connection.ops.quote_name(model._meta.get_field(field).column)
+
+
+def _enroll(where, params):
+    """
+    Enrolls class students in mandatory subjects of their class with a
+    single INSERT ... SELECT. where filters the join of class students
+    (cs) and subjects (s). Existing enrollments are skipped, inviter and
+    active state are copied from class enrollment.
+    Returns number of created rows.
+    """
+    iss = models.InstituteSubjectStudents
+    ics = models.InstituteClassStudents
+    subject = models.InstituteSubject
+    created_on = iss._meta.get_field('created_on').get_db_prep_value(
+        int(time.time()) * 1000, connection)
+
+    sql = (
+        'INSERT INTO {iss} ({iss_subject}, {iss_student}, {iss_inviter}, '
+        '{iss_active}, {iss_banned}, {iss_created}) '
+        'SELECT s.{s_pk}, cs.{cs_student}, cs.{cs_inviter}, cs.{cs_active}, '
+        '%s, %s '
+        'FROM {ics} cs INNER JOIN {subject} s ON s.{s_class} = cs.{cs_class} '
+        'WHERE s.{s_type} = %s AND ' + where + ' AND NOT EXISTS ('
+        'SELECT 1 FROM {iss} e WHERE e.{iss_subject} = s.{s_pk} '
+        'AND e.{iss_student} = cs.{cs_student})'
+    ).format(
+        iss=_table(iss),
+        iss_subject=_column(iss, 'institute_subject'),
+        iss_student=_column(iss, 'institute_student'),
+        iss_inviter=_column(iss, 'inviter'),
+        iss_active=_column(iss, 'active'),
+        iss_banned=_column(iss, 'is_banned'),
+        iss_created=_column(iss, 'created_on'),
+        ics=_table(ics),
+        cs_student=_column(ics, 'institute_student'),
+        cs_inviter=_column(ics, 'inviter'),
+        cs_active=_column(ics, 'active'),
+        cs_class=_column(ics, 'institute_class'),
+        subject=_table(subject),
+        s_pk=_column(subject, 'id'),
+        s_class=_column(subject, 'subject_class'),
+        s_type=_column(subject, 'type'))
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [
+            False, created_on, models.InstituteSubjectType.MANDATORY
+        ] + list(params))
+        return cursor.rowcount
+
+
+def enroll_in_mandatory_subjects(institute_student_pks):
+    """
+    Enrolls InstituteStudents with given pks in every mandatory subject
+    of their class. Returns number of created rows.
+    """
+    institute_student_pks = list(institute_student_pks)
+    if not institute_student_pks:
+        return 0
+
+    return _enroll(
+        'cs.{} IN ({})'.format(
+            _column(models.InstituteClassStudents, 'institute_student'),
+            ', '.join(['%s'] * len(institute_student_pks))),
+        institute_student_pks)
+
+
+def enroll_class_in_subject(subject_pk):
+    """
+    Enrolls every student of class of mandatory subject in subject.
+    Returns number of created rows.
+    """
+    return _enroll(
+        's.{} = %s'.format(_column(models.InstituteSubject, 'id')),
+        [subject_pk])
+
+
+def enroll_class_in_new_subject(subject):
+    """
+    Enrolls students of class in newly created mandatory subject in
+    current transaction, or after commit in a background job if class
+    has more than ENROLLMENT_SYNC_LIMIT students.
+    """
+    if subject.type != models.InstituteSubjectType.MANDATORY:
+        return
+
+    if models.InstituteClassStudents.objects.filter(
+        institute_class__pk=subject.subject_class_id
+    ).count() <= ENROLLMENT_SYNC_LIMIT:
+        enroll_class_in_subject(subject.pk)
+    else:
+        from .tasks import enroll_class_students_in_subject
+        transaction.on_commit(
+            lambda: enroll_class_students_in_subject.delay(subject.pk))
@@ -0,0 +1,47 @@
+import time
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Upper bound of lifetime of license snapshot in seconds. Snapshot of
+# active license expires at license end date if that is earlier.
+LICENSE_CACHE_TIMEOUT = getattr(
+    settings, 'INSTITUTE_LICENSE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _license_cache_key(institute_pk):
+    return 'institute-license:' + str(institute_pk)
+
+
+def get_license_snapshot(institute_pk):
+    """
+    Returns cached license snapshot of institute or None if not cached.
+    Snapshot is a dict with 'active' (oldest active paid order) and
+    'latest' (latest paid order). Orders have selected license loaded.
+    """
+    return cache.get(_license_cache_key(institute_pk))
+
+
+def set_license_snapshot(institute_pk, active_order, latest_order):
+    """Caches and returns license snapshot of institute"""
+    snapshot = {
+        'active': active_order,
+        'latest': latest_order
+    }
+    timeout = LICENSE_CACHE_TIMEOUT
+
+    if active_order and active_order.end_date:
+        timeout = min(timeout, ceil(
+            (active_order.end_date - int(time.time()) * 1000) / 1000))
+
+    if timeout > 0:
+        cache.set(_license_cache_key(institute_pk), snapshot, timeout)
+
+    return snapshot
+
+
+def invalidate_license_snapshot(institute_pk):
+    """Removes cached license snapshot of institute"""
+    if institute_pk:
+        cache.delete(_license_cache_key(institute_pk))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import models
+from core.subject_access import diff_subject_access, refresh_subject_access
+
+
+class Command(BaseCommand):
+    """Django command to verify stored subject access against source models"""
+    help = 'Checks InstituteSubjectAccess for missing, stale and extra rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Refresh inconsistent institutes')
+
+    def handle(self, *args, **kwargs):
+        inconsistent = 0
+
+        for pk, slug in models.Institute.objects.values_list(
+                'pk', 'institute_slug'):
+            missing, stale, extra = diff_subject_access(pk)
+            if not (missing or stale or extra):
+                continue
+
+            inconsistent += 1
+            self.stdout.write('{}: {} missing, {} stale, {} extra'.format(
+                slug, len(missing), len(stale), len(extra)))
+
+            if kwargs['fix']:
+                refresh_subject_access(pk)
+
+        if inconsistent and not kwargs['fix']:
+            raise CommandError(
+                '{} institutes have inconsistent subject access'.format(
+                    inconsistent))
+
+        if inconsistent:
+            self.stdout.write(self.style.SUCCESS('Subject access fixed'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Subject access consistent'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core import models
+from core.subject_access import refresh_subject_access
+
+
+class Command(BaseCommand):
+    """Django command to rebuild subject access of users from source models"""
+    help = 'Rebuilds InstituteSubjectAccess of given or all institutes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'institute_slugs', nargs='*',
+            help='Slugs of institutes to rebuild, all if not given')
+
+    def handle(self, *args, **kwargs):
+        institutes = models.Institute.objects.all()
+        if kwargs['institute_slugs']:
+            institutes = institutes.filter(
+                institute_slug__in=kwargs['institute_slugs'])
+
+        for pk, slug in institutes.values_list('pk', 'institute_slug'):
+            created, updated, deleted = refresh_subject_access(pk)
+            self.stdout.write('{}: {} created, {} updated, {} deleted'.format(
+                slug, created, updated, deleted))
+
+        self.stdout.write(self.style.SUCCESS('Subject access rebuilt'))
@@ -0,0 +1,16 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from institute.transcoding_progress import get_timing_histograms
+
+
+class Command(BaseCommand):
+    """Django command to print timing histograms of video transcoding"""
+    help = 'Prints count, mean and histogram of seconds per transcoding stage'
+
+    def handle(self, *args, **kwargs):
+        histograms = get_timing_histograms()
+        for stage in sorted(histograms):
+            self.stdout.write('{}: {}'.format(
+                stage, json.dumps(histograms[stage], sort_keys=True)))
@@ -1,11 +1,14 @@
+import hashlib
+import hmac
 import os
 import random
+import shutil
 import string
 import time
 import uuid
 from decimal import Decimal
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 from django.core.validators import EmailValidator, MinLengthValidator, \
@@ -32,6 +35,8 @@ from rest_framework.authtoken.models import Token
 from rest_framework import viewsets
 
 from .tasks import create_welcome_message_after_user_creation
+from .authentication import invalidate_token, invalidate_user_tokens
+from .license_cache import invalidate_license_snapshot
 
 # Constant to define unlimited limit
 UNLIMITED = 99999
@@ -272,6 +277,7 @@ class SubjectLectureMaterialsContentType:
     EXTERNAL_LINK = 'E'
     YOUTUBE_LINK = 'Y'
     LIVE_CLASS = 'L'
+    VIDEO = 'V'
 
     CONTENT_TYPE_IN_CONTENT_TYPES = [
         (IMAGE, _(u'IMAGE')),
@@ -279,6 +285,33 @@ class SubjectLectureMaterialsContentType:
         (EXTERNAL_LINK, _(u'EXTERNAL_LINK')),
         (YOUTUBE_LINK, _(u'YOUTUBE_LINK')),
         (LIVE_CLASS, _(u'LIVE_CLASS')),
+        (VIDEO, _(u'VIDEO')),
+    ]
+
+
+class TranscodingStatus:
+    QUEUED = 'Q'
+    PROBING = 'P'
+    ENCODING = 'E'
+    DONE = 'D'
+    FAILED = 'F'
+
+    STATUS_IN_STATUSES = [
+        (QUEUED, _(u'QUEUED')),
+        (PROBING, _(u'PROBING')),
+        (ENCODING, _(u'ENCODING')),
+        (DONE, _(u'DONE')),
+        (FAILED, _(u'FAILED'))
+    ]
+
+
+class ChunkedUploadPurpose:
+    LECTURE_MATERIAL = 'L'
+    FILE_QUESTION_PAPER = 'Q'
+
+    PURPOSE_IN_PURPOSES = [
+        (LECTURE_MATERIAL, _(u'LECTURE_MATERIAL')),
+        (FILE_QUESTION_PAPER, _(u'FILE_QUESTION_PAPER'))
     ]
 
 
@@ -473,6 +506,15 @@ def subject_img_study_material_upload_file_path(instance, filename):
     return full_path
 
 
+def media_blob_upload_file_path(instance, filename):
+    """Generates file path of blob from its institute and content hash"""
+    extension = filename.split('.')[-1]
+    file_name = f'{instance.sha256}.{extension}'
+    path = f'institute/uploads/blobs/{instance.institute_id}/{instance.sha256[:2]}'
+    full_path = os.path.join(path, file_name)
+    return full_path
+
+
 def subject_introductory_content_upload_file_path(instance, filename):
     """Generates file path for uploading institute introductory content"""
     extension = filename.split('.')[-1]
@@ -491,6 +533,15 @@ def subject_pdf_study_material_upload_file_path(instance, filename):
     return full_path
 
 
+def subject_video_study_material_upload_file_path(instance, filename):
+    """Generates file path for uploading institute video study material"""
+    extension = filename.split('.')[-1]
+    file_name = f'{uuid.uuid4()}.{extension}'
+    path = 'institute/uploads/content/video'
+    full_path = os.path.join(path, file_name)
+    return full_path
+
+
 def hls_encoded_video_saving_file_name_path(filename):
     """Generates file name and path for uploading hls encoded media"""
     extension = filename.split('.')[-1]
@@ -575,17 +626,35 @@ def unique_slug_generator_for_test_set(instance):
     return slug
 
 
+def test_password_lookup_key(test_pk, password):
+    """
+    Returns key for finding test credential by plaintext password.
+    Unlike salted hash it is the same for the same password of test.
+    """
+    return hmac.new(
+        settings.SECRET_KEY.encode(),
+        '{}:{}'.format(test_pk, password).encode(),
+        hashlib.sha256
+    ).hexdigest()
+
+
 def generate_student_test_password(instance):
-    """Generates and returns a new test set slug"""
+    """
+    Generates test password unique in test, sets its lookup key
+    on instance and returns hashed password
+    """
     while True:
-        hashed_password = make_password(random_string_generator(size=6).upper())
+        password = random_string_generator(size=6).upper()
+        lookup_key = test_password_lookup_key(instance.test_id, password)
 
         k_class = instance.__class__
-        qs_exists = k_class.objects.filter(test=instance.test, password=hashed_password).exists()
+        qs_exists = k_class.objects.filter(test=instance.test, lookup_key=lookup_key).exists()
 
         if not qs_exists:
             break
-    return hashed_password
+
+    instance.lookup_key = lookup_key
+    return make_password(password)
 
 
 def create_order_receipt(instance):
@@ -830,6 +899,18 @@ def user_is_created(sender, instance, created, **kwargs):
                 UserProfile.objects.create(user=instance)
 
 
+@receiver(post_save, sender=User)
+def invalidate_cached_user_tokens(sender, instance, created, *args, **kwargs):
+    """Cached token carries user details, so drop it when user changes"""
+    if not created:
+        invalidate_user_tokens([instance.pk])
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key, instance.user_id)
+
+
 ################################################################
 #  Institute License
 ################################################################
@@ -1192,6 +1273,21 @@ def update_selected_license(sender, instance, created, *args, **kwargs):
         instance.selected_license.save()
 
 
+@receiver(post_save, sender=InstituteSelectedCommonLicense)
+@receiver(post_delete, sender=InstituteSelectedCommonLicense)
+@receiver(post_save, sender=InstituteCommonLicenseOrderDetails)
+@receiver(post_delete, sender=InstituteCommonLicenseOrderDetails)
+def invalidate_institute_license_snapshot(sender, instance, *args, **kwargs):
+    """
+    Invalidates cached license of institute now, so that rest of the
+    transaction sees the change, and again after commit, so that
+    snapshot cached concurrently from uncommitted state is dropped.
+    """
+    invalidate_license_snapshot(instance.institute_id)
+    transaction.on_commit(
+        lambda: invalidate_license_snapshot(instance.institute_id))
+
+
 class RazorpayCallback(models.Model):
     """Stores Razorpay callback credentials"""
     razorpay_order_id = models.CharField(
@@ -1298,7 +1394,8 @@ class Institute(models.Model):
         _('Institute Slug'),
         max_length=180,
         null=True,
-        blank=True
+        blank=True,
+        unique=True
     )
 
     def save(self, *args, **kwargs):
@@ -1517,7 +1614,7 @@ class InstituteClass(models.Model):
     name = models.CharField(
         _('Name'), max_length=40, blank=False, null=False)
     class_slug = models.CharField(
-        _('Class slug'), max_length=50, blank=True, null=True)
+        _('Class slug'), max_length=50, blank=True, null=True, unique=True)
     created_on = UnixTimeStampField(
         _('Created timestamp in millisecond'), use_numeric=True, editable=False)
 
@@ -1592,6 +1689,21 @@ def add_subject_slug(instance, *args, **kwargs):
         instance.subject_slug = unique_slug_generator_for_subject(instance)
 
 
+@receiver(post_delete, sender=Institute)
+@receiver(post_delete, sender=InstituteClass)
+@receiver(post_delete, sender=InstituteSubject)
+def invalidate_deleted_slug(sender, instance, *args, **kwargs):
+    """Removes slug of deleted institute, class or subject from identity map"""
+    from .slug_map import invalidate_slug, INSTITUTE, CLASS, SUBJECT
+
+    if sender == Institute:
+        invalidate_slug(INSTITUTE, instance.institute_slug)
+    elif sender == InstituteClass:
+        invalidate_slug(CLASS, instance.class_slug)
+    else:
+        invalidate_slug(SUBJECT, instance.subject_slug)
+
+
 @receiver(post_save, sender=InstituteSubject)
 def create_institute_subject_statistics_instance(sender, instance, created, *args, **kwargs):
     if created:
@@ -1610,16 +1722,8 @@ def create_institute_subject_statistics_instance(sender, instance, created, *arg
             key='M1',
             name='Module 1')
 
-        if instance.type == InstituteSubjectType.MANDATORY:
-            for invite in InstituteClassStudents.objects.filter(
-                institute_class__pk=instance.subject_class.pk
-            ).only('institute_student'):
-                InstituteSubjectStudents.objects.create(
-                    institute_subject=instance,
-                    institute_student=invite.institute_student,
-                    inviter=invite.inviter,
-                    active=invite.active
-                )
+        from .enrollment import enroll_class_in_new_subject
+        enroll_class_in_new_subject(instance)
 
 
 class SubjectBookmarked(models.Model):
@@ -1939,6 +2043,62 @@ class SubjectLectureMaterials(models.Model):
         return self.name
 
 
+class MediaBlob(models.Model):
+    """
+    Model for storing file content of institute once per sha256 hash.
+    Refcount is number of materials referencing blob, blob is deleted with
+    its file when it drops to zero. Size is counted once against storage
+    of institute however many materials reference it.
+    """
+    institute = models.ForeignKey(
+        'Institute', related_name='media_blobs', on_delete=models.CASCADE)
+    sha256 = models.CharField(_('Sha256 hash'), max_length=64)
+    file = models.FileField(
+        _('File'),
+        upload_to=media_blob_upload_file_path,
+        max_length=1024)
+    size = models.BigIntegerField(_('Size in bytes'))
+    refcount = models.PositiveIntegerField(_('Refcount'), default=0, blank=True)
+    created_on = UnixTimeStampField(
+        _('Created on'), blank=True, null=True, use_numeric=True)
+
+    class Meta:
+        unique_together = ('institute', 'sha256')
+
+    def __str__(self):
+        return self.sha256
+
+
+@receiver(post_delete, sender=MediaBlob)
+def auto_delete_blob_on_delete(sender, instance, **kwargs):
+    if instance.file:
+        if os.path.isfile(instance.file.path):
+            try:
+                os.remove(instance.file.path)
+            except Exception as e:
+                print('Error: ' + e)
+
+
+def release_media_blob(blob_pk):
+    """
+    Decrements refcount of blob. Blob no longer referenced is deleted and
+    its size is freed from storage used by institute.
+    """
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(
+            pk=blob_pk).first()
+        if not blob:
+            return
+
+        if blob.refcount > 1:
+            MediaBlob.objects.filter(pk=blob_pk).update(refcount=models.F('refcount') - 1)
+        else:
+            blob.delete()
+            InstituteStatistics.objects.filter(
+                institute__pk=blob.institute_id
+            ).update(storage=models.F('storage') - Decimal(blob.size / 1000000000))
+
+
 class SubjectLectureImageMaterial(models.Model):
     """Model for storing image study material of subject lecture"""
     lecture_material = models.ForeignKey(
@@ -1948,8 +2108,10 @@ class SubjectLectureImageMaterial(models.Model):
         upload_to=subject_img_study_material_upload_file_path,
         null=False,
         blank=False,
-        max_length=1024,
-        unique=True)
+        max_length=1024)
+    blob = models.ForeignKey(
+        MediaBlob, related_name='image_lecture_materials', on_delete=models.SET_NULL,
+        null=True, blank=True)
     can_download = models.BooleanField(_('Can Download'), blank=True, default=True)
 
     def __str__(self):
@@ -1957,8 +2119,10 @@ class SubjectLectureImageMaterial(models.Model):
 
 
 @receiver(post_delete, sender=SubjectLectureImageMaterial)
-def auto_delete_image_on_delete(sender, instance, **kwargs):
-    if instance.file:
+def auto_delete_lecture_image_on_delete(sender, instance, **kwargs):
+    if instance.blob_id:
+        release_media_blob(instance.blob_id)
+    elif instance.file:
         if os.path.isfile(instance.file.path):
             try:
                 os.remove(instance.file.path)
@@ -1975,8 +2139,10 @@ class SubjectLecturePdfMaterial(models.Model):
         upload_to=subject_pdf_study_material_upload_file_path,
         null=False,
         blank=False,
-        max_length=1024,
-        unique=True)
+        max_length=1024)
+    blob = models.ForeignKey(
+        MediaBlob, related_name='pdf_lecture_materials', on_delete=models.SET_NULL,
+        null=True, blank=True)
     can_download = models.BooleanField(_('Can Download'), blank=True, default=True)
 
     def __str__(self):
@@ -1985,7 +2151,50 @@ class SubjectLecturePdfMaterial(models.Model):
 
 @receiver(post_delete, sender=SubjectLecturePdfMaterial)
 def auto_delete_pdf_on_delete(sender, instance, **kwargs):
+    if instance.blob_id:
+        release_media_blob(instance.blob_id)
+    elif instance.file:
+        if os.path.isfile(instance.file.path):
+            try:
+                os.remove(instance.file.path)
+            except Exception as e:
+                print('Error: ' + e)
+
+
+class SubjectLectureVideoMaterial(models.Model):
+    """
+    Model for storing video study material of subject lecture. Stream
+    file, duration and bit rate are filled in by transcoding job.
+    """
+    lecture_material = models.ForeignKey(
+        SubjectLectureMaterials, on_delete=models.CASCADE, related_name="video_lecture_material")
+    file = models.FileField(
+        _('Video File'),
+        upload_to=subject_video_study_material_upload_file_path,
+        null=False,
+        blank=False,
+        max_length=1024,
+        unique=True)
+    can_download = models.BooleanField(_('Can Download'), blank=True, default=False)
+    stream_file = models.CharField(
+        _('Hls stream file'), max_length=1024, blank=True, default='')
+    duration = models.DecimalField(
+        _('Duration in seconds'), max_digits=10, decimal_places=3, blank=True, null=True)
+    bit_rate = models.PositiveIntegerField(_('Bit rate'), blank=True, null=True)
+    width = models.PositiveSmallIntegerField(_('Width'), blank=True, null=True)
+    height = models.PositiveSmallIntegerField(_('Height'), blank=True, null=True)
+    error_transcoding = models.BooleanField(_('Error in transcoding'), blank=True, default=False)
+
+    def __str__(self):
+        return str(self.lecture_material)
+
+
+@receiver(post_delete, sender=SubjectLectureVideoMaterial)
+def auto_delete_video_on_delete(sender, instance, **kwargs):
     if instance.file:
+        for path in (os.path.dirname(hls_encoded_video_saving_file_name_path(str(instance.file))),
+                     os.path.dirname(hls_key_saving_path(str(instance.file)))):
+            shutil.rmtree(path, ignore_errors=True)
         if os.path.isfile(instance.file.path):
             try:
                 os.remove(instance.file.path)
@@ -1993,6 +2202,94 @@ def auto_delete_pdf_on_delete(sender, instance, **kwargs):
                 print('Error: ' + e)
 
 
+class VideoTranscodingJob(models.Model):
+    """Model for storing state of transcoding of video into hls stream"""
+    video = models.OneToOneField(
+        SubjectLectureVideoMaterial, on_delete=models.CASCADE, related_name='transcoding_job')
+    uploaded_by = models.ForeignKey(
+        'User', related_name='video_transcoding_jobs', on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(
+        _('Status'),
+        max_length=1,
+        choices=TranscodingStatus.STATUS_IN_STATUSES,
+        default=TranscodingStatus.QUEUED)
+    attempts = models.PositiveSmallIntegerField(_('Attempts'), default=0, blank=True)
+    error = models.CharField(_('Last error'), max_length=500, blank=True, default='')
+    probe_time = models.DecimalField(
+        _('Probe time in seconds'), max_digits=10, decimal_places=3, blank=True, null=True)
+    created_on = UnixTimeStampField(
+        _('Created on'), blank=True, null=True, use_numeric=True)
+    updated_on = UnixTimeStampField(
+        _('Updated on'), blank=True, null=True, use_numeric=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status'])]
+
+    def __str__(self):
+        return str(self.video)
+
+
+class VideoRenditionJob(models.Model):
+    """
+    Model for storing state of encoding of one rendition of abr ladder of
+    video. Renditions are encoded independently into own variant playlist.
+    """
+    job = models.ForeignKey(
+        VideoTranscodingJob, on_delete=models.CASCADE, related_name='renditions')
+    width = models.PositiveSmallIntegerField(_('Width'))
+    height = models.PositiveSmallIntegerField(_('Height'))
+    video_bit_rate = models.PositiveIntegerField(_('Video bit rate'))
+    audio_bit_rate = models.PositiveIntegerField(_('Audio bit rate'))
+    status = models.CharField(
+        _('Status'),
+        max_length=1,
+        choices=TranscodingStatus.STATUS_IN_STATUSES,
+        default=TranscodingStatus.QUEUED)
+    attempts = models.PositiveSmallIntegerField(_('Attempts'), default=0, blank=True)
+    error = models.CharField(_('Last error'), max_length=500, blank=True, default='')
+    playlist = models.CharField(
+        _('Variant playlist relative to master'), max_length=1024, blank=True, default='')
+    encode_time = models.DecimalField(
+        _('Encode time in seconds'), max_digits=10, decimal_places=3, blank=True, null=True)
+    publish_time = models.DecimalField(
+        _('Publish time in seconds'), max_digits=10, decimal_places=3, blank=True, null=True)
+    updated_on = UnixTimeStampField(
+        _('Updated on'), blank=True, null=True, use_numeric=True)
+
+    class Meta:
+        unique_together = ('job', 'height')
+
+    def __str__(self):
+        return '{}p of {}'.format(self.height, self.job)
+
+
+class ChunkedUpload(models.Model):
+    """
+    Model for storing state of resumable upload. Chunks are written to
+    partial file on disk till offset reaches declared size, then file is
+    saved as material described by purpose and metadata. Declared size
+    is counted against storage of institute while upload is in progress.
+    """
+    upload_id = models.UUIDField(_('Upload id'), default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        'User', related_name='chunked_uploads', on_delete=models.CASCADE)
+    institute = models.ForeignKey(
+        'Institute', related_name='chunked_uploads', on_delete=models.CASCADE)
+    subject = models.ForeignKey(
+        'InstituteSubject', related_name='chunked_uploads', on_delete=models.CASCADE)
+    purpose = models.CharField(
+        _('Purpose'), max_length=1, choices=ChunkedUploadPurpose.PURPOSE_IN_PURPOSES)
+    file_name = models.CharField(_('File name'), max_length=255)
+    size = models.BigIntegerField(_('Declared size in bytes'))
+    offset = models.BigIntegerField(_('Bytes received'), default=0, blank=True)
+    metadata = models.TextField(_('Metadata of material in json'), default='{}', blank=True)
+    created_on = UnixTimeStampField(
+        _('Created on'), blank=True, null=True, use_numeric=True)
+
+    def __str__(self):
+        return str(self.upload_id)
+
+
 class SubjectLectureLinkMaterial(models.Model):
     """Model for storing link study material of subject lecture"""
     lecture_material = models.ForeignKey(
@@ -2233,6 +2530,12 @@ class InstituteStudents(models.Model):
 
     class Meta:
         unique_together = ('invitee', 'institute')
+        indexes = [
+            models.Index(fields=['institute', 'registration_no'],
+                         name='inst_student_reg_no_idx'),
+            models.Index(fields=['institute', 'enrollment_no'],
+                         name='inst_student_enroll_no_idx'),
+        ]
 
 
 class InstituteClassStudents(models.Model):
@@ -2263,23 +2566,15 @@ class InstituteClassStudents(models.Model):
 @receiver(post_save, sender=InstituteClassStudents)
 def add_student_to_subject(sender, instance, created, *args, **kwargs):
     if created:
-        for subject in InstituteSubject.objects.filter(
-            subject_class__pk=instance.institute_class.pk,
-            type=InstituteSubjectType.MANDATORY
-        ):
-            InstituteSubjectStudents.objects.create(
-                institute_subject=subject,
-                institute_student=instance.institute_student,
-                inviter=instance.inviter,
-                active=instance.active
-            )
+        from .enrollment import enroll_in_mandatory_subjects
+        enroll_in_mandatory_subjects([instance.institute_student_id])
 
 
 class InstituteSubjectStudents(models.Model):
     """Model for storing institute subject students"""
     institute_subject = models.ForeignKey(
         InstituteSubject, on_delete=models.CASCADE, related_name='student_institute_subject')
-    institute_student = models.OneToOneField(
+    institute_student = models.ForeignKey(
         InstituteStudents, on_delete=models.CASCADE, related_name='subject_student_institute_profile')
     inviter = models.ForeignKey(
         User, on_delete=models.SET_NULL, related_name='subject_student_inviter', null=True)
@@ -2482,6 +2777,119 @@ class InstituteSubjectLastSeen(models.Model):
         unique_together = ('user', 'last_seen_subject')
 
 
+class InstituteSubjectAccess(models.Model):
+    """
+    Denormalized effective access of user to institute subject.
+    Maintained from enrollment, ban and permission models in
+    core.subject_access, do not edit manually.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='subject_access_user')
+    subject = models.ForeignKey(
+        InstituteSubject, on_delete=models.CASCADE, related_name='subject_access_subject')
+    institute = models.ForeignKey(
+        Institute, on_delete=models.CASCADE, related_name='subject_access_institute')
+    role = models.CharField(
+        _('Institute Role'),
+        max_length=1,
+        choices=InstituteRole.ROLE_IN_INSTITUTE_ROLES,
+        blank=True,
+        default='')
+    subject_incharge = models.BooleanField(_('Subject In-charge'), default=False, blank=True)
+    class_incharge = models.BooleanField(_('Class In-charge'), default=False, blank=True)
+    enrolled = models.BooleanField(_('Enrolled as student'), default=False, blank=True)
+    active = models.BooleanField(_('Student Active'), default=False, blank=True)
+    is_banned = models.BooleanField(_('Is Banned'), default=False, blank=True)
+    can_view = models.BooleanField(_('Can View'), default=False, blank=True)
+    updated_on = UnixTimeStampField(
+        _('Updated timestamp in milliseconds'), use_numeric=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        self.updated_on = int(time.time()) * 1000
+        super(InstituteSubjectAccess, self).save(*args, **kwargs)
+
+    def __str__(self):
+        return str(self.user)
+
+    class Meta:
+        unique_together = ('user', 'subject')
+        indexes = [
+            models.Index(fields=['institute', 'user'], name='subject_access_inst_user_idx'),
+        ]
+
+
+def schedule_subject_access_refresh(institute_pk, user_pk=None):
+    """Refreshes InstituteSubjectAccess of user in institute after commit"""
+    from .subject_access import schedule_refresh
+    schedule_refresh(institute_pk, user_pk)
+
+
+def _schedule_student_access_refresh(institute_student_pk):
+    student = InstituteStudents.objects.filter(
+        pk=institute_student_pk
+    ).values_list('institute', 'invitee').first()
+
+    # Student itself is being deleted, its own receiver refreshes access
+    if student:
+        schedule_subject_access_refresh(*student)
+
+
+@receiver(post_save, sender=InstituteStudents)
+@receiver(post_delete, sender=InstituteStudents)
+def institute_student_access_changed(sender, instance, *args, **kwargs):
+    schedule_subject_access_refresh(instance.institute_id, instance.invitee_id)
+
+
+@receiver(post_save, sender=InstituteClassStudents)
+@receiver(post_delete, sender=InstituteClassStudents)
+@receiver(post_save, sender=InstituteSubjectStudents)
+@receiver(post_delete, sender=InstituteSubjectStudents)
+@receiver(post_save, sender=InstituteBannedStudent)
+@receiver(post_delete, sender=InstituteBannedStudent)
+@receiver(post_save, sender=InstituteClassBannedStudent)
+@receiver(post_delete, sender=InstituteClassBannedStudent)
+@receiver(post_save, sender=InstituteSubjectBannedStudent)
+@receiver(post_delete, sender=InstituteSubjectBannedStudent)
+def institute_student_enrollment_changed(sender, instance, *args, **kwargs):
+    _schedule_student_access_refresh(instance.institute_student_id)
+
+
+@receiver(post_save, sender=InstitutePermission)
+@receiver(post_delete, sender=InstitutePermission)
+def institute_permission_changed(sender, instance, *args, **kwargs):
+    schedule_subject_access_refresh(instance.institute_id, instance.invitee_id)
+
+
+@receiver(post_save, sender=InstituteClassPermission)
+@receiver(post_delete, sender=InstituteClassPermission)
+def institute_class_permission_changed(sender, instance, *args, **kwargs):
+    schedule_subject_access_refresh(
+        InstituteClass.objects.filter(
+            pk=instance.to_id
+        ).values_list('class_institute', flat=True).first(),
+        instance.invitee_id)
+
+
+@receiver(post_save, sender=InstituteSubjectPermission)
+@receiver(post_delete, sender=InstituteSubjectPermission)
+def institute_subject_permission_changed(sender, instance, *args, **kwargs):
+    schedule_subject_access_refresh(
+        InstituteSubject.objects.filter(
+            pk=instance.to_id
+        ).values_list('subject_class__class_institute', flat=True).first(),
+        instance.invitee_id)
+
+
+@receiver(post_save, sender=InstituteSubject)
+def institute_subject_access_created(sender, instance, created, *args, **kwargs):
+    # Admins and class in-charges get access to new subject
+    if created:
+        schedule_subject_access_refresh(
+            InstituteClass.objects.filter(
+                pk=instance.subject_class_id
+            ).values_list('class_institute', flat=True).first())
+
+
 #####################################################################
 # Models for digital adaptive test
 # Models for creating Question paper
@@ -2940,6 +3348,27 @@ class SubjectTestFillInTheBlankCorrectAnswer(models.Model):
         return str(self.question)
 
 
+class SubjectTestSetSnapshot(models.Model):
+    """Model for storing compiled question paper of finalized test set"""
+    set = models.OneToOneField(
+        SubjectTestSets, on_delete=models.CASCADE, related_name='test_set_snapshot')
+    version = models.PositiveIntegerField(_('Version'), default=1, blank=True)
+    teacher_paper = models.TextField(_('Question paper with answers (json)'))
+    student_paper = models.TextField(_('Question paper without answers (json)'))
+    teacher_etag = models.CharField(_('Teacher paper hash'), max_length=40)
+    student_etag = models.CharField(_('Student paper hash'), max_length=40)
+    stale = models.BooleanField(_('Set was changed after compilation'), default=False, blank=True)
+    created_on = UnixTimeStampField(
+        _('Created timestamp in milliseconds'), use_numeric=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        self.created_on = int(time.time()) * 1000
+        super(SubjectTestSetSnapshot, self).save(*args, **kwargs)
+
+    def __str__(self):
+        return str(self.set)
+
+
 #####################################################################
 # Models for test credentials
 #####################################################################
@@ -2957,6 +3386,13 @@ class StudentTestCredential(models.Model):
         _('Number of warnings'), default=0, blank=True)
     logged_in = models.BooleanField(
         _('Logged In'), default=False, blank=True)
+    lookup_key = models.CharField(
+        _('Password lookup key'), max_length=64, blank=True, null=True)
+    question_order = models.TextField(
+        _('Question order (json)'), blank=True, default='')
+
+    class Meta:
+        unique_together = ('test', 'lookup_key')
 
 
 @receiver(pre_save, sender=StudentTestCredential)
@@ -2965,6 +3401,86 @@ def create_password(instance, *args, **kwargs):
         instance.password = generate_student_test_password(instance)
 
 
+class StudentTestSubmission(models.Model):
+    """
+    Model for storing answers of student in test. Answers are json
+    object of question id -> answer (option id for mcq, list of option
+    ids for select multiple, boolean for true false and assertion,
+    number for numeric and text for other questions).
+    """
+    credential = models.OneToOneField(
+        StudentTestCredential, on_delete=models.CASCADE, related_name='student_test_submission')
+    test = models.ForeignKey(
+        SubjectTest, on_delete=models.CASCADE, related_name='subject_test_submission')
+    set = models.ForeignKey(
+        SubjectTestSets, on_delete=models.CASCADE, related_name='test_set_submission')
+    answers = models.TextField(_('Answers (json)'), blank=True, default='{}')
+    submitted = models.BooleanField(_('Submitted'), default=False, blank=True)
+    submitted_on = UnixTimeStampField(
+        _('Submitted timestamp in milliseconds'), use_numeric=True, blank=True, null=True)
+    graded = models.BooleanField(_('Auto graded'), default=False, blank=True)
+    marks = models.DecimalField(
+        _('Auto graded marks'), max_digits=7, decimal_places=2, blank=True, null=True)
+    question_marks = models.TextField(
+        _('Marks of auto graded questions (json)'), blank=True, default='{}')
+    needs_manual_checking = models.BooleanField(
+        _('Has manually checked questions'), default=False, blank=True)
+    updated_on = UnixTimeStampField(
+        _('Updated timestamp in milliseconds'), use_numeric=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        self.updated_on = int(time.time()) * 1000
+        super(StudentTestSubmission, self).save(*args, **kwargs)
+
+    def __str__(self):
+        return str(self.credential_id)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['set', 'submitted', 'graded'], name='submission_set_graded_idx'),
+        ]
+
+
+class StudentConceptMastery(models.Model):
+    """
+    Model for storing auto graded marks of student in questions of
+    concept label. Maintained from grading in institute.concept_mastery.
+    """
+    concept_label = models.ForeignKey(
+        SubjectTestConceptLabels, on_delete=models.CASCADE, related_name='student_concept_mastery')
+    student = models.ForeignKey(
+        InstituteStudents, on_delete=models.CASCADE, related_name='student_concept_mastery')
+    scored = models.DecimalField(
+        _('Scored marks'), max_digits=7, decimal_places=2, default=0, blank=True)
+    possible = models.DecimalField(
+        _('Possible marks'), max_digits=7, decimal_places=2, default=0, blank=True)
+
+    class Meta:
+        unique_together = ('concept_label', 'student')
+
+    def __str__(self):
+        return str(self.concept_label)
+
+
+class ClassConceptMastery(models.Model):
+    """
+    Model for storing sum of marks of graded students of class in
+    questions of concept label. Maintained with StudentConceptMastery.
+    """
+    concept_label = models.OneToOneField(
+        SubjectTestConceptLabels, on_delete=models.CASCADE, related_name='class_concept_mastery')
+    institute_class = models.ForeignKey(
+        InstituteClass, on_delete=models.CASCADE, related_name='class_concept_mastery')
+    scored = models.DecimalField(
+        _('Scored marks'), max_digits=12, decimal_places=2, default=0, blank=True)
+    possible = models.DecimalField(
+        _('Possible marks'), max_digits=12, decimal_places=2, default=0, blank=True)
+    students = models.PositiveIntegerField(_('Graded students'), default=0, blank=True)
+
+    def __str__(self):
+        return str(self.concept_label)
+
+
 class StudentTestLoginStats(models.Model):
     """Model for storing login statistics of student"""
     test = models.ForeignKey(
@@ -2988,3 +3504,27 @@ class StudentTestLoginStats(models.Model):
         if not self.created_on:
             self.created_on = int(time.time()) * 1000
         super(StudentTestLoginStats, self).save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['test', 'created_on'], name='login_stats_test_created_idx'),
+        ]
+
+
+class StudentTestLoginRollup(models.Model):
+    """
+    Model for storing login counts of test per dimension value (state,
+    country, attempt or net speed bucket). Maintained incrementally
+    from ingested login stats in institute.login_stats.
+    """
+    test = models.ForeignKey(
+        SubjectTest, on_delete=models.CASCADE, related_name='student_test_login_rollup')
+    dimension = models.CharField(_('Dimension'), max_length=10)
+    value = models.CharField(_('Value'), max_length=100, blank=True, default='')
+    count = models.PositiveIntegerField(_('Count'), default=0, blank=True)
+
+    class Meta:
+        unique_together = ('test', 'dimension', 'value')
+
+    def __str__(self):
+        return str(self.test)
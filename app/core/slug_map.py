@@ -0,0 +1,126 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import models
+from core.authentication import LocalLRUCache
+
+# Slugs never change once generated, so entries only have to be
+# dropped when the object is deleted
+SLUG_CACHE_TIMEOUT = getattr(settings, 'SLUG_CACHE_TIMEOUT', 60 * 60 * 24)
+SLUG_LOCAL_CACHE_SIZE = getattr(settings, 'SLUG_LOCAL_CACHE_SIZE', 4096)
+SLUG_LOCAL_CACHE_TIMEOUT = getattr(settings, 'SLUG_LOCAL_CACHE_TIMEOUT', 60)
+
+INSTITUTE = 'institute'
+CLASS = 'class'
+SUBJECT = 'subject'
+
+local_slug_cache = LocalLRUCache(
+    SLUG_LOCAL_CACHE_SIZE, SLUG_LOCAL_CACHE_TIMEOUT)
+
+# Primary keys of resolved institute, class and subject
+SlugPath = namedtuple('SlugPath', ('institute', 'class_', 'subject'))
+
+
+def _slug_cache_key(kind, slug):
+    return 'slug-' + kind + ':' + slug
+
+
+def _normalize(slug):
+    if slug:
+        return slug.lower().strip()
+    return slug
+
+
+def _load_entry(kind, slug):
+    """
+    Loads slug of given kind with its ancestors in one query.
+    Entry is (subject_pk, class_pk, class_slug, institute_pk, institute_slug)
+    with None for levels below kind.
+    """
+    if kind == SUBJECT:
+        return models.InstituteSubject.objects.filter(
+            subject_slug=slug
+        ).values_list(
+            'pk', 'subject_class', 'subject_class__class_slug',
+            'subject_class__class_institute',
+            'subject_class__class_institute__institute_slug'
+        ).first()
+
+    if kind == CLASS:
+        row = models.InstituteClass.objects.filter(
+            class_slug=slug
+        ).values_list(
+            'pk', 'class_slug', 'class_institute',
+            'class_institute__institute_slug'
+        ).first()
+        return (None, ) + row if row else None
+
+    row = models.Institute.objects.filter(
+        institute_slug=slug
+    ).values_list('pk', 'institute_slug').first()
+    return (None, None, None) + row if row else None
+
+
+def _get_entry(kind, slug):
+    key = _slug_cache_key(kind, slug)
+    entry = local_slug_cache.get(key)
+
+    if entry is None:
+        entry = cache.get(key)
+
+        if entry is None:
+            entry = _load_entry(kind, slug)
+            if entry is None:
+                return None
+            cache.set(key, entry, SLUG_CACHE_TIMEOUT)
+
+        local_slug_cache.set(key, entry)
+
+    return entry
+
+
+def resolve_slug_path(institute_slug, class_slug=None, subject_slug=None):
+    """
+    Resolves institute, institute/class or institute/class/subject slug
+    path to primary keys with a single cache lookup (or a single query
+    on miss). Returns None if deepest object does not exist or if parts
+    of the path do not belong together.
+    """
+    institute_slug = _normalize(institute_slug)
+    class_slug = _normalize(class_slug)
+    subject_slug = _normalize(subject_slug)
+
+    if subject_slug:
+        if not class_slug:
+            return None
+        entry = _get_entry(SUBJECT, subject_slug)
+    elif class_slug:
+        entry = _get_entry(CLASS, class_slug)
+    elif institute_slug:
+        entry = _get_entry(INSTITUTE, institute_slug)
+    else:
+        return None
+
+    if not entry:
+        return None
+
+    subject_pk, class_pk, entry_class_slug, institute_pk,\
+        entry_institute_slug = entry
+
+    if entry_institute_slug != institute_slug:
+        return None
+
+    if class_slug and entry_class_slug != class_slug:
+        return None
+
+    return SlugPath(institute_pk, class_pk, subject_pk)
+
+
+def invalidate_slug(kind, slug):
+    """Removes slug from local and shared identity map"""
+    if slug:
+        key = _slug_cache_key(kind, slug)
+        local_slug_cache.delete(key)
+        cache.delete(key)
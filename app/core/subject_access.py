@@ -0,0 +1,250 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.db import transaction
+
+from core import models
+
+# Fields of InstituteSubjectAccess derived from source models
+ACCESS_FIELDS = ('role', 'subject_incharge', 'class_incharge',
+                 'enrolled', 'active', 'is_banned', 'can_view')
+
+
+def _empty_access():
+    return {
+        'role': '',
+        'subject_incharge': False,
+        'class_incharge': False,
+        'enrolled': False,
+        'active': False,
+        'is_banned': False,
+        'can_view': False
+    }
+
+
+def _filter_users(queryset, lookup, user_pks):
+    if user_pks is None:
+        return queryset
+    return queryset.filter(**{lookup + '__in': user_pks})
+
+
+def compute_subject_access(institute_pk, user_pks=None):
+    """
+    Computes effective access of users to all subjects of institute
+    from enrollment, ban and permission models with a fixed number of
+    queries. Returns dict of (user_pk, subject_pk) -> access fields.
+    Only users with some relation to a subject get an entry.
+    """
+    subjects = dict(models.InstituteSubject.objects.filter(
+        subject_class__class_institute__pk=institute_pk
+    ).values_list('pk', 'subject_class'))
+
+    if not subjects:
+        return dict()
+
+    subjects_of_class = defaultdict(list)
+    for subject_pk, class_pk in subjects.items():
+        subjects_of_class[class_pk].append(subject_pk)
+
+    roles = dict(_filter_users(
+        models.InstitutePermission.objects.filter(
+            institute__pk=institute_pk,
+            active=True),
+        'invitee', user_pks
+    ).values_list('invitee', 'role'))
+
+    result = defaultdict(_empty_access)
+
+    for user_pk, role in roles.items():
+        if role == models.InstituteRole.ADMIN:
+            for subject_pk in subjects:
+                result[user_pk, subject_pk]['role'] = role
+
+    for user_pk, class_pk in _filter_users(
+        models.InstituteClassPermission.objects.filter(
+            to__class_institute__pk=institute_pk),
+        'invitee', user_pks
+    ).values_list('invitee', 'to'):
+        for subject_pk in subjects_of_class[class_pk]:
+            result[user_pk, subject_pk]['class_incharge'] = True
+
+    for user_pk, subject_pk in _filter_users(
+        models.InstituteSubjectPermission.objects.filter(
+            to__pk__in=subjects.keys()),
+        'invitee', user_pks
+    ).values_list('invitee', 'to'):
+        result[user_pk, subject_pk]['subject_incharge'] = True
+
+    # Enrolled students
+    students = {
+        pk: (user_pk, active, is_banned)
+        for pk, user_pk, active, is_banned in _filter_users(
+            models.InstituteStudents.objects.filter(
+                institute__pk=institute_pk),
+            'invitee', user_pks
+        ).values_list('pk', 'invitee', 'active', 'is_banned')
+    }
+
+    if students:
+        class_students = {
+            student_pk: (class_pk, is_banned)
+            for student_pk, class_pk, is_banned in
+            models.InstituteClassStudents.objects.filter(
+                institute_student__pk__in=students.keys()
+            ).values_list('institute_student', 'institute_class', 'is_banned')
+        }
+        institute_bans = set(models.InstituteBannedStudent.objects.filter(
+            institute_student__pk__in=students.keys(),
+            banned_institute__pk=institute_pk,
+            active=True
+        ).values_list('institute_student', flat=True))
+        class_bans = set(models.InstituteClassBannedStudent.objects.filter(
+            institute_student__pk__in=students.keys(),
+            active=True
+        ).values_list('institute_student', 'banned_class'))
+        subject_bans = set(models.InstituteSubjectBannedStudent.objects.filter(
+            institute_student__pk__in=students.keys(),
+            active=True
+        ).values_list('institute_student', 'banned_subject'))
+
+        for student_pk, subject_pk, active, is_banned in\
+                models.InstituteSubjectStudents.objects.filter(
+                    institute_student__pk__in=students.keys(),
+                    institute_subject__pk__in=subjects.keys()
+                ).values_list('institute_student', 'institute_subject',
+                              'active', 'is_banned'):
+            user_pk, student_active, student_banned = students[student_pk]
+            class_pk = subjects[subject_pk]
+            class_banned = class_students.get(student_pk) == (class_pk, True)
+
+            access = result[user_pk, subject_pk]
+            access['enrolled'] = True
+            access['active'] = student_active and active
+            access['is_banned'] = bool(
+                student_banned or is_banned or
+                class_banned or
+                student_pk in institute_bans or
+                (student_pk, class_pk) in class_bans or
+                (student_pk, subject_pk) in subject_bans)
+
+    for (user_pk, subject_pk), access in result.items():
+        access['role'] = roles.get(user_pk, '')
+        access['can_view'] = bool(
+            access['role'] == models.InstituteRole.ADMIN or
+            access['subject_incharge'] or
+            access['class_incharge'] or
+            (access['enrolled'] and access['active'] and
+             not access['is_banned']))
+
+    return dict(result)
+
+
+def diff_subject_access(institute_pk, user_pks=None):
+    """
+    Compares stored access of institute with computed access.
+    Returns tuple of (missing, stale, extra) where missing is dict of
+    (user_pk, subject_pk) -> access fields which are not stored, stale
+    is list of stored rows with wrong fields (already updated in memory)
+    and extra is list of pk of stored rows which should not exist.
+    """
+    expected = compute_subject_access(institute_pk, user_pks)
+    stale = list()
+    extra = list()
+
+    for row in _filter_users(
+        models.InstituteSubjectAccess.objects.filter(
+            institute__pk=institute_pk),
+        'user', user_pks
+    ).only('pk', 'user', 'subject', *ACCESS_FIELDS):
+        access = expected.pop((row.user_id, row.subject_id), None)
+
+        if access is None:
+            extra.append(row.pk)
+        elif any(getattr(row, f) != access[f] for f in ACCESS_FIELDS):
+            for f in ACCESS_FIELDS:
+                setattr(row, f, access[f])
+            stale.append(row)
+
+    return expected, stale, extra
+
+
+def refresh_subject_access(institute_pk, user_pks=None):
+    """
+    Brings stored access of institute (or only of given users of
+    institute) in sync with source models.
+    Returns tuple of number of (created, updated, deleted) rows.
+    """
+    if user_pks is not None:
+        user_pks = list(user_pks)
+
+    with transaction.atomic():
+        missing, stale, extra = diff_subject_access(institute_pk, user_pks)
+        now = int(time.time()) * 1000
+
+        if extra:
+            models.InstituteSubjectAccess.objects.filter(pk__in=extra).delete()
+
+        if stale:
+            for row in stale:
+                row.updated_on = now
+            models.InstituteSubjectAccess.objects.bulk_update(
+                stale, ACCESS_FIELDS + ('updated_on', ))
+
+        if missing:
+            models.InstituteSubjectAccess.objects.bulk_create([
+                models.InstituteSubjectAccess(
+                    user_id=user_pk,
+                    subject_id=subject_pk,
+                    institute_id=institute_pk,
+                    updated_on=now,
+                    **access
+                ) for (user_pk, subject_pk), access in missing.items()
+            ])
+
+    return len(missing), len(stale), len(extra)
+
+
+def can_view_subject(user, subject_pk):
+    """Returns True if user may view subject. Makes one indexed lookup."""
+    return models.InstituteSubjectAccess.objects.filter(
+        user__pk=user.pk,
+        subject__pk=subject_pk,
+        can_view=True
+    ).exists()
+
+
+# Refreshes requested by signals are collected per thread and run
+# once after commit, so a cascade of saves or deletes in one
+# transaction refreshes every affected user only once.
+_pending = threading.local()
+
+
+def _run_pending_refreshes():
+    pending = getattr(_pending, 'refreshes', None)
+    _pending.refreshes = dict()
+
+    for institute_pk, user_pks in (pending or dict()).items():
+        refresh_subject_access(institute_pk, user_pks)
+
+
+def schedule_refresh(institute_pk, user_pk=None):
+    """
+    Schedules refresh of access of user in institute after current
+    transaction commits. Refreshes whole institute if user_pk is None.
+    """
+    if not institute_pk:
+        return
+
+    pending = getattr(_pending, 'refreshes', None)
+    if pending is None:
+        pending = _pending.refreshes = dict()
+
+    if user_pk is None:
+        pending[institute_pk] = None
+    elif institute_pk not in pending:
+        pending[institute_pk] = {user_pk}
+    elif pending[institute_pk] is not None:
+        pending[institute_pk].add(user_pk)
+
+    transaction.on_commit(_run_pending_refreshes)
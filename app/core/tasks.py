@@ -4,6 +4,7 @@ from celery import shared_task
 
 import os
 from django.contrib.auth import get_user_model
+from django.db import transaction
 
 from core import models
 
@@ -35,3 +36,24 @@ def create_welcome_message_after_user_creation(receiver_pk):
                 ' as per your requirements.'
     )
     return message.id
+
+
+@shared_task
+def enroll_class_students_in_subject(subject_pk):
+    """Enrolls students of class in mandatory subject after it is created"""
+    from core.enrollment import enroll_class_in_subject
+    from core.subject_access import refresh_subject_access
+
+    institute_pk = models.InstituteSubject.objects.filter(
+        pk=subject_pk
+    ).values_list('subject_class__class_institute', flat=True).first()
+
+    if not institute_pk:
+        return 0
+
+    with transaction.atomic():
+        created = enroll_class_in_subject(subject_pk)
+
+    # Rows inserted by INSERT ... SELECT do not send signals
+    refresh_subject_access(institute_pk)
+    return created
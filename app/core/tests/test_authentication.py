@@ -0,0 +1,72 @@
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+
+from core.admin import CustomUserAdmin
+from core.authentication import CachedTokenAuthentication,\
+    local_token_cache
+
+
+def create_teacher(email='abc@gmail.com', username='tempusername'):
+    """Creates and return teacher"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_teacher=True
+    )
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Tests for cache backed token authentication"""
+
+    def setUp(self):
+        cache.clear()
+        local_token_cache.clear()
+        self.user = create_teacher()
+        self.token = Token.objects.get(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_token_is_resolved_from_cache(self):
+        """Test that only the first lookup of token hits database"""
+        with self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.email, self.user.email)
+        self.assertTrue(user.is_teacher)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_token_is_resolved_from_shared_cache(self):
+        """Test that other processes find token in shared cache"""
+        self.auth.authenticate_credentials(self.token.key)
+        local_token_cache.clear()
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_deleted_token_fails(self):
+        """Test that deleted token is evicted from cache"""
+        key = self.token.key
+        self.auth.authenticate_credentials(key)
+        self.token.delete()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_deactivated_user_fails(self):
+        """Test that deactivating account through admin evicts token"""
+        self.auth.authenticate_credentials(self.token.key)
+        CustomUserAdmin(get_user_model(), AdminSite()).deactivate_accounts(
+            None, get_user_model().objects.filter(pk=self.user.pk))
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
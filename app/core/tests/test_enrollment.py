@@ -0,0 +1,122 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import models
+from core.enrollment import enroll_class_in_subject
+from core.tasks import enroll_class_students_in_subject
+
+
+def create_teacher(email='abc@gmail.com', username='tempusername'):
+    """Creates and return teacher"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_teacher=True
+    )
+
+
+def create_student(email, username):
+    """Creates and return student"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_student=True
+    )
+
+
+class SubjectEnrollmentTests(TestCase):
+    """Tests for set-based enrollment of class students in subjects"""
+
+    def setUp(self):
+        self.admin = create_teacher()
+        self.institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        self.class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+
+    def add_class_student(self, i, active=True):
+        student = models.InstituteStudents.objects.create(
+            invitee=create_student(
+                'student{}@gmail.com'.format(i), 'student{}'.format(i)),
+            inviter=self.admin,
+            institute=self.institute,
+            active=active
+        )
+        models.InstituteClassStudents.objects.create(
+            institute_class=self.class_,
+            institute_student=student,
+            inviter=self.admin,
+            active=active
+        )
+        return student
+
+    def create_subject(self, name,
+                       type_=models.InstituteSubjectType.MANDATORY):
+        return models.InstituteSubject.objects.create(
+            subject_class=self.class_,
+            name=name,
+            type=type_
+        )
+
+    def test_class_student_joins_all_mandatory_subjects(self):
+        """Test that new class student is enrolled in mandatory subjects"""
+        subject1 = self.create_subject('subject 1')
+        subject2 = self.create_subject('subject 2')
+        self.create_subject('subject 3', models.InstituteSubjectType.OPTIONAL)
+
+        student = self.add_class_student(1)
+
+        enrolled = models.InstituteSubjectStudents.objects.filter(
+            institute_student=student)
+        self.assertEqual(
+            set(enrolled.values_list('institute_subject', flat=True)),
+            {subject1.pk, subject2.pk})
+        self.assertTrue(all(e.active and e.inviter == self.admin
+                            for e in enrolled))
+
+    def test_new_mandatory_subject_enrolls_class(self):
+        """Test that class students are enrolled in new mandatory subject"""
+        for i in range(5):
+            self.add_class_student(i, active=i % 2 == 0)
+
+        subject = self.create_subject('subject 1')
+
+        enrolled = models.InstituteSubjectStudents.objects.filter(
+            institute_subject=subject)
+        self.assertEqual(enrolled.count(), 5)
+        self.assertEqual(enrolled.filter(active=True).count(), 3)
+
+    def test_enrollment_is_single_query_and_idempotent(self):
+        """Test that class is enrolled with one query skipping existing"""
+        for i in range(5):
+            self.add_class_student(i)
+        subject = self.create_subject('subject 1')
+
+        with self.assertNumQueries(1):
+            created = enroll_class_in_subject(subject.pk)
+
+        self.assertEqual(created, 0)
+        self.assertEqual(models.InstituteSubjectStudents.objects.filter(
+            institute_subject=subject).count(), 5)
+
+    @mock.patch('core.enrollment.ENROLLMENT_SYNC_LIMIT', 2)
+    def test_large_class_is_enrolled_in_background(self):
+        """Test that class above limit is enrolled by background job"""
+        for i in range(3):
+            self.add_class_student(i)
+
+        subject = self.create_subject('subject 1')
+
+        self.assertFalse(models.InstituteSubjectStudents.objects.filter(
+            institute_subject=subject).exists())
+        self.assertEqual(enroll_class_students_in_subject(subject.pk), 3)
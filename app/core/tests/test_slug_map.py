@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from core import models
+from core.slug_map import SlugPath, local_slug_cache, resolve_slug_path
+
+
+def create_teacher(email='abc@gmail.com', username='tempusername'):
+    """Creates and return teacher"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_teacher=True
+    )
+
+
+def create_institute(user, institute_name='tempinstitute'):
+    """Creates institute and return institute"""
+    return models.Institute.objects.create(
+        name=institute_name,
+        user=user,
+        institute_category=models.InstituteCategory.EDUCATION,
+        type=models.InstituteType.COLLEGE
+    )
+
+
+class SlugMapTests(TestCase):
+    """Tests for resolving institute, class and subject slugs"""
+
+    def setUp(self):
+        cache.clear()
+        local_slug_cache.clear()
+        self.user = create_teacher()
+        self.institute = create_institute(self.user)
+        self.class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+        self.subject = models.InstituteSubject.objects.create(
+            subject_class=self.class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.OPTIONAL
+        )
+
+    def test_resolve_subject_path(self):
+        """Test that subject path is resolved once and then from cache"""
+        with self.assertNumQueries(1):
+            path = resolve_slug_path(
+                self.institute.institute_slug,
+                self.class_.class_slug.upper(),
+                self.subject.subject_slug)
+
+        self.assertEqual(path, SlugPath(
+            self.institute.pk, self.class_.pk, self.subject.pk))
+
+        local_slug_cache.clear()
+        with self.assertNumQueries(0):
+            resolve_slug_path(
+                self.institute.institute_slug,
+                self.class_.class_slug,
+                self.subject.subject_slug)
+
+    def test_resolve_institute_and_class_path(self):
+        """Test that shorter paths are resolved"""
+        self.assertEqual(
+            resolve_slug_path(self.institute.institute_slug),
+            SlugPath(self.institute.pk, None, None))
+        self.assertEqual(
+            resolve_slug_path(
+                self.institute.institute_slug, self.class_.class_slug),
+            SlugPath(self.institute.pk, self.class_.pk, None))
+
+    def test_parts_must_belong_together(self):
+        """Test that class of other institute is not resolved"""
+        other = create_institute(self.user, 'otherinstitute')
+
+        self.assertIsNone(resolve_slug_path(
+            other.institute_slug, self.class_.class_slug))
+        self.assertIsNone(resolve_slug_path(
+            self.institute.institute_slug, 'unknown-class',
+            self.subject.subject_slug))
+        self.assertIsNone(resolve_slug_path(
+            self.institute.institute_slug, 'unknown-class'))
+
+    def test_deleted_subject_is_not_resolved(self):
+        """Test that deleting subject removes it from identity map"""
+        slugs = (self.institute.institute_slug, self.class_.class_slug,
+                 self.subject.subject_slug)
+        self.assertIsNotNone(resolve_slug_path(*slugs))
+
+        self.subject.delete()
+
+        self.assertIsNone(resolve_slug_path(*slugs))
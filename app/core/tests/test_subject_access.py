@@ -0,0 +1,129 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+
+from core import models
+from core.subject_access import can_view_subject, diff_subject_access
+
+
+def create_teacher(email='abc@gmail.com', username='tempusername'):
+    """Creates and return teacher"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_teacher=True
+    )
+
+
+def create_student(email='student@gmail.com', username='studentusername'):
+    """Creates and return student"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_student=True
+    )
+
+
+# Refreshes run on commit, so the tests need real transactions
+class InstituteSubjectAccessTests(TransactionTestCase):
+    """Tests for materialized subject access"""
+
+    def setUp(self):
+        self.admin = create_teacher()
+        self.institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        self.class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+        self.subject = models.InstituteSubject.objects.create(
+            subject_class=self.class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        self.student = create_student()
+        self.institute_student = models.InstituteStudents.objects.create(
+            invitee=self.student,
+            inviter=self.admin,
+            institute=self.institute,
+            active=True
+        )
+
+    def enroll_student(self):
+        models.InstituteClassStudents.objects.create(
+            institute_class=self.class_,
+            institute_student=self.institute_student,
+            inviter=self.admin,
+            active=True
+        )
+
+    def test_admin_can_view_new_subject(self):
+        """Test that admin gets access to subject on creation"""
+        self.assertTrue(can_view_subject(self.admin, self.subject.pk))
+        access = models.InstituteSubjectAccess.objects.get(
+            user=self.admin, subject=self.subject)
+        self.assertEqual(access.role, models.InstituteRole.ADMIN)
+
+    def test_enrolled_student_can_view_subject(self):
+        """Test that enrollment in class grants access to mandatory subject"""
+        self.assertFalse(can_view_subject(self.student, self.subject.pk))
+
+        self.enroll_student()
+
+        self.assertTrue(can_view_subject(self.student, self.subject.pk))
+
+    def test_banned_student_can_not_view_subject(self):
+        """Test that active ban revokes and lifted ban restores access"""
+        self.enroll_student()
+        ban = models.InstituteSubjectBannedStudent.objects.create(
+            institute_student=self.institute_student,
+            banned_by=self.admin,
+            banned_subject=self.subject,
+            start_date=1,
+            reason='reason'
+        )
+        self.assertFalse(can_view_subject(self.student, self.subject.pk))
+
+        ban.active = False
+        ban.save()
+        self.assertTrue(can_view_subject(self.student, self.subject.pk))
+
+    def test_subject_incharge_access_follows_permission(self):
+        """Test that removing subject permission removes access"""
+        teacher = create_teacher('def@gmail.com', 'tempusername2')
+        perm = models.InstituteSubjectPermission.objects.create(
+            invitee=teacher,
+            inviter=self.admin,
+            to=self.subject
+        )
+        self.assertTrue(can_view_subject(teacher, self.subject.pk))
+
+        perm.delete()
+
+        self.assertFalse(models.InstituteSubjectAccess.objects.filter(
+            user=teacher).exists())
+
+    def test_check_command_detects_and_fixes_drift(self):
+        """Test that checker reports drift and rebuild repairs it"""
+        self.enroll_student()
+        models.InstituteSubjectAccess.objects.filter(
+            user=self.student).update(can_view=False)
+
+        with self.assertRaises(CommandError):
+            call_command('check_subject_access', stdout=StringIO())
+
+        call_command('rebuild_subject_access', self.institute.institute_slug,
+                     stdout=StringIO())
+
+        self.assertEqual(diff_subject_access(self.institute.pk),
+                         (dict(), list(), list()))
+        self.assertTrue(can_view_subject(self.student, self.subject.pk))
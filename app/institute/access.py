@@ -0,0 +1,144 @@
+from django.db.models import CharField, F, IntegerField, Value
+
+from core import models
+
+# Grant kinds returned by the combined grant query
+INSTITUTE_GRANT = 'I'
+CLASS_GRANT = 'C'
+SUBJECT_GRANT = 'S'
+
+
+def _grant_query(user):
+    """
+    Returns one UNION ALL query over institute, class and subject permissions
+    of user. Every row is (kind, institute_id, institute_slug, class_id,
+    class_slug, subject_id, subject_slug, role).
+    """
+    no_int = Value(None, output_field=IntegerField())
+    no_char = Value(None, output_field=CharField())
+    columns = ('grant_kind', 'grant_institute', 'grant_institute_slug',
+               'grant_class', 'grant_class_slug', 'grant_subject',
+               'grant_subject_slug', 'grant_role')
+
+    institute_grants = models.InstitutePermission.objects.filter(
+        invitee=user,
+        active=True
+    ).annotate(
+        grant_kind=Value(INSTITUTE_GRANT, output_field=CharField()),
+        grant_institute=F('institute_id'),
+        grant_institute_slug=F('institute__institute_slug'),
+        grant_class=no_int,
+        grant_class_slug=no_char,
+        grant_subject=no_int,
+        grant_subject_slug=no_char,
+        grant_role=F('role')
+    ).values_list(*columns)
+
+    class_grants = models.InstituteClassPermission.objects.filter(
+        invitee=user
+    ).annotate(
+        grant_kind=Value(CLASS_GRANT, output_field=CharField()),
+        grant_institute=F('to__class_institute_id'),
+        grant_institute_slug=F('to__class_institute__institute_slug'),
+        grant_class=F('to_id'),
+        grant_class_slug=F('to__class_slug'),
+        grant_subject=no_int,
+        grant_subject_slug=no_char,
+        grant_role=no_char
+    ).values_list(*columns)
+
+    subject_grants = models.InstituteSubjectPermission.objects.filter(
+        invitee=user
+    ).annotate(
+        grant_kind=Value(SUBJECT_GRANT, output_field=CharField()),
+        grant_institute=F('to__subject_class__class_institute_id'),
+        grant_institute_slug=F(
+            'to__subject_class__class_institute__institute_slug'),
+        grant_class=F('to__subject_class_id'),
+        grant_class_slug=F('to__subject_class__class_slug'),
+        grant_subject=F('to_id'),
+        grant_subject_slug=F('to__subject_slug'),
+        grant_role=no_char
+    ).values_list(*columns)
+
+    return institute_grants.union(class_grants, subject_grants, all=True)
+
+
+class InstituteAccess:
+    """
+    Institute, class and subject grants of a single user.
+
+    All grants are loaded lazily with a single query the first time any
+    check is made and are kept for the lifetime of the object, so it must
+    not outlive the request it was created for. Lookups accept either the
+    primary key or the slug of institute, class and subject.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._loaded = False
+        self._roles = dict()
+        self._classes = set()
+        self._subjects = set()
+
+    def _load(self):
+        if self._loaded:
+            return
+
+        self._loaded = True
+        if not self.user or not self.user.is_authenticated:
+            return
+
+        for kind, institute, institute_slug, class_, class_slug,\
+                subject, subject_slug, role in _grant_query(self.user):
+            if kind == INSTITUTE_GRANT:
+                self._roles[institute] = role
+                if institute_slug:
+                    self._roles[institute_slug] = role
+            elif kind == CLASS_GRANT:
+                self._classes.add(class_)
+                if class_slug:
+                    self._classes.add(class_slug)
+            elif kind == SUBJECT_GRANT:
+                self._subjects.add(subject)
+                self._subjects.add(subject_slug)
+
+    def role(self, institute):
+        """Returns active role of user in institute, None if there is none"""
+        self._load()
+        return self._roles.get(institute)
+
+    def is_admin(self, institute):
+        """Returns True if user is an active admin of the institute"""
+        return self.role(institute) == models.InstituteRole.ADMIN
+
+    def has_class_perm(self, class_):
+        """Returns True if user is in-charge of class"""
+        self._load()
+        return class_ in self._classes
+
+    def has_subject_perm(self, subject):
+        """Returns True if user is in-charge of subject"""
+        self._load()
+        return subject in self._subjects
+
+    def can_manage_class(self, institute, class_):
+        """Class in-charge or admin"""
+        return self.has_class_perm(class_) or self.is_admin(institute)
+
+    def can_manage_subject(self, institute, class_, subject):
+        """Subject in-charge, class in-charge or admin"""
+        return self.has_subject_perm(subject) or\
+            self.has_class_perm(class_) or\
+            self.is_admin(institute)
+
+
+def get_access(request):
+    """Returns access of requesting user, memoized on the request"""
+    access = getattr(request, '_institute_access', None)
+
+    if access is None or access.user != request.user:
+        access = InstituteAccess(request.user)
+        request._institute_access = access
+
+    return access
@@ -0,0 +1,99 @@
+import hashlib
+import hmac
+import random
+
+from django.conf import settings
+from django.utils.translation import ugettext as _
+
+from core import models
+
+# Set allocation strategies, cohort is always in seat order (enrollment
+# number then student)
+ROUND_ROBIN = 'round_robin'
+# Seeded permutation of cohort, then round robin
+SHUFFLED = 'shuffled'
+# Every block of as many neighbouring seats as sets gets all sets in
+# seeded order, so neighbours never share a set
+SEPARATED = 'separated'
+
+ALLOCATION_STRATEGIES = (ROUND_ROBIN, SHUFFLED, SEPARATED)
+
+
+def allocation_seed(test_pk, *parts):
+    """
+    Returns seed of test for given purpose. It is derived from secret
+    key, so allocations can be reproduced but not predicted by students.
+    """
+    message = ':'.join(str(p) for p in (test_pk,) + parts)
+    return int.from_bytes(hmac.new(
+        settings.SECRET_KEY.encode(), message.encode(), hashlib.sha256
+    ).digest()[:8], 'big')
+
+
+def allocate_sets(test_pk, students, set_pks, strategy=ROUND_ROBIN):
+    """
+    Returns dict of student pk -> set pk for whole cohort of test.
+    students are pks in seat order. Allocation depends only on test,
+    cohort and sets, so it is the same every time it is computed.
+    Raises ValueError for unknown strategy.
+    """
+    if strategy not in ALLOCATION_STRATEGIES:
+        raise ValueError(_('Invalid allocation strategy.'))
+
+    count = len(set_pks)
+    rng = random.Random(allocation_seed(test_pk, 'sets', strategy))
+
+    if strategy == SEPARATED:
+        order = list()
+        for _i in range(0, len(students), count):
+            block = rng.sample(set_pks, count)
+            # Last seat of previous block neighbours first seat of this
+            if order and count > 1 and block[0] == order[-1]:
+                block[0], block[-1] = block[-1], block[0]
+            order.extend(block)
+        return dict(zip(students, order))
+
+    students = list(students)
+    if strategy == SHUFFLED:
+        rng.shuffle(students)
+
+    return {s: set_pks[i % count] for i, s in enumerate(students)}
+
+
+def get_set_questions(test):
+    """
+    Returns dict of set pk -> list of question pks of each section of
+    set in order, read with one query
+    """
+    model = models.SubjectTypedTestQuestion\
+        if test.question_mode == models.QuestionMode.TYPED\
+        else models.SubjectPictureTestQuestion
+
+    sets = dict()
+    last_section = None
+    for set_pk, section_pk, question_pk in model.objects.filter(
+            test_section__set__test__pk=test.pk
+    ).values_list('test_section__set', 'test_section', 'pk').order_by(
+            'test_section__set', 'test_section__order', 'test_section',
+            'order', 'pk'):
+        sections = sets.setdefault(set_pk, [])
+        if section_pk != last_section:
+            sections.append([])
+            last_section = section_pk
+        sections[-1].append(question_pk)
+
+    return sets
+
+
+def question_order(test_pk, student_pk, sections):
+    """
+    Returns question pks of student with questions of every section
+    shuffled by seeded permutation, sections keep their order
+    """
+    rng = random.Random(allocation_seed(test_pk, 'questions', student_pk))
+    order = list()
+    for questions in sections:
+        questions = list(questions)
+        rng.shuffle(questions)
+        order.extend(questions)
+    return order
@@ -0,0 +1,206 @@
+import json
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from .submissions import save_answers
+from core import models
+
+# Flusher takes this many students with pending answers at a time
+AUTOSAVE_FLUSH_BATCH = getattr(settings, 'AUTOSAVE_FLUSH_BATCH', 500)
+
+# Pending answers expire if they are not flushed within this many seconds
+AUTOSAVE_TTL = getattr(settings, 'AUTOSAVE_TTL', 60 * 60 * 24)
+
+# Set of credential pks with pending answers
+DIRTY_KEY = 'autosave:dirty'
+# Set of credential pks whose answers are being flushed. Members left
+# here by a crashed flusher are flushed again in recovery.
+IN_FLIGHT_KEY = 'autosave:in-flight'
+
+
+def _pending_key(credential_pk):
+    return 'autosave:answers:' + str(credential_pk)
+
+
+def _flushing_key(credential_pk):
+    return 'autosave:flushing:' + str(credential_pk)
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def autosave_answers(credential_pk, answers):
+    """
+    Buffers answers (question id -> answer, None removes answer) of
+    student in redis. They are written to database by the flusher.
+    """
+    if not answers:
+        return
+
+    pipe = _redis().pipeline()
+    pipe.hset(_pending_key(credential_pk), mapping={
+        str(q): json.dumps(a) for q, a in answers.items()})
+    pipe.expire(_pending_key(credential_pk), AUTOSAVE_TTL)
+    pipe.sadd(DIRTY_KEY, credential_pk)
+    pipe.execute()
+
+
+def _take(credential_pks, include_pending=False):
+    """
+    Moves pending answers of credentials aside for flushing and returns
+    (dict of credential pk -> answers, pks with answers left pending).
+    Answers left aside by a crashed flush are returned instead and
+    newer answers stay pending for the next flush, unless
+    include_pending is True when both are returned, newer last.
+    """
+    redis = _redis()
+    pipe = redis.pipeline()
+    for pk in credential_pks:
+        pipe.renamenx(_pending_key(pk), _flushing_key(pk))
+        pipe.sadd(IN_FLIGHT_KEY, pk)
+        pipe.srem(DIRTY_KEY, pk)
+    renamed = pipe.execute(raise_on_error=False)[::3]
+
+    pipe = redis.pipeline()
+    for pk in credential_pks:
+        pipe.hgetall(_flushing_key(pk))
+        if include_pending:
+            pipe.hgetall(_pending_key(pk))
+    results = pipe.execute()
+    if include_pending:
+        results = [{**results[i], **results[i + 1]}
+                   for i in range(0, len(results), 2)]
+
+    taken = dict()
+    for pk, answers in zip(credential_pks, results):
+        if answers:
+            taken[pk] = {int(q): json.loads(a) for q, a in answers.items()}
+
+    return taken, [] if include_pending else [
+        pk for pk, result in zip(credential_pks, renamed) if result is False]
+
+
+def _release(credential_pks, still_pending=(), delete_pending=False):
+    """Removes flushed answers, marks answers left pending as dirty"""
+    pipe = _redis().pipeline()
+    for pk in credential_pks:
+        pipe.delete(_flushing_key(pk))
+        if delete_pending:
+            pipe.delete(_pending_key(pk))
+        pipe.srem(IN_FLIGHT_KEY, pk)
+    if still_pending:
+        pipe.sadd(DIRTY_KEY, *still_pending)
+    pipe.execute()
+
+
+def _merge(answers, updates):
+    """Returns answers json with updates applied"""
+    answers = json.loads(answers or '{}')
+    for question_id, answer in updates.items():
+        if answer is None:
+            answers.pop(str(question_id), None)
+        else:
+            answers[str(question_id)] = answer
+    return json.dumps(answers)
+
+
+def _create_missing_submissions(credential_pks):
+    models.StudentTestSubmission.objects.bulk_create([
+        models.StudentTestSubmission(
+            credential_id=pk,
+            test_id=test_pk,
+            set_id=set_pk,
+            updated_on=int(time.time()) * 1000
+        ) for pk, test_pk, set_pk in
+        models.StudentTestCredential.objects.filter(
+            pk__in=credential_pks,
+            student_test_submission__isnull=True
+        ).values_list('pk', 'test', 'set')
+    ], ignore_conflicts=True)
+
+
+def flush(credential_pks):
+    """
+    Writes pending answers of credentials to their submissions with one
+    bulk update. Rows are locked before answers are taken from redis,
+    so a concurrent submit can not miss them. Answers of submitted
+    tests are dropped. Returns number of updated submissions.
+    """
+    credential_pks = [int(pk) for pk in credential_pks]
+    if not credential_pks:
+        return 0
+
+    _create_missing_submissions(credential_pks)
+
+    with transaction.atomic():
+        submissions = {
+            s.credential_id: s for s in
+            models.StudentTestSubmission.objects.select_for_update().filter(
+                credential__pk__in=credential_pks
+            ).only('pk', 'credential', 'answers', 'submitted')}
+        taken, still_pending = _take(credential_pks)
+
+        changed = list()
+        for pk, answers in taken.items():
+            submission = submissions.get(pk)
+            if submission is None or submission.submitted:
+                continue
+            submission.answers = _merge(submission.answers, answers)
+            submission.updated_on = int(time.time()) * 1000
+            changed.append(submission)
+
+        models.StudentTestSubmission.objects.bulk_update(
+            changed, ['answers', 'updated_on'], batch_size=500)
+
+    _release(credential_pks, still_pending)
+    return len(changed)
+
+
+def recover():
+    """
+    Flushes answers left aside by a flush that crashed before removing
+    them. Must not run concurrently with flush_pending.
+    """
+    return flush(_redis().smembers(IN_FLIGHT_KEY))
+
+
+def flush_pending():
+    """
+    Flushes answers of every student with pending answers in batches
+    of AUTOSAVE_FLUSH_BATCH, after recovering crashed flushes.
+    Returns number of updated submissions.
+    """
+    flushed = recover()
+    redis = _redis()
+
+    while True:
+        pks = redis.srandmember(DIRTY_KEY, AUTOSAVE_FLUSH_BATCH)
+        if not pks:
+            return flushed
+        flushed += flush(pks)
+
+
+def submit_answers(credential, answers=None):
+    """
+    Submits test of student with pending answers flushed synchronously
+    and answers applied on top of them. Returns the submission.
+    Raises ValueError if it is already submitted.
+    """
+    _create_missing_submissions([credential.pk])
+
+    with transaction.atomic():
+        models.StudentTestSubmission.objects.select_for_update().filter(
+            credential__pk=credential.pk).first()
+
+        taken, _pending = _take([credential.pk], include_pending=True)
+        pending = taken.get(credential.pk, {})
+        pending.update(answers or {})
+
+        submission = save_answers(credential, pending, submit=True)
+
+    _release([credential.pk], delete_pending=True)
+    return submission
@@ -0,0 +1,166 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Sum
+from django.utils.translation import ugettext as _
+
+from core import models
+
+# Largest chunk accepted in one request, in bytes
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = getattr(
+    settings, 'CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+
+# Uploads not completed within this many seconds are removed
+CHUNKED_UPLOAD_EXPIRY = getattr(settings, 'CHUNKED_UPLOAD_EXPIRY',
+                                60 * 60 * 24)
+
+# Chunks are copied from request to disk in blocks of this many bytes
+_BLOCK_SIZE = 64 * 1024
+
+
+def _now():
+    return int(time.time()) * 1000
+
+
+def partial_file_path(upload_id):
+    """Returns path of partial file of upload"""
+    return os.path.join(settings.MEDIA_ROOT, 'institute/uploads/partial',
+                        str(upload_id))
+
+
+def _lock_key(upload_pk):
+    return 'chunked-upload-lock:' + str(upload_pk)
+
+
+class AssembledFile(File):
+    """
+    Partial file of completed upload. Like temporary uploaded files, it is
+    moved into place by storage instead of being copied.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def create_upload(user, subject_pk, institute_pk, purpose, file_name, size,
+                  metadata):
+    """
+    Returns new upload of declared size in bytes with empty partial file.
+    Storage license of institute is locked while storage used by it and
+    its uploads in progress is checked, so concurrent uploads can not
+    together exceed it. Raises ValueError if storage is not enough.
+    """
+    with transaction.atomic():
+        license_stat = models.InstituteLicenseStat.objects.select_for_update(
+        ).filter(institute__pk=institute_pk).only(
+            'total_storage', 'storage_license_end_date').first()
+
+        if not license_stat or not license_stat.total_storage:
+            raise ValueError(_(
+                'Storage license not found. Purchase storage to upload '
+                'files.'))
+
+        if _now() > license_stat.storage_license_end_date:
+            raise ValueError(_(
+                'Storage license expired. Please purchase storage license '
+                'to continue.'))
+
+        used = models.InstituteStatistics.objects.filter(
+            institute__pk=institute_pk
+        ).values_list('storage', flat=True).first() or 0
+        pending = models.ChunkedUpload.objects.filter(
+            institute__pk=institute_pk
+        ).aggregate(size=Sum('size'))['size'] or 0
+
+        if float(used) + (pending + size) / 1000000000 >\
+                float(license_stat.total_storage):
+            raise ValueError(_(
+                'File size too large. Purchase additional storage to upload '
+                'files.'))
+
+        upload = models.ChunkedUpload.objects.create(
+            user=user,
+            subject_id=subject_pk,
+            institute_id=institute_pk,
+            purpose=purpose,
+            file_name=file_name,
+            size=size,
+            metadata=json.dumps(metadata),
+            created_on=_now())
+
+    path = partial_file_path(upload.upload_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return upload
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Writes length bytes read from stream at offset of partial file of
+    upload and returns new offset. Bytes are copied in blocks, so chunk is
+    never held in memory. Bytes received before client disconnects are
+    kept and client resumes from new offset. Raises ValueError if offset
+    is not offset of upload or another chunk of it is being written.
+    """
+    if not cache.add(_lock_key(upload.pk), 1, 60 * 10):
+        raise ValueError(_('Another chunk of upload is being written.'))
+
+    try:
+        if models.ChunkedUpload.objects.filter(pk=upload.pk).values_list(
+                'offset', flat=True).first() != offset:
+            raise ValueError(_('Upload offset does not match.'))
+
+        written = 0
+        partial = open(partial_file_path(upload.upload_id), 'r+b')
+        try:
+            # Drops bytes of earlier chunk written after its offset was saved
+            partial.seek(offset)
+            partial.truncate()
+            while written < length:
+                block = stream.read(min(_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                partial.write(block)
+                written += len(block)
+        finally:
+            partial.close()
+            upload.offset = offset + written
+            models.ChunkedUpload.objects.filter(pk=upload.pk).update(
+                offset=upload.offset)
+    finally:
+        cache.delete(_lock_key(upload.pk))
+
+    return upload.offset
+
+
+def assembled_file(upload):
+    """Returns assembled file of completed upload named as uploaded"""
+    return AssembledFile(open(partial_file_path(upload.upload_id), 'rb'),
+                         name=upload.file_name)
+
+
+def delete_upload(upload):
+    """Removes upload with its partial file, releasing its storage"""
+    path = partial_file_path(upload.upload_id)
+    if os.path.isfile(path):
+        os.remove(path)
+    models.ChunkedUpload.objects.filter(pk=upload.pk).delete()
+
+
+def expire_uploads():
+    """
+    Removes uploads not completed within CHUNKED_UPLOAD_EXPIRY seconds,
+    returns number of removed uploads
+    """
+    uploads = list(models.ChunkedUpload.objects.filter(
+        created_on__lt=_now() - CHUNKED_UPLOAD_EXPIRY * 1000
+    ).only('upload_id'))
+
+    for upload in uploads:
+        delete_upload(upload)
+    return len(uploads)
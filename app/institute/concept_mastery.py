@@ -0,0 +1,155 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import F
+
+from core import models
+
+# Lifetime of cached concept matrix of test in seconds, it is removed
+# whenever a submission of test is graded
+CONCEPT_MATRIX_CACHE_TIMEOUT = 60 * 60
+
+
+def _matrix_cache_key(test_pk):
+    return 'concept-matrix:' + str(test_pk)
+
+
+def _decimal(value):
+    return Decimal(str(round(value, 2)))
+
+
+def label_totals(question_labels, question_max_marks, question_marks):
+    """
+    Returns dict of concept label pk -> [scored, possible] from marks
+    of auto graded questions (question pk -> marks) of submission
+    """
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for question_pk, marks in question_marks.items():
+        label_pk = question_labels.get(question_pk)
+        if label_pk:
+            totals[label_pk][0] += marks
+            totals[label_pk][1] += question_max_marks[question_pk]
+    return totals
+
+
+def update_mastery(class_pk, test_pk, graded):
+    """
+    Stores label totals of graded submissions as mastery of their
+    students and adds the difference from their previous mastery to
+    class mastery, so nothing is re-scanned. graded is list of
+    (institute student pk, label totals).
+    """
+    labels = {label for _student, totals in graded for label in totals}
+    if not labels:
+        return
+
+    existing = {
+        (m.concept_label_id, m.student_id): m for m in
+        models.StudentConceptMastery.objects.filter(
+            concept_label__pk__in=labels,
+            student__pk__in={student for student, _totals in graded})}
+
+    created, changed = list(), list()
+    deltas = defaultdict(lambda: [Decimal(0), Decimal(0), 0])
+    for student_pk, totals in graded:
+        for label_pk, (scored, possible) in totals.items():
+            scored, possible = _decimal(scored), _decimal(possible)
+            delta = deltas[label_pk]
+            mastery = existing.get((label_pk, student_pk))
+
+            if mastery is None:
+                created.append(models.StudentConceptMastery(
+                    concept_label_id=label_pk,
+                    student_id=student_pk,
+                    scored=scored,
+                    possible=possible))
+                delta[2] += 1
+            else:
+                delta[0] -= mastery.scored
+                delta[1] -= mastery.possible
+                mastery.scored, mastery.possible = scored, possible
+                changed.append(mastery)
+
+            delta[0] += scored
+            delta[1] += possible
+
+    models.StudentConceptMastery.objects.bulk_create(created, batch_size=500)
+    models.StudentConceptMastery.objects.bulk_update(
+        changed, ['scored', 'possible'], batch_size=500)
+
+    models.ClassConceptMastery.objects.bulk_create([
+        models.ClassConceptMastery(
+            concept_label_id=label_pk, institute_class_id=class_pk)
+        for label_pk in deltas], ignore_conflicts=True)
+    for label_pk, (scored, possible, students) in deltas.items():
+        models.ClassConceptMastery.objects.filter(
+            concept_label__pk=label_pk
+        ).update(scored=F('scored') + scored,
+                 possible=F('possible') + possible,
+                 students=F('students') + students)
+
+    cache.delete(_matrix_cache_key(test_pk))
+
+
+def _mastery(scored, possible):
+    return round(float(scored) / float(possible), 4) if possible else None
+
+
+def get_concept_matrix(test_pk):
+    """
+    Returns graded concept labels of test with class mastery and every
+    graded student with mastery per label, read from aggregates with
+    one query and cached until a submission of test is graded again.
+    """
+    matrix = cache.get(_matrix_cache_key(test_pk))
+    if matrix is not None:
+        return matrix
+
+    labels, students = dict(), dict()
+    for (label_pk, name, student_pk, enrollment_no, first_name, last_name,
+         scored, possible) in models.StudentConceptMastery.objects.filter(
+            concept_label__test__pk=test_pk
+    ).values_list('concept_label', 'concept_label__name', 'student',
+                  'student__enrollment_no', 'student__first_name',
+                  'student__last_name', 'scored', 'possible'
+                  ).order_by('student', 'concept_label'):
+        student = students.setdefault(student_pk, {
+            'id': student_pk,
+            'enrollment_no': enrollment_no,
+            'name': ' '.join(filter(None, (first_name, last_name))),
+            'labels': {}
+        })
+        student['labels'][label_pk] = _mastery(scored, possible)
+
+        label = labels.setdefault(label_pk, {
+            'id': label_pk, 'name': name, 'scored': 0, 'possible': 0})
+        label['scored'] += scored
+        label['possible'] += possible
+
+    for label in labels.values():
+        label['mastery'] = _mastery(label.pop('scored'), label.pop('possible'))
+
+    matrix = {
+        'labels': list(labels.values()),
+        'students': list(students.values())
+    }
+    cache.set(_matrix_cache_key(test_pk), matrix,
+              CONCEPT_MATRIX_CACHE_TIMEOUT)
+    return matrix
+
+
+def get_class_concept_mastery(class_pk):
+    """Returns mastery of class in concept labels of all its tests"""
+    return [{
+        'id': label_pk,
+        'name': name,
+        'test': test_name,
+        'students': students,
+        'mastery': _mastery(scored, possible)
+    } for label_pk, name, test_name, students, scored, possible in
+        models.ClassConceptMastery.objects.filter(
+            institute_class__pk=class_pk
+    ).values_list('concept_label', 'concept_label__name',
+                  'concept_label__test__name', 'students', 'scored',
+                  'possible').order_by('concept_label')]
@@ -0,0 +1,240 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .autosave import autosave_answers, submit_answers
+from .exam_session import EXAM_TIME_SYNC_INTERVAL, add_warning,\
+    authenticate_test_credential, remaining_time, set_logged_in,\
+    test_group_name
+from .login_stats import record_login
+from .transcoding_progress import get_progress, uploader_group_name
+from core import models
+from core.authentication import get_cached_token_user
+
+# Close codes sent to client
+UNAUTHORIZED = 4001
+TEST_NOT_FOUND = 4004
+
+
+class ExamSessionConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Exam session of student. Client connects with auth token in query
+    string and sends login message with test password, net speed,
+    state and country which are recorded as login stats. Logged in
+    client gets its set with question order and remaining time,
+    autosaves answers, submits test, can report proctoring warnings and
+    receives test live and result published events of the test. Answers
+    are taken only while test is live and time is left, test is submitted
+    by server when time is up.
+    """
+
+    async def connect(self):
+        self.credential = None
+        self.ticker = None
+        self.time_up = False
+
+        token = parse_qs(self.scope['query_string'].decode()).get('token')
+        user = await database_sync_to_async(get_cached_token_user)(
+            token[0]) if token else None
+
+        if not user or not user.is_active or not user.is_student:
+            await self.close(code=UNAUTHORIZED)
+            return
+
+        self.user = user
+        self.test = await database_sync_to_async(
+            models.SubjectTest.objects.filter(
+                test_slug=self.scope['url_route']['kwargs']['test_slug']
+            ).only('subject', 'test_schedule', 'total_duration').first)()
+
+        if not self.test:
+            await self.close(code=TEST_NOT_FOUND)
+            return
+
+        await self.accept()
+
+    async def disconnect(self, code):
+        if self.ticker:
+            self.ticker.cancel()
+
+        if self.credential:
+            await self.channel_layer.group_discard(
+                test_group_name(self.test.pk), self.channel_name)
+            await database_sync_to_async(set_logged_in)(
+                self.credential.pk, False)
+
+    async def receive_json(self, content, **kwargs):
+        message_type = content.get('type') if isinstance(
+            content, dict) else None
+
+        if message_type == 'login':
+            await self.login(content)
+        elif not self.credential:
+            await self.close(code=UNAUTHORIZED)
+        elif message_type == 'time':
+            await self.send_time()
+        elif message_type == 'answer':
+            await self.save(content.get('answers'))
+        elif message_type == 'submit':
+            await self.save(content.get('answers') or {}, submit=True)
+        elif message_type == 'warning':
+            await self.send_json({
+                'type': 'warning',
+                'no_of_warning': await database_sync_to_async(add_warning)(
+                    self.credential.pk)
+            })
+        else:
+            await self.send_json({'type': 'error', 'error': 'Invalid type.'})
+
+    async def login(self, content):
+        if self.credential:
+            return
+
+        password = content.get('password')
+        credential = await database_sync_to_async(
+            authenticate_test_credential)(
+                self.test, self.user, password) if isinstance(
+                    password, str) else None
+
+        if not credential:
+            await self.close(code=UNAUTHORIZED)
+            return
+
+        self.credential = credential
+        await database_sync_to_async(set_logged_in)(credential.pk, True)
+        await sync_to_async(record_login)(
+            self.test.pk,
+            credential.pk,
+            content.get('net_speed'),
+            content.get('login_state'),
+            content.get('login_country'),
+            content.get('other_region'))
+        await self.channel_layer.group_add(
+            test_group_name(self.test.pk), self.channel_name)
+        await self.send_json({
+            'type': 'session',
+            'set': credential.set_id,
+            'question_order': json.loads(credential.question_order)
+            if credential.question_order else None,
+            'no_of_warning': credential.no_of_warning
+        })
+        await self.send_time()
+        self.ticker = asyncio.ensure_future(self.sync_time())
+
+    async def save(self, answers, submit=False):
+        """
+        Buffers answers or submits test, acknowledges either. Answers are
+        taken only while test is live and time of student is left, test is
+        submitted with answers saved in time once time is up.
+        """
+        if not isinstance(answers, dict) or not all(
+                str(q).isdigit() for q in answers):
+            await self.send_json({'type': 'error',
+                                  'error': 'Invalid answers.'})
+            return
+
+        test_live, remaining = await database_sync_to_async(remaining_time)(
+            self.test.pk, self.credential.pk)
+        if not test_live:
+            await self.send_json({'type': 'error',
+                                  'error': 'Test is not live.'})
+            return
+        if not remaining:
+            if self.time_up:
+                await self.send_json({'type': 'error',
+                                      'error': 'Time is up.'})
+            else:
+                await self.submit_on_time_up()
+            return
+
+        if not submit:
+            await sync_to_async(autosave_answers)(self.credential.pk, answers)
+            await self.send_json({'type': 'saved', 'questions': list(answers)})
+            return
+
+        try:
+            await database_sync_to_async(submit_answers)(
+                self.credential, answers)
+        except ValueError as e:
+            await self.send_json({'type': 'error', 'error': str(e)})
+            return
+        await self.send_json({'type': 'submitted'})
+
+    async def submit_on_time_up(self):
+        """Submits test with answers saved before time of student was up"""
+        if self.time_up:
+            return
+
+        self.time_up = True
+        try:
+            await database_sync_to_async(submit_answers)(self.credential)
+        except ValueError:
+            # Already submitted by student
+            pass
+        await self.send_json({'type': 'submitted', 'time_up': True})
+
+    async def send_time(self):
+        test_live, remaining = await database_sync_to_async(remaining_time)(
+            self.test.pk, self.credential.pk)
+        await self.send_json({
+            'type': 'time',
+            'test_live': test_live,
+            'remaining': remaining
+        })
+
+        if test_live and not remaining:
+            await self.submit_on_time_up()
+
+    async def sync_time(self):
+        while True:
+            await asyncio.sleep(EXAM_TIME_SYNC_INTERVAL)
+            await self.send_time()
+
+    async def test_live(self, event):
+        """Handles test live event of test group"""
+        await self.send_json({'type': 'test_live'})
+        await self.send_time()
+
+    async def result_published(self, event):
+        """Handles result published event of test group"""
+        await self.send_json({'type': 'result_published'})
+
+
+class TranscodingProgressConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Transcoding progress of videos uploaded by teacher. Client connects
+    with auth token in query string, gets latest progress of each upload
+    and then every status and progress event as it happens.
+    """
+
+    async def connect(self):
+        self.user = None
+
+        token = parse_qs(self.scope['query_string'].decode()).get('token')
+        user = await database_sync_to_async(get_cached_token_user)(
+            token[0]) if token else None
+
+        if not user or not user.is_active or not user.is_teacher:
+            await self.close(code=UNAUTHORIZED)
+            return
+
+        self.user = user
+        await self.channel_layer.group_add(
+            uploader_group_name(user.pk), self.channel_name)
+        await self.accept()
+
+        for event in await sync_to_async(get_progress)(user.pk):
+            await self.send_json(dict(event, type='transcoding_progress'))
+
+    async def disconnect(self, code):
+        if self.user:
+            await self.channel_layer.group_discard(
+                uploader_group_name(self.user.pk), self.channel_name)
+
+    async def transcoding_progress(self, event):
+        """Handles transcoding progress event of uploader group"""
+        await self.send_json(dict(event['event'], type='transcoding_progress'))
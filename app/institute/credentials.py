@@ -0,0 +1,182 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import secrets
+import string
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import ugettext as _
+
+from .allocation import ROUND_ROBIN, allocate_sets, get_set_questions,\
+    question_order
+from .warmup import invalidate_test_roster
+from core import models
+
+# Passwords are hashed in this many processes, hashing is cpu bound
+CREDENTIAL_HASH_WORKERS = getattr(
+    settings, 'TEST_CREDENTIAL_HASH_WORKERS', None) or os.cpu_count() or 1
+
+# Credential sheet can be downloaded once within this many seconds
+CREDENTIAL_SHEET_TIMEOUT = getattr(
+    settings, 'TEST_CREDENTIAL_SHEET_TIMEOUT', 10 * 60)
+
+PASSWORD_LENGTH = 6
+PASSWORD_CHARS = string.ascii_uppercase + string.digits
+
+SHEET_FIELDS = ('enrollment_no', 'first_name', 'last_name', 'email',
+                'set_name', 'password')
+
+
+def _sheet_cache_key(token):
+    return 'test-credential-sheet:' + token
+
+
+def hash_passwords(passwords):
+    """
+    Returns hashes of passwords in the same order. Hashing is spread
+    over a process pool unless there is a single worker or caller is a
+    daemon process (like celery prefork worker) which can not fork.
+    """
+    workers = min(CREDENTIAL_HASH_WORKERS, len(passwords))
+
+    if workers <= 1 or multiprocessing.current_process().daemon:
+        return [make_password(p) for p in passwords]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            make_password, passwords,
+            chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def generate_passwords(test_pk, count, used_keys):
+    """
+    Returns list of count (password, lookup key) unique in test.
+    used_keys is set of lookup keys already issued in test.
+    """
+    used_keys = set(used_keys)
+    passwords = list()
+
+    while len(passwords) < count:
+        password = ''.join(secrets.choice(PASSWORD_CHARS)
+                           for _i in range(PASSWORD_LENGTH))
+        lookup_key = models.test_password_lookup_key(test_pk, password)
+
+        if lookup_key not in used_keys:
+            used_keys.add(lookup_key)
+            passwords.append((password, lookup_key))
+
+    return passwords
+
+
+def issue_test_credentials(test, strategy=ROUND_ROBIN):
+    """
+    Issues credentials to every active enrolled student of subject of
+    test who has none. Sets are allocated from final sets of test over
+    the whole cohort with given strategy, so issuing again only adds
+    missing students and never moves issued ones. With shuffle
+    questions, question order of every student is stored with the
+    credential. Returns list of credential sheet rows with plaintext
+    passwords, they are not stored anywhere else.
+    Raises ValueError if test has no final set or strategy is invalid.
+    """
+    with transaction.atomic():
+        # Concurrent issuance for the same test waits here
+        shuffle_questions = models.SubjectTest.objects.select_for_update(
+        ).filter(pk=test.pk).values_list(
+            'shuffle_questions', flat=True).first()
+
+        sets = dict(models.SubjectTestSets.objects.filter(
+            test__pk=test.pk,
+            mark_as_final=True
+        ).order_by('pk').values_list('pk', 'set_name'))
+
+        if not sets:
+            raise ValueError(_('Mark at least one question set as final.'))
+
+        issued = models.StudentTestCredential.objects.filter(
+            test__pk=test.pk)
+        issued_students = set(issued.values_list('student', flat=True))
+        cohort = list(models.InstituteSubjectStudents.objects.filter(
+            institute_subject__pk=test.subject_id,
+            active=True,
+            is_banned=False
+        ).order_by(
+            'institute_student__enrollment_no', 'institute_student'
+        ).values_list(
+            'institute_student',
+            'institute_student__enrollment_no',
+            'institute_student__first_name',
+            'institute_student__last_name',
+            'institute_student__invitee__email'))
+
+        allocation = allocate_sets(
+            test.pk, [s[0] for s in cohort], list(sets), strategy)
+        students = [s for s in cohort if s[0] not in issued_students]
+
+        if not students:
+            return []
+
+        set_questions = get_set_questions(test) if shuffle_questions\
+            else None
+        passwords = generate_passwords(
+            test.pk, len(students), issued.exclude(
+                lookup_key=None).values_list('lookup_key', flat=True))
+        hashes = hash_passwords([p for p, _k in passwords])
+
+        credentials = list()
+        rows = list()
+        for i, student in enumerate(students):
+            set_pk = allocation[student[0]]
+            password, lookup_key = passwords[i]
+            credentials.append(models.StudentTestCredential(
+                test_id=test.pk,
+                set_id=set_pk,
+                student_id=student[0],
+                password=hashes[i],
+                lookup_key=lookup_key,
+                question_order=json.dumps(question_order(
+                    test.pk, student[0], set_questions.get(set_pk, [])
+                )) if set_questions is not None else ''))
+            rows.append(dict(zip(SHEET_FIELDS, student[1:] + (
+                sets[set_pk], password))))
+
+        models.StudentTestCredential.objects.bulk_create(
+            credentials, batch_size=500)
+        transaction.on_commit(lambda: invalidate_test_roster(test.pk))
+
+    return rows
+
+
+def store_credential_sheet(user_pk, test_pk, rows):
+    """Stores credential sheet for one download, returns its token"""
+    token = secrets.token_urlsafe(24)
+    cache.set(_sheet_cache_key(token),
+              {'user': user_pk, 'test': test_pk, 'rows': rows},
+              CREDENTIAL_SHEET_TIMEOUT)
+    return token
+
+
+def pop_credential_sheet(token, user_pk, test_pk):
+    """
+    Returns csv of credential sheet and removes it, returns None if it
+    is not found, expired or was stored by another user for another test
+    """
+    key = _sheet_cache_key(token)
+    sheet = cache.get(key)
+
+    if not sheet or sheet['user'] != user_pk or sheet['test'] != test_pk:
+        return None
+
+    cache.delete(key)
+
+    content = io.StringIO()
+    writer = csv.DictWriter(content, fieldnames=SHEET_FIELDS)
+    writer.writeheader()
+    writer.writerows(sheet['rows'])
+    return content.getvalue()
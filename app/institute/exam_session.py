@@ -0,0 +1,136 @@
+import hmac
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from core import models
+
+# Connected students get remaining time every this many seconds
+EXAM_TIME_SYNC_INTERVAL = getattr(settings, 'EXAM_TIME_SYNC_INTERVAL', 30)
+
+TEST_LIVE = 'test_live'
+RESULT_PUBLISHED = 'result_published'
+
+
+def test_group_name(test_pk):
+    """Returns channel layer group of students connected to test"""
+    return 'test-' + str(test_pk)
+
+
+def _session_start_cache_key(credential_pk):
+    return 'exam-session-start:' + str(credential_pk)
+
+
+def _now():
+    return int(time.time()) * 1000
+
+
+def broadcast_test_event(test_pk, event):
+    """
+    Sends event (TEST_LIVE or RESULT_PUBLISHED) to every student
+    connected to test after current transaction commits
+    """
+    def send():
+        async_to_sync(get_channel_layer().group_send)(
+            test_group_name(test_pk), {'type': event, 'test': test_pk})
+
+    transaction.on_commit(send)
+
+
+def authenticate_test_credential(test, user, password):
+    """
+    Returns credential of student user for test if password matches
+    else None. Credential of scheduled test is read from its warmed up
+    roster and password is checked against its lookup key, only number
+    of warnings is read from database. Students missing from roster
+    are found in database by lookup key, so only one hash is checked.
+    """
+    # Warm up imports exam session
+    from .warmup import get_test_roster
+
+    lookup_key = models.test_password_lookup_key(test.pk, password)
+    entry = get_test_roster(test).get(user.pk) \
+        if test.test_schedule else None
+
+    if entry and entry[1] and entry[3]:
+        student_pk, credential_pk, set_pk, key, question_order = entry
+        if not hmac.compare_digest(key, lookup_key):
+            return None
+
+        return models.StudentTestCredential(
+            pk=credential_pk,
+            test_id=test.pk,
+            set_id=set_pk,
+            student_id=student_pk,
+            lookup_key=key,
+            question_order=question_order,
+            no_of_warning=models.StudentTestCredential.objects.filter(
+                pk=credential_pk
+            ).values_list('no_of_warning', flat=True).first() or 0)
+
+    credential = models.StudentTestCredential.objects.filter(
+        test__pk=test.pk,
+        lookup_key=lookup_key,
+        student__invitee__pk=user.pk
+    ).first()
+
+    if not credential or not check_password(password, credential.password):
+        return None
+
+    return credential
+
+
+def set_logged_in(credential_pk, logged_in):
+    """Stores whether student is connected with credential"""
+    models.StudentTestCredential.objects.filter(
+        pk=credential_pk).update(logged_in=logged_in)
+
+
+def add_warning(credential_pk):
+    """Records proctoring warning of student, returns number of warnings"""
+    models.StudentTestCredential.objects.filter(
+        pk=credential_pk).update(no_of_warning=F('no_of_warning') + 1)
+    return models.StudentTestCredential.objects.filter(
+        pk=credential_pk).values_list('no_of_warning', flat=True).first()
+
+
+def remaining_time(test_pk, credential_pk):
+    """
+    Returns (test live, remaining time in milliseconds) of student.
+    Scheduled tests end at schedule + duration for everyone, unscheduled
+    tests run for duration from first connection of student after test
+    went live. State of warmed up test is read from cache.
+    """
+    # Warm up imports exam session
+    from .warmup import get_test_state
+
+    test = get_test_state(test_pk)
+    duration = test['total_duration'] * 60 * 1000
+
+    if not test['test_live']:
+        return False, duration
+
+    now = _now()
+    if test['test_schedule']:
+        start = test['test_schedule']
+    else:
+        key = _session_start_cache_key(credential_pk)
+        cache.add(key, now, duration // 1000 * 2)
+        start = cache.get(key, now)
+
+    return True, max(0, start + duration - now)
+
+
+def publish_test_result(test_pk):
+    """Marks result of test published and notifies connected students"""
+    if models.SubjectTest.objects.filter(
+        pk=test_pk,
+        result_published=False
+    ).update(result_published=True):
+        broadcast_test_event(test_pk, RESULT_PUBLISHED)
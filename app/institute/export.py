@@ -0,0 +1,104 @@
+import csv
+import datetime
+import json
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.translation import ugettext as _
+
+from .roster import EXPORT_FIELDS, class_roster, institute_roster,\
+    subject_roster
+
+# Exported files are removed from storage this many seconds after they
+# are written
+EXPORT_EXPIRY = getattr(settings, 'EXPORT_EXPIRY', 60 * 60 * 24)
+
+EXPORT_DIRECTORY = 'exports'
+
+INSTITUTE_ROSTER = 'institute'
+CLASS_ROSTER = 'class'
+SUBJECT_ROSTER = 'subject'
+
+ROSTERS = {
+    INSTITUTE_ROSTER: institute_roster,
+    CLASS_ROSTER: class_roster,
+    SUBJECT_ROSTER: subject_roster
+}
+
+
+class _Echo:
+    """File like object that returns written value instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, fields=EXPORT_FIELDS):
+    """Yields header and rows of roster (or given fields) as csv lines"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+
+    for row in rows:
+        yield writer.writerow([row[f] for f in fields])
+
+
+def ndjson_lines(rows):
+    """Yields rows of roster as newline delimited json"""
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+# File type -> (content type, line generator)
+EXPORT_FILE_TYPES = {
+    'csv': ('text/csv', csv_lines),
+    'ndjson': ('application/x-ndjson', ndjson_lines)
+}
+
+
+def export_lines(kind, pk, student_type, file_type, ordering=None):
+    """
+    Returns generator of lines of exported roster. Raises ValueError
+    if kind, file type or ordering is invalid.
+    """
+    if kind not in ROSTERS:
+        raise ValueError(_('Invalid roster.'))
+
+    if file_type not in EXPORT_FILE_TYPES:
+        raise ValueError(_('Invalid file type.'))
+
+    rows = ROSTERS[kind](pk, student_type).export(ordering=ordering)
+    return EXPORT_FILE_TYPES[file_type][1](rows)
+
+
+def export_file_name(user_pk, file_type):
+    """Returns new storage name of file exported by user"""
+    return '{}/{}/{}.{}'.format(EXPORT_DIRECTORY, user_pk, uuid.uuid4().hex,
+                                file_type)
+
+
+def expire_exports(now=None):
+    """
+    Removes exported files written more than EXPORT_EXPIRY seconds ago,
+    returns number of removed files
+    """
+    expired_before = (now or timezone.now()) - datetime.timedelta(
+        seconds=EXPORT_EXPIRY)
+
+    try:
+        user_directories = default_storage.listdir(EXPORT_DIRECTORY)[0]
+    except FileNotFoundError:
+        return 0
+
+    removed = 0
+    for directory in user_directories:
+        directory = os.path.join(EXPORT_DIRECTORY, directory)
+        for file_name in default_storage.listdir(directory)[1]:
+            name = os.path.join(directory, file_name)
+            if default_storage.get_modified_time(name) < expired_before:
+                default_storage.delete(name)
+                removed += 1
+    return removed
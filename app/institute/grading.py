@@ -0,0 +1,320 @@
+import json
+import re
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .concept_mastery import label_totals, update_mastery
+from core import models
+
+# Numeric answers within this distance of correct answer are correct
+NUMERIC_ANSWER_TOLERANCE = getattr(
+    settings, 'NUMERIC_ANSWER_TOLERANCE', 1e-6)
+
+# Submissions are loaded, graded and saved in chunks of this size
+GRADING_CHUNK_SIZE = getattr(settings, 'GRADING_CHUNK_SIZE', 5000)
+
+# Select multiple answers are compared as bitmasks of options
+MAX_SELECT_MULTIPLE_OPTIONS = 64
+
+BOOLEAN_TYPES = (models.QuestionType.TRUE_FALSE,
+                 models.QuestionType.ASSERTION)
+
+_WHITESPACE = re.compile(r'\s+')
+_SPECIAL_CHARACTERS = re.compile(r'[^\w\s]|_')
+_ARTICLES = re.compile(r'\b(a|an|the)\b')
+
+
+def make_normalizer(enable_strict_checking, ignore_grammar,
+                    ignore_special_characters):
+    """
+    Returns function normalizing fill in the blank answer for
+    comparison. Strict checking only strips surrounding whitespace,
+    otherwise case and repeated whitespace are ignored. Ignoring
+    grammar also drops articles, ignoring special characters drops
+    everything except letters, digits and whitespace.
+    """
+    if enable_strict_checking:
+        return str.strip
+
+    steps = [str.casefold]
+    if ignore_special_characters:
+        steps.append(lambda text: _SPECIAL_CHARACTERS.sub(' ', text))
+    if ignore_grammar:
+        steps.append(lambda text: _ARTICLES.sub(' ', text))
+
+    def normalize(text):
+        for step in steps:
+            text = step(text)
+        return _WHITESPACE.sub(' ', text).strip()
+
+    return normalize
+
+
+class AnswerKey:
+    """
+    Answer key of typed question set compiled into arrays. Questions of
+    each auto graded type are kept as a group with columns of correct
+    answers and marks, so submissions are compared a group at a time.
+    """
+
+    def __init__(self, questions):
+        self.question_ids = [q.pk for q in questions]
+        self.labels = {q.pk: q.concept_label_id for q in questions
+                       if q.concept_label_id}
+        self.marks = dict()
+        self.manual = list()
+
+        mcq, boolean, multiple, numeric, blank = [], [], [], [], []
+        for q in questions:
+            self.marks[q.pk] = float(q.marks)
+
+            if q.type == models.QuestionType.MCQ:
+                mcq.append((q.pk, next((
+                    o.pk for o in q.typed_test_mcq_question.all()
+                    if o.correct_answer), -1)))
+
+            elif q.type in BOOLEAN_TYPES:
+                answer = _related(q, 'typed_test_true_false_question'
+                                  if q.type == models.QuestionType.TRUE_FALSE
+                                  else 'typed_test_assertion_answer')
+                boolean.append((q.pk, -1 if answer is None
+                                else int(answer.correct_answer)))
+
+            elif q.type == models.QuestionType.SELECT_MULTIPLE_CHOICE:
+                options = list(q.typed_test_select_multiple_question.all())
+                bits = {o.pk: 1 << i for i, o in enumerate(
+                    options[:MAX_SELECT_MULTIPLE_OPTIONS])}
+                multiple.append((q.pk, bits, sum(
+                    bits.get(o.pk, 0) for o in options if o.correct_answer)))
+
+            elif q.type == models.QuestionType.NUMERIC_ANSWER:
+                answer = _related(q, 'typed_test_numeric_question')
+                numeric.append((q.pk, np.nan if answer is None
+                                else float(answer.correct_answer)))
+
+            elif q.type == models.QuestionType.FILL_IN_THE_BLANK:
+                answer = _related(q, 'typed_test_fill_in_the_blank_answer')
+                if answer is None or answer.manual_checking:
+                    self.manual.append(q.pk)
+                    continue
+                normalize = make_normalizer(
+                    answer.enable_strict_checking,
+                    answer.ignore_grammar,
+                    answer.ignore_special_characters)
+                blank.append((q.pk, normalize,
+                              normalize(answer.correct_answer)))
+
+            else:
+                self.manual.append(q.pk)
+
+        self.mcq_ids = [q for q, _a in mcq]
+        self.mcq = np.array([a for _q, a in mcq], dtype=np.int64)
+        self.boolean_ids = [q for q, _a in boolean]
+        self.boolean = np.array([a for _q, a in boolean], dtype=np.int8)
+        self.multiple_ids = [q for q, _b, _m in multiple]
+        self.multiple_bits = [b for _q, b, _m in multiple]
+        self.multiple = np.array([m for _q, _b, m in multiple],
+                                 dtype=np.uint64)
+        self.numeric_ids = [q for q, _a in numeric]
+        self.numeric = np.array([a for _q, a in numeric], dtype=np.float64)
+        self.blank_ids = [q for q, _n, _a in blank]
+        self.blank = [(n, a) for _q, n, a in blank]
+
+    @classmethod
+    def load(cls, set_pk):
+        """Loads answer key of set with three queries"""
+        return cls(list(models.SubjectTypedTestQuestion.objects.filter(
+            test_section__set__pk=set_pk
+        ).select_related(
+            'typed_test_true_false_question',
+            'typed_test_assertion_answer',
+            'typed_test_numeric_question',
+            'typed_test_fill_in_the_blank_answer'
+        ).prefetch_related(
+            Prefetch('typed_test_mcq_question',
+                     queryset=models.SubjectTestMcqOptions.objects.order_by(
+                         'pk')),
+            Prefetch('typed_test_select_multiple_question',
+                     queryset=models.SubjectTestSelectMultipleCorrectAnswer
+                     .objects.order_by('pk'))
+        ).order_by('test_section__order', 'order')))
+
+    def _marks(self, question_ids):
+        return np.array([self.marks[q] for q in question_ids],
+                        dtype=np.float64)
+
+    def grade(self, answers):
+        """
+        Grades list of answer dicts (question id -> answer).
+        Returns (total marks array, dict of question id -> marks array,
+        boolean array of submissions having manually checked answers).
+        """
+        count = len(answers)
+        scores = dict()
+
+        def score(question_ids, correct):
+            marks = correct * self._marks(question_ids)
+            for column, q in enumerate(question_ids):
+                scores[q] = marks[:, column]
+
+        score(self.mcq_ids, (self._matrix(
+            answers, self.mcq_ids, np.int64, -1, _option) == self.mcq) &
+            (self.mcq != -1))
+        score(self.boolean_ids, (self._matrix(
+            answers, self.boolean_ids, np.int8, -1, _boolean) ==
+            self.boolean) & (self.boolean != -1))
+        score(self.numeric_ids, np.isclose(
+            self._matrix(answers, self.numeric_ids, np.float64, np.nan,
+                         _number),
+            self.numeric, rtol=0, atol=NUMERIC_ANSWER_TOLERANCE))
+
+        masks = np.zeros((count, len(self.multiple_ids)), dtype=np.uint64)
+        answered = np.zeros(masks.shape, dtype=bool)
+        for row, submission in enumerate(answers):
+            for column, (q, bits) in enumerate(
+                    zip(self.multiple_ids, self.multiple_bits)):
+                selected = submission.get(q)
+                if isinstance(selected, list) and selected:
+                    answered[row, column] = True
+                    masks[row, column] = sum(
+                        bits.get(o, 0) for o in {
+                            o for o in selected if isinstance(o, int)})
+        score(self.multiple_ids, answered & (masks == self.multiple))
+
+        score(self.blank_ids, np.array([[
+            isinstance(submission.get(q), str) and
+            normalize(submission[q]) == correct
+            for q, (normalize, correct) in zip(self.blank_ids, self.blank)
+        ] for submission in answers], dtype=bool).reshape(
+            count, len(self.blank_ids)))
+
+        total = np.zeros(count, dtype=np.float64)
+        for marks in scores.values():
+            total += marks
+
+        manual = np.array([any(
+            submission.get(q) not in (None, '') for q in self.manual
+        ) for submission in answers], dtype=bool)
+
+        return total, scores, manual
+
+    @staticmethod
+    def _matrix(answers, question_ids, dtype, missing, convert):
+        """Returns submissions x questions array of converted answers"""
+        matrix = np.full((len(answers), len(question_ids)), missing,
+                         dtype=dtype)
+        for row, submission in enumerate(answers):
+            for column, q in enumerate(question_ids):
+                value = convert(submission.get(q))
+                if value is not None:
+                    matrix[row, column] = value
+        return matrix
+
+
+def _related(instance, name):
+    try:
+        return getattr(instance, name)
+    except ObjectDoesNotExist:
+        return None
+
+
+_INT64 = np.iinfo(np.int64)
+
+
+def _option(value):
+    # Option ids out of int64 range can not be options of question
+    return value if isinstance(value, int) and \
+        not isinstance(value, bool) and \
+        _INT64.min <= value <= _INT64.max else None
+
+
+def _boolean(value):
+    return int(value) if isinstance(value, bool) else None
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def parse_answers(answers):
+    """Returns answers json of submission with question ids as int"""
+    try:
+        answers = json.loads(answers or '{}')
+    except ValueError:
+        return dict()
+    return {int(q): a for q, a in answers.items() if q.isdigit()} \
+        if isinstance(answers, dict) else dict()
+
+
+def grade_set(set_pk, regrade=False):
+    """
+    Grades submitted submissions of typed question set in chunks with
+    its answer key loaded once and updates concept mastery of their
+    students. Already graded submissions are skipped unless regrade is
+    True. Returns number of graded submissions.
+    """
+    key = AnswerKey.load(set_pk)
+    test_pk, class_pk = models.SubjectTestSets.objects.filter(
+        pk=set_pk).values_list('test', 'test__subject__subject_class').get()
+    submissions = models.StudentTestSubmission.objects.filter(
+        set__pk=set_pk,
+        submitted=True
+    )
+    if not regrade:
+        submissions = submissions.filter(graded=False)
+
+    graded = 0
+    last_pk = 0
+    while True:
+        chunk = list(submissions.filter(pk__gt=last_pk).select_related(
+            'credential').order_by('pk').only(
+                'pk', 'answers', 'credential__student')[:GRADING_CHUNK_SIZE])
+        if not chunk:
+            return graded
+
+        total, scores, manual = key.grade(
+            [parse_answers(s.answers) for s in chunk])
+
+        mastery = list()
+        for row, submission in enumerate(chunk):
+            question_marks = {
+                q: float(marks[row]) for q, marks in scores.items()}
+            submission.graded = True
+            submission.marks = Decimal(str(round(float(total[row]), 2)))
+            submission.question_marks = json.dumps(question_marks)
+            submission.needs_manual_checking = bool(manual[row])
+            mastery.append((submission.credential.student_id, label_totals(
+                key.labels, key.marks, question_marks)))
+
+        with transaction.atomic():
+            models.StudentTestSubmission.objects.bulk_update(
+                chunk,
+                ['graded', 'marks', 'question_marks',
+                 'needs_manual_checking'],
+                batch_size=500)
+            update_mastery(class_pk, test_pk, mastery)
+
+        graded += len(chunk)
+        last_pk = chunk[-1].pk
+
+
+def grade_test(test_pk, regrade=False):
+    """
+    Grades submissions of every set of typed test.
+    Returns number of graded submissions.
+    """
+    return sum(grade_set(set_pk, regrade) for set_pk in
+               models.SubjectTestSets.objects.filter(
+                   test__pk=test_pk,
+                   test__question_mode=models.QuestionMode.TYPED
+               ).values_list('pk', flat=True))
@@ -0,0 +1,40 @@
+import time
+
+from core import license_cache, models
+
+
+def get_license_snapshot(institute):
+    """
+    Returns license snapshot of institute (instance or pk) from cache,
+    loads and caches it if it is not cached
+    """
+    institute_pk = getattr(institute, 'pk', institute)
+    snapshot = license_cache.get_license_snapshot(institute_pk)
+
+    if snapshot is None:
+        orders = models.InstituteCommonLicenseOrderDetails.objects.filter(
+            institute__pk=institute_pk,
+            paid=True
+        ).select_related('selected_license')
+        snapshot = license_cache.set_license_snapshot(
+            institute_pk,
+            orders.filter(active=True).order_by('order_created_on').first(),
+            orders.order_by('-order_created_on').first()
+        )
+
+    return snapshot
+
+
+def get_active_or_expired_common_license(institute):
+    """Returns common license order if order is active or expired"""
+    return get_license_snapshot(institute)['latest']
+
+
+def get_active_common_license(institute):
+    """Returns license order if institute has active license else None"""
+    order = get_license_snapshot(institute)['active']
+
+    if not order or (int(time.time()) * 1000 > order.end_date):
+        return None
+    else:
+        return order
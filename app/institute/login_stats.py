@@ -0,0 +1,192 @@
+import json
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django_redis import get_redis_connection
+
+from core import models
+
+# Buffered login events are ingested in batches of this size
+LOGIN_STATS_INGEST_BATCH = getattr(settings, 'LOGIN_STATS_INGEST_BATCH', 1000)
+
+# Upper bounds (Mbps) of net speed histogram buckets
+NET_SPEED_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+# Rollup dimensions
+TOTAL = 'total'
+STATE = 'state'
+COUNTRY = 'country'
+ATTEMPT = 'attempt'
+NET_SPEED = 'net_speed'
+
+UNKNOWN = 'unknown'
+
+BUFFER_KEY = 'login-stats:buffer'
+# Buffer being ingested, ingested events are trimmed from its head.
+# Left over by a crashed ingestion, it is ingested again first.
+INGESTING_KEY = 'login-stats:ingesting'
+
+_STATES = {s for s, _name in
+           models.StatesAndUnionTerritories.STATE_IN_STATE_CHOICES}
+_COUNTRIES = {c for c, _name in models.OperationalCountries()}
+_NUMBER = re.compile(r'\d+(\.\d+)?')
+
+
+def _attempt_key(credential_pk):
+    return 'login-attempt:' + str(credential_pk)
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def record_login(test_pk, credential_pk, net_speed=None, login_state=None,
+                 login_country=None, other_region=''):
+    """
+    Buffers login event of student in redis and returns its attempt
+    number. Events are written to database by ingest_pending.
+    """
+    redis = _redis()
+    attempt = redis.incr(_attempt_key(credential_pk))
+    redis.expire(_attempt_key(credential_pk), 60 * 60 * 24 * 7)
+
+    redis.rpush(BUFFER_KEY, json.dumps({
+        'test': test_pk,
+        'attempt': attempt,
+        'net_speed': str(net_speed)[:50] if net_speed else None,
+        'login_state': login_state if login_state in _STATES else None,
+        'login_country':
+            login_country if login_country in _COUNTRIES else 'IN',
+        'other_region': str(other_region or '')[:100],
+        'created_on': int(time.time()) * 1000
+    }))
+    return attempt
+
+
+def net_speed_bucket(net_speed):
+    """Returns histogram bucket of net speed like '<=5' or '>100'"""
+    match = _NUMBER.search(net_speed or '')
+    if not match:
+        return UNKNOWN
+
+    speed = float(match.group())
+    for bound in NET_SPEED_BUCKETS:
+        if speed <= bound:
+            return '<=' + str(bound)
+    return '>' + str(NET_SPEED_BUCKETS[-1])
+
+
+def _rollup_keys(event):
+    return (
+        (TOTAL, ''),
+        (STATE, event['login_state'] or UNKNOWN),
+        (COUNTRY, event['login_country']),
+        (ATTEMPT, str(event['attempt'])),
+        (NET_SPEED, net_speed_bucket(event['net_speed']))
+    )
+
+
+def ingest(events):
+    """
+    Inserts login events with one bulk insert and adds them to rollups
+    of their tests in the same transaction. Events of deleted tests are
+    dropped. Returns number of inserted events.
+    """
+    tests = set(models.SubjectTest.objects.filter(
+        pk__in={e['test'] for e in events}
+    ).values_list('pk', flat=True))
+    events = [e for e in events if e['test'] in tests]
+
+    counts = Counter(
+        (event['test'],) + key
+        for event in events for key in _rollup_keys(event))
+
+    with transaction.atomic():
+        models.StudentTestLoginStats.objects.bulk_create([
+            models.StudentTestLoginStats(
+                test_id=e['test'],
+                attempt=e['attempt'],
+                net_speed=e['net_speed'],
+                login_state=e['login_state'],
+                other_region=e['other_region'],
+                login_country=e['login_country'],
+                created_on=e['created_on']
+            ) for e in events], batch_size=500)
+
+        models.StudentTestLoginRollup.objects.bulk_create([
+            models.StudentTestLoginRollup(
+                test_id=test_pk, dimension=dimension, value=value)
+            for test_pk, dimension, value in counts
+        ], ignore_conflicts=True)
+
+        for (test_pk, dimension, value), count in counts.items():
+            models.StudentTestLoginRollup.objects.filter(
+                test__pk=test_pk,
+                dimension=dimension,
+                value=value
+            ).update(count=F('count') + count)
+
+    return len(events)
+
+
+def ingest_pending():
+    """
+    Ingests buffered login events in batches of LOGIN_STATS_INGEST_BATCH.
+    Events left by a crashed ingestion are ingested first; a batch
+    committed right before a crash may be counted twice.
+    Must not run concurrently. Returns number of inserted events.
+    """
+    redis = _redis()
+    ingested = 0
+
+    while True:
+        events = redis.lrange(INGESTING_KEY, 0, LOGIN_STATS_INGEST_BATCH - 1)
+
+        if not events:
+            if not redis.exists(BUFFER_KEY):
+                return ingested
+            redis.renamenx(BUFFER_KEY, INGESTING_KEY)
+            continue
+
+        ingested += ingest([json.loads(e) for e in events])
+        redis.ltrim(INGESTING_KEY, len(events), -1)
+
+
+def get_login_rollups(test_pk):
+    """
+    Returns login counts of test per state, country, attempt and net
+    speed bucket with total logins and approximate median net speed
+    bucket, read from rollups with one query.
+    """
+    rollups = {STATE: {}, COUNTRY: {}, ATTEMPT: {}, NET_SPEED: {}}
+    total = 0
+
+    for dimension, value, count in \
+            models.StudentTestLoginRollup.objects.filter(
+                test__pk=test_pk
+            ).values_list('dimension', 'value', 'count'):
+        if dimension == TOTAL:
+            total = count
+        elif dimension in rollups:
+            rollups[dimension][value] = count
+
+    rollups['logins'] = total
+    rollups['median_net_speed'] = _median_bucket(rollups[NET_SPEED])
+    return rollups
+
+
+def _median_bucket(histogram):
+    buckets = ['<=' + str(b) for b in NET_SPEED_BUCKETS] + [
+        '>' + str(NET_SPEED_BUCKETS[-1])]
+    known = sum(histogram.get(b, 0) for b in buckets)
+
+    seen = 0
+    for bucket in buckets:
+        seen += histogram.get(bucket, 0)
+        if known and seen * 2 >= known:
+            return bucket
+    return None
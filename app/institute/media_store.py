@@ -0,0 +1,94 @@
+import hashlib
+import os
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from core import models
+
+# Files are hashed and written in blocks of this many bytes
+_BLOCK_SIZE = 64 * 1024
+
+
+def staging_file_path():
+    """Returns new path where upload is written while it is hashed"""
+    return os.path.join(settings.MEDIA_ROOT, 'institute/uploads/blobs/staging',
+                        uuid.uuid4().hex)
+
+
+def _stage(file):
+    """
+    Returns (sha256 hex digest, path, staged) of file. Uploads already on
+    disk are hashed in place, others are hashed while written to staging
+    path in one pass, staged is True for them.
+    """
+    sha256 = hashlib.sha256()
+
+    if hasattr(file, 'temporary_file_path'):
+        with open(file.temporary_file_path(), 'rb') as f:
+            for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+                sha256.update(block)
+        return sha256.hexdigest(), file.temporary_file_path(), False
+
+    path = staging_file_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        for block in file.chunks(_BLOCK_SIZE):
+            sha256.update(block)
+            f.write(block)
+    return sha256.hexdigest(), path, True
+
+
+def _reference(institute_pk, sha256):
+    """Increments refcount of blob of hash, returns it or None"""
+    blob = models.MediaBlob.objects.select_for_update().filter(
+        institute__pk=institute_pk, sha256=sha256).first()
+    if blob:
+        models.MediaBlob.objects.filter(pk=blob.pk).update(
+            refcount=F('refcount') + 1)
+    return blob
+
+
+def store_blob(institute_pk, file):
+    """
+    Returns (blob, created) holding content of file with its refcount
+    incremented for the referencing material. Content already stored by
+    institute is not stored again, new content is moved into place and
+    its size is added to storage used by institute.
+    """
+    sha256, path, staged = _stage(file)
+
+    with transaction.atomic():
+        blob = _reference(institute_pk, sha256)
+
+        if not blob:
+            blob = models.MediaBlob(institute_id=institute_pk, sha256=sha256,
+                                    size=os.path.getsize(path), refcount=1,
+                                    created_on=int(time.time()) * 1000)
+            blob.file.name = blob.file.field.generate_filename(
+                blob, str(getattr(file, 'name', '')))
+            try:
+                # Same content stored concurrently is referenced instead
+                with transaction.atomic():
+                    blob.save()
+            except IntegrityError:
+                blob = _reference(institute_pk, sha256)
+            else:
+                destination = default_storage.path(blob.file.name)
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                file_move_safe(path, destination, allow_overwrite=True)
+                models.InstituteStatistics.objects.filter(
+                    institute__pk=institute_pk
+                ).update(storage=F('storage') + Decimal(
+                    blob.size / 1000000000))
+                return blob, True
+
+    if staged:
+        os.remove(path)
+    return blob, False
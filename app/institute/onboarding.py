@@ -0,0 +1,313 @@
+import csv
+import datetime
+import io
+import json
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils.translation import ugettext as _
+
+from core import models
+from core.enrollment import enroll_in_mandatory_subjects
+from core.subject_access import refresh_subject_access
+
+# Columns accepted in imported file, only invitee_email is required
+IMPORT_FIELDS = ('invitee_email', 'enrollment_no', 'registration_no',
+                 'first_name', 'last_name', 'gender', 'date_of_birth',
+                 'class')
+
+IMPORT_FILE_TYPES = ('csv', 'json')
+
+MAX_IMPORT_ROWS = getattr(settings, 'STUDENT_IMPORT_MAX_ROWS', 10000)
+
+# Students inserted (and committed) at once, progress is reported
+# after every chunk
+IMPORT_CHUNK_SIZE = getattr(settings, 'STUDENT_IMPORT_CHUNK_SIZE', 500)
+
+_MAX_LENGTHS = {
+    'enrollment_no': 15,
+    'registration_no': 15,
+    'first_name': 30,
+    'last_name': 30
+}
+
+_GENDERS = {
+    'm': models.Gender.MALE,
+    'male': models.Gender.MALE,
+    'f': models.Gender.FEMALE,
+    'female': models.Gender.FEMALE,
+    'o': models.Gender.OTHER,
+    'other': models.Gender.OTHER,
+    '': models.Gender.NOT_MENTIONED
+}
+
+# Validated row, index is position of row in file
+ValidRow = namedtuple('ValidRow', ('index', 'user', 'class_', 'data'))
+
+
+def parse_rows(content, file_type):
+    """
+    Parses csv (with header) or json (list of objects) content into list
+    of dicts of IMPORT_FIELDS with str values.
+    Raises ValueError if content can not be parsed.
+    """
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ValueError(_('File must be utf-8 encoded.'))
+
+    if file_type == 'csv':
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames:
+            raise ValueError(_('File is empty.'))
+        reader.fieldnames = [f.strip().lower() for f in reader.fieldnames]
+        records = list(reader)
+    elif file_type == 'json':
+        try:
+            records = json.loads(content) if isinstance(content, str)\
+                else content
+        except ValueError:
+            raise ValueError(_('Invalid json.'))
+        if not isinstance(records, list) or\
+                not all(isinstance(r, dict) for r in records):
+            raise ValueError(_('Expected a list of students.'))
+    else:
+        raise ValueError(_('Invalid file type.'))
+
+    if not records:
+        raise ValueError(_('File is empty.'))
+
+    if len(records) > MAX_IMPORT_ROWS:
+        raise ValueError(
+            _('At most {} students can be imported at once.').format(
+                MAX_IMPORT_ROWS))
+
+    return [
+        {f: str(r.get(f) or '').strip() for f in IMPORT_FIELDS}
+        for r in records
+    ]
+
+
+def check_student_limit(institute_pk, limit, count):
+    """
+    Raises ValueError if adding count students to institute would exceed
+    student limit of license.
+    """
+    existing = models.InstituteStudents.objects.filter(
+        institute__pk=institute_pk).count()
+
+    if existing + count > limit:
+        raise ValueError(
+            _('License allows {} more students.').format(
+                max(0, limit - existing)))
+
+
+def _clean_row(row):
+    """Returns (cleaned row, error message) of parsed row"""
+    if not row['invitee_email']:
+        return None, _('Email is required.')
+
+    for field, max_length in _MAX_LENGTHS.items():
+        if len(row[field]) > max_length:
+            return None, _('{} can have at most {} characters.').format(
+                field, max_length)
+
+    gender = _GENDERS.get(row['gender'].lower())
+    if gender is None:
+        return None, _('Invalid gender.')
+
+    date_of_birth = None
+    if row['date_of_birth']:
+        try:
+            date_of_birth = datetime.date.fromisoformat(row['date_of_birth'])
+        except ValueError:
+            return None, _('Date of birth must be in YYYY-MM-DD format.')
+
+    return {
+        'invitee_email': row['invitee_email'].lower().strip(),
+        'enrollment_no': row['enrollment_no'],
+        'registration_no': row['registration_no'],
+        'first_name': row['first_name'].lower(),
+        'last_name': row['last_name'].lower(),
+        'gender': gender,
+        'date_of_birth': date_of_birth,
+        'class': row['class'].lower()
+    }, None
+
+
+class StudentImport:
+    """
+    Bulk import of students into institute.
+
+    Rows are validated against users, existing students and classes with
+    one query each, the license limit is checked before anything is
+    inserted and valid rows are then inserted in chunks with bulk_create,
+    each chunk followed by one set-based enrollment in mandatory subjects.
+    Invalid rows are skipped and reported with their 1-based row number.
+    """
+
+    def __init__(self, institute_pk, inviter_pk, rows):
+        self.institute_pk = institute_pk
+        self.inviter_pk = inviter_pk
+        self.rows = rows
+        self.errors = list()
+
+    def _error(self, index, email, message):
+        self.errors.append({
+            'row': index + 1,
+            'invitee_email': email,
+            'error': message
+        })
+
+    def validate(self):
+        """Returns list of ValidRow, invalid rows are added to errors"""
+        cleaned = list()
+        seen = set()
+
+        for index, row in enumerate(self.rows):
+            data, error = _clean_row(row)
+            if error:
+                self._error(index, row['invitee_email'], error)
+            elif data['invitee_email'] in seen:
+                self._error(index, data['invitee_email'],
+                            _('Email is repeated in file.'))
+            else:
+                seen.add(data['invitee_email'])
+                cleaned.append((index, data))
+
+        if not cleaned:
+            return list()
+
+        # Emails are matched case insensitively
+        users = {
+            email: (pk, is_student)
+            for email, pk, is_student in get_user_model().objects.annotate(
+                email_lower=Lower('email')
+            ).filter(
+                email_lower__in=seen
+            ).values_list('email_lower', 'pk', 'is_student')
+        }
+        invited = set(models.InstituteStudents.objects.annotate(
+            email_lower=Lower('invitee__email')
+        ).filter(
+            institute__pk=self.institute_pk,
+            email_lower__in=seen
+        ).values_list('email_lower', flat=True))
+
+        classes = dict()
+        class_keys = {data['class'] for i, data in cleaned if data['class']}
+        if class_keys:
+            for pk, name, slug in models.InstituteClass.objects.filter(
+                class_institute__pk=self.institute_pk,
+            ).filter(
+                Q(name__in=class_keys) | Q(class_slug__in=class_keys)
+            ).values_list('pk', 'name', 'class_slug'):
+                classes[name] = pk
+                classes[slug] = pk
+
+        valid = list()
+        for index, data in cleaned:
+            email = data['invitee_email']
+            user = users.get(email)
+
+            if not user:
+                self._error(index, email,
+                            _('No student with this email was found.'))
+            elif not user[1]:
+                self._error(index, email, _('User is not a student.'))
+            elif email in invited:
+                self._error(index, email, _('Student was already invited.'))
+            elif data['class'] and data['class'] not in classes:
+                self._error(index, email, _('Class not found.'))
+            else:
+                valid.append(ValidRow(
+                    index, user[0], classes.get(data['class']), data))
+
+        return valid
+
+    def _insert_chunk(self, chunk):
+        now = int(time.time()) * 1000
+
+        with transaction.atomic():
+            models.InstituteStudents.objects.bulk_create([
+                models.InstituteStudents(
+                    invitee_id=row.user,
+                    inviter_id=self.inviter_pk,
+                    institute_id=self.institute_pk,
+                    enrollment_no=row.data['enrollment_no'],
+                    registration_no=row.data['registration_no'],
+                    first_name=row.data['first_name'],
+                    last_name=row.data['last_name'],
+                    gender=row.data['gender'],
+                    date_of_birth=row.data['date_of_birth'],
+                    created_on=now
+                ) for row in chunk
+            ])
+
+            # Primary keys are not returned by bulk_create on every
+            # backend, so they are read back in one query
+            student_pks = dict(models.InstituteStudents.objects.filter(
+                institute__pk=self.institute_pk,
+                invitee__pk__in=[row.user for row in chunk]
+            ).values_list('invitee', 'pk'))
+
+            class_students = [
+                models.InstituteClassStudents(
+                    institute_class_id=row.class_,
+                    institute_student_id=student_pks[row.user],
+                    inviter_id=self.inviter_pk,
+                    created_on=now
+                ) for row in chunk if row.class_
+            ]
+
+            if class_students:
+                models.InstituteClassStudents.objects.bulk_create(
+                    class_students)
+                enroll_in_mandatory_subjects(
+                    c.institute_student_id for c in class_students)
+
+    def run(self, student_limit, progress=None):
+        """
+        Imports valid rows. Raises ValueError without inserting anything
+        if valid rows exceed student limit of license. progress is called
+        with (processed, total) after every chunk.
+        Returns report with counts and per row errors.
+        """
+        valid = self.validate()
+        check_student_limit(self.institute_pk, student_limit, len(valid))
+
+        total = len(valid)
+        created = list()
+
+        for start in range(0, total, IMPORT_CHUNK_SIZE):
+            chunk = valid[start:start + IMPORT_CHUNK_SIZE]
+            try:
+                self._insert_chunk(chunk)
+                created.extend(row.user for row in chunk)
+            except IntegrityError:
+                # Rows changed since validation, importing file again
+                # reports them individually
+                for row in chunk:
+                    self._error(row.index, row.data['invitee_email'],
+                                _('Student could not be added, try again.'))
+
+            if progress:
+                progress(start + len(chunk), total)
+
+        # Signals are not sent by bulk_create
+        if created:
+            refresh_subject_access(self.institute_pk, created)
+
+        self.errors.sort(key=lambda e: e['row'])
+        return {
+            'total': len(self.rows),
+            'created': len(created),
+            'failed': len(self.rows) - len(created),
+            'errors': self.errors
+        }
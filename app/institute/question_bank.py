@@ -0,0 +1,493 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Max, Prefetch
+from django.utils.translation import ugettext as _
+
+from .export import csv_lines, ndjson_lines
+from .question_paper import invalidate_paper_snapshot
+from core import models
+
+# Question records of imported and exported question banks. Section
+# fields are read from the first question of section, consecutive
+# questions with the same section name are in the same section.
+BANK_FIELDS = ('set_name', 'section', 'section_view', 'section_mandatory',
+               'answer_all_questions', 'no_of_question_to_attempt', 'type',
+               'question', 'marks', 'concept_label', 'options',
+               'correct_answer', 'manual_checking', 'enable_strict_checking',
+               'ignore_grammar', 'ignore_special_characters')
+
+BANK_FILE_TYPES = ('csv', 'json', 'ndjson')
+
+MAX_BANK_QUESTIONS = getattr(settings, 'QUESTION_BANK_MAX_QUESTIONS', 10000)
+
+# Questions of a section are exported in chunks of this size
+BANK_EXPORT_CHUNK_SIZE = 500
+
+# Options and answers in csv are separated by new lines
+CSV_LIST_SEPARATOR = '\n'
+
+AUTOCHECK_QUESTION_TYPES = (
+    models.QuestionType.MCQ,
+    models.QuestionType.TRUE_FALSE,
+    models.QuestionType.SELECT_MULTIPLE_CHOICE,
+    models.QuestionType.NUMERIC_ANSWER
+)
+
+_QUESTION_TYPES = {
+    t for t, _name in models.QuestionType.TYPE_IN_QUESTION_TYPES}
+_VIEWS = {v for v, _name in models.TestQuestionViewType.TYPE_IN_VIEW_TYPES}
+_TRUE = ('true', '1', 'yes', 'y')
+_FALSE = ('false', '0', 'no', 'n')
+
+
+def parse_bank(content, file_type):
+    """
+    Parses csv (with header), json (list of objects) or newline
+    delimited json content into list of question records.
+    Raises ValueError if content can not be parsed.
+    """
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ValueError(_('File must be utf-8 encoded.'))
+
+    try:
+        if file_type == 'csv':
+            reader = csv.DictReader(io.StringIO(content))
+            if not reader.fieldnames:
+                raise ValueError(_('File is empty.'))
+            reader.fieldnames = [
+                f.strip().lower() for f in reader.fieldnames]
+            records = list(reader)
+        elif file_type == 'json':
+            records = json.loads(content) if isinstance(content, str)\
+                else content
+        elif file_type == 'ndjson':
+            records = [json.loads(line) for line in content.splitlines()
+                       if line.strip()]
+        else:
+            raise ValueError(_('Invalid file type.'))
+    except json.JSONDecodeError:
+        raise ValueError(_('Invalid json.'))
+
+    if not isinstance(records, list) or\
+            not all(isinstance(r, dict) for r in records):
+        raise ValueError(_('Expected a list of questions.'))
+
+    if not records:
+        raise ValueError(_('File is empty.'))
+
+    if len(records) > MAX_BANK_QUESTIONS:
+        raise ValueError(
+            _('At most {} questions can be imported at once.').format(
+                MAX_BANK_QUESTIONS))
+
+    return records
+
+
+def _text(value):
+    return str(value).strip() if value is not None else ''
+
+
+def _bool(value, default):
+    if isinstance(value, bool):
+        return value
+
+    value = _text(value).lower()
+    if not value:
+        return default
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    raise ValueError(_('Expected true or false.'))
+
+
+def _list(value):
+    if isinstance(value, list):
+        values = [_text(v) for v in value]
+    else:
+        values = _text(value).split(CSV_LIST_SEPARATOR)
+    return [v for v in values if v]
+
+
+def _decimal(value, max_digits, decimal_places):
+    try:
+        number = Decimal(_text(value))
+    except InvalidOperation:
+        raise ValueError(_('Expected a number.'))
+
+    if not number.is_finite() or number.as_tuple().exponent < \
+            -decimal_places or abs(number) >= 10 ** (
+                max_digits - decimal_places):
+        raise ValueError(_('Number is too large or too precise.'))
+    return number
+
+
+def _clean_section(record):
+    name = _text(record.get('section'))
+    if len(name) > 100:
+        raise ValueError(_('Section name can have at most 100 characters.'))
+
+    view = _text(record.get('section_view')) or\
+        models.TestQuestionViewType.MULTIPLE_QUESTION
+    if view not in _VIEWS:
+        raise ValueError(_('Invalid section view.'))
+
+    answer_all_questions = _bool(record.get('answer_all_questions'), True)
+    if view == models.TestQuestionViewType.SINGLE_QUESTION and\
+            not answer_all_questions:
+        raise ValueError(_('Answer all questions should be true since '
+                           'there is only one question.'))
+
+    to_attempt = _text(record.get('no_of_question_to_attempt'))
+    if to_attempt and not to_attempt.isdigit():
+        raise ValueError(_('Number of questions to attempt is invalid.'))
+
+    return {
+        'name': name,
+        'view': view,
+        'section_mandatory': _bool(record.get('section_mandatory'), True),
+        'answer_all_questions': answer_all_questions,
+        'no_of_question_to_attempt': int(to_attempt) if to_attempt else None
+    }
+
+
+def _clean_answer(type_, record):
+    """Returns (options, correct answer) of question of type"""
+    if type_ in (models.QuestionType.MCQ,
+                 models.QuestionType.SELECT_MULTIPLE_CHOICE):
+        options = _list(record.get('options'))
+        if len(options) < 2:
+            raise ValueError(_('At least two options are required.'))
+        if len(set(options)) != len(options):
+            raise ValueError(_('Options are repeated.'))
+        if any(len(o) > 300 for o in options):
+            raise ValueError(_('Option can have at most 300 characters.'))
+
+        correct = _list(record.get('correct_answer'))
+        if type_ == models.QuestionType.MCQ and len(correct) != 1:
+            raise ValueError(_('Mcq should have one correct answer.'))
+        if not correct or not set(correct) <= set(options):
+            raise ValueError(_('Correct answer should be one of options.'))
+        return options, set(correct)
+
+    if type_ in (models.QuestionType.TRUE_FALSE,
+                 models.QuestionType.ASSERTION):
+        correct = _bool(record.get('correct_answer'), None)
+        if correct is None:
+            raise ValueError(_('Correct answer is required.'))
+        return None, correct
+
+    if type_ == models.QuestionType.NUMERIC_ANSWER:
+        return None, _decimal(record.get('correct_answer'), 20, 6)
+
+    if type_ == models.QuestionType.FILL_IN_THE_BLANK:
+        correct = _text(record.get('correct_answer'))
+        if not correct or len(correct) > 100:
+            raise ValueError(
+                _('Correct answer of at most 100 characters is required.'))
+
+        strict = _bool(record.get('enable_strict_checking'), False)
+        answer = {
+            'correct_answer': correct,
+            'manual_checking': _bool(record.get('manual_checking'), False),
+            'enable_strict_checking': strict,
+            'ignore_grammar': _bool(record.get('ignore_grammar'), not strict),
+            'ignore_special_characters': _bool(
+                record.get('ignore_special_characters'), not strict)
+        }
+        if strict and (answer['ignore_grammar'] or
+                       answer['ignore_special_characters']):
+            raise ValueError(_('Grammar and special characters can not be '
+                               'ignored if strict checking is enabled.'))
+        return None, answer
+
+    return None, None
+
+
+def _clean_question(record, question_types):
+    type_ = _text(record.get('type')).upper()
+    if type_ not in _QUESTION_TYPES or type_ not in question_types:
+        raise ValueError(_('Question type not allowed.'))
+
+    question = _text(record.get('question'))
+    if not question:
+        raise ValueError(_('Question is required.'))
+
+    marks = _decimal(record.get('marks'), 5, 2)
+    if marks <= 0:
+        raise ValueError(_('Marks should be a positive number'))
+
+    concept_label = _text(record.get('concept_label'))
+    if len(concept_label) > 30:
+        raise ValueError(_('Name of label should be less than 30 characters.'))
+
+    options, answer = _clean_answer(type_, record)
+    return {
+        'type': type_,
+        'question': question,
+        'marks': marks,
+        'concept_label': concept_label,
+        'options': options,
+        'answer': answer
+    }
+
+
+def validate_bank(records, question_category):
+    """
+    Returns (sections, errors) of parsed question records. Sections are
+    list of (section data, list of question data), errors are reported
+    with 1-based row number.
+    """
+    question_types = AUTOCHECK_QUESTION_TYPES\
+        if question_category == models.QuestionCategory.AUTOCHECK_TYPE\
+        else _QUESTION_TYPES
+
+    sections, errors = list(), list()
+    for index, record in enumerate(records):
+        try:
+            name = _text(record.get('section'))
+            if not sections or sections[-1][0]['name'] != name:
+                sections.append((_clean_section(record), list()))
+            sections[-1][1].append(_clean_question(record, question_types))
+        except ValueError as e:
+            errors.append({'row': index + 1, 'error': str(e)})
+
+    return sections, errors
+
+
+def _next_order(model):
+    """
+    Returns order to start from for bulk inserted rows of model whose
+    order is their primary key when added one by one. Starting above
+    every primary key keeps rows added later after them.
+    """
+    return (model.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+
+
+def _concept_labels(test_pk, names):
+    """Returns dict of name -> pk of concept labels, creates missing ones"""
+    labels = dict(models.SubjectTestConceptLabels.objects.filter(
+        test__pk=test_pk, name__in=names).values_list('name', 'pk'))
+
+    missing = [n for n in names if n not in labels]
+    if missing:
+        models.SubjectTestConceptLabels.objects.bulk_create([
+            models.SubjectTestConceptLabels(test_id=test_pk, name=n)
+            for n in missing])
+        labels.update(models.SubjectTestConceptLabels.objects.filter(
+            test__pk=test_pk, name__in=missing).values_list('name', 'pk'))
+
+    return labels
+
+
+def _answer_rows(question_pk, data):
+    """Returns option and answer rows of question for bulk insert"""
+    type_, answer = data['type'], data['answer']
+
+    if type_ == models.QuestionType.MCQ:
+        return [models.SubjectTestMcqOptions(
+            question_id=question_pk, option=o, correct_answer=o in answer)
+            for o in data['options']]
+    if type_ == models.QuestionType.SELECT_MULTIPLE_CHOICE:
+        return [models.SubjectTestSelectMultipleCorrectAnswer(
+            question_id=question_pk, option=o, correct_answer=o in answer)
+            for o in data['options']]
+    if type_ == models.QuestionType.TRUE_FALSE:
+        return [models.SubjectTestTrueFalseCorrectAnswer(
+            question_id=question_pk, correct_answer=answer)]
+    if type_ == models.QuestionType.ASSERTION:
+        return [models.SubjectTestAssertionCorrectAnswer(
+            question_id=question_pk, correct_answer=answer)]
+    if type_ == models.QuestionType.NUMERIC_ANSWER:
+        return [models.SubjectTestNumericCorrectAnswer(
+            question_id=question_pk, correct_answer=answer)]
+    if type_ == models.QuestionType.FILL_IN_THE_BLANK:
+        return [models.SubjectTestFillInTheBlankCorrectAnswer(
+            question_id=question_pk, **answer)]
+    return []
+
+
+def import_bank(test_pk, set_pk, sections):
+    """
+    Adds validated sections with their questions, options and answers
+    after existing sections of set in one transaction. Rows are
+    inserted with bulk_create and given their order up front, so none
+    is saved twice. Missing concept labels are created.
+    Raises ValueError if set is not found or is marked as final.
+    Returns number of added sections and questions.
+    """
+    with transaction.atomic():
+        # Concurrent imports into the same set wait here
+        set_ = models.SubjectTestSets.objects.select_for_update().filter(
+            pk=set_pk, test__pk=test_pk).only('mark_as_final').first()
+
+        if not set_:
+            raise ValueError(_('Question set not found.'))
+        if set_.mark_as_final:
+            raise ValueError(_('Question set is MARKED AS FINAL. '
+                               'Uploading question is not allowed.'))
+
+        labels = _concept_labels(test_pk, list({
+            q['concept_label'] for _s, questions in sections
+            for q in questions if q['concept_label']}))
+
+        section_order = _next_order(models.SubjectTestQuestionSection)
+        models.SubjectTestQuestionSection.objects.bulk_create([
+            models.SubjectTestQuestionSection(
+                test_id=test_pk,
+                set_id=set_pk,
+                order=section_order + i,
+                **section
+            ) for i, (section, _q) in enumerate(sections)])
+        # Primary keys are not returned by bulk_create on every
+        # backend, so they are read back by order in one query
+        section_pks = dict(models.SubjectTestQuestionSection.objects.filter(
+            set__pk=set_pk, order__gte=section_order
+        ).values_list('order', 'pk'))
+
+        question_order = _next_order(models.SubjectTypedTestQuestion)
+        questions = [
+            (section_pks[section_order + i], q)
+            for i, (_s, section_questions) in enumerate(sections)
+            for q in section_questions]
+        models.SubjectTypedTestQuestion.objects.bulk_create([
+            models.SubjectTypedTestQuestion(
+                test_section_id=section_pk,
+                type=q['type'],
+                question=q['question'],
+                marks=q['marks'],
+                concept_label_id=labels.get(q['concept_label']),
+                order=question_order + i
+            ) for i, (section_pk, q) in enumerate(questions)],
+            batch_size=500)
+        question_pks = dict(models.SubjectTypedTestQuestion.objects.filter(
+            test_section__set__pk=set_pk, order__gte=question_order
+        ).values_list('order', 'pk'))
+
+        rows = dict()
+        for i, (_section_pk, q) in enumerate(questions):
+            for row in _answer_rows(question_pks[question_order + i], q):
+                rows.setdefault(type(row), []).append(row)
+        for model, model_rows in rows.items():
+            model.objects.bulk_create(model_rows, batch_size=500)
+
+        invalidate_paper_snapshot(set_pk)
+
+    return {'sections': len(sections), 'questions': len(questions)}
+
+
+# Answers stored in one-to-one tables, loaded with the question
+_ANSWER_RELATIONS = {
+    models.QuestionType.TRUE_FALSE: 'typed_test_true_false_question',
+    models.QuestionType.ASSERTION: 'typed_test_assertion_answer',
+    models.QuestionType.NUMERIC_ANSWER: 'typed_test_numeric_question',
+    models.QuestionType.FILL_IN_THE_BLANK:
+        'typed_test_fill_in_the_blank_answer'
+}
+
+
+def _answer_fields(q):
+    """Returns options and answer fields of exported question"""
+    fields = dict()
+
+    if q.type in (models.QuestionType.MCQ,
+                  models.QuestionType.SELECT_MULTIPLE_CHOICE):
+        options = q.typed_test_mcq_question.all()\
+            if q.type == models.QuestionType.MCQ\
+            else q.typed_test_select_multiple_question.all()
+        fields['options'] = [o.option for o in options]
+        correct = [o.option for o in options if o.correct_answer]
+        fields['correct_answer'] = correct[0] if correct and\
+            q.type == models.QuestionType.MCQ else correct
+        return fields
+
+    relation = _ANSWER_RELATIONS.get(q.type)
+    try:
+        answer = getattr(q, relation) if relation else None
+    except ObjectDoesNotExist:
+        answer = None
+
+    if answer:
+        fields['correct_answer'] = answer.correct_answer
+        if q.type == models.QuestionType.FILL_IN_THE_BLANK:
+            for field in ('manual_checking', 'enable_strict_checking',
+                          'ignore_grammar', 'ignore_special_characters'):
+                fields[field] = getattr(answer, field)
+    return fields
+
+
+def bank_records(test_pk):
+    """
+    Yields question records of every set of typed test in order.
+    Questions are read per section in chunks, so memory use does not
+    grow with size of test.
+    """
+    sections = models.SubjectTestQuestionSection.objects.filter(
+        test__pk=test_pk
+    ).select_related('set').order_by('set', 'order', 'pk')
+
+    for section in sections:
+        questions = models.SubjectTypedTestQuestion.objects.filter(
+            test_section__pk=section.pk
+        ).select_related(
+            'concept_label', *_ANSWER_RELATIONS.values()
+        ).prefetch_related(
+            Prefetch('typed_test_mcq_question',
+                     queryset=models.SubjectTestMcqOptions.objects.order_by(
+                         'pk')),
+            Prefetch('typed_test_select_multiple_question',
+                     queryset=models.SubjectTestSelectMultipleCorrectAnswer
+                     .objects.order_by('pk'))
+        ).order_by('order', 'pk')
+
+        for start in range(0, questions.count(), BANK_EXPORT_CHUNK_SIZE):
+            for q in questions[start:start + BANK_EXPORT_CHUNK_SIZE]:
+                record = dict.fromkeys(BANK_FIELDS)
+                record.update({
+                    'set_name': section.set.set_name,
+                    'section': section.name,
+                    'section_view': section.view,
+                    'section_mandatory': section.section_mandatory,
+                    'answer_all_questions': section.answer_all_questions,
+                    'no_of_question_to_attempt':
+                        section.no_of_question_to_attempt,
+                    'type': q.type,
+                    'question': q.question,
+                    'marks': q.marks,
+                    'concept_label':
+                        q.concept_label.name if q.concept_label else None
+                })
+                record.update(_answer_fields(q))
+                yield record
+
+
+def _csv_record(record):
+    return {
+        field: CSV_LIST_SEPARATOR.join(value) if isinstance(value, list)
+        else str(value).lower() if isinstance(value, bool)
+        else value
+        for field, value in record.items()
+    }
+
+
+def export_bank_lines(test_pk, file_type):
+    """
+    Returns generator of lines of exported question bank of test as
+    csv or newline delimited json. Raises ValueError if file type is
+    invalid.
+    """
+    if file_type == 'csv':
+        return csv_lines(
+            (_csv_record(r) for r in bank_records(test_pk)), BANK_FIELDS)
+    if file_type == 'ndjson':
+        return ndjson_lines(bank_records(test_pk))
+    raise ValueError(_('Invalid file type.'))
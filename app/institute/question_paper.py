@@ -0,0 +1,306 @@
+import copy
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+
+from app.settings import MEDIA_URL
+from core import models
+
+TEACHER_PAPER = 'teacher'
+STUDENT_PAPER = 'student'
+
+PAPER_SNAPSHOT_CACHE_TIMEOUT = getattr(
+    settings, 'PAPER_SNAPSHOT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# Snapshots are compiled with this in place of media url prefix, so the
+# stored json does not depend on host of the request. Json encoder
+# escapes it, so it can not clash with text of questions.
+MEDIA_PLACEHOLDER = '\x00'
+_ENCODED_MEDIA_PLACEHOLDER = json.dumps(MEDIA_PLACEHOLDER)[1:-1]
+
+# Answers stored in one-to-one tables, loaded with the question
+SINGLE_ANSWER_RELATIONS = (
+    'image_typed_test_question',
+    'typed_test_true_false_question',
+    'typed_test_assertion_answer',
+    'typed_test_numeric_question',
+    'typed_test_fill_in_the_blank_answer'
+)
+
+# Answers stored as one row per option, prefetched per question set
+OPTION_RELATIONS = {
+    models.QuestionType.MCQ: 'typed_test_mcq_question',
+    models.QuestionType.SELECT_MULTIPLE_CHOICE:
+        'typed_test_select_multiple_question'
+}
+
+
+def get_media_prefix(request):
+    """Returns prefix of absolute url of uploaded files"""
+    return request.build_absolute_uri('/').strip('/') + MEDIA_URL + '/'
+
+
+def _related(instance, name):
+    """Returns reverse one-to-one related object or None if it is missing"""
+    try:
+        return getattr(instance, name)
+    except ObjectDoesNotExist:
+        return None
+
+
+def _section_data(section):
+    return {
+        'section_id': section.pk,
+        'name': section.name,
+        'order': section.order,
+        'view': section.view,
+        'no_of_question_to_attempt': section.no_of_question_to_attempt,
+        'answer_all_questions': section.answer_all_questions,
+        'section_mandatory': section.section_mandatory
+    }
+
+
+def _picture_question_data(q, media_prefix):
+    question_data = {
+        'question_id': q.pk,
+        'order': q.order,
+        'text': q.text,
+        'marks': q.marks,
+        'file': media_prefix + str(q.file)
+    }
+    if q.concept_label_id:
+        question_data['concept_label_id'] = q.concept_label_id
+    return question_data
+
+
+def _typed_question_data(q, media_prefix):
+    question_data = {
+        'question_id': q.pk,
+        'order': q.order,
+        'question': q.question,
+        'marks': q.marks,
+        'type': q.type,
+        'has_picture': q.has_picture
+    }
+
+    if q.concept_label_id:
+        question_data['concept_label_id'] = q.concept_label_id
+
+    if q.has_picture:
+        picture = _related(q, 'image_typed_test_question')
+        if picture:
+            question_data['image'] = media_prefix + str(picture.file)
+
+    if q.type in OPTION_RELATIONS:
+        question_data['options'] = [{
+            'option_id': option.pk,
+            'option': option.option,
+            'correct_answer': option.correct_answer
+        } for option in getattr(q, OPTION_RELATIONS[q.type]).all()]
+
+    elif q.type == models.QuestionType.TRUE_FALSE:
+        answer = _related(q, 'typed_test_true_false_question')
+        if answer:
+            question_data['correct_answer'] = answer.correct_answer
+
+    elif q.type == models.QuestionType.ASSERTION:
+        answer = _related(q, 'typed_test_assertion_answer')
+        if answer:
+            question_data['correct_answer'] = answer.correct_answer
+
+    elif q.type == models.QuestionType.NUMERIC_ANSWER:
+        answer = _related(q, 'typed_test_numeric_question')
+        if answer:
+            question_data['correct_answer'] = answer.correct_answer
+
+    elif q.type == models.QuestionType.FILL_IN_THE_BLANK:
+        answer = _related(q, 'typed_test_fill_in_the_blank_answer')
+        if answer:
+            question_data['fill_in_the_blank_answer'] = {
+                'correct_answer': answer.correct_answer,
+                'manual_checking': answer.manual_checking,
+                'enable_strict_checking': answer.enable_strict_checking,
+                'ignore_grammar': answer.ignore_grammar,
+                'ignore_special_characters': answer.ignore_special_characters
+            }
+
+    return question_data
+
+
+def _sections(test, set_pk):
+    """
+    Returns sections of set with questions and answers prefetched.
+    Typed sets take four queries (sections, questions joined with
+    image and single answers, mcq options, select multiple options),
+    image sets take two.
+    """
+    sections = models.SubjectTestQuestionSection.objects.filter(
+        test__pk=test.pk,
+        set__pk=set_pk
+    ).order_by('order')
+
+    if test.question_mode == models.QuestionMode.IMAGE:
+        return sections.prefetch_related(Prefetch(
+            'picture_question_section',
+            queryset=models.SubjectPictureTestQuestion.objects.order_by(
+                'order')))
+
+    return sections.prefetch_related(Prefetch(
+        'typed_test_question_section',
+        queryset=models.SubjectTypedTestQuestion.objects.select_related(
+            *SINGLE_ANSWER_RELATIONS
+        ).prefetch_related(
+            Prefetch('typed_test_mcq_question',
+                     queryset=models.SubjectTestMcqOptions.objects.order_by(
+                         'pk')),
+            Prefetch('typed_test_select_multiple_question',
+                     queryset=models.SubjectTestSelectMultipleCorrectAnswer
+                     .objects.order_by('pk'))
+        ).order_by('order')))
+
+
+def assemble_question_paper(test, set_pk, media_prefix):
+    """
+    Returns questions of set of test with answers. File mode paper is a
+    dict of file (or None if not uploaded), image and typed papers are a
+    list of sections with nested questions. Query count does not depend
+    on number of sections, questions or options.
+    """
+    if test.question_mode == models.QuestionMode.FILE:
+        question_set = models.SubjectFileTestQuestion.objects.filter(
+            test__pk=test.pk,
+            set__pk=set_pk
+        ).first()
+
+        if not question_set:
+            return None
+
+        return {
+            'id': question_set.pk,
+            'file': media_prefix + str(question_set.file)
+        }
+
+    paper = list()
+    for section in _sections(test, set_pk):
+        section_data = _section_data(section)
+
+        if test.question_mode == models.QuestionMode.IMAGE:
+            section_data['questions'] = [
+                _picture_question_data(q, media_prefix)
+                for q in section.picture_question_section.all()]
+        else:
+            section_data['questions'] = [
+                _typed_question_data(q, media_prefix)
+                for q in section.typed_test_question_section.all()]
+
+        paper.append(section_data)
+
+    return paper
+
+
+def strip_answers(paper):
+    """Returns copy of assembled paper without correct answers"""
+    if not isinstance(paper, list):
+        return paper
+
+    paper = copy.deepcopy(paper)
+    for section in paper:
+        for question in section['questions']:
+            question.pop('correct_answer', None)
+            question.pop('fill_in_the_blank_answer', None)
+            for option in question.get('options', ()):
+                option.pop('correct_answer', None)
+    return paper
+
+
+def _paper_cache_key(set_pk, variant):
+    return 'question-paper:' + str(set_pk) + ':' + variant
+
+
+def _dump(paper):
+    body = json.dumps(paper, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return body, hashlib.sha1(body.encode()).hexdigest()
+
+
+def _invalidate_cached_paper(set_pk):
+    # Deleted again after commit so that readers of the old row during
+    # the transaction do not keep it cached
+    keys = [_paper_cache_key(set_pk, variant)
+            for variant in (TEACHER_PAPER, STUDENT_PAPER)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_paper_snapshot(set_pk):
+    """Marks snapshot of set stale, it is compiled again when finalized"""
+    models.SubjectTestSetSnapshot.objects.filter(
+        set__pk=set_pk).update(stale=True)
+    _invalidate_cached_paper(set_pk)
+
+
+def compile_paper_snapshot(test, set_pk):
+    """
+    Compiles teacher (with answers) and student (without answers)
+    variants of question paper of finalized set and stores them with
+    their hashes. Every compilation gets a new version.
+    Returns the snapshot.
+    """
+    paper = assemble_question_paper(test, set_pk, MEDIA_PLACEHOLDER)
+    teacher_paper, teacher_etag = _dump(paper)
+    student_paper, student_etag = _dump(strip_answers(paper))
+
+    with transaction.atomic():
+        snapshot = models.SubjectTestSetSnapshot.objects.select_for_update(
+        ).filter(set__pk=set_pk).first()
+
+        if snapshot:
+            snapshot.version += 1
+        else:
+            snapshot = models.SubjectTestSetSnapshot(set_id=set_pk)
+
+        snapshot.teacher_paper = teacher_paper
+        snapshot.teacher_etag = teacher_etag
+        snapshot.student_paper = student_paper
+        snapshot.student_etag = student_etag
+        snapshot.stale = False
+        snapshot.save()
+
+    _invalidate_cached_paper(set_pk)
+    return snapshot
+
+
+def get_paper_snapshot(set_pk, variant, media_prefix):
+    """
+    Returns (etag, json body) of compiled paper of finalized set from
+    cache, loading it from database on miss. Returns None if set is
+    not finalized or its snapshot is stale.
+    """
+    key = _paper_cache_key(set_pk, variant)
+    entry = cache.get(key)
+
+    if entry is None:
+        paper_field = variant + '_paper'
+        etag_field = variant + '_etag'
+        entry = models.SubjectTestSetSnapshot.objects.filter(
+            set__pk=set_pk,
+            set__mark_as_final=True,
+            stale=False
+        ).values_list('version', etag_field, paper_field).first()
+
+        if entry is None:
+            return None
+        cache.set(key, entry, PAPER_SNAPSHOT_CACHE_TIMEOUT)
+
+    version, etag, body = entry
+    encoded_prefix = json.dumps(media_prefix)[1:-1]
+
+    # Urls depend on host, so the prefix is part of the entity tag
+    etag = '"{}-{}"'.format(version, hashlib.sha1(
+        (etag + encoded_prefix).encode()).hexdigest())
+    return etag, body.replace(_ENCODED_MEDIA_PLACEHOLDER, encoded_prefix)
@@ -0,0 +1,285 @@
+import base64
+import binascii
+import json
+
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils.translation import ugettext as _
+
+from core import models
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Fields of InstituteStudents roster can be ordered by
+ORDERING_FIELDS = ('registration_no', 'enrollment_no')
+
+STUDENT_FIELDS = ('first_name', 'last_name', 'gender', 'date_of_birth',
+                  'enrollment_no', 'registration_no')
+
+# Columns of exported roster in order
+EXPORT_FIELDS = ('id', 'invitee_email') + STUDENT_FIELDS + (
+    'created_on', 'active', 'is_banned', 'banning_reason', 'class_name')
+
+# Rows fetched from server side cursor at once during export
+EXPORT_CHUNK_SIZE = 2000
+
+
+def encode_cursor(value, pk):
+    """Returns opaque cursor pointing after row with value and pk"""
+    return base64.urlsafe_b64encode(
+        json.dumps([value, pk]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns (value, pk) of cursor, raises ValueError if it is invalid"""
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError(_('Invalid cursor.'))
+
+    if not isinstance(value, str) or not isinstance(pk, int):
+        raise ValueError(_('Invalid cursor.'))
+
+    return value, pk
+
+
+def get_page_size(limit):
+    """Returns page size from request parameter"""
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+class StudentRoster:
+    """
+    Keyset paginated student list of institute, class or subject.
+
+    A page is loaded with a constant number of queries: one for the
+    rows (joined with student and invitee), one for the total count on
+    the first page, one for ban details of banned students on the page
+    and, for institute roster, one for class names.
+    """
+
+    def __init__(self, queryset, prefix='', bans=None, with_class_name=False):
+        # prefix is the path from queryset model to InstituteStudents
+        self.queryset = queryset
+        self.prefix = prefix
+        self.bans = bans
+        self.with_class_name = with_class_name
+
+    def _field(self, name):
+        return self.prefix + name if self.prefix else name
+
+    def search(self, query):
+        """Filters students by name, enrollment/registration no or email"""
+        query = (query or '').strip()
+
+        if query:
+            self.queryset = self.queryset.filter(
+                Q(**{self._field('first_name__startswith'): query.lower()}) |
+                Q(**{self._field('last_name__startswith'): query.lower()}) |
+                Q(**{self._field('enrollment_no__istartswith'): query}) |
+                Q(**{self._field('registration_no__istartswith'): query}) |
+                Q(**{self._field('invitee__email__istartswith'): query})
+            )
+        return self
+
+    def filter(self, gender=None):
+        """Filters students by gender"""
+        if gender:
+            self.queryset = self.queryset.filter(
+                **{self._field('gender'): gender})
+        return self
+
+    def page(self, ordering=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Returns dict with 'data' (rows of page), 'next' (cursor of next
+        page or None) and 'count' (total rows, only on first page).
+        Raises ValueError on invalid ordering or cursor.
+        """
+        ordering = ordering or ORDERING_FIELDS[0]
+        if ordering not in ORDERING_FIELDS:
+            raise ValueError(_('Invalid ordering.'))
+
+        key = self._field(ordering)
+        queryset = self.queryset
+        count = None
+
+        if cursor:
+            value, pk = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{key + '__gt': value}) | Q(**{key: value, 'pk__gt': pk}))
+        else:
+            count = queryset.count()
+
+        student_fields = {
+            'student_' + f: F(self._field(f)) for f in STUDENT_FIELDS}
+        rows = list(queryset.order_by(key, 'pk').values(
+            'pk', 'created_on', 'is_banned', 'active',
+            student_id=F(self._field('pk')),
+            invitee_email=F(self._field('invitee__email')),
+            **student_fields
+        )[:limit + 1])
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(
+                rows[-1]['student_' + ordering], rows[-1]['pk'])
+
+        return {
+            'data': self._serialize(rows),
+            'next': next_cursor,
+            'count': count
+        }
+
+    def export(self, ordering=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Returns generator of every row of roster as dict of EXPORT_FIELDS,
+        raises ValueError on invalid ordering. Rows are streamed from a
+        server side cursor with ban reason and class name joined in the
+        same query, so memory use does not depend on roster size.
+        """
+        ordering = ordering or ORDERING_FIELDS[0]
+        if ordering not in ORDERING_FIELDS:
+            raise ValueError(_('Invalid ordering.'))
+
+        annotations = {
+            'student_' + f: F(self._field(f)) for f in STUDENT_FIELDS}
+        annotations['class_name'] = F(self._field(
+            'class_student_institute_profile__institute_class__name'))
+
+        if self.bans is not None:
+            annotations['banning_reason'] = Subquery(self.bans.filter(
+                institute_student=OuterRef(self._field('pk')),
+                active=True
+            ).order_by('-created_on').values('reason')[:1])
+
+        rows = self.queryset.order_by(self._field(ordering), 'pk').values(
+            'created_on', 'is_banned', 'active',
+            student_id=F(self._field('pk')),
+            invitee_email=F(self._field('invitee__email')),
+            **annotations
+        ).iterator(chunk_size=chunk_size)
+
+        return self._export_rows(rows)
+
+    def _export_rows(self, rows):
+        for r in rows:
+            row = {f: r['student_' + f] for f in STUDENT_FIELDS}
+            row['id'] = r['student_id']
+            row['invitee_email'] = r['invitee_email']
+            row['created_on'] = r['created_on']
+            row['active'] = r['active']
+            row['is_banned'] = r['is_banned']
+            row['banning_reason'] = r.get('banning_reason') or ''
+            row['class_name'] = r['class_name'] or ''
+            yield {f: row[f] for f in EXPORT_FIELDS}
+
+    def _ban_details(self, student_ids):
+        bans = dict()
+        if self.bans is None or not student_ids:
+            return bans
+
+        for ban in self.bans.filter(
+            institute_student__pk__in=student_ids,
+            active=True
+        ).select_related('banned_by__user_profile').order_by('created_on'):
+            bans[ban.institute_student_id] = ban
+        return bans
+
+    def _class_names(self, student_ids):
+        if not self.with_class_name or not student_ids:
+            return dict()
+
+        return dict(models.InstituteClassStudents.objects.filter(
+            institute_student__pk__in=student_ids
+        ).values_list('institute_student', 'institute_class__name'))
+
+    def _serialize(self, rows):
+        banned_ids = [r['student_id'] for r in rows if r['is_banned']]
+        bans = self._ban_details(banned_ids)
+        class_names = self._class_names([r['student_id'] for r in rows])
+        response = list()
+
+        for r in rows:
+            res = {f: r['student_' + f] for f in STUDENT_FIELDS}
+            res['id'] = r['student_id']
+            res['invitee_email'] = r['invitee_email']
+            res['created_on'] = r['created_on']
+            res['is_banned'] = r['is_banned']
+            res['active'] = r['active']
+            res['image'] = ''
+
+            ban_details = bans.get(r['student_id'])
+            if ban_details:
+                res['banning_reason'] = ban_details.reason
+                res['banned_on'] = ban_details.created_on
+                res['ban_start_date'] = ban_details.start_date
+                profile = ban_details.banned_by.user_profile
+
+                if profile.first_name:
+                    res['banned_by'] = \
+                        profile.first_name + ' ' + profile.last_name
+                else:
+                    res['banned_by'] = str(ban_details.banned_by)
+
+                if ban_details.end_date != models.UNLIMITED:
+                    res['ban_end_date'] = ban_details.end_date
+
+            if r['student_id'] in class_names:
+                res['class_name'] = class_names[r['student_id']]
+
+            response.append(res)
+
+        return response
+
+
+def _with_student_type(queryset, student_type):
+    if student_type == 'active':
+        return queryset.filter(active=True, is_banned=False)
+    elif student_type == 'inactive':
+        return queryset.filter(active=False, is_banned=False)
+    elif student_type == 'banned':
+        return queryset.filter(is_banned=True)
+    elif student_type == 'all':
+        return queryset
+    return queryset.none()
+
+
+def institute_roster(institute_pk, student_type):
+    """Returns roster of students of institute"""
+    return StudentRoster(
+        _with_student_type(models.InstituteStudents.objects.filter(
+            institute__pk=institute_pk), student_type),
+        bans=models.InstituteBannedStudent.objects.filter(
+            banned_institute__pk=institute_pk),
+        with_class_name=True)
+
+
+def class_roster(class_pk, student_type):
+    """Returns roster of students of class"""
+    queryset = models.InstituteClassStudents.objects.filter(
+        institute_class__pk=class_pk)
+
+    # Banned class students were listed only if active
+    if student_type == 'banned':
+        queryset = queryset.filter(active=True)
+
+    return StudentRoster(
+        _with_student_type(queryset, student_type),
+        prefix='institute_student__',
+        bans=models.InstituteClassBannedStudent.objects.filter(
+            banned_class__pk=class_pk))
+
+
+def subject_roster(subject_pk, student_type):
+    """Returns roster of students of subject"""
+    return StudentRoster(
+        _with_student_type(models.InstituteSubjectStudents.objects.filter(
+            institute_subject__pk=subject_pk), student_type),
+        prefix='institute_student__',
+        bans=models.InstituteSubjectBannedStudent.objects.filter(
+            banned_subject__pk=subject_pk))
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/test/<slug:test_slug>/', consumers.ExamSessionConsumer),
+    path('ws/transcoding/', consumers.TranscodingProgressConsumer),
+]
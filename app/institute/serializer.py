@@ -504,6 +504,16 @@ class SubjectLecturePdfSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class SubjectLectureVideoSerializer(serializers.ModelSerializer):
+    """Serializer for creating video study material"""
+    file = serializers.FileField(allow_null=False, use_url=True)
+
+    class Meta:
+        model = models.SubjectLectureVideoMaterial
+        fields = ('id', 'lecture_material', 'file', 'can_download')
+        read_only_fields = ('id',)
+
+
 class SubjectTestFileQuestionPaperUploadSerializer(serializers.ModelSerializer):
     """Serializer for creating pdf question paper"""
     file = serializers.FileField(allow_null=False, use_url=True)
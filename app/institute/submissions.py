@@ -0,0 +1,43 @@
+import json
+import time
+
+from django.db import transaction
+from django.utils.translation import ugettext as _
+
+from core import models
+
+
+def save_answers(credential, answers, submit=False):
+    """
+    Merges answers (question id -> answer) into submission of test
+    credential, creating it on first save. Answer None removes answer
+    of question. Submission is closed for changes once submitted.
+    Returns the submission. Raises ValueError if it is already submitted.
+    """
+    with transaction.atomic():
+        submission = models.StudentTestSubmission.objects.select_for_update(
+        ).filter(credential__pk=credential.pk).first()
+
+        if not submission:
+            submission = models.StudentTestSubmission(
+                credential_id=credential.pk,
+                test_id=credential.test_id,
+                set_id=credential.set_id)
+        elif submission.submitted:
+            raise ValueError(_('Test is already submitted.'))
+
+        saved = json.loads(submission.answers or '{}')
+        for question_id, answer in answers.items():
+            if answer is None:
+                saved.pop(str(question_id), None)
+            else:
+                saved[str(question_id)] = answer
+        submission.answers = json.dumps(saved)
+
+        if submit:
+            submission.submitted = True
+            submission.submitted_on = int(time.time()) * 1000
+
+        submission.save()
+
+    return submission
@@ -0,0 +1,208 @@
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+import tempfile
+
+from celery import shared_task
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from .autosave import flush_pending
+from .chunked_upload import expire_uploads
+from .exam_session import publish_test_result
+from .export import expire_exports, export_file_name, export_lines
+from .grading import grade_test
+from .login_stats import ingest_pending
+from .onboarding import StudentImport
+from .transcoding import TRANSCODING_MAX_RETRIES, TRANSCODING_RETRY_DELAY,\
+    encode_rendition, fail_job, fail_rendition, plan
+from .warmup import lock_warm_up, start_test, tests_to_start,\
+    tests_to_warm_up, warm_up_test
+from core import models
+
+
+@shared_task
+def export_student_roster(user_pk, kind, pk, student_type, file_type,
+                          ordering=None):
+    """
+    Writes exported roster to storage.
+    Returns requesting user pk and storage name of file.
+    """
+    lines = export_lines(kind, pk, student_type, file_type, ordering)
+    name = export_file_name(user_pk, file_type)
+
+    with tempfile.TemporaryFile() as tmp:
+        for line in lines:
+            tmp.write(line.encode())
+        tmp.seek(0)
+        name = default_storage.save(name, File(tmp))
+
+    return {'user': user_pk, 'file': name}
+
+
+@shared_task(bind=True)
+def import_institute_students(self, user_pk, institute_pk, rows,
+                              student_limit):
+    """
+    Adds parsed rows of students to institute reporting progress as
+    PROGRESS state. Returns requesting user pk with import report or
+    error if license limit would be exceeded.
+    """
+    def progress(done, total):
+        self.update_state(state='PROGRESS',
+                          meta={'done': done, 'total': total})
+
+    result = {'user': user_pk}
+    try:
+        result['report'] = StudentImport(institute_pk, user_pk, rows).run(
+            student_limit, progress)
+    except ValueError as e:
+        result['error'] = str(e)
+
+    return result
+
+
+@shared_task
+def start_scheduled_test(test_pk):
+    """Makes scheduled test live at its start time"""
+    return start_test(test_pk)
+
+
+@shared_task
+def warm_up_scheduled_tests():
+    """
+    Periodic task run by celery beat. Warms up cache of tests starting
+    within TEST_WARMUP_MINUTES and schedules them to go live on time.
+    Tests whose start was missed are made live immediately.
+    Returns pks of warmed up tests.
+    """
+    warmed = list()
+
+    for test in tests_to_warm_up():
+        if not lock_warm_up(test):
+            continue
+        warm_up_test(test)
+        start_scheduled_test.apply_async(
+            (test.pk,),
+            eta=datetime.datetime.fromtimestamp(
+                test.test_schedule / 1000, tz=datetime.timezone.utc))
+        warmed.append(test.pk)
+
+    for test in tests_to_start():
+        if lock_warm_up(test):
+            warm_up_test(test)
+        start_test(test.pk)
+
+    return warmed
+
+
+@shared_task
+def grade_test_submissions(test_pk, regrade=False):
+    """
+    Auto grades submitted answers of typed test and publishes result
+    if test publishes it automatically and no answer needs manual
+    checking. Returns number of graded submissions.
+    """
+    graded = grade_test(test_pk, regrade)
+
+    if models.SubjectTest.objects.filter(
+        pk=test_pk,
+        publish_result_automatically=True
+    ).exists() and not models.StudentTestSubmission.objects.filter(
+        test__pk=test_pk,
+        needs_manual_checking=True
+    ).exists():
+        publish_test_result(test_pk)
+
+    return graded
+
+
+@shared_task
+def flush_autosaved_answers():
+    """
+    Periodic task run by celery beat. Writes answers buffered in redis
+    to database. Returns number of updated submissions or None if
+    previous run is still flushing.
+    """
+    if not cache.add('autosave-flush-lock', True, 5 * 60):
+        return None
+
+    try:
+        return flush_pending()
+    finally:
+        cache.delete('autosave-flush-lock')
+
+
+@shared_task
+def ingest_login_stats():
+    """
+    Periodic task run by celery beat. Inserts buffered login events and
+    updates login rollups of tests. Returns number of inserted events
+    or None if previous run is still ingesting.
+    """
+    if not cache.add('login-stats-ingest-lock', True, 5 * 60):
+        return None
+
+    try:
+        return ingest_pending()
+    finally:
+        cache.delete('login-stats-ingest-lock')
+
+
+@shared_task
+def expire_roster_exports():
+    """
+    Periodic task run by celery beat. Removes exported roster files
+    which were written more than EXPORT_EXPIRY seconds ago.
+    """
+    return expire_exports()
+
+
+@shared_task
+def expire_chunked_uploads():
+    """
+    Periodic task run by celery beat. Removes uploads which were not
+    completed in time along with their partial files.
+    """
+    return expire_uploads()
+
+
+@shared_task(bind=True, acks_late=True, max_retries=TRANSCODING_MAX_RETRIES)
+def transcode_video(self, job_pk):
+    """
+    Probes uploaded video of job and queues encoding of each rendition of
+    its abr ladder, lowest first, so renditions are encoded in parallel
+    across transcoding workers. Routed to its own queue, so its worker caps
+    how many videos a node encodes at once. Failed attempts are retried
+    with exponential backoff.
+    """
+    try:
+        renditions = plan(job_pk)
+    except Exception as e:
+        final = self.request.retries >= self.max_retries
+        fail_job(job_pk, str(e), final)
+        if final:
+            raise
+        countdown = TRANSCODING_RETRY_DELAY * 2 ** self.request.retries
+        raise self.retry(exc=e, countdown=countdown)
+
+    for rendition_pk in renditions:
+        encode_video_rendition.delay(rendition_pk)
+
+
+@shared_task(bind=True, acks_late=True, max_retries=TRANSCODING_MAX_RETRIES)
+def encode_video_rendition(self, rendition_pk):
+    """
+    Encodes one rendition of video and publishes it in master playlist.
+    Failed attempts are retried with exponential backoff.
+    """
+    try:
+        encode_rendition(rendition_pk)
+    except Exception as e:
+        final = self.request.retries >= self.max_retries
+        fail_rendition(rendition_pk, str(e), final)
+        if final:
+            raise
+        countdown = TRANSCODING_RETRY_DELAY * 2 ** self.request.retries
+        raise self.retry(exc=e, countdown=countdown)
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import models
+from institute.access import InstituteAccess
+
+
+def create_teacher(email='abc@gmail.com', username='tempusername'):
+    """Creates and return teacher"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_teacher=True
+    )
+
+
+def create_institute(user, institute_name='tempinstitute'):
+    """Creates institute and return institute"""
+    return models.Institute.objects.create(
+        name=institute_name,
+        user=user,
+        institute_category=models.InstituteCategory.EDUCATION,
+        type=models.InstituteType.COLLEGE
+    )
+
+
+class InstituteAccessTests(TestCase):
+    """Tests for resolving institute, class and subject grants"""
+
+    def setUp(self):
+        self.admin = create_teacher()
+        self.institute = create_institute(self.admin)
+        self.class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+        self.subject = models.InstituteSubject.objects.create(
+            subject_class=self.class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.OPTIONAL
+        )
+        self.teacher = create_teacher('def@gmail.com', 'tempusername2')
+
+    def test_admin_can_manage_everything(self):
+        """Test that admin can manage class and subject of institute"""
+        access = InstituteAccess(self.admin)
+
+        self.assertTrue(access.is_admin(self.institute.pk))
+        self.assertTrue(access.is_admin(self.institute.institute_slug))
+        self.assertTrue(access.can_manage_class(
+            self.institute.pk, self.class_.pk))
+        self.assertTrue(access.can_manage_subject(
+            self.institute.pk, self.class_.pk, self.subject.pk))
+        self.assertFalse(access.has_subject_perm(self.subject.pk))
+
+    def test_subject_incharge_can_manage_only_subject(self):
+        """Test that subject in-charge can not manage class"""
+        models.InstitutePermission.objects.create(
+            institute=self.institute,
+            inviter=self.admin,
+            invitee=self.teacher,
+            role=models.InstituteRole.FACULTY,
+            active=True
+        )
+        models.InstituteSubjectPermission.objects.create(
+            invitee=self.teacher,
+            inviter=self.admin,
+            to=self.subject
+        )
+        access = InstituteAccess(self.teacher)
+
+        self.assertEqual(access.role(self.institute.pk),
+                         models.InstituteRole.FACULTY)
+        self.assertFalse(access.is_admin(self.institute.pk))
+        self.assertTrue(access.can_manage_subject(
+            self.institute.institute_slug,
+            self.class_.class_slug,
+            self.subject.subject_slug))
+        self.assertFalse(access.can_manage_class(
+            self.institute.pk, self.class_.pk))
+
+    def test_inactive_role_is_ignored(self):
+        """Test that pending invitation does not grant any role"""
+        models.InstitutePermission.objects.create(
+            institute=self.institute,
+            inviter=self.admin,
+            invitee=self.teacher,
+            role=models.InstituteRole.ADMIN
+        )
+        access = InstituteAccess(self.teacher)
+
+        self.assertIsNone(access.role(self.institute.pk))
+        self.assertFalse(access.is_admin(self.institute.pk))
+
+    def test_grants_are_loaded_in_one_query(self):
+        """Test that all checks together make a single query"""
+        models.InstituteClassPermission.objects.create(
+            invitee=self.admin,
+            inviter=self.admin,
+            to=self.class_
+        )
+        access = InstituteAccess(self.admin)
+
+        with self.assertNumQueries(1):
+            access.is_admin(self.institute.pk)
+            access.has_class_perm(self.class_.pk)
+            access.can_manage_subject(
+                self.institute.pk, self.class_.pk, self.subject.pk)
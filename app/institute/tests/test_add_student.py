@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import models
+
+
+def create_teacher(email='abc@gmail.com', username='tempusername'):
+    """Creates and return teacher"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_teacher=True
+    )
+
+
+def create_student(email, username):
+    """Creates and return student"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_student=True
+    )
+
+
+class AddStudentToSubjectTests(TestCase):
+    """Tests for adding student to subject by admin"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = create_teacher()
+        self.institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        self.class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+        self.subject = models.InstituteSubject.objects.create(
+            subject_class=self.class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        license_ = models.InstituteSelectedCommonLicense.objects.create(
+            institute=self.institute,
+            type=models.InstituteLicensePlans.BASIC,
+            billing=models.Billing.MONTHLY,
+            price=1000,
+            no_of_admin=1,
+            no_of_staff=1,
+            no_of_faculty=1,
+            no_of_student=3,
+            video_call_max_attendees=10,
+            classroom_limit=5,
+            department_limit=5,
+            created_on=1
+        )
+        models.InstituteCommonLicenseOrderDetails.objects.create(
+            institute=self.institute,
+            selected_license=license_,
+            payment_gateway=models.PaymentGateway.RAZORPAY,
+            order_id='order_id',
+            paid=True,
+            active=True,
+            end_date=9999999999999
+        )
+        self.url = reverse('institute:add-student-to-subject', kwargs={
+            'institute_slug': self.institute.institute_slug,
+            'class_slug': self.class_.class_slug,
+            'subject_slug': self.subject.subject_slug
+        })
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_new_student_is_added_to_institute_and_subject(self):
+        """Test that student not in institute is invited with subject"""
+        student = create_student('s1@gmail.com', 's1')
+
+        res = self.client.post(self.url, {'invitee_email': 's1@gmail.com'})
+
+        self.assertEqual(res.status_code, 201)
+        institute_student = models.InstituteStudents.objects.get(
+            invitee=student, institute=self.institute)
+        self.assertEqual(res.data['id'], institute_student.pk)
+        self.assertTrue(models.InstituteSubjectStudents.objects.filter(
+            institute_subject=self.subject,
+            institute_student=institute_student
+        ).exists())
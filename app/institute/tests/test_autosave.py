@@ -0,0 +1,107 @@
+import json
+from unittest import mock
+
+import fakeredis
+from django.test import TestCase
+
+from core import models
+from institute import autosave
+from institute.tests.test_question_paper import create_teacher,\
+    create_typed_test
+from institute.tests.test_warmup import create_student
+
+
+class AutosaveTests(TestCase):
+    """Tests for write-behind buffer of autosaved answers"""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        patcher = mock.patch('institute.autosave.get_redis_connection',
+                             return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        admin = create_teacher()
+        institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        class_ = models.InstituteClass.objects.create(
+            class_institute=institute,
+            name='class 1'
+        )
+        subject = models.InstituteSubject.objects.create(
+            subject_class=class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        test = create_typed_test(subject)
+        set_ = models.SubjectTestSets.objects.create(
+            test=test, set_name='set 1', mark_as_final=True)
+        self.credentials = [models.StudentTestCredential.objects.create(
+            test=test,
+            set=set_,
+            student=models.InstituteStudents.objects.create(
+                invitee=create_student(
+                    'student{}@gmail.com'.format(i), 'student{}'.format(i)),
+                inviter=admin,
+                institute=institute
+            )) for i in range(3)]
+
+    def answers(self, credential):
+        return json.loads(models.StudentTestSubmission.objects.get(
+            credential=credential).answers)
+
+    def test_answers_are_flushed_in_batches(self):
+        """Test that buffered answers reach database in one flush"""
+        for credential in self.credentials:
+            autosave.autosave_answers(credential.pk, {1: 'a', 2: 5})
+        autosave.autosave_answers(self.credentials[0].pk, {1: 'b'})
+
+        self.assertFalse(models.StudentTestSubmission.objects.exists())
+        self.assertEqual(autosave.flush_pending(), 3)
+
+        self.assertEqual(self.answers(self.credentials[0]),
+                         {'1': 'b', '2': 5})
+        self.assertEqual(self.answers(self.credentials[2]),
+                         {'1': 'a', '2': 5})
+        self.assertEqual(self.redis.keys('autosave:*'), [])
+
+        autosave.autosave_answers(self.credentials[0].pk, {2: None})
+        self.assertEqual(autosave.flush_pending(), 1)
+        self.assertEqual(self.answers(self.credentials[0]), {'1': 'b'})
+
+    def test_crashed_flush_is_recovered(self):
+        """Test that answers taken by a crashed flush are not lost"""
+        pk = self.credentials[0].pk
+        autosave.autosave_answers(pk, {1: 'a', 2: 'b'})
+        # Flush crashes after taking answers from buffer
+        autosave._take([pk])
+        autosave.autosave_answers(pk, {2: 'c'})
+
+        autosave.flush_pending()
+
+        self.assertEqual(self.answers(self.credentials[0]),
+                         {'1': 'a', '2': 'c'})
+        self.assertEqual(self.redis.keys('autosave:*'), [])
+
+    def test_submit_flushes_pending_answers(self):
+        """Test that submit includes buffered answers synchronously"""
+        credential = self.credentials[0]
+        autosave.autosave_answers(credential.pk, {1: 'a', 2: 'b'})
+        autosave._take([credential.pk])
+        autosave.autosave_answers(credential.pk, {2: 'c'})
+
+        submission = autosave.submit_answers(credential, {3: True})
+
+        self.assertTrue(submission.submitted)
+        self.assertEqual(self.answers(credential),
+                         {'1': 'a', '2': 'c', '3': True})
+
+        autosave.autosave_answers(credential.pk, {1: 'late'})
+        self.assertEqual(autosave.flush_pending(), 0)
+        self.assertEqual(self.answers(credential)['1'], 'a')
+        with self.assertRaises(ValueError):
+            autosave.submit_answers(credential)
@@ -0,0 +1,181 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import models
+from institute.chunked_upload import expire_uploads, partial_file_path
+from institute.tests.test_question_paper import create_teacher,\
+    create_typed_test
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+PDF = b'%PDF-1.4\n' + b'0' * 100 + b'\n%%EOF\n'
+
+CREATE_URL = 'institute:create-chunked-upload'
+
+
+def upload_url(upload_id):
+    return reverse('institute:chunked-upload',
+                   kwargs={'upload_id': upload_id})
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ChunkedUploadTests(TestCase):
+    """Tests for resumable chunked uploads of subject files"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.admin = create_teacher()
+        self.institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+        self.subject = models.InstituteSubject.objects.create(
+            subject_class=class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        models.InstituteSubjectPermission.objects.create(
+            invitee=self.admin,
+            inviter=self.admin,
+            to=self.subject
+        )
+        license_ = models.InstituteSelectedCommonLicense.objects.create(
+            institute=self.institute,
+            type=models.InstituteLicensePlans.BASIC,
+            billing=models.Billing.MONTHLY,
+            price=1000,
+            no_of_admin=1,
+            no_of_staff=1,
+            no_of_faculty=1,
+            no_of_student=100,
+            video_call_max_attendees=10,
+            classroom_limit=5,
+            department_limit=5,
+            created_on=1
+        )
+        models.InstituteCommonLicenseOrderDetails.objects.create(
+            institute=self.institute,
+            selected_license=license_,
+            payment_gateway=models.PaymentGateway.RAZORPAY,
+            order_id='order_id',
+            paid=True,
+            active=True,
+            end_date=9999999999999
+        )
+        # 1 KB of storage
+        models.InstituteLicenseStat.objects.filter(
+            institute=self.institute
+        ).update(total_storage=0.000001,
+                 storage_license_end_date=9999999999999)
+        self.lecture = models.SubjectLecture.objects.create(name='lecture 1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create(self, size=len(PDF), **data):
+        return self.client.post(
+            reverse(CREATE_URL,
+                    kwargs={'subject_slug': self.subject.subject_slug}),
+            dict({
+                'purpose': models.ChunkedUploadPurpose.LECTURE_MATERIAL,
+                'file_name': 'notes.pdf',
+                'size': size,
+                'lecture_id': self.lecture.pk,
+                'name': 'notes',
+                'content_type': models.SubjectLectureMaterialsContentType.PDF,
+                'can_download': True
+            }, **data), format='json')
+
+    def send(self, upload_id, offset, chunk):
+        return self.client.generic(
+            'PATCH', upload_url(upload_id), chunk,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_storage_is_checked_before_upload(self):
+        """Test that declared size of uploads in progress is reserved"""
+        res = self.create(size=2000)
+        self.assertEqual(res.status_code, 400)
+
+        self.assertEqual(self.create(size=600).status_code, 201)
+        self.assertEqual(self.create(size=600).status_code, 400)
+        self.assertEqual(models.ChunkedUpload.objects.count(), 1)
+
+    def test_lecture_material_is_uploaded_in_chunks(self):
+        """Test that upload resumes from offset and creates material"""
+        res = self.create()
+        self.assertEqual(res.status_code, 201)
+        upload_id = res.data['upload_id']
+
+        res = self.send(upload_id, 0, PDF[:50])
+        self.assertEqual((res.status_code, res['Upload-Offset']), (200, '50'))
+
+        # Chunk at stale offset is rejected with offset to resume from
+        res = self.send(upload_id, 20, PDF[20:])
+        self.assertEqual((res.status_code, res.data['offset']), (409, 50))
+        self.assertEqual(self.client.head(upload_url(upload_id))[
+            'Upload-Offset'], '50')
+
+        res = self.send(upload_id, 50, PDF[50:])
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['name'], 'notes')
+
+        material = models.SubjectLecturePdfMaterial.objects.get(
+            pk=res.data['data']['id'])
+        self.assertTrue(material.can_download)
+        with material.file.open('rb') as f:
+            self.assertEqual(f.read(), PDF)
+        self.assertFalse(models.ChunkedUpload.objects.exists())
+        self.assertFalse(os.path.exists(partial_file_path(upload_id)))
+        self.assertGreater(models.InstituteStatistics.objects.get(
+            institute=self.institute).storage, 0)
+
+    def test_invalid_file_is_rejected_when_completed(self):
+        """Test that upload is removed if assembled file is invalid"""
+        upload_id = self.create(size=10).data['upload_id']
+
+        res = self.send(upload_id, 0, b'0' * 10)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(models.SubjectLectureMaterials.objects.exists())
+        self.assertFalse(models.ChunkedUpload.objects.exists())
+
+    def test_file_question_paper_is_uploaded(self):
+        """Test that completed upload is saved as question paper of set"""
+        test = create_typed_test(self.subject)
+        set_ = models.SubjectTestSets.objects.create(
+            test=test, set_name='set 1')
+        upload_id = self.create(
+            purpose=models.ChunkedUploadPurpose.FILE_QUESTION_PAPER,
+            test_slug=test.test_slug,
+            set_id=set_.pk
+        ).data['upload_id']
+
+        res = self.send(upload_id, 0, PDF)
+
+        self.assertEqual(res.status_code, 201)
+        self.assertTrue(models.SubjectFileTestQuestion.objects.filter(
+            pk=res.data['id'], set=set_).exists())
+
+    def test_expired_uploads_are_removed(self):
+        """Test that uploads not completed in time are removed"""
+        upload_id = self.create().data['upload_id']
+        self.send(upload_id, 0, PDF[:10])
+        models.ChunkedUpload.objects.update(created_on=1)
+
+        self.assertEqual(expire_uploads(), 1)
+        self.assertFalse(os.path.exists(partial_file_path(upload_id)))
@@ -0,0 +1,124 @@
+import json
+from decimal import Decimal
+
+from django.test import TestCase
+
+from core import models
+from institute.concept_mastery import get_class_concept_mastery,\
+    get_concept_matrix
+from institute.grading import grade_test
+from institute.submissions import save_answers
+from institute.tests.test_question_paper import add_section,\
+    create_teacher, create_typed_test
+from institute.tests.test_warmup import create_student
+
+
+class ConceptMasteryTests(TestCase):
+    """Tests for concept label mastery maintained while grading"""
+
+    def setUp(self):
+        admin = create_teacher()
+        institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        self.class_ = models.InstituteClass.objects.create(
+            class_institute=institute,
+            name='class 1'
+        )
+        subject = models.InstituteSubject.objects.create(
+            subject_class=self.class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        self.test = create_typed_test(subject)
+        set_ = models.SubjectTestSets.objects.create(
+            test=self.test, set_name='set 1', mark_as_final=True)
+        add_section(self.test, set_)
+        self.credentials = [models.StudentTestCredential.objects.create(
+            test=self.test,
+            set=set_,
+            student=models.InstituteStudents.objects.create(
+                invitee=create_student(
+                    'student{}@gmail.com'.format(i), 'student{}'.format(i)),
+                inviter=admin,
+                institute=institute
+            )) for i in range(2)]
+
+        questions = {
+            q.type: q for q in models.SubjectTypedTestQuestion.objects.all()}
+        self.mcq = questions[models.QuestionType.MCQ]
+        self.true_false = questions['T']
+        self.numeric = questions['N']
+
+        self.algebra = models.SubjectTestConceptLabels.objects.create(
+            test=self.test, name='algebra')
+        self.geometry = models.SubjectTestConceptLabels.objects.create(
+            test=self.test, name='geometry')
+        models.SubjectTypedTestQuestion.objects.filter(
+            pk__in=[self.mcq.pk, self.true_false.pk]
+        ).update(concept_label=self.algebra)
+        models.SubjectTypedTestQuestion.objects.filter(
+            pk=self.numeric.pk).update(concept_label=self.geometry)
+
+        self.right = self.mcq.typed_test_mcq_question.get(
+            correct_answer=True).pk
+        self.wrong = self.mcq.typed_test_mcq_question.get(
+            correct_answer=False).pk
+
+    def answers(self, mcq):
+        return {self.mcq.pk: mcq, self.true_false.pk: True,
+                self.numeric.pk: 5}
+
+    def test_mastery_is_aggregated_while_grading(self):
+        """Test that student and class mastery are stored per label"""
+        save_answers(self.credentials[0], self.answers(self.right), True)
+        save_answers(self.credentials[1], self.answers(self.wrong), True)
+        grade_test(self.test.pk)
+
+        mastery = models.StudentConceptMastery.objects.get(
+            concept_label=self.algebra,
+            student=self.credentials[1].student)
+        self.assertEqual((mastery.scored, mastery.possible),
+                         (Decimal(1), Decimal(2)))
+
+        class_mastery = models.ClassConceptMastery.objects.get(
+            concept_label=self.algebra)
+        self.assertEqual(class_mastery.institute_class, self.class_)
+        self.assertEqual((class_mastery.scored, class_mastery.possible,
+                          class_mastery.students),
+                         (Decimal(3), Decimal(4), 2))
+
+        with self.assertNumQueries(1):
+            matrix = get_concept_matrix(self.test.pk)
+        self.assertEqual(
+            {label['name']: label['mastery'] for label in matrix['labels']},
+            {'algebra': 0.75, 'geometry': 1.0})
+        self.assertEqual(
+            [s['labels'][self.algebra.pk] for s in matrix['students']],
+            [1.0, 0.5])
+
+        with self.assertNumQueries(0):
+            get_concept_matrix(self.test.pk)
+
+    def test_regrading_applies_difference(self):
+        """Test that regraded submission replaces its previous mastery"""
+        save_answers(self.credentials[0], self.answers(self.right), True)
+        save_answers(self.credentials[1], self.answers(self.wrong), True)
+        grade_test(self.test.pk)
+        get_concept_matrix(self.test.pk)
+
+        models.StudentTestSubmission.objects.filter(
+            credential=self.credentials[1]
+        ).update(answers=json.dumps(self.answers(self.right)))
+        grade_test(self.test.pk, regrade=True)
+
+        with self.assertNumQueries(1):
+            mastery = get_class_concept_mastery(self.class_.pk)
+        self.assertEqual(
+            [(m['name'], m['students'], m['mastery']) for m in mastery],
+            [('algebra', 2, 1.0), ('geometry', 2, 1.0)])
+        self.assertEqual(get_concept_matrix(self.test.pk)['labels'][0][
+            'mastery'], 1.0)
@@ -0,0 +1,238 @@
+import json
+from unittest import mock
+
+import fakeredis
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+
+from core import models
+from core.authentication import get_or_create_token_key
+from institute.credentials import issue_test_credentials
+from institute.exam_session import RESULT_PUBLISHED, TEST_LIVE,\
+    test_group_name
+from institute.routing import websocket_urlpatterns
+from institute.tests.test_question_paper import create_teacher,\
+    create_typed_test
+from institute.tests.test_warmup import create_student
+
+application = URLRouter(websocket_urlpatterns)
+
+
+@override_settings(CHANNEL_LAYERS={
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ExamSessionConsumerTests(TransactionTestCase):
+    """Tests for real time exam session of student"""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        for module in ('autosave', 'login_stats'):
+            patcher = mock.patch(
+                'institute.{}.get_redis_connection'.format(module),
+                return_value=self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        admin = create_teacher()
+        institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        class_ = models.InstituteClass.objects.create(
+            class_institute=institute,
+            name='class 1'
+        )
+        subject = models.InstituteSubject.objects.create(
+            subject_class=class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        self.user = create_student('student@gmail.com', 'student')
+        student = models.InstituteStudents.objects.create(
+            invitee=self.user,
+            inviter=admin,
+            institute=institute,
+            active=True
+        )
+        models.InstituteClassStudents.objects.create(
+            institute_class=class_,
+            institute_student=student,
+            inviter=admin,
+            active=True
+        )
+        self.test = create_typed_test(subject)
+        models.SubjectTestSets.objects.create(
+            test=self.test, set_name='set 1', mark_as_final=True)
+        self.password = issue_test_credentials(self.test)[0]['password']
+        self.token = get_or_create_token_key(self.user)
+
+    def communicator(self, token=None):
+        return WebsocketCommunicator(
+            application, 'ws/test/{}/?token={}'.format(
+                self.test.test_slug, token or self.token))
+
+    def test_student_without_valid_token_is_rejected(self):
+        """Test that connection without valid token is closed"""
+        @async_to_sync
+        async def run():
+            connected, code = await self.communicator('invalid').connect()
+            return connected, code
+
+        self.assertEqual(run(), (False, 4001))
+
+    def test_student_logs_in_and_reports_warning(self):
+        """Test login, remaining time and proctoring warning"""
+        @async_to_sync
+        async def run():
+            communicator = self.communicator()
+            connected, _code = await communicator.connect()
+            self.assertTrue(connected)
+
+            await communicator.send_json_to(
+                {'type': 'login', 'password': self.password})
+            session = await communicator.receive_json_from()
+            time = await communicator.receive_json_from()
+            await communicator.send_json_to({'type': 'warning'})
+            warning = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return session, time, warning
+
+        session, time, warning = run()
+
+        self.assertEqual(session['type'], 'session')
+        self.assertEqual(time, {
+            'type': 'time', 'test_live': False, 'remaining': 60 * 60 * 1000})
+        self.assertEqual(warning['no_of_warning'], 1)
+        credential = models.StudentTestCredential.objects.get()
+        self.assertEqual(credential.no_of_warning, 1)
+        self.assertFalse(credential.logged_in)
+
+    def test_wrong_password_is_rejected(self):
+        """Test that login with wrong password closes connection"""
+        @async_to_sync
+        async def run():
+            communicator = self.communicator()
+            await communicator.connect()
+            await communicator.send_json_to(
+                {'type': 'login', 'password': 'WRONG'})
+            return await communicator.receive_output()
+
+        self.assertEqual(run(), {'type': 'websocket.close', 'code': 4001})
+
+    def test_test_events_are_broadcast(self):
+        """Test that test live and result events reach logged in students"""
+        @async_to_sync
+        async def run():
+            communicator = self.communicator()
+            await communicator.connect()
+            await communicator.send_json_to(
+                {'type': 'login', 'password': self.password})
+            await communicator.receive_json_from()
+            await communicator.receive_json_from()
+
+            await database_sync_to_async(
+                models.SubjectTest.objects.filter(pk=self.test.pk).update)(
+                    test_live=True)
+            layer = get_channel_layer()
+            for event in (TEST_LIVE, RESULT_PUBLISHED):
+                await layer.group_send(test_group_name(self.test.pk),
+                                       {'type': event})
+
+            messages = [await communicator.receive_json_from()
+                        for _i in range(3)]
+            await communicator.disconnect()
+            return messages
+
+        live, time, result = run()
+
+        self.assertEqual(live, {'type': 'test_live'})
+        self.assertTrue(time['test_live'])
+        self.assertEqual(time['remaining'], 60 * 60 * 1000)
+        self.assertEqual(result, {'type': 'result_published'})
+
+    async def logged_in_communicator(self):
+        communicator = self.communicator()
+        await communicator.connect()
+        await communicator.send_json_to(
+            {'type': 'login', 'password': self.password})
+        await communicator.receive_json_from()
+        await communicator.receive_json_from()
+        return communicator
+
+    def test_answers_are_not_taken_before_test_is_live(self):
+        """Test that answers sent before test is live are rejected"""
+        @async_to_sync
+        async def run():
+            communicator = await self.logged_in_communicator()
+            await communicator.send_json_to(
+                {'type': 'answer', 'answers': {'1': 'a'}})
+            error = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return error
+
+        self.assertEqual(run(), {'type': 'error',
+                                 'error': 'Test is not live.'})
+        self.assertFalse(self.redis.keys('autosave:*'))
+
+    def test_test_is_submitted_when_time_is_up(self):
+        """Test that late answers are dropped and test is submitted"""
+        models.SubjectTest.objects.filter(pk=self.test.pk).update(
+            test_live=True)
+
+        @async_to_sync
+        async def run():
+            communicator = await self.logged_in_communicator()
+            await communicator.send_json_to(
+                {'type': 'answer', 'answers': {'1': 'a'}})
+            await communicator.receive_json_from()
+
+            with mock.patch('institute.consumers.remaining_time',
+                            return_value=(True, 0)):
+                await communicator.send_json_to(
+                    {'type': 'answer', 'answers': {'1': 'late'}})
+                submitted = await communicator.receive_json_from()
+                await communicator.send_json_to(
+                    {'type': 'submit', 'answers': {'2': 'late'}})
+                error = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return submitted, error
+
+        submitted, error = run()
+
+        self.assertEqual(submitted, {'type': 'submitted', 'time_up': True})
+        self.assertEqual(error, {'type': 'error', 'error': 'Time is up.'})
+        submission = models.StudentTestSubmission.objects.get()
+        self.assertTrue(submission.submitted)
+        self.assertEqual(json.loads(submission.answers), {'1': 'a'})
+
+    def test_answers_are_autosaved_and_submitted(self):
+        """Test that autosaved answers are acknowledged and submitted"""
+        models.SubjectTest.objects.filter(pk=self.test.pk).update(
+            test_live=True)
+
+        @async_to_sync
+        async def run():
+            communicator = await self.logged_in_communicator()
+
+            await communicator.send_json_to(
+                {'type': 'answer', 'answers': {'1': 'a'}})
+            saved = await communicator.receive_json_from()
+            await communicator.send_json_to(
+                {'type': 'submit', 'answers': {'2': 'b'}})
+            submitted = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return saved, submitted
+
+        saved, submitted = run()
+
+        self.assertEqual(saved, {'type': 'saved', 'questions': ['1']})
+        self.assertEqual(submitted, {'type': 'submitted'})
+        submission = models.StudentTestSubmission.objects.get()
+        self.assertTrue(submission.submitted)
+        self.assertEqual(json.loads(submission.answers),
+                         {'1': 'a', '2': 'b'})
@@ -0,0 +1,151 @@
+import json
+from decimal import Decimal
+
+from django.test import TestCase
+
+from core import models
+from institute.grading import AnswerKey, grade_test, make_normalizer
+from institute.submissions import save_answers
+from institute.tests.test_question_paper import add_section,\
+    create_teacher, create_typed_test
+from institute.tests.test_warmup import create_student
+
+
+class FillInTheBlankNormalizerTests(TestCase):
+    """Tests for normalizing fill in the blank answers"""
+
+    def test_strict_checking_compares_exact_text(self):
+        """Test that strict normalizer only strips whitespace"""
+        normalize = make_normalizer(True, False, False)
+
+        self.assertEqual(normalize(' The Cell. '), 'The Cell.')
+
+    def test_grammar_and_special_characters_are_ignored(self):
+        """Test that articles, case and punctuation are ignored"""
+        normalize = make_normalizer(False, True, True)
+
+        self.assertEqual(normalize('The  Mito-chondria!'),
+                         normalize('mito chondria'))
+        self.assertNotEqual(make_normalizer(False, False, False)('The cell'),
+                            normalize('the cell'))
+
+
+class GradingTests(TestCase):
+    """Tests for batch auto grading of typed test submissions"""
+
+    def setUp(self):
+        admin = create_teacher()
+        institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        class_ = models.InstituteClass.objects.create(
+            class_institute=institute,
+            name='class 1'
+        )
+        subject = models.InstituteSubject.objects.create(
+            subject_class=class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        self.test = create_typed_test(subject)
+        self.set_ = models.SubjectTestSets.objects.create(
+            test=self.test, set_name='set 1', mark_as_final=True)
+        add_section(self.test, self.set_)
+        self.credentials = [models.StudentTestCredential.objects.create(
+            test=self.test,
+            set=self.set_,
+            student=models.InstituteStudents.objects.create(
+                invitee=create_student(
+                    'student{}@gmail.com'.format(i), 'student{}'.format(i)),
+                inviter=admin,
+                institute=institute
+            )) for i in range(3)]
+
+        self.questions = {
+            q.type: q for q in models.SubjectTypedTestQuestion.objects.all()}
+        self.correct = {
+            self.mcq.pk: self.mcq.typed_test_mcq_question.get(
+                correct_answer=True).pk,
+            self.question('C').pk: [
+                o.pk for o in self.question('C')
+                .typed_test_select_multiple_question.all()],
+            self.question('T').pk: True,
+            self.question('A').pk: False,
+            self.question('N').pk: 5.0000001,
+            self.question('F').pk: ' The Answer!'
+        }
+
+    def question(self, type_):
+        return self.questions[type_]
+
+    @property
+    def mcq(self):
+        return self.question(models.QuestionType.MCQ)
+
+    def test_answer_key_is_loaded_with_fixed_queries(self):
+        """Test that answer key of set takes three queries"""
+        with self.assertNumQueries(3):
+            key = AnswerKey.load(self.set_.pk)
+
+        self.assertEqual(len(key.question_ids), 7)
+        self.assertEqual(key.manual, [self.question('S').pk])
+
+    def test_submissions_are_graded(self):
+        """Test that every auto graded type is scored"""
+        wrong = dict(self.correct)
+        wrong[self.mcq.pk] = self.mcq.typed_test_mcq_question.get(
+            correct_answer=False).pk
+        wrong[self.question('N').pk] = 5.1
+        wrong[self.question('T').pk] = 'true'
+
+        answers = dict(self.correct)
+        answers[self.question('S').pk] = 'text'
+        save_answers(self.credentials[0], answers, submit=True)
+        save_answers(self.credentials[1], wrong, submit=True)
+        save_answers(self.credentials[2], self.correct)
+
+        self.assertEqual(grade_test(self.test.pk), 2)
+
+        submission = models.StudentTestSubmission.objects.get(
+            credential=self.credentials[0])
+        self.assertEqual(submission.marks, Decimal('6'))
+        self.assertTrue(submission.needs_manual_checking)
+        submission = models.StudentTestSubmission.objects.get(
+            credential=self.credentials[1])
+        self.assertEqual(submission.marks, Decimal('3'))
+        self.assertFalse(submission.needs_manual_checking)
+        self.assertEqual(
+            json.loads(submission.question_marks)[str(self.mcq.pk)], 0)
+        self.assertFalse(models.StudentTestSubmission.objects.get(
+            credential=self.credentials[2]).graded)
+        self.assertEqual(grade_test(self.test.pk), 0)
+
+    def test_out_of_range_answers_are_wrong(self):
+        """Test that huge option ids and numbers do not stop grading"""
+        answers = dict(self.correct)
+        answers[self.mcq.pk] = 2 ** 64
+        answers[self.question('N').pk] = 10 ** 400
+        save_answers(self.credentials[0], answers, submit=True)
+        save_answers(self.credentials[1], self.correct, submit=True)
+
+        self.assertEqual(grade_test(self.test.pk), 2)
+
+        self.assertEqual(models.StudentTestSubmission.objects.get(
+            credential=self.credentials[0]).marks, Decimal('4'))
+        self.assertEqual(models.StudentTestSubmission.objects.get(
+            credential=self.credentials[1]).marks, Decimal('6'))
+
+    def test_submitted_answers_can_not_be_changed(self):
+        """Test that answers are merged until test is submitted"""
+        save_answers(self.credentials[0], {self.mcq.pk: 1})
+        save_answers(self.credentials[0], {self.question('T').pk: True})
+        submission = save_answers(
+            self.credentials[0], {self.mcq.pk: None}, submit=True)
+
+        self.assertEqual(json.loads(submission.answers),
+                         {str(self.question('T').pk): True})
+        with self.assertRaises(ValueError):
+            save_answers(self.credentials[0], {self.mcq.pk: 1})
@@ -0,0 +1,102 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from core import models
+from institute.views import get_active_common_license,\
+    get_active_or_expired_common_license
+
+
+def create_teacher(email='abc@gmail.com', username='tempusername'):
+    """Creates and return teacher"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_teacher=True
+    )
+
+
+def create_institute(user, institute_name='tempinstitute'):
+    """Creates institute and return institute"""
+    return models.Institute.objects.create(
+        name=institute_name,
+        user=user,
+        institute_category=models.InstituteCategory.EDUCATION,
+        type=models.InstituteType.COLLEGE
+    )
+
+
+def create_order(institute, end_date, active=True):
+    """Creates paid license order of institute"""
+    selected_license = models.InstituteSelectedCommonLicense.objects.create(
+        institute=institute,
+        type=models.InstituteLicensePlans.BASIC,
+        billing=models.Billing.MONTHLY,
+        price=1000,
+        no_of_admin=1,
+        no_of_staff=1,
+        no_of_faculty=1,
+        no_of_student=100,
+        video_call_max_attendees=10,
+        classroom_limit=5,
+        department_limit=5,
+        created_on=int(time.time()) * 1000
+    )
+    return models.InstituteCommonLicenseOrderDetails.objects.create(
+        institute=institute,
+        selected_license=selected_license,
+        payment_gateway=models.PaymentGateway.RAZORPAY,
+        order_id='order_id',
+        paid=True,
+        active=active,
+        end_date=end_date
+    )
+
+
+class InstituteLicenseCacheTests(TestCase):
+    """Tests for cached license snapshot of institute"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_teacher()
+        self.institute = create_institute(self.user)
+
+    def test_active_license_is_cached(self):
+        """Test that only the first license check hits database"""
+        order = create_order(
+            self.institute, int(time.time()) * 1000 + 86400 * 1000)
+
+        with self.assertNumQueries(2):
+            get_active_common_license(self.institute)
+
+        with self.assertNumQueries(0):
+            active = get_active_common_license(self.institute)
+            latest = get_active_or_expired_common_license(self.institute)
+            self.assertEqual(active.selected_license.classroom_limit, 5)
+
+        self.assertEqual(active.pk, order.pk)
+        self.assertEqual(latest.pk, order.pk)
+
+    def test_saving_order_invalidates_snapshot(self):
+        """Test that deactivated license is not returned from cache"""
+        order = create_order(
+            self.institute, int(time.time()) * 1000 + 86400 * 1000)
+        self.assertIsNotNone(get_active_common_license(self.institute))
+
+        order.active = False
+        order.save()
+
+        self.assertIsNone(get_active_common_license(self.institute))
+        self.assertEqual(
+            get_active_or_expired_common_license(self.institute).pk, order.pk)
+
+    def test_expired_license_is_not_active(self):
+        """Test that license past end date is not returned"""
+        create_order(self.institute, int(time.time()) * 1000 - 1000)
+
+        self.assertIsNone(get_active_common_license(self.institute))
+        self.assertIsNotNone(
+            get_active_or_expired_common_license(self.institute))
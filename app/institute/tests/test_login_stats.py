@@ -0,0 +1,79 @@
+from unittest import mock
+
+import fakeredis
+from django.test import TestCase
+
+from core import models
+from institute import login_stats
+from institute.tests.test_question_paper import create_teacher,\
+    create_typed_test
+
+
+class LoginStatsTests(TestCase):
+    """Tests for batched login stats ingestion and rollups"""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        patcher = mock.patch('institute.login_stats.get_redis_connection',
+                             return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=create_teacher(),
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        class_ = models.InstituteClass.objects.create(
+            class_institute=institute,
+            name='class 1'
+        )
+        subject = models.InstituteSubject.objects.create(
+            subject_class=class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        self.test = create_typed_test(subject)
+
+    def test_logins_are_ingested_into_rollups(self):
+        """Test that buffered logins are inserted and rolled up"""
+        login_stats.record_login(self.test.pk, 1, '4.5 Mbps', 'WB')
+        login_stats.record_login(self.test.pk, 1, '30 Mbps', 'WB')
+        login_stats.record_login(self.test.pk, 2, None, 'XX')
+
+        self.assertFalse(models.StudentTestLoginStats.objects.exists())
+        self.assertEqual(login_stats.ingest_pending(), 3)
+
+        self.assertEqual(models.StudentTestLoginStats.objects.filter(
+            test=self.test).count(), 3)
+        rollups = login_stats.get_login_rollups(self.test.pk)
+        self.assertEqual(rollups['logins'], 3)
+        self.assertEqual(rollups['state'], {'WB': 2, 'unknown': 1})
+        self.assertEqual(rollups['country'], {'IN': 3})
+        self.assertEqual(rollups['attempt'], {'1': 2, '2': 1})
+        self.assertEqual(rollups['net_speed'],
+                         {'<=5': 1, '<=50': 1, 'unknown': 1})
+        self.assertEqual(rollups['median_net_speed'], '<=5')
+
+        login_stats.record_login(self.test.pk, 3, '60', 'WB')
+        login_stats.ingest_pending()
+
+        rollups = login_stats.get_login_rollups(self.test.pk)
+        self.assertEqual(rollups['logins'], 4)
+        self.assertEqual(rollups['state']['WB'], 3)
+        self.assertEqual(rollups['median_net_speed'], '<=50')
+
+    def test_crashed_ingestion_is_recovered(self):
+        """Test that events left by crashed ingestion are ingested"""
+        login_stats.record_login(self.test.pk, 1, '1', 'WB')
+        # Ingestion crashes after taking the buffer
+        self.redis.rename(login_stats.BUFFER_KEY, login_stats.INGESTING_KEY)
+        login_stats.record_login(self.test.pk, 2, '1', 'WB')
+
+        with mock.patch('institute.login_stats.LOGIN_STATS_INGEST_BATCH', 1):
+            self.assertEqual(login_stats.ingest_pending(), 2)
+
+        self.assertEqual(
+            login_stats.get_login_rollups(self.test.pk)['attempt'], {'1': 2})
+        self.assertEqual(self.redis.keys('login-stats:*'), [])
@@ -0,0 +1,166 @@
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import models
+from institute.media_store import store_blob
+from institute.tests.test_question_paper import create_teacher
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+PDF = b'%PDF-1.4\n' + b'0' * 100 + b'\n%%EOF\n'
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + b'0' * 100
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+@mock.patch.object(models.settings, 'MEDIA_ROOT', MEDIA_ROOT)
+class MediaStoreTests(TestCase):
+    """Tests for content addressed storage of lecture files"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.teacher = create_teacher()
+        self.institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.teacher,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        self.lecture = models.SubjectLecture.objects.create(name='lecture 1')
+
+    def storage(self):
+        return models.InstituteStatistics.objects.get(
+            institute=self.institute).storage
+
+    def add_image(self, lecture):
+        blob, _created = store_blob(self.institute.pk,
+                                    SimpleUploadedFile('image.png', IMAGE))
+        material = models.SubjectLectureMaterials.objects.create(
+            lecture=lecture,
+            name='image',
+            content_type=models.SubjectLectureMaterialsContentType.IMAGE)
+        return models.SubjectLectureImageMaterial.objects.create(
+            lecture_material=material, file=blob.file.name, blob=blob)
+
+    def add_pdf(self, content=PDF, institute=None):
+        blob, _created = store_blob((institute or self.institute).pk,
+                                    SimpleUploadedFile('notes.pdf', content))
+        material = models.SubjectLectureMaterials.objects.create(
+            lecture=self.lecture,
+            name='notes',
+            content_type=models.SubjectLectureMaterialsContentType.PDF)
+        return models.SubjectLecturePdfMaterial.objects.create(
+            lecture_material=material, file=blob.file.name, blob=blob)
+
+    def test_same_content_is_stored_once(self):
+        """Test that duplicate uploads reference one blob"""
+        first = self.add_pdf()
+        storage = self.storage()
+        second = self.add_pdf()
+
+        blob = models.MediaBlob.objects.get()
+        self.assertEqual((blob.refcount, blob.size), (2, len(PDF)))
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertIn(blob.sha256, blob.file.name)
+        self.assertEqual(self.storage(), storage)
+        self.assertGreater(storage, 0)
+        with second.file.open('rb') as f:
+            self.assertEqual(f.read(), PDF)
+        self.assertEqual(os.listdir(os.path.join(
+            MEDIA_ROOT, 'institute/uploads/blobs/staging')), [])
+
+    def test_blobs_are_not_shared_between_institutes(self):
+        """Test that same content is stored per institute"""
+        other = models.Institute.objects.create(
+            name='otherinstitute',
+            user=create_teacher('other@gmail.com', 'other'),
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        self.add_pdf()
+        self.add_pdf(institute=other)
+
+        self.assertEqual(models.MediaBlob.objects.filter(
+            refcount=1).count(), 2)
+
+    def test_blob_is_deleted_with_last_material(self):
+        """Test that deleting material decrements refcount of blob"""
+        first = self.add_pdf()
+        second = self.add_pdf()
+        self.add_pdf(b'%PDF-1.4\n%%EOF\n')
+        path = first.file.path
+
+        first.lecture_material.delete()
+        self.assertEqual(models.MediaBlob.objects.get(
+            pk=second.blob_id).refcount, 1)
+        self.assertTrue(os.path.isfile(path))
+
+        second.lecture_material.delete()
+        self.assertFalse(models.MediaBlob.objects.filter(
+            pk=second.blob_id).exists())
+        self.assertFalse(os.path.isfile(path))
+        self.assertAlmostEqual(float(self.storage()), 15 / 1000000000)
+
+    def test_delete_lecture_and_module_with_shared_image(self):
+        """Test that institute storage is freed with last shared image"""
+        subject = models.InstituteSubject.objects.create(
+            subject_class=models.InstituteClass.objects.create(
+                class_institute=self.institute, name='class 1'),
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        models.InstituteSubjectPermission.objects.create(
+            invitee=self.teacher, to=subject)
+        module_lecture = models.SubjectLecture.objects.create(
+            name='lecture 2')
+        view = models.SubjectViewNames.objects.get(
+            view_subject=subject, key='M1')
+        models.SubjectModuleView.objects.create(
+            view=view,
+            type=models.SubjectModuleViewType.LECTURE_VIEW,
+            lecture=module_lecture)
+        image = self.add_image(self.lecture)
+        self.add_image(module_lecture)
+        models.InstituteSubjectStatistics.objects.filter(
+            statistics_subject=subject
+        ).update(storage=Decimal(2 * len(IMAGE) / 1000000000))
+        storage = self.storage()
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+
+        res = client.delete(reverse(
+            'institute:delete-subject-lecture',
+            kwargs={'subject_slug': subject.subject_slug,
+                    'lecture_id': self.lecture.pk}))
+
+        self.assertEqual(res.status_code, 204)
+        self.assertEqual(models.MediaBlob.objects.get(
+            pk=image.blob_id).refcount, 1)
+        self.assertEqual(self.storage(), storage)
+
+        res = client.delete(reverse(
+            'institute:delete-subject-view',
+            kwargs={'institute_slug': self.institute.institute_slug,
+                    'subject_slug': subject.subject_slug,
+                    'view_key': 'M1'}))
+
+        self.assertEqual(res.status_code, 204)
+        self.assertFalse(models.MediaBlob.objects.exists())
+        self.assertAlmostEqual(
+            float(self.storage()), float(storage) - len(IMAGE) / 1000000000)
+        self.assertAlmostEqual(float(
+            models.InstituteSubjectStatistics.objects.get(
+                statistics_subject=subject).storage), 0)
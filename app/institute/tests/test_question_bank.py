@@ -0,0 +1,185 @@
+import json
+
+from django.test import TestCase
+
+from core import models
+from institute.question_bank import bank_records, export_bank_lines,\
+    import_bank, parse_bank, validate_bank
+from institute.tests.test_question_paper import create_teacher,\
+    create_typed_test
+
+
+def bank(count=1):
+    """Returns question records with every question type"""
+    records = list()
+    for i in range(count):
+        section = 'section {}'.format(i)
+        records.extend([{
+            'section': section,
+            'section_view': 'M',
+            'type': 'M',
+            'question': 'mcq {}'.format(i),
+            'marks': '2',
+            'concept_label': 'algebra',
+            'options': ['a', 'b', 'c'],
+            'correct_answer': 'b'
+        }, {
+            'section': section,
+            'type': 'C',
+            'question': 'select',
+            'marks': 1,
+            'options': ['a', 'b', 'c'],
+            'correct_answer': ['a', 'c']
+        }, {
+            'section': section,
+            'type': 'T',
+            'question': 'true false',
+            'marks': 1,
+            'correct_answer': 'false'
+        }, {
+            'section': section,
+            'type': 'N',
+            'question': 'numeric',
+            'marks': 1.5,
+            'correct_answer': '2.25'
+        }, {
+            'section': section,
+            'type': 'F',
+            'question': 'blank',
+            'marks': 1,
+            'correct_answer': 'cell',
+            'enable_strict_checking': True
+        }, {
+            'section': section,
+            'type': 'S',
+            'question': 'short',
+            'marks': 3,
+            'concept_label': 'geometry'
+        }])
+    return records
+
+
+class QuestionBankTests(TestCase):
+    """Tests for bulk question bank import and export"""
+
+    def setUp(self):
+        institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=create_teacher(),
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        class_ = models.InstituteClass.objects.create(
+            class_institute=institute,
+            name='class 1'
+        )
+        subject = models.InstituteSubject.objects.create(
+            subject_class=class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        self.test = create_typed_test(subject)
+        models.SubjectTest.objects.filter(pk=self.test.pk).update(
+            question_category=models.QuestionCategory.ALL_TYPES)
+        self.set1 = models.SubjectTestSets.objects.create(
+            test=self.test, set_name='set 1')
+        self.set2 = models.SubjectTestSets.objects.create(
+            test=self.test, set_name='set 2')
+
+    def import_(self, set_, records):
+        sections, errors = validate_bank(
+            records, models.QuestionCategory.ALL_TYPES)
+        self.assertEqual(errors, [])
+        return import_bank(self.test.pk, set_.pk, sections)
+
+    def test_questions_are_imported(self):
+        """Test that sections, questions and answers are added in order"""
+        self.assertEqual(self.import_(self.set1, bank(2)),
+                         {'sections': 2, 'questions': 12})
+
+        sections = list(models.SubjectTestQuestionSection.objects.filter(
+            set=self.set1).order_by('order'))
+        self.assertEqual([s.name for s in sections],
+                         ['section 0', 'section 1'])
+        questions = list(models.SubjectTypedTestQuestion.objects.filter(
+            test_section=sections[0]).order_by('order'))
+        self.assertEqual([q.type for q in questions],
+                         ['M', 'C', 'T', 'N', 'F', 'S'])
+
+        mcq = questions[0]
+        self.assertEqual(mcq.concept_label.name, 'algebra')
+        self.assertEqual(
+            mcq.typed_test_mcq_question.get(correct_answer=True).option, 'b')
+        self.assertEqual(sorted(
+            questions[1].typed_test_select_multiple_question.filter(
+                correct_answer=True).values_list('option', flat=True)),
+            ['a', 'c'])
+        self.assertFalse(
+            questions[2].typed_test_true_false_question.correct_answer)
+        blank = questions[4].typed_test_fill_in_the_blank_answer
+        self.assertFalse(blank.ignore_grammar)
+        self.assertEqual(models.SubjectTestConceptLabels.objects.filter(
+            test=self.test).count(), 2)
+
+        # Sections and questions added one by one still come after
+        section = models.SubjectTestQuestionSection.objects.create(
+            test=self.test,
+            set=self.set1,
+            section_mandatory=True,
+            view=models.TestQuestionViewType.MULTIPLE_QUESTION,
+            answer_all_questions=True)
+        self.assertGreater(section.order, sections[-1].order)
+
+    def test_import_takes_fixed_number_of_queries(self):
+        """Test that import queries do not grow with questions"""
+        # Concept labels are created by first import
+        self.import_(self.set1, bank(1))
+
+        for count in (1, 20):
+            sections, _errors = validate_bank(
+                bank(count), models.QuestionCategory.ALL_TYPES)
+            with self.assertNumQueries(16):
+                import_bank(self.test.pk, self.set2.pk, sections)
+
+    def test_invalid_questions_are_reported(self):
+        """Test that rows with invalid questions are reported"""
+        records = bank(1)
+        records[0]['correct_answer'] = 'd'
+        records[3]['correct_answer'] = 'two'
+        records[5]['marks'] = 0
+
+        _sections, errors = validate_bank(
+            records, models.QuestionCategory.ALL_TYPES)
+
+        self.assertEqual([e['row'] for e in errors], [1, 4, 6])
+        _sections, errors = validate_bank(
+            bank(1), models.QuestionCategory.AUTOCHECK_TYPE)
+        self.assertEqual([e['row'] for e in errors], [5, 6])
+
+        sections, _errors = validate_bank(
+            bank(1), models.QuestionCategory.ALL_TYPES)
+        self.set1.mark_as_final = True
+        self.set1.save()
+        with self.assertRaises(ValueError):
+            import_bank(self.test.pk, self.set1.pk, sections)
+
+    def test_exported_bank_is_imported_again(self):
+        """Test that csv and ndjson exports round trip"""
+        self.import_(self.set1, bank(2))
+        exported = list(bank_records(self.test.pk))
+
+        for file_type in ('csv', 'ndjson'):
+            content = ''.join(export_bank_lines(self.test.pk, file_type))
+            records = [r for r in parse_bank(content, file_type)
+                       if r['set_name'] == 'set 1']
+            set_ = models.SubjectTestSets.objects.create(
+                test=self.test, set_name=file_type)
+            self.import_(set_, records)
+
+            imported = [dict(r, set_name='set 1')
+                        for r in bank_records(self.test.pk)
+                        if r['set_name'] == file_type]
+            self.assertEqual(imported, exported)
+
+        self.assertEqual(json.loads(next(iter(export_bank_lines(
+            self.test.pk, 'ndjson'))))['options'], ['a', 'b', 'c'])
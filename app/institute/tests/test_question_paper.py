@@ -0,0 +1,310 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import models
+from institute.question_paper import STUDENT_PAPER, TEACHER_PAPER,\
+    assemble_question_paper, compile_paper_snapshot, get_paper_snapshot,\
+    invalidate_paper_snapshot
+
+
+def create_teacher(email='abc@gmail.com', username='tempusername'):
+    """Creates and return teacher"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_teacher=True
+    )
+
+
+def create_typed_test(subject):
+    """Creates and return typed unscheduled test of subject"""
+    return models.SubjectTest.objects.create(
+        subject=subject,
+        test_place=models.TestPlace.GLOBAL,
+        name='test',
+        type=models.GradedType.UNGRADED,
+        total_marks=100,
+        total_duration=60,
+        test_schedule_type=models.TestScheduleType.UNSCHEDULED,
+        question_mode=models.QuestionMode.TYPED,
+        answer_mode=models.AnswerMode.TYPED,
+        question_category=models.QuestionCategory.AUTOCHECK_TYPE,
+        publish_result_automatically=True,
+        enable_peer_check=False,
+        allow_question_preview_10_min_before=False,
+        shuffle_questions=False
+    )
+
+
+def add_section(test, set_):
+    """Adds section with one question of every auto checked type"""
+    section = models.SubjectTestQuestionSection.objects.create(
+        test=test,
+        set=set_,
+        section_mandatory=True,
+        view=models.TestQuestionViewType.MULTIPLE_QUESTION,
+        answer_all_questions=True
+    )
+
+    def question(type_):
+        return models.SubjectTypedTestQuestion.objects.create(
+            test_section=section, type=type_, question='question', marks=1)
+
+    q = question(models.QuestionType.MCQ)
+    models.SubjectTestMcqOptions.objects.create(
+        question=q, option='a', correct_answer=True)
+    models.SubjectTestMcqOptions.objects.create(
+        question=q, option='b', correct_answer=False)
+
+    q = question(models.QuestionType.SELECT_MULTIPLE_CHOICE)
+    models.SubjectTestSelectMultipleCorrectAnswer.objects.create(
+        question=q, option='a', correct_answer=True)
+
+    models.SubjectTestTrueFalseCorrectAnswer.objects.create(
+        question=question(models.QuestionType.TRUE_FALSE),
+        correct_answer=True)
+    models.SubjectTestAssertionCorrectAnswer.objects.create(
+        question=question(models.QuestionType.ASSERTION),
+        correct_answer=False)
+    models.SubjectTestNumericCorrectAnswer.objects.create(
+        question=question(models.QuestionType.NUMERIC_ANSWER),
+        correct_answer=5)
+    models.SubjectTestFillInTheBlankCorrectAnswer.objects.create(
+        question=question(models.QuestionType.FILL_IN_THE_BLANK),
+        correct_answer='answer',
+        manual_checking=False)
+    question(models.QuestionType.SHORT_ANSWER)
+    return section
+
+
+class QuestionPaperAssemblerTests(TestCase):
+    """Tests for assembling question paper of test set"""
+
+    def setUp(self):
+        self.admin = create_teacher()
+        institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        class_ = models.InstituteClass.objects.create(
+            class_institute=institute,
+            name='class 1'
+        )
+        subject = models.InstituteSubject.objects.create(
+            subject_class=class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        self.test = create_typed_test(subject)
+        self.set_ = models.SubjectTestSets.objects.create(
+            test=self.test, set_name='set 1')
+
+    def test_typed_paper_has_answers_of_every_type(self):
+        """Test that every question type gets its answers"""
+        add_section(self.test, self.set_)
+
+        paper = assemble_question_paper(self.test, self.set_.pk, '/media/')
+
+        questions = {q['type']: q for q in paper[0]['questions']}
+        self.assertEqual(
+            [o['option'] for o in questions[models.QuestionType.MCQ]
+             ['options']], ['a', 'b'])
+        self.assertEqual(len(questions[
+            models.QuestionType.SELECT_MULTIPLE_CHOICE]['options']), 1)
+        self.assertTrue(
+            questions[models.QuestionType.TRUE_FALSE]['correct_answer'])
+        self.assertFalse(
+            questions[models.QuestionType.ASSERTION]['correct_answer'])
+        self.assertEqual(
+            questions[models.QuestionType.NUMERIC_ANSWER]['correct_answer'],
+            5)
+        self.assertEqual(questions[models.QuestionType.FILL_IN_THE_BLANK]
+                         ['fill_in_the_blank_answer']['correct_answer'],
+                         'answer')
+        self.assertNotIn('correct_answer',
+                         questions[models.QuestionType.SHORT_ANSWER])
+
+    def test_query_count_does_not_grow_with_questions(self):
+        """Test that typed paper is loaded with a fixed number of queries"""
+        add_section(self.test, self.set_)
+
+        with self.assertNumQueries(4):
+            assemble_question_paper(self.test, self.set_.pk, '/media/')
+
+        for i in range(3):
+            add_section(self.test, self.set_)
+
+        with self.assertNumQueries(4):
+            paper = assemble_question_paper(
+                self.test, self.set_.pk, '/media/')
+
+        self.assertEqual(len(paper), 4)
+        self.assertEqual(sum(len(s['questions']) for s in paper), 28)
+
+
+class QuestionPaperSnapshotTests(TestCase):
+    """Tests for compiled snapshots of finalized question sets"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = create_teacher()
+        self.institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+        self.subject = models.InstituteSubject.objects.create(
+            subject_class=class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        models.InstituteSubjectPermission.objects.create(
+            invitee=self.admin,
+            inviter=self.admin,
+            to=self.subject
+        )
+        license_ = models.InstituteSelectedCommonLicense.objects.create(
+            institute=self.institute,
+            type=models.InstituteLicensePlans.BASIC,
+            billing=models.Billing.MONTHLY,
+            price=1000,
+            no_of_admin=1,
+            no_of_staff=1,
+            no_of_faculty=1,
+            no_of_student=100,
+            video_call_max_attendees=10,
+            classroom_limit=5,
+            department_limit=5,
+            created_on=1
+        )
+        models.InstituteCommonLicenseOrderDetails.objects.create(
+            institute=self.institute,
+            selected_license=license_,
+            payment_gateway=models.PaymentGateway.RAZORPAY,
+            order_id='order_id',
+            paid=True,
+            active=True,
+            end_date=9999999999999
+        )
+        self.test = create_typed_test(self.subject)
+        self.set_ = models.SubjectTestSets.objects.create(
+            test=self.test, set_name='set 1')
+        add_section(self.test, self.set_)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def url(self, name):
+        return reverse('institute:' + name, kwargs={
+            'institute_slug': self.institute.institute_slug,
+            'subject_slug': self.subject.subject_slug,
+            'test_slug': self.test.test_slug,
+            'set_id': self.set_.pk
+        })
+
+    def finalize(self):
+        self.set_.mark_as_final = True
+        self.set_.save()
+        return compile_paper_snapshot(self.test, self.set_.pk)
+
+    def test_student_paper_has_no_answers(self):
+        """Test that student variant is compiled without answers"""
+        self.finalize()
+
+        etag, body = get_paper_snapshot(
+            self.set_.pk, STUDENT_PAPER, '/media/')
+
+        self.assertNotIn('correct_answer', body)
+        self.assertNotIn('fill_in_the_blank_answer', body)
+        teacher_etag, teacher_body = get_paper_snapshot(
+            self.set_.pk, TEACHER_PAPER, '/media/')
+        self.assertIn('correct_answer', teacher_body)
+        self.assertNotEqual(etag, teacher_etag)
+
+    def test_snapshot_is_cached_until_set_is_unfinalized(self):
+        """Test that snapshot is served from cache and versioned"""
+        self.assertEqual(self.finalize().version, 1)
+        get_paper_snapshot(self.set_.pk, TEACHER_PAPER, '/media/')
+
+        with self.assertNumQueries(0):
+            get_paper_snapshot(self.set_.pk, TEACHER_PAPER, '/media/')
+
+        invalidate_paper_snapshot(self.set_.pk)
+        self.assertIsNone(
+            get_paper_snapshot(self.set_.pk, TEACHER_PAPER, '/media/'))
+        self.assertEqual(self.finalize().version, 2)
+
+    def test_finalized_set_is_served_with_etag(self):
+        """Test that final set is served from snapshot with strong etag"""
+        res = self.client.patch(self.url('mark-question-set-final'),
+                                {'mark_as_final': True}, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['version'], 1)
+
+        res = self.client.get(self.url('get-question-set-questions'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['ETag'].startswith('"1-'))
+        paper = json.loads(res.content)
+        self.assertEqual(len(paper[0]['questions']), 7)
+
+        res = self.client.get(self.url('get-question-set-questions'),
+                              HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, 304)
+
+        # Etags are compared exactly, not as substring of header
+        res = self.client.get(self.url('get-question-set-questions'),
+                              HTTP_IF_NONE_MATCH=res['ETag'][:-3] + '"')
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client.get(self.url('get-question-set-questions'),
+                              HTTP_IF_NONE_MATCH='"0-abc", ' + res['ETag'])
+        self.assertEqual(res.status_code, 304)
+
+    def test_final_set_can_not_be_edited(self):
+        """Test that answers and sections of final set are not changed"""
+        self.finalize()
+        question = models.SubjectTypedTestQuestion.objects.get(
+            test_section__set=self.set_, type=models.QuestionType.MCQ)
+        option = question.typed_test_mcq_question.get(correct_answer=True)
+
+        res = self.client.post(
+            reverse('institute:add-update-mcq-option', kwargs={
+                'subject_slug': self.subject.subject_slug,
+                'question_id': question.pk}),
+            {'option_id': option.pk, 'option': 'c', 'correct_answer': True},
+            format='json')
+        self.assertEqual(res.status_code, 400)
+
+        res = self.client.delete(
+            reverse('institute:delete-mcq-option', kwargs={
+                'subject_slug': self.subject.subject_slug,
+                'question_id': question.pk,
+                'option_id': option.pk}))
+        self.assertEqual(res.status_code, 400)
+        option.refresh_from_db()
+        self.assertEqual(option.option, 'a')
+
+        res = self.client.delete(
+            reverse('institute:delete-question-section', kwargs={
+                'institute_slug': self.institute.institute_slug,
+                'subject_slug': self.subject.subject_slug,
+                'test_slug': self.test.test_slug,
+                'question_section_id': question.test_section_id}))
+        self.assertEqual(res.status_code, 400)
+        self.assertTrue(models.SubjectTestQuestionSection.objects.filter(
+            pk=question.test_section_id).exists())
@@ -0,0 +1,118 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import models
+from institute.roster import institute_roster, subject_roster
+
+
+def create_teacher(email='abc@gmail.com', username='tempusername'):
+    """Creates and return teacher"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_teacher=True
+    )
+
+
+def create_student(email, username):
+    """Creates and return student"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_student=True
+    )
+
+
+class StudentRosterTests(TestCase):
+    """Tests for keyset paginated student roster"""
+
+    def setUp(self):
+        self.admin = create_teacher()
+        self.institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        self.class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+        self.subject = models.InstituteSubject.objects.create(
+            subject_class=self.class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        self.students = list()
+
+        for i in range(5):
+            student = models.InstituteStudents.objects.create(
+                invitee=create_student(
+                    'student%s@gmail.com' % i, 'student%s' % i),
+                inviter=self.admin,
+                institute=self.institute,
+                registration_no='reg%s' % (4 - i),
+                first_name='name%s' % i,
+                active=True
+            )
+            models.InstituteClassStudents.objects.create(
+                institute_class=self.class_,
+                institute_student=student,
+                inviter=self.admin,
+                active=True
+            )
+            self.students.append(student)
+
+    def test_pages_follow_registration_no(self):
+        """Test that cursor walks through all students in order"""
+        page = institute_roster(self.institute.pk, 'active').page(limit=2)
+        self.assertEqual(page['count'], 5)
+        reg_nos = [s['registration_no'] for s in page['data']]
+
+        while page['next']:
+            page = institute_roster(self.institute.pk, 'active').page(
+                cursor=page['next'], limit=2)
+            self.assertIsNone(page['count'])
+            reg_nos += [s['registration_no'] for s in page['data']]
+
+        self.assertEqual(reg_nos, ['reg0', 'reg1', 'reg2', 'reg3', 'reg4'])
+
+    def test_query_count_is_constant(self):
+        """Test that banned students and class names are loaded in bulk"""
+        for student in self.students:
+            student.is_banned = True
+            student.save()
+            models.InstituteBannedStudent.objects.create(
+                institute_student=student,
+                banned_by=self.admin,
+                banned_institute=self.institute,
+                start_date=1,
+                reason='reason'
+            )
+
+        with self.assertNumQueries(4):
+            page = institute_roster(self.institute.pk, 'banned').page()
+
+        self.assertEqual(len(page['data']), 5)
+        self.assertEqual(page['data'][0]['banning_reason'], 'reason')
+        self.assertEqual(page['data'][0]['class_name'], 'class 1')
+
+    def test_search_subject_roster(self):
+        """Test that subject roster is searched by name and email"""
+        page = subject_roster(self.subject.pk, 'active').search(
+            'Name3').page()
+        self.assertEqual([s['id'] for s in page['data']],
+                         [self.students[3].pk])
+
+        page = subject_roster(self.subject.pk, 'active').search(
+            'student1@').page()
+        self.assertEqual([s['id'] for s in page['data']],
+                         [self.students[1].pk])
+
+    def test_invalid_cursor(self):
+        """Test that tampered cursor is rejected"""
+        with self.assertRaises(ValueError):
+            institute_roster(self.institute.pk, 'active').page(
+                cursor='not-a-cursor')
@@ -0,0 +1,163 @@
+import csv
+import datetime
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from core import models
+from institute.export import EXPORT_EXPIRY, expire_exports
+from institute.tasks import export_student_roster
+
+
+def create_teacher(email='abc@gmail.com', username='tempusername'):
+    """Creates and return teacher"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_teacher=True
+    )
+
+
+def create_student(email, username):
+    """Creates and return student"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_student=True
+    )
+
+
+def export_url(institute_slug, student_type='all'):
+    return reverse('institute:export-institute-student-list',
+                   kwargs={'institute_slug': institute_slug,
+                           'student_type': student_type})
+
+
+class StudentRosterExportTests(TestCase):
+    """Tests for streaming student list export"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = create_teacher()
+        self.institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        self.class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+        self.student = models.InstituteStudents.objects.create(
+            invitee=create_student('student@gmail.com', 'student'),
+            inviter=self.admin,
+            institute=self.institute,
+            registration_no='reg1',
+            active=True,
+            is_banned=True
+        )
+        models.InstituteClassStudents.objects.create(
+            institute_class=self.class_,
+            institute_student=self.student,
+            inviter=self.admin,
+            active=True
+        )
+        models.InstituteBannedStudent.objects.create(
+            institute_student=self.student,
+            banned_by=self.admin,
+            banned_institute=self.institute,
+            start_date=1,
+            reason='reason'
+        )
+        license_ = models.InstituteSelectedCommonLicense.objects.create(
+            institute=self.institute,
+            type=models.InstituteLicensePlans.BASIC,
+            billing=models.Billing.MONTHLY,
+            price=1000,
+            no_of_admin=1,
+            no_of_staff=1,
+            no_of_faculty=1,
+            no_of_student=100,
+            video_call_max_attendees=10,
+            classroom_limit=5,
+            department_limit=5,
+            created_on=1
+        )
+        models.InstituteCommonLicenseOrderDetails.objects.create(
+            institute=self.institute,
+            selected_license=license_,
+            payment_gateway=models.PaymentGateway.RAZORPAY,
+            order_id='order_id',
+            paid=True,
+            active=True,
+            end_date=9999999999999
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_export_csv_is_streamed(self):
+        """Test that csv export contains ban reason and class name"""
+        res = self.client.get(export_url(self.institute.institute_slug))
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(
+            b''.join(res.streaming_content).decode().splitlines()))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['invitee_email'], 'student@gmail.com')
+        self.assertEqual(rows[0]['banning_reason'], 'reason')
+        self.assertEqual(rows[0]['class_name'], 'class 1')
+
+    def test_export_requires_admin(self):
+        """Test that user without admin role can not export"""
+        self.client.force_authenticate(
+            create_teacher('def@gmail.com', 'tempusername2'))
+
+        res = self.client.get(export_url(self.institute.institute_slug))
+
+        self.assertEqual(res.status_code, 400)
+
+    def test_export_job_writes_file(self):
+        """Test that queued export writes ndjson file to storage"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            result = export_student_roster(
+                self.admin.pk, 'institute', self.institute.pk,
+                'banned', 'ndjson')
+
+            with default_storage.open(result['file']) as f:
+                rows = [json.loads(line) for line in f.read().splitlines()]
+
+        self.assertEqual(result['user'], self.admin.pk)
+        self.assertEqual(rows[0]['id'], self.student.pk)
+        self.assertTrue(rows[0]['is_banned'])
+
+    def test_expired_export_files_are_removed(self):
+        """Test that files older than export expiry are deleted"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            name = export_student_roster(
+                self.admin.pk, 'institute', self.institute.pk,
+                'all', 'csv')['file']
+
+            later = timezone.now() + datetime.timedelta(
+                seconds=EXPORT_EXPIRY + 1)
+            self.assertEqual(expire_exports(), 0)
+            self.assertEqual(expire_exports(later), 1)
+            self.assertFalse(default_storage.exists(name))
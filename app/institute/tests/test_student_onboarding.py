@@ -0,0 +1,207 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import models
+from institute.onboarding import StudentImport, parse_rows
+
+
+def create_teacher(email='abc@gmail.com', username='tempusername'):
+    """Creates and return teacher"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_teacher=True
+    )
+
+
+def create_student(email, username):
+    """Creates and return student"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_student=True
+    )
+
+
+def import_url(institute_slug):
+    return reverse('institute:bulk-add-students-to-institute',
+                   kwargs={'institute_slug': institute_slug})
+
+
+class StudentOnboardingTests(TestCase):
+    """Tests for bulk import of students into institute"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = create_teacher()
+        self.institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        self.class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+        self.subject = models.InstituteSubject.objects.create(
+            subject_class=self.class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        license_ = models.InstituteSelectedCommonLicense.objects.create(
+            institute=self.institute,
+            type=models.InstituteLicensePlans.BASIC,
+            billing=models.Billing.MONTHLY,
+            price=1000,
+            no_of_admin=1,
+            no_of_staff=1,
+            no_of_faculty=1,
+            no_of_student=3,
+            video_call_max_attendees=10,
+            classroom_limit=5,
+            department_limit=5,
+            created_on=1
+        )
+        models.InstituteCommonLicenseOrderDetails.objects.create(
+            institute=self.institute,
+            selected_license=license_,
+            payment_gateway=models.PaymentGateway.RAZORPAY,
+            order_id='order_id',
+            paid=True,
+            active=True,
+            end_date=9999999999999
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_import_creates_students_and_reports_errors(self):
+        """Test that valid rows are added with class and subjects"""
+        create_student('s1@gmail.com', 's1')
+        create_student('s2@gmail.com', 's2')
+        rows = parse_rows(
+            'invitee_email,First_Name,gender,date_of_birth,class\n'
+            's1@gmail.com, Ram ,male,2000-01-31,Class 1\n'
+            's2@gmail.com,,,,\n'
+            's1@gmail.com,,,,\n'
+            'abc@gmail.com,,,,\n'
+            'none@gmail.com,,,,\n'
+            's3@gmail.com,,,31-01-2000,\n', 'csv')
+
+        report = StudentImport(self.institute.pk, self.admin.pk, rows).run(3)
+
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([e['row'] for e in report['errors']], [3, 4, 5, 6])
+        student = models.InstituteStudents.objects.get(
+            invitee__email='s1@gmail.com')
+        self.assertEqual(student.first_name, 'ram')
+        self.assertEqual(student.gender, models.Gender.MALE)
+        self.assertTrue(models.InstituteSubjectStudents.objects.filter(
+            institute_student=student,
+            institute_subject=self.subject
+        ).exists())
+        self.assertFalse(models.InstituteClassStudents.objects.filter(
+            institute_student__invitee__email='s2@gmail.com'
+        ).exists())
+
+    def test_emails_are_matched_case_insensitively(self):
+        """Test that emails are normalised before matching and dedup"""
+        user = create_student('s1@gmail.com', 's1')
+        rows = parse_rows(
+            'invitee_email\n'
+            ' S1@Gmail.com\n'
+            's1@GMAIL.COM\n', 'csv')
+
+        report = StudentImport(self.institute.pk, self.admin.pk, rows).run(3)
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([(e['row'], e['invitee_email']) for e in
+                          report['errors']], [(2, 's1@gmail.com')])
+        self.assertTrue(models.InstituteStudents.objects.filter(
+            invitee=user).exists())
+
+    def test_import_over_license_limit_adds_nobody(self):
+        """Test that nothing is inserted if license limit is exceeded"""
+        rows = list()
+        for i in range(4):
+            create_student('s{}@gmail.com'.format(i), 's{}'.format(i))
+            rows.append({'invitee_email': 's{}@gmail.com'.format(i)})
+
+        with self.assertRaises(ValueError):
+            StudentImport(self.institute.pk, self.admin.pk,
+                          parse_rows(rows, 'json')).run(3)
+
+        self.assertFalse(models.InstituteStudents.objects.exists())
+
+    def test_validation_queries_do_not_grow_with_rows(self):
+        """Test that rows are validated with a fixed number of queries"""
+        rows = list()
+        for i in range(20):
+            create_student('s{}@gmail.com'.format(i), 's{}'.format(i))
+            rows.append({'invitee_email': 's{}@gmail.com'.format(i),
+                         'class': 'class 1'})
+
+        with self.assertNumQueries(3):
+            valid = StudentImport(self.institute.pk, self.admin.pk,
+                                  parse_rows(rows, 'json')).validate()
+
+        self.assertEqual(len(valid), 20)
+
+    @mock.patch('institute.views.import_institute_students.delay')
+    def test_upload_queues_import_job(self, delay):
+        """Test that uploaded csv is parsed and queued"""
+        delay.return_value.id = 'task-id'
+        upload = SimpleUploadedFile(
+            'students.csv', b'invitee_email\ns1@gmail.com\n')
+
+        res = self.client.post(import_url(self.institute.institute_slug),
+                               {'file': upload}, format='multipart')
+
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.data['task_id'], 'task-id')
+        args = delay.call_args[0]
+        self.assertEqual(args[1], self.institute.pk)
+        self.assertEqual(args[2][0]['invitee_email'], 's1@gmail.com')
+        self.assertEqual(args[3], 3)
+
+    def test_upload_over_license_limit_is_rejected(self):
+        """Test that file with more new students than allowed is rejected"""
+        for i in range(4):
+            create_student('s{}@gmail.com'.format(i), 's{}'.format(i))
+
+        res = self.client.post(
+            import_url(self.institute.institute_slug),
+            {'students': [{'invitee_email': 's{}@gmail.com'.format(i)}
+                          for i in range(4)]},
+            format='json')
+
+        self.assertEqual(res.status_code, 400)
+
+    @mock.patch('institute.views.import_institute_students.delay')
+    def test_upload_counts_only_new_students_against_limit(self, delay):
+        """Test that existing, repeated and invalid rows are not counted"""
+        delay.return_value.id = 'task-id'
+        for i in range(3):
+            user = create_student('s{}@gmail.com'.format(i), 's{}'.format(i))
+            if i < 2:
+                models.InstituteStudents.objects.create(
+                    invitee=user, inviter=self.admin, institute=self.institute)
+        rows = [{'invitee_email': 's{}@gmail.com'.format(i)}
+                for i in range(3)]
+        rows += [{'invitee_email': 'S2@gmail.com'},
+                 {'invitee_email': 'none@gmail.com'}]
+
+        res = self.client.post(import_url(self.institute.institute_slug),
+                               {'students': rows}, format='json')
+
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.data['total'], 5)
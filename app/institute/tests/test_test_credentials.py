@@ -0,0 +1,208 @@
+import csv
+import io
+import json
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import models
+from institute.allocation import SEPARATED, SHUFFLED, allocate_sets
+from institute.credentials import hash_passwords, issue_test_credentials
+from institute.tests.test_question_paper import add_section,\
+    create_teacher, create_typed_test
+from institute.tests.test_warmup import create_student
+
+
+class TestCredentialIssuanceTests(TestCase):
+    """Tests for bulk issuance of test credentials"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = create_teacher()
+        self.institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+        self.subject = models.InstituteSubject.objects.create(
+            subject_class=class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        models.InstituteSubjectPermission.objects.create(
+            invitee=self.admin,
+            inviter=self.admin,
+            to=self.subject
+        )
+        for i in range(5):
+            student = models.InstituteStudents.objects.create(
+                invitee=create_student(
+                    'student{}@gmail.com'.format(i), 'student{}'.format(i)),
+                inviter=self.admin,
+                institute=self.institute,
+                enrollment_no=str(i),
+                active=i != 4
+            )
+            models.InstituteClassStudents.objects.create(
+                institute_class=class_,
+                institute_student=student,
+                inviter=self.admin,
+                active=i != 4
+            )
+        self.test = create_typed_test(self.subject)
+        self.set1 = models.SubjectTestSets.objects.create(
+            test=self.test, set_name='set 1', mark_as_final=True)
+        self.set2 = models.SubjectTestSets.objects.create(
+            test=self.test, set_name='set 2', mark_as_final=True)
+        models.SubjectTestSets.objects.create(test=self.test, set_name='set 3')
+
+    def url(self, name, **kwargs):
+        kwargs.update({
+            'institute_slug': self.institute.institute_slug,
+            'subject_slug': self.subject.subject_slug,
+            'test_slug': self.test.test_slug
+        })
+        return reverse('institute:' + name, kwargs=kwargs)
+
+    def test_credentials_are_issued_to_active_students(self):
+        """Test that active students get credentials of final sets"""
+        rows = issue_test_credentials(self.test)
+
+        self.assertEqual([r['enrollment_no'] for r in rows],
+                         ['0', '1', '2', '3'])
+        self.assertEqual([r['set_name'] for r in rows],
+                         ['set 1', 'set 2', 'set 1', 'set 2'])
+
+        for row in rows:
+            credential = models.StudentTestCredential.objects.get(
+                test=self.test,
+                lookup_key=models.test_password_lookup_key(
+                    self.test.pk, row['password']))
+            self.assertEqual(credential.student.enrollment_no,
+                             row['enrollment_no'])
+            self.assertTrue(check_password(row['password'],
+                                           credential.password))
+
+        self.assertEqual(issue_test_credentials(self.test), [])
+
+    def test_sets_are_allocated_deterministically(self):
+        """Test that strategies are balanced and reproducible"""
+        students = list(range(1, 1001))
+        sets = [10, 20, 30]
+
+        for strategy in (SHUFFLED, SEPARATED):
+            allocation = allocate_sets(1, students, sets, strategy)
+
+            self.assertEqual(allocation,
+                             allocate_sets(1, students, sets, strategy))
+            self.assertEqual(
+                sorted(list(allocation.values()).count(s) for s in sets),
+                [333, 333, 334])
+
+        allocation = allocate_sets(1, students, sets, SEPARATED)
+        self.assertTrue(all(allocation[s] != allocation[s + 1]
+                            for s in students[:-1]))
+        self.assertNotEqual(allocation, allocate_sets(2, students, sets,
+                                                      SEPARATED))
+        with self.assertRaises(ValueError):
+            allocate_sets(1, students, sets, 'invalid')
+
+    def test_issuance_is_resumed_with_same_allocation(self):
+        """Test that issuing again keeps sets of issued students"""
+        rows = issue_test_credentials(self.test, SHUFFLED)
+        allocation = {r['enrollment_no']: r['set_name'] for r in rows}
+
+        models.StudentTestCredential.objects.filter(
+            student__enrollment_no__in=['1', '2']).delete()
+        rows = issue_test_credentials(self.test, SHUFFLED)
+
+        self.assertEqual({r['enrollment_no']: r['set_name'] for r in rows},
+                         {n: allocation[n] for n in ['1', '2']})
+        self.assertEqual(models.StudentTestCredential.objects.filter(
+            test=self.test).count(), 4)
+
+    def test_question_order_is_precomputed(self):
+        """Test that shuffled question order is stored per student"""
+        models.SubjectTest.objects.filter(pk=self.test.pk).update(
+            shuffle_questions=True)
+        add_section(self.test, self.set1)
+        add_section(self.test, self.set1)
+        add_section(self.test, self.set2)
+
+        issue_test_credentials(self.test)
+
+        sections = [list(models.SubjectTypedTestQuestion.objects.filter(
+            test_section=section).values_list('pk', flat=True))
+            for section in models.SubjectTestQuestionSection.objects.filter(
+                set=self.set1).order_by('order', 'pk')]
+        orders = [json.loads(c.question_order) for c in
+                  models.StudentTestCredential.objects.filter(set=self.set1)]
+
+        self.assertEqual(len(orders), 2)
+        size = len(sections[0])
+        for order in orders:
+            self.assertEqual(set(order[:size]), set(sections[0]))
+            self.assertEqual(set(order[size:]), set(sections[1]))
+        self.assertNotEqual(orders[0], orders[1])
+
+    @mock.patch('institute.credentials.CREDENTIAL_HASH_WORKERS', 2)
+    def test_passwords_are_hashed_in_process_pool(self):
+        """Test that pooled hashing keeps order of passwords"""
+        passwords = ['PASS{}'.format(i) for i in range(6)]
+
+        hashes = hash_passwords(passwords)
+
+        self.assertTrue(all(check_password(p, h)
+                            for p, h in zip(passwords, hashes)))
+
+    def test_credential_sheet_is_downloaded_once(self):
+        """Test that credential sheet can be downloaded only once"""
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        models.InstituteSelectedCommonLicense.objects.create(
+            institute=self.institute,
+            type=models.InstituteLicensePlans.BASIC,
+            billing=models.Billing.MONTHLY,
+            price=1000,
+            no_of_admin=1,
+            no_of_staff=1,
+            no_of_faculty=1,
+            no_of_student=100,
+            video_call_max_attendees=10,
+            classroom_limit=5,
+            department_limit=5,
+            created_on=1
+        )
+        models.InstituteCommonLicenseOrderDetails.objects.create(
+            institute=self.institute,
+            selected_license=models.InstituteSelectedCommonLicense
+            .objects.get(institute=self.institute),
+            payment_gateway=models.PaymentGateway.RAZORPAY,
+            order_id='order_id',
+            paid=True,
+            active=True,
+            end_date=9999999999999
+        )
+
+        res = client.post(self.url('issue-test-credentials'))
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['issued'], 4)
+
+        url = self.url('test-credential-sheet', token=res.data['sheet'])
+        res = client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(res.content.decode())))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(client.get(url).status_code, 400)
@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
+
+import fakeredis
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from core import models
+from institute.transcoding import claim_job, create_transcoding_job,\
+    encode_rendition, fail_job, fail_rendition, ladder, plan
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+@mock.patch.object(models.settings, 'MEDIA_ROOT', MEDIA_ROOT)
+class TranscodingTests(TestCase):
+    """Tests for background transcoding jobs of lecture videos"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        patcher = mock.patch(
+            'institute.transcoding_progress.get_redis_connection',
+            return_value=fakeredis.FakeStrictRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        material = models.SubjectLectureMaterials.objects.create(
+            lecture=models.SubjectLecture.objects.create(name='lecture 1'),
+            content_type=models.SubjectLectureMaterialsContentType.VIDEO,
+            name='video 1')
+        self.video = models.SubjectLectureVideoMaterial.objects.create(
+            lecture_material=material,
+            file=SimpleUploadedFile('video.mp4', b'video'))
+        self.job = create_transcoding_job(self.video)
+
+    def refresh(self):
+        self.job.refresh_from_db()
+        self.video.refresh_from_db()
+
+    def master_playlist(self):
+        with open(os.path.join(MEDIA_ROOT, self.video.stream_file)) as f:
+            return f.read()
+
+    def test_ladder_never_upscales(self):
+        """Test that renditions follow size of source"""
+        self.assertEqual([r[:2] for r in ladder(1920, 1080)],
+                         [(256, 144), (426, 240), (640, 360), (854, 480),
+                          (1280, 720)])
+        self.assertEqual([r[:2] for r in ladder(480, 360)],
+                         [(192, 144), (320, 240), (480, 360)])
+        self.assertEqual([r[:2] for r in ladder(175, 99)], [(174, 98)])
+
+    @mock.patch('institute.transcoding.encode')
+    @mock.patch('institute.transcoding.probe',
+                return_value=(Decimal('12.5'), 800000, 640, 360))
+    def test_renditions_are_published_progressively(self, probe, encode):
+        """Test that master playlist grows as renditions are encoded"""
+        self.assertEqual(self.job.status, models.TranscodingStatus.QUEUED)
+
+        renditions = plan(self.job.pk)
+
+        self.refresh()
+        self.assertEqual(self.job.status, models.TranscodingStatus.ENCODING)
+        self.assertEqual((self.video.duration, self.video.bit_rate,
+                          self.video.height), (Decimal('12.5'), 800000, 360))
+        self.assertEqual(
+            list(models.VideoRenditionJob.objects.filter(
+                pk__in=renditions).values_list('height', flat=True)),
+            [144, 240, 360])
+        probe.assert_called_once_with(self.video.file.path)
+
+        encode_rendition(renditions[0])
+        self.refresh()
+        self.assertEqual(self.job.status, models.TranscodingStatus.ENCODING)
+        self.assertTrue(self.video.stream_file.endswith('.m3u8'))
+        self.assertFalse(os.path.isabs(self.video.stream_file))
+        master = self.master_playlist()
+        self.assertIn('RESOLUTION=256x144', master)
+        self.assertNotIn('RESOLUTION=426x240', master)
+
+        for rendition_pk in reversed(renditions[1:]):
+            encode_rendition(rendition_pk)
+        self.refresh()
+        self.assertEqual(self.job.status, models.TranscodingStatus.DONE)
+        lines = self.master_playlist().splitlines()
+        self.assertEqual([line.split('/')[0] for line in lines[3::2]],
+                         ['144p', '240p', '360p'])
+
+        # Finished job and renditions are not claimed again
+        self.assertIsNone(claim_job(self.job.pk))
+        self.assertEqual(plan(self.job.pk), [])
+        encode_rendition(renditions[0])
+        self.assertEqual(encode.call_count, 3)
+
+    @mock.patch('institute.transcoding.probe',
+                side_effect=RuntimeError('ffprobe failed'))
+    def test_failed_attempt_is_queued_again(self, probe):
+        """Test that failed attempt is retried until final attempt"""
+        with self.assertRaises(RuntimeError):
+            plan(self.job.pk)
+        fail_job(self.job.pk, 'ffprobe failed', final=False)
+
+        self.refresh()
+        self.assertEqual(self.job.status, models.TranscodingStatus.QUEUED)
+        self.assertEqual(self.job.error, 'ffprobe failed')
+        self.assertFalse(self.video.error_transcoding)
+
+        with self.assertRaises(RuntimeError):
+            plan(self.job.pk)
+        fail_job(self.job.pk, 'ffprobe failed', final=True)
+
+        self.refresh()
+        self.assertEqual(self.job.status, models.TranscodingStatus.FAILED)
+        self.assertEqual(self.job.attempts, 2)
+        self.assertTrue(self.video.error_transcoding)
+        self.assertIsNone(claim_job(self.job.pk))
+
+    @mock.patch('institute.transcoding.encode')
+    @mock.patch('institute.transcoding.probe',
+                return_value=(Decimal(1), 1000, 426, 240))
+    def test_failed_rendition_is_left_out(self, probe, encode):
+        """Test that job finishes without renditions which failed"""
+        low, high = plan(self.job.pk)
+
+        fail_rendition(high, 'ffmpeg failed', final=False)
+        self.assertEqual(models.VideoRenditionJob.objects.get(pk=high).status,
+                         models.TranscodingStatus.QUEUED)
+        encode_rendition(low)
+        fail_rendition(high, 'ffmpeg failed', final=True)
+
+        self.refresh()
+        self.assertEqual(self.job.status, models.TranscodingStatus.DONE)
+        self.assertNotIn('240p', self.master_playlist())
+
+    @mock.patch('institute.transcoding.probe',
+                return_value=(Decimal(1), 1000, 256, 144))
+    def test_job_fails_without_renditions(self, probe):
+        """Test that video is marked failed when every rendition fails"""
+        rendition, = plan(self.job.pk)
+        fail_rendition(rendition, 'ffmpeg failed', final=True)
+
+        self.refresh()
+        self.assertEqual(self.job.status, models.TranscodingStatus.FAILED)
+        self.assertTrue(self.video.error_transcoding)
+        self.assertEqual(self.video.stream_file, '')
+
+    @mock.patch('institute.transcoding.encode')
+    @mock.patch('institute.transcoding.probe',
+                return_value=(Decimal(1), 1000, 256, 144))
+    def test_rendition_being_encoded_is_not_claimed(self, probe, encode):
+        """Test that redelivered rendition is not encoded concurrently"""
+        rendition, = plan(self.job.pk)
+        models.VideoRenditionJob.objects.filter(pk=rendition).update(
+            status=models.TranscodingStatus.ENCODING,
+            updated_on=int(time.time()) * 1000)
+
+        # Job planned again dispatches no rendition being encoded
+        self.assertEqual(plan(self.job.pk), [])
+        encode_rendition(rendition)
+        encode.assert_not_called()
+
+        # Encoding abandoned by crashed worker is claimed again
+        models.VideoRenditionJob.objects.filter(pk=rendition).update(
+            updated_on=1)
+        encode_rendition(rendition)
+        encode.assert_called_once()
@@ -0,0 +1,162 @@
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+import fakeredis
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TransactionTestCase,\
+    override_settings
+
+from core import models
+from core.authentication import get_or_create_token_key
+from institute.routing import websocket_urlpatterns
+from institute.tests.test_question_paper import create_teacher
+from institute.transcoding import create_transcoding_job, encode_rendition,\
+    plan
+from institute.transcoding_progress import ProgressMonitor,\
+    get_timing_histograms, progress_event, timed
+
+application = URLRouter(websocket_urlpatterns)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+LINE = 'frame=  240 fps= 48 q=28.0 size=     512kB time=00:00:10.00 '\
+    'bitrate= 419.4kbits/s speed=1.92x'
+
+
+class ProgressEventTests(SimpleTestCase):
+    """Tests for progress events parsed from ffmpeg output"""
+
+    def setUp(self):
+        patcher = mock.patch(
+            'institute.transcoding_progress.get_redis_connection',
+            return_value=fakeredis.FakeStrictRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_progress_line_is_parsed(self):
+        """Test that percent, fps, speed and eta are read"""
+        self.assertEqual(progress_event(LINE, 40, 10, 15.4), {
+            'percent': 25.0, 'fps': 48.0, 'speed': 1.92, 'eta': 15})
+        self.assertIsNone(progress_event('Stream #0:0: Video', 40, 0, 0))
+
+    @mock.patch('institute.transcoding_progress.publish_progress')
+    def test_progress_is_throttled(self, publish_progress):
+        """Test that progress is published once per interval"""
+        monitor = ProgressMonitor(1, 2, 3, 144, 'E', Decimal(40))
+
+        with mock.patch('institute.transcoding_progress.time.monotonic',
+                        side_effect=[100, 100.5, 101, 102.5]):
+            for _i in range(4):
+                monitor(LINE, 1, 10, 15, None)
+
+        self.assertEqual(publish_progress.call_count, 2)
+        user_pk, event = publish_progress.call_args[0]
+        self.assertEqual(user_pk, 1)
+        self.assertEqual((event['job'], event['rendition'], event['percent']),
+                         (2, 144, 25.0))
+
+    def test_timings_are_recorded_in_histograms(self):
+        """Test that successful stages are counted per bucket"""
+        with mock.patch('institute.transcoding_progress.time.monotonic',
+                        side_effect=[0, 3, 10, 50]):
+            with timed('probe'):
+                pass
+            with timed('probe'):
+                pass
+
+        with self.assertRaises(RuntimeError):
+            with timed('publish'):
+                raise RuntimeError
+
+        self.assertEqual(get_timing_histograms(), {'probe': {
+            'count': 2, 'mean': 21.5,
+            'buckets': {'<=5': 1, '<=60': 1}}})
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CHANNEL_LAYERS={
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+@mock.patch.object(models.settings, 'MEDIA_ROOT', MEDIA_ROOT)
+class TranscodingProgressConsumerTests(TransactionTestCase):
+    """Tests for transcoding progress sent to uploading teacher"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        patcher = mock.patch(
+            'institute.transcoding_progress.get_redis_connection',
+            return_value=fakeredis.FakeStrictRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = create_teacher()
+        material = models.SubjectLectureMaterials.objects.create(
+            lecture=models.SubjectLecture.objects.create(name='lecture 1'),
+            content_type=models.SubjectLectureMaterialsContentType.VIDEO,
+            name='video 1')
+        video = models.SubjectLectureVideoMaterial.objects.create(
+            lecture_material=material,
+            file=SimpleUploadedFile('video.mp4', b'video'))
+        self.job = create_transcoding_job(video, self.user)
+        self.token = get_or_create_token_key(self.user)
+
+    def communicator(self, token=None):
+        return WebsocketCommunicator(
+            application, 'ws/transcoding/?token={}'.format(
+                token or self.token))
+
+    @mock.patch('institute.transcoding.probe',
+                return_value=(Decimal(40), 1000, 256, 144))
+    def test_teacher_gets_progress_of_uploads(self, probe):
+        """Test that latest progress is sent on connect, then live"""
+        rendition, = plan(self.job.pk)
+
+        def encode(path, output, key_path, key_url, representation,
+                   monitor):
+            monitor(LINE, 1, 10, 15, None)
+
+        @async_to_sync
+        async def run():
+            communicator = self.communicator()
+            connected, _code = await communicator.connect()
+            self.assertTrue(connected)
+            snapshot = await communicator.receive_json_from()
+
+            with mock.patch('institute.transcoding.encode', encode):
+                await database_sync_to_async(encode_rendition)(rendition)
+            events = [await communicator.receive_json_from()
+                      for _i in range(4)]
+            await communicator.disconnect()
+            return snapshot, events
+
+        snapshot, events = run()
+
+        # Only latest status of job is kept
+        self.assertEqual((snapshot['job'], snapshot['status']),
+                         (self.job.pk, 'E'))
+        self.assertEqual(
+            [(e['rendition'], e['status'], e.get('percent'))
+             for e in events],
+            [(144, 'E', 0), (144, 'E', 25.0), (144, 'D', 100),
+             (None, 'D', None)])
+        self.assertEqual(events[1]['fps'], 48.0)
+        self.assertEqual(
+            set(get_timing_histograms()), {'probe', 'encode_144p', 'publish'})
+        self.assertIsNotNone(self.job.renditions.get().encode_time)
+
+    def test_invalid_token_is_rejected(self):
+        """Test that connection without valid token is closed"""
+        @async_to_sync
+        async def run():
+            connected, code = await self.communicator('invalid').connect()
+            return connected, code
+
+        self.assertEqual(run(), (False, 4001))
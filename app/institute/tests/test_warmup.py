@@ -0,0 +1,130 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from core import models
+from core.subject_access import refresh_subject_access
+from institute.exam_session import authenticate_test_credential,\
+    remaining_time
+from institute.question_paper import STUDENT_PAPER, get_paper_snapshot
+from institute.tasks import warm_up_scheduled_tests
+from institute.tests.test_question_paper import add_section, \
+    create_teacher, create_typed_test
+from institute.warmup import get_test_roster
+
+
+def create_student(email, username):
+    """Creates and return student"""
+    return get_user_model().objects.create_user(
+        email=email,
+        username=username,
+        password='tempupassword',
+        is_student=True
+    )
+
+
+class TestWarmUpTests(TestCase):
+    """Tests for warming up scheduled tests before they start"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = create_teacher()
+        self.institute = models.Institute.objects.create(
+            name='tempinstitute',
+            user=self.admin,
+            institute_category=models.InstituteCategory.EDUCATION,
+            type=models.InstituteType.COLLEGE
+        )
+        class_ = models.InstituteClass.objects.create(
+            class_institute=self.institute,
+            name='class 1'
+        )
+        self.subject = models.InstituteSubject.objects.create(
+            subject_class=class_,
+            name='subject 1',
+            type=models.InstituteSubjectType.MANDATORY
+        )
+        self.student = models.InstituteStudents.objects.create(
+            invitee=create_student('student@gmail.com', 'student'),
+            inviter=self.admin,
+            institute=self.institute,
+            active=True
+        )
+        models.InstituteClassStudents.objects.create(
+            institute_class=class_,
+            institute_student=self.student,
+            inviter=self.admin,
+            active=True
+        )
+        self.test = create_typed_test(self.subject)
+        self.set_ = models.SubjectTestSets.objects.create(
+            test=self.test, set_name='set 1', mark_as_final=True)
+        add_section(self.test, self.set_)
+        refresh_subject_access(self.institute.pk)
+
+    def schedule(self, minutes):
+        # Updated in database, tests can not be saved with past schedule
+        models.SubjectTest.objects.filter(pk=self.test.pk).update(
+            test_schedule_type=models.TestScheduleType.SPECIFIC_DATE_AND_TIME,
+            test_schedule=int(time.time() + minutes * 60) * 1000)
+        self.test.refresh_from_db()
+
+    @mock.patch('institute.tasks.start_scheduled_test.apply_async')
+    def test_test_starting_soon_is_warmed_up(self, apply_async):
+        """Test that paper and roster are cached before test starts"""
+        self.schedule(5)
+        credential = models.StudentTestCredential.objects.create(
+            test=self.test, set=self.set_, student=self.student)
+        credential.password = 'password'
+        credential.lookup_key = models.test_password_lookup_key(
+            self.test.pk, credential.password)
+        credential.save()
+
+        self.assertEqual(warm_up_scheduled_tests(), [self.test.pk])
+
+        self.assertEqual(apply_async.call_args[0][0], (self.test.pk,))
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(
+                get_paper_snapshot(self.set_.pk, STUDENT_PAPER, ''))
+            roster = get_test_roster(self.test)
+        self.assertEqual(roster, {
+            self.student.invitee_id: (
+                self.student.pk, credential.pk, self.set_.pk,
+                credential.lookup_key, credential.question_order)
+        })
+
+        # Login and time checks of students read warmed up roster and state
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticate_test_credential(
+                self.test, self.student.invitee, credential.password
+            ).set_id, self.set_.pk)
+            self.assertIsNone(authenticate_test_credential(
+                self.test, self.student.invitee, 'WRONG'))
+            self.assertEqual(remaining_time(self.test.pk, credential.pk)[0],
+                             False)
+
+        # Second beat does not warm the test up again
+        self.assertEqual(warm_up_scheduled_tests(), [])
+        self.assertEqual(apply_async.call_count, 1)
+
+    @mock.patch('institute.tasks.start_scheduled_test.apply_async')
+    def test_later_test_is_not_warmed_up(self, apply_async):
+        """Test that tests starting after warm up window are skipped"""
+        self.schedule(60)
+
+        self.assertEqual(warm_up_scheduled_tests(), [])
+        apply_async.assert_not_called()
+
+    def test_missed_test_is_made_live(self):
+        """Test that test whose start was missed goes live"""
+        self.schedule(-5)
+
+        warm_up_scheduled_tests()
+
+        self.test.refresh_from_db()
+        self.assertTrue(self.test.test_live)
+        with self.assertNumQueries(0):
+            self.assertTrue(remaining_time(self.test.pk, None)[0])
@@ -0,0 +1,358 @@
+import os
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from ffmpeg_streaming import Bitrate, FFProbe, Formats, Representation, Size
+import ffmpeg_streaming
+
+from core import models
+from .transcoding_progress import ENCODE, PROBE, PUBLISH, ProgressMonitor,\
+    notify_status, timed
+
+# Failed transcoding is retried this many times, waiting
+# TRANSCODING_RETRY_DELAY seconds doubled after every attempt
+TRANSCODING_MAX_RETRIES = getattr(settings, 'TRANSCODING_MAX_RETRIES', 3)
+TRANSCODING_RETRY_DELAY = getattr(settings, 'TRANSCODING_RETRY_DELAY', 60)
+
+# Rendition encoding for this many seconds is taken to be abandoned by
+# crashed worker and may be claimed again
+TRANSCODING_CLAIM_TIMEOUT = getattr(settings, 'TRANSCODING_CLAIM_TIMEOUT',
+                                    60 * 60 * 6)
+
+# Seconds of video encrypted with one hls key
+HLS_KEY_ROTATION_PERIOD = 5
+
+# Abr ladder as (height, width at 16:9, video bit rate, audio bit rate),
+# lowest first so low renditions are queued and published first
+RENDITIONS = (
+    (144, 256, 95 * 1024, 64 * 1024),
+    (240, 426, 150 * 1024, 94 * 1024),
+    (360, 640, 276 * 1024, 128 * 1024),
+    (480, 854, 750 * 1024, 192 * 1024),
+    (720, 1280, 2048 * 1024, 320 * 1024),
+)
+
+
+def _now():
+    return int(time.time()) * 1000
+
+
+def create_transcoding_job(video, uploaded_by=None):
+    """
+    Returns new queued transcoding job of video, its progress is published
+    to uploading teacher
+    """
+    now = _now()
+    return models.VideoTranscodingJob.objects.create(
+        video=video, uploaded_by=uploaded_by, created_on=now, updated_on=now)
+
+
+def _notify(job_pk, status, rendition=None, **fields):
+    """Publishes status of job or its rendition to uploader"""
+    job = models.VideoTranscodingJob.objects.filter(pk=job_pk).values(
+        'uploaded_by', 'video').first()
+    if job:
+        notify_status(job['uploaded_by'], job_pk, job['video'], status,
+                      rendition, **fields)
+
+
+def _set_status(job_pk, status, **fields):
+    models.VideoTranscodingJob.objects.filter(pk=job_pk).update(
+        status=status, updated_on=_now(), **fields)
+    _notify(job_pk, status)
+
+
+def _claimable(job):
+    """
+    Returns True if attempt of job or rendition job can be started. Jobs
+    are planned again till finished, planning keeps existing renditions.
+    Renditions are claimed only when queued, so rendition dispatched
+    twice is never encoded concurrently, or when their encoding was
+    abandoned by crashed worker.
+    """
+    if isinstance(job, models.VideoTranscodingJob):
+        return job.status not in (models.TranscodingStatus.DONE,
+                                  models.TranscodingStatus.FAILED)
+
+    return job.status == models.TranscodingStatus.QUEUED or\
+        job.status == models.TranscodingStatus.ENCODING and\
+        job.updated_on < _now() - TRANSCODING_CLAIM_TIMEOUT * 1000
+
+
+def _claim(model, pk, related=None):
+    """
+    Starts attempt of job or rendition job and returns it, returns None
+    if it is not found or can not be claimed
+    """
+    query = model.objects.select_for_update().filter(pk=pk)
+    if related:
+        query = query.select_related(related)
+    job = query.first()
+
+    if not job or not _claimable(job):
+        return None
+
+    job.status = models.TranscodingStatus.PROBING\
+        if model is models.VideoTranscodingJob\
+        else models.TranscodingStatus.ENCODING
+    job.attempts += 1
+    job.updated_on = _now()
+    job.save(update_fields=['status', 'attempts', 'updated_on'])
+    return job
+
+
+def claim_job(job_pk):
+    """
+    Starts attempt of job and returns its video, returns None if job is
+    not found or already finished
+    """
+    with transaction.atomic():
+        job = _claim(models.VideoTranscodingJob, job_pk, 'video')
+        if not job:
+            return None
+
+        notify_status(job.uploaded_by_id, job.pk, job.video_id, job.status)
+        return job.video
+
+
+def probe(path):
+    """Returns (duration in seconds, bit rate, width, height) of video"""
+    ffprobe = FFProbe(path)
+    video_format = ffprobe.format()
+    size = ffprobe.video_size
+    return (Decimal(video_format['duration']), int(video_format['bit_rate']),
+            size.width, size.height)
+
+
+def ladder(width, height):
+    """
+    Returns renditions of abr ladder for source of given size as list of
+    (width, height, video bit rate, audio bit rate). Renditions taller than
+    source are left out, so video is never upscaled, and widths follow
+    aspect ratio of source. Source smaller than lowest rendition is
+    encoded once at its own size.
+    """
+    renditions = list()
+    for rendition_height, _width, video_bit_rate, audio_bit_rate\
+            in RENDITIONS:
+        if rendition_height > height:
+            break
+        # Encoder needs even dimensions
+        rendition_width = int(round(width * rendition_height / height / 2))
+        renditions.append((rendition_width * 2, rendition_height,
+                           video_bit_rate, audio_bit_rate))
+
+    if not renditions:
+        _height, _width, video_bit_rate, audio_bit_rate = RENDITIONS[0]
+        renditions.append((width - width % 2, height - height % 2,
+                           video_bit_rate, audio_bit_rate))
+    return renditions
+
+
+def encode(path, output, key_path, key_url, representation, monitor=None):
+    """
+    Encodes video file into encrypted hls variant playlist of one
+    representation in directory of output, monitor gets ffmpeg progress
+    """
+    hls = ffmpeg_streaming.input(path).hls(Formats.h264())
+    hls.representations(representation)
+    hls.encryption(key_path, key_url, HLS_KEY_ROTATION_PERIOD)
+    hls.output(output, monitor=monitor)
+
+
+def _media_relative(path):
+    return os.path.relpath(path, settings.MEDIA_ROOT)
+
+
+def rendition_name(height):
+    return '{}p'.format(height)
+
+
+def plan(job_pk):
+    """
+    Probes video of queued job, fills in its details and creates rendition
+    jobs of its abr ladder. Returns pks of renditions left to encode, lowest
+    first, or empty list if job is already finished. Renditions already
+    created by earlier attempt are kept. Exceptions are left to caller,
+    which retries or fails the job.
+    """
+    video = claim_job(job_pk)
+    if not video:
+        return []
+
+    with timed(PROBE) as timing:
+        duration, bit_rate, width, height = probe(video.file.path)
+    now = _now()
+    with transaction.atomic():
+        models.SubjectLectureVideoMaterial.objects.filter(pk=video.pk).update(
+            duration=duration, bit_rate=bit_rate, width=width, height=height)
+        models.VideoTranscodingJob.objects.filter(pk=job_pk).update(
+            probe_time=round(Decimal(timing['seconds']), 3))
+
+        existing = set(models.VideoRenditionJob.objects.filter(
+            job__pk=job_pk).values_list('height', flat=True))
+        models.VideoRenditionJob.objects.bulk_create([
+            models.VideoRenditionJob(
+                job_id=job_pk,
+                width=rendition_width,
+                height=rendition_height,
+                video_bit_rate=video_bit_rate,
+                audio_bit_rate=audio_bit_rate,
+                updated_on=now)
+            for rendition_width, rendition_height, video_bit_rate,
+            audio_bit_rate in ladder(width, height)
+            if rendition_height not in existing])
+        _set_status(job_pk, models.TranscodingStatus.ENCODING)
+
+        return list(models.VideoRenditionJob.objects.filter(
+            job__pk=job_pk, status=models.TranscodingStatus.QUEUED
+        ).order_by('height').values_list('pk', flat=True))
+
+
+def write_master_playlist(path, renditions):
+    """
+    Writes hls master playlist of renditions at path. File is replaced
+    at once, so players never read partly written playlist.
+    """
+    content = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for rendition in sorted(renditions, key=lambda r: r.height):
+        content.append(
+            '#EXT-X-STREAM-INF:BANDWIDTH={},RESOLUTION={}x{},NAME="{}"'.format(
+                rendition.video_bit_rate + rendition.audio_bit_rate,
+                rendition.width, rendition.height, rendition.height))
+        content.append(rendition.playlist)
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as playlist:
+        playlist.write('\n'.join(content) + '\n')
+    os.replace(temp_path, path)
+
+
+def _publish(job_pk):
+    """
+    Stitches master playlist from encoded renditions of job and finishes
+    job once no rendition is left. Job is done if any rendition was
+    encoded, otherwise it fails. Caller holds lock of job.
+    """
+    video = models.SubjectLectureVideoMaterial.objects.filter(
+        transcoding_job__pk=job_pk).only('file').first()
+    renditions = list(models.VideoRenditionJob.objects.filter(job__pk=job_pk))
+    done = [r for r in renditions if r.status == models.TranscodingStatus.DONE]
+    finished = all(r.status in (models.TranscodingStatus.DONE,
+                                models.TranscodingStatus.FAILED)
+                   for r in renditions)
+
+    if done:
+        master = models.hls_encoded_video_saving_file_name_path(
+            str(video.file))
+        os.makedirs(os.path.dirname(master), exist_ok=True)
+        write_master_playlist(master, done)
+        models.SubjectLectureVideoMaterial.objects.filter(pk=video.pk).update(
+            stream_file=_media_relative(master), error_transcoding=False)
+
+    if finished and done:
+        _set_status(job_pk, models.TranscodingStatus.DONE, error='')
+    elif finished:
+        _set_status(job_pk, models.TranscodingStatus.FAILED)
+        models.SubjectLectureVideoMaterial.objects.filter(pk=video.pk).update(
+            error_transcoding=True)
+
+
+def encode_rendition(rendition_pk):
+    """
+    Encodes one rendition of video into its variant playlist and publishes
+    it in master playlist, so lower renditions are playable while higher
+    ones are still encoding. Does nothing if rendition is already finished
+    or being encoded by another worker.
+    Exceptions are left to caller, which retries or fails the rendition.
+    """
+    with transaction.atomic():
+        rendition = _claim(models.VideoRenditionJob, rendition_pk,
+                           'job__video')
+        if not rendition:
+            return
+
+        job = rendition.job
+        notify_status(job.uploaded_by_id, job.pk, job.video_id,
+                      rendition.status, rendition.height, percent=0)
+
+    name = rendition_name(rendition.height)
+    file_name = str(job.video.file)
+    master = models.hls_encoded_video_saving_file_name_path(file_name)
+    output = os.path.join(os.path.dirname(master), name,
+                          os.path.basename(master))
+    key_path = os.path.join(
+        os.path.dirname(models.hls_key_saving_path(file_name)), name, 'key')
+    with timed(ENCODE + '_' + name) as encoding:
+        encode(job.video.file.path, output, key_path,
+               settings.MEDIA_URL + _media_relative(key_path),
+               Representation(
+                   Size(rendition.width, rendition.height),
+                   Bitrate(rendition.video_bit_rate,
+                           rendition.audio_bit_rate)),
+               ProgressMonitor(job.uploaded_by_id, job.pk, job.video_id,
+                               rendition.height, rendition.status,
+                               job.video.duration))
+
+    with timed(PUBLISH) as publishing:
+        # Encoder writes master playlist of this rendition only beside it
+        if os.path.isfile(output):
+            os.remove(output)
+
+        with transaction.atomic():
+            models.VideoTranscodingJob.objects.select_for_update().filter(
+                pk=job.pk).first()
+            models.VideoRenditionJob.objects.filter(pk=rendition_pk).update(
+                status=models.TranscodingStatus.DONE,
+                playlist='{}/{}_{}.m3u8'.format(
+                    name, os.path.basename(master).split('.')[0], name),
+                error='',
+                updated_on=_now())
+            notify_status(job.uploaded_by_id, job.pk, job.video_id,
+                          models.TranscodingStatus.DONE, rendition.height,
+                          percent=100)
+            _publish(job.pk)
+
+    models.VideoRenditionJob.objects.filter(pk=rendition_pk).update(
+        encode_time=round(Decimal(encoding['seconds']), 3),
+        publish_time=round(Decimal(publishing['seconds']), 3))
+
+
+def fail_job(job_pk, error, final):
+    """
+    Records error of failed attempt of job. Job is queued again for
+    retry unless attempt was final, then video is marked as failed.
+    """
+    if not final:
+        _set_status(job_pk, models.TranscodingStatus.QUEUED,
+                    error=error[:500])
+        return
+
+    with transaction.atomic():
+        _set_status(job_pk, models.TranscodingStatus.FAILED,
+                    error=error[:500])
+        models.SubjectLectureVideoMaterial.objects.filter(
+            transcoding_job__pk=job_pk).update(error_transcoding=True)
+
+
+def fail_rendition(rendition_pk, error, final):
+    """
+    Records error of failed attempt of rendition. Rendition is queued again
+    for retry unless attempt was final, then it is left out of master
+    playlist and job is finished if it was the last rendition.
+    """
+    status = models.TranscodingStatus.FAILED if final\
+        else models.TranscodingStatus.QUEUED
+
+    with transaction.atomic():
+        job_pk, height = models.VideoRenditionJob.objects.filter(
+            pk=rendition_pk).values_list('job', 'height').first()
+        models.VideoTranscodingJob.objects.select_for_update().filter(
+            pk=job_pk).first()
+        models.VideoRenditionJob.objects.filter(pk=rendition_pk).update(
+            status=status, error=error[:500], updated_on=_now())
+        _notify(job_pk, status, height)
+        if final:
+            _publish(job_pk)
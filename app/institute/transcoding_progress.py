@@ -0,0 +1,202 @@
+import json
+import logging
+import re
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# Encoding progress of a rendition is published at most once in this
+# many seconds
+TRANSCODING_PROGRESS_INTERVAL = getattr(
+    settings, 'TRANSCODING_PROGRESS_INTERVAL', 2)
+
+# Latest progress of uploads of teacher is kept this many seconds
+TRANSCODING_PROGRESS_TTL = 60 * 60 * 24
+
+# Upper bounds (seconds) of timing histogram buckets
+TIMING_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+# Timed stages, encoding is timed per rendition as encode_<height>p
+PROBE = 'probe'
+ENCODE = 'encode'
+PUBLISH = 'publish'
+
+# Channel layer event type, handled by consumer method of same name
+TRANSCODING_PROGRESS = 'transcoding_progress'
+
+_TIMING_KEY_PREFIX = 'transcoding-timings:'
+_FPS = re.compile(r'fps=\s*(\d+(\.\d+)?)')
+_SPEED = re.compile(r'speed=\s*(\d+(\.\d+)?)x')
+
+
+def uploader_group_name(user_pk):
+    """Returns channel layer group of clients of uploading teacher"""
+    return 'uploads-' + str(user_pk)
+
+
+def _progress_key(user_pk):
+    return 'transcoding-progress:' + str(user_pk)
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def publish_progress(user_pk, event):
+    """
+    Stores event as latest progress of its job and rendition (None for
+    whole job) in redis and sends it to connected clients of uploader
+    """
+    field = '{}:{}'.format(event['job'], event.get('rendition') or '')
+    pipe = _redis().pipeline()
+    pipe.hset(_progress_key(user_pk), field, json.dumps(event))
+    pipe.expire(_progress_key(user_pk), TRANSCODING_PROGRESS_TTL)
+    pipe.execute()
+
+    async_to_sync(get_channel_layer().group_send)(
+        uploader_group_name(user_pk),
+        {'type': TRANSCODING_PROGRESS, 'event': event})
+
+
+def notify_status(user_pk, job_pk, video_pk, status, rendition=None,
+                  **fields):
+    """
+    Publishes status of job or its rendition after current transaction
+    commits. Uploads without uploader are not published. Failure to
+    publish is logged, it never fails transcoding.
+    """
+    if not user_pk:
+        return
+
+    event = dict(job=job_pk, video=video_pk, rendition=rendition,
+                 status=status, **fields)
+
+    def send():
+        try:
+            publish_progress(user_pk, event)
+        except Exception:
+            logger.exception('Could not publish transcoding status')
+
+    transaction.on_commit(send)
+
+
+def get_progress(user_pk):
+    """Returns latest progress events of uploads of teacher"""
+    events = [json.loads(e)
+              for e in _redis().hvals(_progress_key(user_pk))]
+    return sorted(events, key=lambda e: (e['job'], e['rendition'] or 0))
+
+
+def progress_event(line, duration, time_, time_left):
+    """
+    Returns percent, fps, speed factor and eta in seconds parsed from
+    ffmpeg progress line, or None if line is not a progress line
+    """
+    if 'time=' not in line or not duration:
+        return None
+
+    fps = _FPS.search(line)
+    speed = _SPEED.search(line)
+    return {
+        'percent': min(100.0, round(time_ / float(duration) * 100, 1)),
+        'fps': float(fps.group(1)) if fps else None,
+        'speed': float(speed.group(1)) if speed else None,
+        'eta': max(0, round(time_left))
+    }
+
+
+class ProgressMonitor:
+    """
+    Ffmpeg monitor of encoding of rendition, publishes its progress at
+    most once in TRANSCODING_PROGRESS_INTERVAL seconds
+    """
+
+    def __init__(self, user_pk, job_pk, video_pk, rendition, status,
+                 duration=None):
+        self.user_pk = user_pk
+        self.job_pk = job_pk
+        self.video_pk = video_pk
+        self.rendition = rendition
+        self.status = status
+        self.duration = duration
+        self.published_at = None
+
+    def __call__(self, line, duration, time_, time_left, process):
+        now = time.monotonic()
+        if not self.user_pk or self.published_at is not None and\
+                now - self.published_at < TRANSCODING_PROGRESS_INTERVAL:
+            return
+
+        event = progress_event(line, self.duration or duration, time_,
+                               time_left)
+        if not event:
+            return
+
+        self.published_at = now
+        event.update(job=self.job_pk, video=self.video_pk,
+                     rendition=self.rendition, status=self.status)
+        # Exceptions would stop ffmpeg output from being read
+        try:
+            publish_progress(self.user_pk, event)
+        except Exception:
+            logger.exception('Could not publish transcoding progress')
+
+
+def timing_bucket(seconds):
+    """Returns histogram bucket of duration like '<=30' or '>3600'"""
+    for bound in TIMING_BUCKETS:
+        if seconds <= bound:
+            return '<=' + str(bound)
+    return '>' + str(TIMING_BUCKETS[-1])
+
+
+def record_timing(stage, seconds):
+    """Adds duration of stage to its timing histogram in redis"""
+    key = _TIMING_KEY_PREFIX + stage
+    try:
+        pipe = _redis().pipeline()
+        pipe.hincrby(key, timing_bucket(seconds))
+        pipe.hincrby(key, 'count')
+        pipe.hincrbyfloat(key, 'sum', seconds)
+        pipe.execute()
+    except Exception:
+        logger.exception('Could not record transcoding timing')
+
+
+@contextmanager
+def timed(stage):
+    """
+    Times block into histogram of stage and yields dict which gets its
+    elapsed seconds. Failed blocks are not recorded.
+    """
+    timing = dict()
+    started_at = time.monotonic()
+    yield timing
+    timing['seconds'] = time.monotonic() - started_at
+    record_timing(stage, timing['seconds'])
+
+
+def get_timing_histograms():
+    """
+    Returns dict of stage -> count, mean seconds and counts per bucket of
+    every timed stage
+    """
+    redis = _redis()
+    histograms = dict()
+    for key in redis.scan_iter(match=_TIMING_KEY_PREFIX + '*'):
+        values = {k.decode(): v for k, v in redis.hgetall(key).items()}
+        count = int(values.pop('count', 0))
+        total = float(values.pop('sum', 0))
+        histograms[key.decode()[len(_TIMING_KEY_PREFIX):]] = {
+            'count': count,
+            'mean': round(total / count, 3) if count else None,
+            'buckets': {b: int(c) for b, c in values.items()}
+        }
+    return histograms
@@ -96,9 +96,21 @@ urlpatterns = [
     path('<slug:institute_slug>/add-student-to-institute',
          views.AddStudentToInstituteView.as_view(),
          name="add-student-to-institute"),
+    path('<slug:institute_slug>/bulk-add-students-to-institute',
+         views.BulkAddStudentsToInstituteView.as_view(),
+         name="bulk-add-students-to-institute"),
+    path('bulk-add-students-status/<str:task_id>',
+         views.BulkAddStudentsStatusView.as_view(),
+         name="bulk-add-students-status"),
     path('<slug:institute_slug>/institute-student-list/<slug:student_type>',
          views.InstituteStudentListView.as_view(),
          name="institute-student-list"),
+    path('<slug:institute_slug>/export-institute-student-list/<slug:student_type>',
+         views.StudentRosterExportView.as_view(),
+         name="export-institute-student-list"),
+    path('export-student-list-status/<str:task_id>',
+         views.StudentRosterExportStatusView.as_view(),
+         name="export-student-list-status"),
     path('<slug:institute_slug>/edit-institute-student-details',
          views.EditInstituteStudentDetailsView.as_view(),
          name="edit-institute-student-details"),
@@ -136,6 +148,12 @@ urlpatterns = [
     path('<slug:institute_slug>/<slug:class_slug>/class-student-list/<slug:student_type>',
          views.InstituteClassStudentListView.as_view(),
          name="class-student-list"),
+    path('<slug:institute_slug>/<slug:class_slug>/export-class-student-list/<slug:student_type>',
+         views.StudentRosterExportView.as_view(),
+         name="export-class-student-list"),
+    path('<slug:institute_slug>/<slug:class_slug>/class-concept-mastery',
+         views.ClassConceptMasteryView.as_view(),
+         name="class-concept-mastery"),
     path('<slug:institute_slug>/<slug:class_slug>/add-student-to-class',
          views.AddStudentToClassView.as_view(),
          name="add-student-to-class"),
@@ -158,6 +176,9 @@ urlpatterns = [
     path('<slug:institute_slug>/<slug:class_slug>/<slug:subject_slug>/subject-student-list/<slug:student_type>',
          views.InstituteSubjectStudentListView.as_view(),
          name="subject-student-list"),
+    path('<slug:institute_slug>/<slug:class_slug>/<slug:subject_slug>/export-subject-student-list/<slug:student_type>',
+         views.StudentRosterExportView.as_view(),
+         name="export-subject-student-list"),
     path('<slug:institute_slug>/<slug:class_slug>/<slug:subject_slug>/add-student-to-subject',
          views.AddStudentToSubjectView.as_view(),
          name="add-student-to-subject"),
@@ -249,6 +270,30 @@ urlpatterns = [
     path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/<int:set_id>/edit-question-set',
          views.InstituteEditQuestionSetName.as_view(),
          name='edit-question-set'),
+    path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/<int:set_id>/mark-question-set-final',
+         views.InstituteMarkQuestionSetFinalView.as_view(),
+         name='mark-question-set-final'),
+    path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/issue-test-credentials',
+         views.IssueTestCredentialsView.as_view(),
+         name='issue-test-credentials'),
+    path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/test-credential-sheet/<str:token>',
+         views.TestCredentialSheetView.as_view(),
+         name='test-credential-sheet'),
+    path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/grade-test-submissions',
+         views.GradeTestSubmissionsView.as_view(),
+         name='grade-test-submissions'),
+    path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/test-login-stats',
+         views.TestLoginStatsView.as_view(),
+         name='test-login-stats'),
+    path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/test-concept-mastery',
+         views.TestConceptMasteryView.as_view(),
+         name='test-concept-mastery'),
+    path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/<int:set_id>/import-question-bank',
+         views.ImportQuestionBankView.as_view(),
+         name='import-question-bank'),
+    path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/export-question-bank',
+         views.ExportQuestionBankView.as_view(),
+         name='export-question-bank'),
     path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/<int:set_id>/delete-question-set',
          views.InstituteDeleteQuestionSet.as_view(),
          name='delete-question-set'),
@@ -276,6 +321,12 @@ urlpatterns = [
     path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/<int:set_id>/upload-file-question-paper',
          views.InstituteUploadFileQuestionPaperView.as_view(),
          name='upload-file-question-paper'),
+    path('<slug:subject_slug>/create-chunked-upload',
+         views.CreateChunkedUploadView.as_view(),
+         name='create-chunked-upload'),
+    path('chunked-upload/<uuid:upload_id>',
+         views.ChunkedUploadView.as_view(),
+         name='chunked-upload'),
     path('<slug:institute_slug>/<slug:subject_slug>/<slug:test_slug>/<int:set_id>/delete-file-question-paper',
          views.InstituteDeleteFileQuestionPaperView.as_view(),
          name='delete-file-question-paper'),
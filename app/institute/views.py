@@ -1,17 +1,20 @@
 import os
 import datetime
+import json
 from decimal import Decimal
 import time
 from math import ceil
 
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.db.models import Max, Q, F
+from django.http import HttpResponse, HttpResponseNotModified,\
+    StreamingHttpResponse
 from django.utils import timezone
+from django.utils.http import parse_etags
 from django.utils.translation import ugettext as _
 from django.shortcuts import get_object_or_404
 
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import permissions, status
 from rest_framework.views import APIView
@@ -24,51 +27,52 @@ import filetype
 from razorpay.errors import SignatureVerificationError
 from PIL import Image
 
-import ffmpeg_streaming
-from ffmpeg_streaming import Formats, Bitrate, Representation, Size, FFProbe
+from celery.result import AsyncResult
 
 from . import serializer
+from .access import get_access
+from .export import CLASS_ROSTER, EXPORT_FILE_TYPES, INSTITUTE_ROSTER,\
+    SUBJECT_ROSTER, export_lines
+from .roster import ORDERING_FIELDS, class_roster, get_page_size,\
+    institute_roster, subject_roster
+from .question_paper import TEACHER_PAPER, assemble_question_paper,\
+    compile_paper_snapshot, get_media_prefix, get_paper_snapshot,\
+    invalidate_paper_snapshot
+from .license import get_active_common_license,\
+    get_active_or_expired_common_license
+from .onboarding import IMPORT_FILE_TYPES, StudentImport,\
+    check_student_limit, parse_rows
+from .allocation import ROUND_ROBIN
+from .chunked_upload import CHUNKED_UPLOAD_MAX_CHUNK_SIZE, assembled_file,\
+    create_upload, delete_upload, write_chunk
+from .credentials import issue_test_credentials, pop_credential_sheet,\
+    store_credential_sheet
+from .concept_mastery import get_class_concept_mastery, get_concept_matrix
+from .login_stats import get_login_rollups
+from .media_store import store_blob
+from .question_bank import BANK_FILE_TYPES, export_bank_lines, import_bank,\
+    parse_bank, validate_bank
+from .tasks import export_student_roster, grade_test_submissions,\
+    import_institute_students, transcode_video
+from .transcoding import create_transcoding_job
 from app.settings import client, MEDIA_URL, MEDIA_ROOT
 from core import models
-
-
-def get_active_or_expired_common_license(institute):
-    """Returns common license order if order is active or expired"""
-    order = models.InstituteCommonLicenseOrderDetails.objects.filter(
-        institute=institute,
-        paid=True
-    ).order_by('-order_created_on').first()
-
-    if not order:
-        return None
-    else:
-        return order
-
-
-def get_active_common_license(institute):
-    """Returns license order if institute has active license else returns None"""
-    order = models.InstituteCommonLicenseOrderDetails.objects.filter(
-        institute=institute,
-        paid=True,
-        active=True
-    ).order_by('order_created_on').first()
-
-    if not order or (int(time.time()) * 1000 > order.end_date):
-        return None
-    else:
-        return order
+from core.authentication import CachedTokenAuthentication
+from core.slug_map import resolve_slug_path
+from core.subject_access import can_view_subject
 
 
 def get_institute_stats_and_validate(institute, size=None):
     """
     Returns institute statistics if validation success else return error response
     """
-    stats = models.InstituteStatistics.objects.filter(institute=institute).first()
     order = get_active_common_license(institute)
     if not order:
         return Response({'error': _('License not found.')},
                         status=status.HTTP_400_BAD_REQUEST)
-    elif size:
+
+    stats = models.InstituteStatistics.objects.filter(institute=institute).first()
+    if size:
         if stats.storage > order.selected_license.storage:
             return Response({'error': _('Maximum storage limit reached. To get more storage contact us.')},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -78,12 +82,6 @@ def get_institute_stats_and_validate(institute, size=None):
     return stats
 
 
-def monitor(ffmpeg, duration, time_, time_left, process):
-    """Realtime information about ffmpeg transcoding process"""
-    per = round(time_ / duration * 100)
-    print('*' * per + str(per) + '% completed')
-
-
 def get_file_lecture_material_data(data, data_notation, base_url, size=None):
     """
     Creates and returns image content data dict,
@@ -106,6 +104,150 @@ def get_file_lecture_material_data(data, data_notation, base_url, size=None):
             return {}
 
 
+def get_video_lecture_material_data(data, base_url):
+    """Creates and returns video lecture material data with transcoding status"""
+    if not data:
+        return {}
+
+    response = {
+        'id': data.pk,
+        'can_download': data.can_download,
+        'error_transcoding': data.error_transcoding,
+        'bit_rate': data.bit_rate
+    }
+    job = models.VideoTranscodingJob.objects.filter(
+        video__pk=data.pk).only('status').first()
+    if job:
+        response['transcoding_status'] = job.status
+    if data.duration:
+        response['duration'] = data.duration
+    if data.stream_file:
+        response['stream_file'] = base_url + data.stream_file
+    if data.can_download or data.error_transcoding:
+        response['file'] = base_url + str(data.file)
+    return response
+
+
+LECTURE_FILE_MATERIAL_TYPES = (
+    models.SubjectLectureMaterialsContentType.IMAGE,
+    models.SubjectLectureMaterialsContentType.PDF,
+    models.SubjectLectureMaterialsContentType.VIDEO
+)
+
+
+def add_storage_usage(institute_stats, subject, size, stored_as_blob=False):
+    """
+    Adds size in bytes of saved file to storage used by institute and subject.
+    Size of file stored as blob is added to institute by media store only when
+    its content is first stored.
+    """
+    if not stored_as_blob:
+        institute_stats.storage = Decimal(float(institute_stats.storage) + size / 1000000000)
+        institute_stats.save()
+    models.InstituteSubjectStatistics.objects.filter(
+        statistics_subject=subject
+    ).update(storage=F('storage') + Decimal(size / 1000000000))
+
+
+def add_lecture_file_material(request, subject, institute_stats, material, file, can_download):
+    """
+    Validates image, pdf or video file of lecture material, saves it with
+    serializer of its content type and adds it to storage used. Image and
+    pdf files reference blob of their content, so same file uploaded again
+    is stored once. Transcoding of video is queued. Returns (material data,
+    error response), data is None if file was not saved.
+    """
+    if material.content_type == models.SubjectLectureMaterialsContentType.IMAGE:
+        validation_error = validate_image_file(file)
+        material_serializer = serializer.SubjectLectureImageSerializer
+    elif material.content_type == models.SubjectLectureMaterialsContentType.PDF:
+        validation_error = validate_pdf_file(file, str(getattr(file, 'name', '')))
+        material_serializer = serializer.SubjectLecturePdfSerializer
+    else:
+        validation_error = validate_video_file(file)
+        material_serializer = serializer.SubjectLectureVideoSerializer
+
+    if validation_error:
+        return None, validation_error
+
+    ser = material_serializer(data={
+        "lecture_material": material.pk,
+        "file": file,
+        "can_download": can_download
+    })
+
+    if not ser.is_valid():
+        return None, None
+
+    if material.content_type == models.SubjectLectureMaterialsContentType.VIDEO:
+        with transaction.atomic():
+            instance = ser.save()
+            job = create_transcoding_job(instance, request.user)
+            transaction.on_commit(lambda: transcode_video.delay(job.pk))
+    else:
+        blob, _created = store_blob(subject.subject_class.class_institute.pk, file)
+        try:
+            instance = ser.save(file=blob.file.name, blob=blob)
+        except Exception:
+            models.release_media_blob(blob.pk)
+            raise
+
+    add_storage_usage(institute_stats, subject, file.size,
+                      material.content_type != models.SubjectLectureMaterialsContentType.VIDEO)
+
+    if material.content_type == models.SubjectLectureMaterialsContentType.VIDEO:
+        return get_video_lecture_material_data(
+            instance, request.build_absolute_uri('/').strip('/') + MEDIA_URL), None
+    return get_file_lecture_material_data(ser.data, 'SER', ''), None
+
+
+def add_file_question_paper(request, subject, institute_stats, test, test_set, file):
+    """Saves pdf question paper of set and adds it to storage used"""
+    try:
+        ser = serializer.SubjectTestFileQuestionPaperUploadSerializer(
+            data={
+                'file': file,
+                'test': test.pk,
+                'set': test_set.pk
+            }, context={'request': request}
+        )
+        if ser.is_valid():
+            ser.save()
+            add_storage_usage(institute_stats, subject, file.size)
+
+            return Response({
+                'id': ser.data['id'],
+                'file': ser.data['file']
+            }, status=status.HTTP_201_CREATED)
+        else:
+            return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
+    except IntegrityError as e:
+        if 'unique_question_paper_for_single_question_set' in str(e):
+            return Response({'error': _('Question paper for this question set already uploaded. Please refresh.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+        else:
+            return Response({'error': _('Unhandled error occurred.')},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except Exception:
+        return Response({'error': _('Unhandled error occurred.')},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def is_question_set_final(question_pk=None, section_pk=None):
+    """
+    Returns True if question set of typed question or of question section is
+    marked as final. Compiled snapshot of final set holds its answer key, so it
+    can not be edited till it is un-finalized.
+    """
+    question_sets = models.SubjectTestSets.objects.filter(mark_as_final=True)
+    if question_pk is not None:
+        question_sets = question_sets.filter(
+            question_section_set__typed_test_question_section__pk=question_pk)
+    else:
+        question_sets = question_sets.filter(question_section_set__pk=section_pk)
+    return question_sets.exists()
+
+
 def get_study_material_content_details(data, data_notation):
     """
     Creates and returns study material data.
@@ -264,6 +406,21 @@ def validate_pdf_file(file, raw_file):
     return None
 
 
+def validate_video_file(file):
+    """Checking whether the file is video file"""
+    try:
+        if not file:
+            return Response({'error': _('File is required.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+        elif not filetype.is_video(file):
+            return Response({'error': _('Not a valid video file.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+    except Exception:
+        return Response({'error': _('An internal error occurred')},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return None
+
+
 class IsTeacher(permissions.BasePermission):
     """Permission that allows only teacher to access this view"""
 
@@ -299,7 +456,7 @@ class IsStudent(permissions.BasePermission):
 
 class GetInstituteDiscountCouponView(APIView):
     """View to get institute discount coupon"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -341,7 +498,7 @@ class InstituteLicenseCostView(ListAPIView):
     """
     View for getting cost of institute storage license
     """
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -378,7 +535,7 @@ class InstituteLicenseCostView(ListAPIView):
 
 class InstituteCreateStorageLicenseOrderView(APIView):
     """View for creating storage license order"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -473,7 +630,7 @@ class RazorpayStoragePaymentCallbackView(APIView):
     View for storing storage payment callback data
     and checking whether payment was successful
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -544,7 +701,7 @@ class RazorpayStoragePaymentCallbackView(APIView):
 
 class DeleteUnpaidStorageLicenseView(APIView):
     """View for deleting unpaid storage license"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -580,7 +737,7 @@ class DeleteUnpaidStorageLicenseView(APIView):
 
 class StorageLicenseCredentialsForRetryPaymentView(APIView):
     """View for getting storage license credentials for retrying payment"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -627,7 +784,7 @@ class InstituteCommonLicenseListView(ListAPIView):
     """
     View for getting list of all available common institute license
     """
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, IsTeacher)
     serializer_class = serializer.InstituteLicenseListSerializer
 
@@ -663,7 +820,7 @@ class InstituteCommonLicenseDetailView(APIView):
     """
     View for getting institute common license details
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -716,7 +873,7 @@ class InstituteCommonLicenseDetailView(APIView):
 
 class InstituteSelectCommonLicenseView(APIView):
     """View for selecting institute common license"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -808,7 +965,7 @@ class InstituteSelectCommonLicenseView(APIView):
 
 class InstituteCreateCommonLicenseOrderView(APIView):
     """View for creating common license order"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -918,7 +1075,7 @@ class RazorpayCommonLicensePaymentCallbackView(APIView):
     View for storing payment callback data
     and checking whether payment was successful
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -1017,7 +1174,7 @@ class RazorpayWebhookCallbackView(APIView):
 
 class InstituteOrderedLicenseOrderDetailsView(APIView):
     """View for getting list of license orders"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -1223,7 +1380,7 @@ class InstituteOrderedLicenseOrderDetailsView(APIView):
 
 class InstituteSelectedCommonLicenseDetailsView(APIView):
     """View for getting institute selected common license details"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -1285,7 +1442,7 @@ class InstituteSelectedCommonLicenseDetailsView(APIView):
 
 class DeleteUnpaidCommonLicenseView(APIView):
     """View for deleting unpaid common license"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -1323,7 +1480,7 @@ class DeleteUnpaidCommonLicenseView(APIView):
 
 class CommonLicenseCredentialsForRetryPaymentView(APIView):
     """View for getting common license credentials for retrying payment"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -1388,7 +1545,7 @@ class CommonLicenseCredentialsForRetryPaymentView(APIView):
 
 class InstituteMinLicenseStatisticsView(APIView):
     """View for returning minimum license statistics of the institute"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -1427,7 +1584,7 @@ class InstituteMinDetailsStudentView(ListAPIView):
     """
     View for getting min details of institute by student
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsStudent)
     serializer_class = serializer.InstituteMinDetailsStudentSerializer
     queryset = models.Institute.objects.all()
@@ -1472,7 +1629,7 @@ class InstituteMinDetailsTeacherView(ListAPIView):
     View for getting the min details of institute
     by admin teacher
     """
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, IsTeacher)
     serializer_class = serializer.InstituteMinDetailsSerializer
     queryset = models.Institute.objects.all()
@@ -1495,7 +1652,7 @@ class InstituteMinDetailsTeacherView(ListAPIView):
 class InstituteJoinedMinDetailsTeacherView(ListAPIView):
     """
     View for getting the min details of joined institutes"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, IsTeacher)
     serializer_class = serializer.InstitutesJoinedMinDetailsTeacher
     queryset = models.Institute.objects.all()
@@ -1521,7 +1678,7 @@ class InstituteJoinedMinDetailsTeacherView(ListAPIView):
 
 class InstitutePendingInviteMinDetailsTeacherView(ListAPIView):
     """View for getting the min details of active invites by institutes"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, IsTeacher)
     serializer_class = serializer.InstitutePendingInviteMinDetailsSerializer
     queryset = models.Institute.objects.all()
@@ -1547,7 +1704,7 @@ class InstitutePendingInviteMinDetailsTeacherView(ListAPIView):
 
 class AddStudentToInstituteView(APIView):
     """View for adding user to institute by admin"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -1638,9 +1795,91 @@ class AddStudentToInstituteView(APIView):
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BulkAddStudentsToInstituteView(APIView):
+    """
+    View for adding students to institute in bulk by admin. Takes csv or
+    json file ('file') or json list ('students') and queues import job.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+    parser_classes = (JSONParser, MultiPartParser)
+
+    def post(self, request, *args, **kwargs):
+        path = resolve_slug_path(kwargs.get('institute_slug'))
+
+        if not path:
+            return Response({'error': _('Institute not found.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if not get_access(request).is_admin(path.institute):
+            return Response({'error': _('Permission denied.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        order = get_active_common_license(path.institute)
+        if not order:
+            return Response({'error': _('License not found or expired.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            if request.data.get('file'):
+                file = request.data['file']
+                file_type = os.path.splitext(file.name)[1][1:].lower()
+                if file_type not in IMPORT_FILE_TYPES:
+                    raise ValueError(
+                        _('Only csv and json files are supported.'))
+                rows = parse_rows(file.read(), file_type)
+            else:
+                rows = parse_rows(request.data.get('students'), 'json')
+
+            # Only new students are counted, as in import job, so
+            # invalid, repeated and already added rows are not
+            student_limit = order.selected_license.no_of_student
+            valid = StudentImport(
+                path.institute, request.user.pk, rows).validate()
+            check_student_limit(path.institute, student_limit, len(valid))
+        except ValueError as e:
+            return Response({'error': str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        task = import_institute_students.delay(
+            request.user.pk, path.institute, rows, student_limit)
+
+        return Response({'task_id': task.id, 'total': len(rows)},
+                        status=status.HTTP_202_ACCEPTED)
+
+
+class BulkAddStudentsStatusView(APIView):
+    """View for getting progress and report of queued student import"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def get(self, *args, **kwargs):
+        result = AsyncResult(kwargs.get('task_id'))
+
+        if result.state == 'PROGRESS':
+            return Response({'status': result.state, **result.info},
+                            status=status.HTTP_200_OK)
+
+        if not result.successful():
+            return Response({'status': result.state},
+                            status=status.HTTP_200_OK)
+
+        if result.result.get('user') != self.request.user.pk:
+            return Response({'error': _('Permission denied.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = {'status': result.state}
+        if result.result.get('error'):
+            response['error'] = result.result['error']
+        else:
+            response['report'] = result.result['report']
+
+        return Response(response, status=status.HTTP_200_OK)
+
+
 class EditInstituteStudentDetailsView(APIView):
     """View for editing student details by admin"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -1697,7 +1936,7 @@ class EditInstituteStudentDetailsView(APIView):
 
 class InstituteStudentListView(APIView):
     """View for getting active and invited student list by permitted user"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -1724,111 +1963,45 @@ class InstituteStudentListView(APIView):
             return Response({'error': _('License not found or expired.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        student_list = None
-        if kwargs.get('student_type') == 'active':
-            student_list = models.InstituteStudents.objects.filter(
-                institute__pk=institute.pk,
-                active=True,
-                is_banned=False
-            ).defer('inviter', 'edited', 'is_banned').order_by('registration_no')
-        elif kwargs.get('student_type') == 'inactive':
-            student_list = models.InstituteStudents.objects.filter(
-                institute__pk=institute.pk,
-                active=False,
-                is_banned=False
-            ).defer('inviter', 'edited', 'is_banned').order_by('registration_no')
-        elif kwargs.get('student_type') == 'banned':
-            student_list = models.InstituteStudents.objects.filter(
-                institute__pk=institute.pk,
-                is_banned=True
-            ).defer('inviter', 'edited', 'is_banned').order_by('registration_no')
-        response = list()
-
-        for s in student_list:
-            res = dict()
-            res['invitee_email'] = str(s.invitee)
-            res['id'] = s.pk
-            res['first_name'] = s.first_name
-            res['last_name'] = s.last_name
-            res['gender'] = s.gender
-            res['date_of_birth'] = s.date_of_birth
-            res['enrollment_no'] = s.enrollment_no
-            res['registration_no'] = s.registration_no
-            res['created_on'] = str(s.created_on)
-            res['image'] = ''
-
-            if s.is_banned:
-                res['is_banned'] = s.is_banned
-                ban_details = models.InstituteBannedStudent.objects.filter(
-                    institute_student__invitee=s.invitee,
-                    banned_institute__pk=institute.pk
-                ).first()
-                res['banning_reason'] = ban_details.reason
-                res['banned_on'] = str(ban_details.created_on)
-                res['ban_start_date'] = str(ban_details.start_date)
-                res['active'] = s.active
-
-                if ban_details.banned_by.user_profile.first_name:
-                    first_name = ban_details.banned_by.user_profile.first_name
-                    last_name = ban_details.banned_by.user_profile.last_name
-                    res['banned_by'] = first_name + ' ' + last_name
-                else:
-                    res['banned_by'] = str(ban_details.banned_by)
-
-                if ban_details.end_date:
-                    res['ban_end_date'] = str(ban_details.end_date)
-
-            class_invite = models.InstituteClassStudents.objects.filter(
-                institute_student__invitee__pk=s.invitee.pk
-            ).only('institute_class').first()
-
-            if class_invite:
-                res['class_name'] = class_invite.institute_class.name
-
-            response.append(res)
+        try:
+            page = institute_roster(
+                institute.pk, kwargs.get('student_type')
+            ).search(
+                self.request.query_params.get('search')
+            ).filter(
+                gender=self.request.query_params.get('gender')
+            ).page(
+                ordering=self.request.query_params.get('ordering'),
+                cursor=self.request.query_params.get('cursor'),
+                limit=get_page_size(self.request.query_params.get('limit'))
+            )
+        except ValueError as e:
+            return Response({'error': str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({
-            'data': response,
-            'requester_role': requester_perm.role
-        }, status=status.HTTP_200_OK)
+        page['requester_role'] = requester_perm.role
+        return Response(page, status=status.HTTP_200_OK)
 
 
 class AddStudentToClassView(APIView):
     """View for adding user to class by admin or class staff"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
-        institute = models.Institute.objects.filter(
-            institute_slug=kwargs.get('institute_slug')
-        ).only('name').first()
-
-        if not institute:
-            return Response({'error': _('Institute not found.')},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-        class_ = models.InstituteClass.objects.filter(
-            class_slug=kwargs.get('class_slug')
-        ).only('name').first()
+        path = resolve_slug_path(
+            kwargs.get('institute_slug'),
+            kwargs.get('class_slug'))
 
-        if not class_:
+        if not path:
             return Response({'error': _('Class not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        if not models.InstituteClassPermission.objects.filter(
-            invitee=self.request.user,
-            to__pk=class_.pk
-        ).exists():
-            if not models.InstitutePermission.objects.filter(
-                invitee=self.request.user,
-                institute__pk=institute.pk,
-                active=True,
-                role=models.InstituteRole.ADMIN
-            ).exists():
-                return Response({'error': _('Permission denied.')},
-                                status=status.HTTP_400_BAD_REQUEST)
+        if not get_access(self.request).can_manage_class(path.institute, path.class_):
+            return Response({'error': _('Permission denied.')},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        order = get_active_common_license(institute)
+        order = get_active_common_license(path.institute)
         if not order:
             return Response({'error': _('License not found or expired.')},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -1848,7 +2021,7 @@ class AddStudentToClassView(APIView):
         try:
             institute_student = models.InstituteStudents.objects.filter(
                 invitee__pk=invitee.pk,
-                institute__pk=institute.pk
+                institute__pk=path.institute
             ).only('first_name', 'last_name', 'enrollment_no',
                    'registration_no', 'gender', 'date_of_birth').first()
             active_student = False
@@ -1862,11 +2035,11 @@ class AddStudentToClassView(APIView):
                 institute_student = models.InstituteStudents.objects.create(
                     invitee=invitee,
                     inviter=self.request.user,
-                    institute=institute,
+                    institute_id=path.institute,
                     enrollment_no=request.data.get('enrollment_no')
                 )
             class_student = models.InstituteClassStudents.objects.create(
-                institute_class=class_,
+                institute_class_id=path.class_,
                 institute_student=institute_student,
                 inviter=self.request.user,
                 active=active_student
@@ -1900,164 +2073,69 @@ class InstituteClassStudentListView(APIView):
     View for getting active and inactive student list
     by permitted user (admin and class staff)
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
-        institute = models.Institute.objects.filter(
-            institute_slug=kwargs.get('institute_slug')
-        ).only('name').first()
+        path = resolve_slug_path(
+            kwargs.get('institute_slug'),
+            kwargs.get('class_slug'))
 
-        if not institute:
-            return Response({'error': _('Institute not found.')},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-        class_ = models.InstituteClass.objects.filter(
-            class_slug=kwargs.get('class_slug')
-        ).only('class_institute').first()
-
-        if not class_:
+        if not path:
             return Response({'error': _('Class not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        has_class_perm = False
-        requester_perm = models.InstitutePermission.objects.filter(
-            institute__pk=institute.pk,
-            invitee=self.request.user,
-            active=True
-        ).only('role').first()
-
-        if not requester_perm:
+        access = get_access(self.request)
+        if not access.role(path.institute):
             return Response({'error': _('Permission denied.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        if models.InstituteClassPermission.objects.filter(
-            to__pk=class_.pk,
-            invitee=self.request.user
-        ).exists():
-            has_class_perm = True
-
-        order = get_active_common_license(institute)
+        order = get_active_common_license(path.institute)
         if not order:
             return Response({'error': _('License not found or expired.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        student_list = None
-        if kwargs.get('student_type') == 'active':
-            student_list = models.InstituteClassStudents.objects.filter(
-                institute_class__pk=class_.pk,
-                active=True,
-                is_banned=False
-            ).only('institute_student', 'created_on', 'is_banned').order_by(
-                'institute_student__enrollment_no')
-        elif kwargs.get('student_type') == 'inactive':
-            student_list = models.InstituteClassStudents.objects.filter(
-                institute_class__pk=class_.pk,
-                active=False,
-                is_banned=False
-            ).only('institute_student', 'created_on', 'is_banned').order_by(
-                'institute_student__enrollment_no')
-        elif kwargs.get('student_type') == 'banned':
-            student_list = models.InstituteClassStudents.objects.filter(
-                institute_class__pk=class_.pk,
-                active=True,
-                is_banned=True
-            ).only('institute_student', 'created_on', 'is_banned').order_by(
-                'institute_student__enrollment_no')
-        response = list()
-
-        for s in student_list:
-            res = dict()
-            res['invitee_email'] = str(s.institute_student.invitee)
-            res['created_on'] = s.created_on
-            res['is_banned'] = s.is_banned
-
-            res['id'] = s.institute_student.pk
-            res['first_name'] = s.institute_student.first_name
-            res['last_name'] = s.institute_student.last_name
-            res['gender'] = s.institute_student.gender
-            res['date_of_birth'] = s.institute_student.date_of_birth
-            res['enrollment_no'] = s.institute_student.enrollment_no
-            res['registration_no'] = s.institute_student.registration_no
-            res['image'] = ''
-
-            if s.is_banned:
-                ban_details = models.InstituteClassBannedStudent.objects.filter(
-                    institute_student__invitee=s.institute_student.invitee,
-                    banned_class__pk=class_.pk,
-                    active=True
-                ).first()
-                res['banning_reason'] = ban_details.reason
-                res['banned_on'] = ban_details.created_on
-                res['ban_start_date'] = ban_details.start_date
-
-                if ban_details.banned_by.user_profile.first_name:
-                    first_name = ban_details.banned_by.user_profile.first_name
-                    last_name = ban_details.banned_by.user_profile.last_name
-                    res['banned_by'] = first_name + ' ' + last_name
-                else:
-                    res['banned_by'] = ban_details.banned_by
-
-                if ban_details.end_date != models.UNLIMITED:
-                    res['ban_end_date'] = ban_details.end_date
-
-            response.append(res)
+        try:
+            page = class_roster(
+                path.class_, kwargs.get('student_type')
+            ).search(
+                self.request.query_params.get('search')
+            ).filter(
+                gender=self.request.query_params.get('gender')
+            ).page(
+                ordering=self.request.query_params.get('ordering'),
+                cursor=self.request.query_params.get('cursor'),
+                limit=get_page_size(self.request.query_params.get('limit'))
+            )
+        except ValueError as e:
+            return Response({'error': str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({
-            'data': response,
-            'requester_role': requester_perm.role,
-            'has_perm': has_class_perm
-        }, status=status.HTTP_200_OK)
+        page['requester_role'] = access.role(path.institute)
+        page['has_perm'] = access.has_class_perm(path.class_)
+        return Response(page, status=status.HTTP_200_OK)
 
 
 class AddStudentToSubjectView(APIView):
     """View for adding user to subject by permitted faculty, admin or class staff"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
-        institute = models.Institute.objects.filter(
-            institute_slug=kwargs.get('institute_slug')
-        ).only('name').first()
-
-        if not institute:
-            return Response({'error': _('Institute not found.')},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-        class_ = models.InstituteClass.objects.filter(
-            class_slug=kwargs.get('class_slug')
-        ).only('name').first()
-
-        if not class_:
-            return Response({'error': _('Class not found.')},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-        subject = models.InstituteSubject.objects.filter(
-            subject_slug=kwargs.get('subject_slug')
-        ).only('name').first()
+        path = resolve_slug_path(
+            kwargs.get('institute_slug'),
+            kwargs.get('class_slug'),
+            kwargs.get('subject_slug'))
 
-        if not subject:
+        if not path:
             return Response({'error': _('Subject not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        if not models.InstituteSubjectPermission.objects.filter(
-                invitee=self.request.user,
-                to__pk=subject.pk,
-        ).exists():
-            if not models.InstituteClassPermission.objects.filter(
-                    invitee=self.request.user,
-                    to__pk=class_.pk
-            ).exists():
-                if not models.InstitutePermission.objects.filter(
-                    invitee=self.request.user,
-                    institute__pk=institute.pk,
-                    role=models.InstituteRole.ADMIN,
-                    active=True
-                ).exists():
-                    return Response({'error': _('Permission denied.')},
-                                    status=status.HTTP_400_BAD_REQUEST)
+        if not get_access(self.request).can_manage_subject(path.institute, path.class_, path.subject):
+            return Response({'error': _('Permission denied.')},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        order = get_active_common_license(institute)
+        order = get_active_common_license(path.institute)
         if not order:
             return Response({'error': _('License not found or expired.')},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -2079,7 +2157,7 @@ class AddStudentToSubjectView(APIView):
         try:
             institute_student = models.InstituteStudents.objects.filter(
                 invitee=invitee,
-                institute__pk=institute.pk
+                institute__pk=path.institute
             ).only('first_name', 'last_name', 'enrollment_no',
                    'registration_no', 'gender', 'date_of_birth').first()
 
@@ -2090,27 +2168,27 @@ class AddStudentToSubjectView(APIView):
                 institute_student = models.InstituteStudents.objects.create(
                     invitee=invitee,
                     inviter=self.request.user,
-                    institute=institute
+                    institute_id=path.institute
                 )
 
             subject_student = None
             if not models.InstituteClassStudents.objects.filter(
-                institute_class__pk=class_.pk,
+                institute_class__pk=path.class_,
                 institute_student__invitee__pk=invitee.pk
             ).exists():
                 models.InstituteClassStudents.objects.create(
-                    institute_class=class_,
+                    institute_class_id=path.class_,
                     institute_student=institute_student,
                     inviter=self.request.user,
                     active=student_is_active
                 )
                 subject_student = models.InstituteSubjectStudents.objects.filter(
-                    institute_subject__pk=subject.pk,
+                    institute_subject__pk=path.subject,
                     institute_student__invitee__pk=invitee.pk
                 ).only('active', 'created_on').first()
             else:
                 subject_student = models.InstituteSubjectStudents.objects.create(
-                    institute_subject=subject,
+                    institute_subject_id=path.subject,
                     institute_student=institute_student,
                     inviter=self.request.user,
                     active=student_is_active
@@ -2143,135 +2221,165 @@ class InstituteSubjectStudentListView(APIView):
     View for getting active and inactive student list
     by permitted user (admin and class staff)
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
-        institute = models.Institute.objects.filter(
-            institute_slug=kwargs.get('institute_slug')
-        ).only('name').first()
+        path = resolve_slug_path(
+            kwargs.get('institute_slug'),
+            kwargs.get('class_slug'),
+            kwargs.get('subject_slug'))
 
-        if not institute:
-            return Response({'error': _('Institute not found.')},
+        if not path:
+            return Response({'error': _('Subject not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        class_ = models.InstituteClass.objects.filter(
-            class_slug=kwargs.get('class_slug')
-        ).only('name').first()
-
-        if not class_:
-            return Response({'error': _('Class not found.')},
+        access = get_access(self.request)
+        if not access.can_manage_subject(path.institute, path.class_, path.subject):
+            return Response({'error': _('Permission denied.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        subject = models.InstituteSubject.objects.filter(
-            subject_slug=kwargs.get('subject_slug')
-        ).only('name').first()
+        order = get_active_common_license(path.institute)
+        if not order:
+            return Response({'error': _('License not found or expired.')},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        if not subject:
-            return Response({'error': _('Subject not found.')},
+        try:
+            page = subject_roster(
+                path.subject, kwargs.get('student_type')
+            ).search(
+                self.request.query_params.get('search')
+            ).filter(
+                gender=self.request.query_params.get('gender')
+            ).page(
+                ordering=self.request.query_params.get('ordering'),
+                cursor=self.request.query_params.get('cursor'),
+                limit=get_page_size(self.request.query_params.get('limit'))
+            )
+        except ValueError as e:
+            return Response({'error': str(e)},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        has_subject_perm = False
-        perm = models.InstitutePermission.objects.filter(
-            invitee=self.request.user,
-            institute__pk=institute.pk,
-            active=True
-        ).only('role').first()
+        page['requester_role'] = access.role(path.institute)
+        page['has_perm'] = access.has_subject_perm(path.subject)
+        return Response(page, status=status.HTTP_200_OK)
 
-        if not perm or perm.role != models.InstituteRole.ADMIN:
-            if not models.InstituteSubjectPermission.objects.filter(
-                invitee=self.request.user,
-                to__pk=subject.pk
-            ).exists():
-                if not models.InstituteClassPermission.objects.filter(
-                    invitee=self.request.user,
-                    to__pk=class_.pk
-                ).exists():
-                    return Response({'error': _('Permission denied.')},
-                                    status=status.HTTP_400_BAD_REQUEST)
-            else:
-                has_subject_perm = True
 
-        if not has_subject_perm and models.InstituteSubjectPermission.objects.filter(
-            invitee=self.request.user,
-            to__pk=subject.pk
-        ).exists():
-            has_subject_perm = True
+class StudentRosterExportView(APIView):
+    """
+    View for exporting institute, class or subject student list as csv or
+    ndjson by admin (institute), class in-charge (class) or subject
+    in-charge (subject). GET streams the file, POST queues export job.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
 
-        order = get_active_common_license(institute)
-        if not order:
-            return Response({'error': _('License not found or expired.')},
+    def _get_roster(self, kwargs):
+        """Returns (kind, pk) of permitted roster or error response"""
+        path = resolve_slug_path(
+            kwargs.get('institute_slug'),
+            kwargs.get('class_slug'),
+            kwargs.get('subject_slug'))
+
+        if not path:
+            return None, Response({'error': _('Not found.')},
+                                  status=status.HTTP_400_BAD_REQUEST)
+
+        access = get_access(self.request)
+        if path.subject:
+            kind, pk = SUBJECT_ROSTER, path.subject
+            permitted = access.can_manage_subject(
+                path.institute, path.class_, path.subject)
+        elif path.class_:
+            kind, pk = CLASS_ROSTER, path.class_
+            permitted = access.can_manage_class(path.institute, path.class_)
+        else:
+            kind, pk = INSTITUTE_ROSTER, path.institute
+            permitted = access.is_admin(path.institute)
+
+        if not permitted:
+            return None, Response({'error': _('Permission denied.')},
+                                  status=status.HTTP_400_BAD_REQUEST)
+
+        if not get_active_common_license(path.institute):
+            return None, Response({'error': _('License not found or expired.')},
+                                  status=status.HTTP_400_BAD_REQUEST)
+
+        return (kind, pk), None
+
+    def get(self, request, *args, **kwargs):
+        roster, error = self._get_roster(kwargs)
+        if error:
+            return error
+
+        file_type = request.query_params.get('file_type', 'csv')
+        try:
+            lines = export_lines(
+                *roster,
+                kwargs.get('student_type'),
+                file_type,
+                request.query_params.get('ordering'))
+        except ValueError as e:
+            return Response({'error': str(e)},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        student_list = None
-        if kwargs.get('student_type') == 'active':
-            student_list = models.InstituteSubjectStudents.objects.filter(
-                institute_subject__pk=subject.pk,
-                active=True,
-                is_banned=False
-            ).only('institute_student', 'created_on', 'is_banned').order_by(
-                'institute_student__enrollment_no')
-        elif kwargs.get('student_type') == 'inactive':
-            student_list = models.InstituteSubjectStudents.objects.filter(
-                institute_subject__pk=subject.pk,
-                active=False,
-                is_banned=False
-            ).only('institute_student', 'created_on', 'is_banned').order_by(
-                'institute_student__enrollment_no')
-        elif kwargs.get('student_type') == 'banned':
-            student_list = models.InstituteSubjectStudents.objects.filter(
-                institute_subject__pk=subject.pk,
-                is_banned=True
-            ).only('institute_student', 'created_on', 'active', 'is_banned').order_by(
-                'institute_student__enrollment_no')
-        response = list()
+        response = StreamingHttpResponse(
+            lines, content_type=EXPORT_FILE_TYPES[file_type][0])
+        response['Content-Disposition'] = 'attachment; filename="{}-{}.{}"'.format(
+            kwargs.get('subject_slug') or kwargs.get('class_slug') or kwargs.get('institute_slug'),
+            kwargs.get('student_type'),
+            file_type)
+        return response
 
-        for s in student_list:
-            res = dict()
-            res['invitee_email'] = str(s.institute_student.invitee)
-            res['created_on'] = s.created_on
-            res['is_banned'] = s.is_banned
-            res['id'] = s.institute_student.pk
-            res['first_name'] = s.institute_student.first_name
-            res['last_name'] = s.institute_student.last_name
-            res['gender'] = s.institute_student.gender
-            res['date_of_birth'] = s.institute_student.date_of_birth
-            res['enrollment_no'] = s.institute_student.enrollment_no
-            res['registration_no'] = s.institute_student.registration_no
-            res['image'] = ''
-
-            if s.is_banned:
-                ban_details = models.InstituteSubjectBannedStudent.objects.filter(
-                    institute_student__invitee=s.institute_student.invitee,
-                    banned_subject__pk=subject.pk
-                ).first()
-                res['banning_reason'] = ban_details.reason
-                res['banned_on'] = ban_details.created_on
-                res['ban_start_date'] = ban_details.start_date
-                res['active'] = s.active
-
-                if ban_details.banned_by.user_profile.first_name:
-                    first_name = ban_details.banned_by.user_profile.first_name
-                    last_name = ban_details.banned_by.user_profile.last_name
-                    res['banned_by'] = first_name + ' ' + last_name
-                else:
-                    res['banned_by'] = str(ban_details.banned_by)
+    def post(self, request, *args, **kwargs):
+        roster, error = self._get_roster(kwargs)
+        if error:
+            return error
 
-                if ban_details.end_date != models.UNLIMITED:
-                    res['ban_end_date'] = ban_details.end_date
+        file_type = request.data.get('file_type', 'csv')
+        ordering = request.data.get('ordering')
+        if file_type not in EXPORT_FILE_TYPES or\
+                (ordering and ordering not in ORDERING_FIELDS):
+            return Response({'error': _('Invalid file type or ordering.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        task = export_student_roster.delay(
+            request.user.pk,
+            *roster,
+            kwargs.get('student_type'),
+            file_type,
+            ordering)
+
+        return Response({'task_id': task.id},
+                        status=status.HTTP_202_ACCEPTED)
 
-            response.append(res)
+
+class StudentRosterExportStatusView(APIView):
+    """View for getting status and file of queued student list export"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def get(self, *args, **kwargs):
+        result = AsyncResult(kwargs.get('task_id'))
+
+        if not result.successful():
+            return Response({'status': result.state},
+                            status=status.HTTP_200_OK)
+
+        if result.result.get('user') != self.request.user.pk:
+            return Response({'error': _('Permission denied.')},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
-            'requester_role': perm.role,
-            'has_perm': has_subject_perm,
-            'data': response
+            'status': result.state,
+            'file': self.request.build_absolute_uri('/').strip('/') +
+            MEDIA_URL + result.result['file']
         }, status=status.HTTP_200_OK)
 
 
 class CreateInstituteView(CreateAPIView):
     """View for creating institute by teacher"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
     serializer_class = serializer.CreateInstituteSerializer
 
@@ -2309,7 +2417,7 @@ class CreateInstituteView(CreateAPIView):
 
 class InstituteFullDetailsView(RetrieveAPIView):
     """View for getting full details of the institute"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, IsTeacher)
     serializer_class = serializer.InstituteFullDetailsSerializer
     queryset = models.Institute.objects.all()
@@ -2329,7 +2437,7 @@ class InstituteFullDetailsView(RetrieveAPIView):
 
 class InstituteProvidePermissionView(APIView):
     """View for providing permission to institute"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
     serializer_class = serializer.InstituteProvidePermissionSerializer
 
@@ -2542,7 +2650,7 @@ class InstituteProvidePermissionView(APIView):
 
 class InstitutePermissionAcceptDeleteView(APIView):
     """View for accepting or deleting permission"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -2696,7 +2804,7 @@ class InstitutePermissionAcceptDeleteView(APIView):
 
 class InstitutePermittedUserListView(APIView):
     """View to get permitted user list"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, IsTeacher, )
 
     def _format_data(self, user_invites, active=True):
@@ -2783,7 +2891,7 @@ class InstitutePermittedUserListView(APIView):
 
 class CreateClassView(CreateAPIView):
     """View to creating institute class"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher,)
     serializer_class = serializer.InstituteClassSerializer
 
@@ -2833,7 +2941,7 @@ class CreateClassView(CreateAPIView):
 
 class DeleteClassView(DestroyAPIView):
     """View for deleting class"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher,)
 
     def destroy(self, request, *args, **kwargs):
@@ -2877,7 +2985,7 @@ class DeleteClassView(DestroyAPIView):
 
 class ListSlugNamePairsView(APIView):
     """View for getting the list of class slug and class names"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher,)
 
     def get(self, *args, **kwargs):
@@ -2913,7 +3021,7 @@ class ListSlugNamePairsView(APIView):
 
 class ListAllClassView(APIView):
     """View for listing all classes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher,)
 
     def get(self, *args, **kwargs):
@@ -2983,7 +3091,7 @@ class ListAllClassView(APIView):
 
 class ProvideClassPermissionView(CreateAPIView):
     """View for providing class permission by admin to staff/admin"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher,)
 
     def create(self, request, *args, **kwargs):
@@ -3064,7 +3172,7 @@ class ProvideClassPermissionView(CreateAPIView):
 
 class ListPermittedClassInchargeView(APIView):
     """View for listing all permitted class incharges"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher,)
 
     def get(self, *args, **kwargs):
@@ -3117,7 +3225,7 @@ class ListPermittedClassInchargeView(APIView):
 
 class CheckClassPermView(APIView):
     """View returns true if user has class perm"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -3159,7 +3267,7 @@ class CheckClassPermView(APIView):
 
 class CreateSubjectView(APIView):
     """View for creating subject"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -3223,7 +3331,7 @@ class CreateSubjectView(APIView):
 
 class ListAllSubjectView(APIView):
     """View for listing all subjects"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -3293,7 +3401,7 @@ class ListAllSubjectView(APIView):
 
 class ListSubjectInstructorsView(APIView):
     """View for listing all class instructors"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -3354,7 +3462,7 @@ class ListSubjectInstructorsView(APIView):
 
 class AddSubjectPermissionView(APIView):
     """View for adding subject permission"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -3428,7 +3536,7 @@ class AddSubjectPermissionView(APIView):
 
 class CreateSectionView(APIView):
     """View for creating section"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -3486,7 +3594,7 @@ class CreateSectionView(APIView):
 
 class AddSectionPermissionView(APIView):
     """View for adding section permission"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -3560,7 +3668,7 @@ class AddSectionPermissionView(APIView):
 
 class ListAllSectionView(APIView):
     """View for listing all section"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -3628,7 +3736,7 @@ class ListAllSectionView(APIView):
 
 class ListSectionInchargesView(APIView):
     """View for listing all section incharges"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -3683,7 +3791,7 @@ class ListSectionInchargesView(APIView):
 
 class InstituteSubjectAddModuleView(APIView):
     """View for adding subject module or test"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -3730,7 +3838,7 @@ class InstituteSubjectAddModuleView(APIView):
 
 class InstituteSubjectMinStatisticsView(APIView):
     """View for getting subject course content min statistics"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -3832,7 +3940,7 @@ class InstituteSubjectMinStatisticsView(APIView):
 
 class InstituteSubjectSpecificViewCourseContentView(APIView):
     """View for getting course content of a specific subject view"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -3920,7 +4028,7 @@ class InstituteSubjectSpecificViewCourseContentView(APIView):
 
 class InstituteSubjectLectureContents(APIView):
     """View for getting subject lecture course contents"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -4049,6 +4157,12 @@ class InstituteSubjectLectureContents(APIView):
                     'file': self.request.build_absolute_uri('/').strip('/') + MEDIA_URL + str(query_data.file),
                     'can_download': query_data.can_download
                 }
+            elif lecture_materials.content_type == models.SubjectLectureMaterialsContentType.VIDEO:
+                res['data'] = get_video_lecture_material_data(
+                    models.SubjectLectureVideoMaterial.objects.filter(
+                        lecture_material__pk=lecture_materials.pk
+                    ).first(),
+                    self.request.build_absolute_uri('/').strip('/') + MEDIA_URL)
             elif lecture_materials.content_type == models.SubjectLectureMaterialsContentType.LIVE_CLASS:
                 pass
 
@@ -4059,7 +4173,7 @@ class InstituteSubjectLectureContents(APIView):
 
 class InstituteSubjectAddLectureView(APIView):
     """View for adding subject lecture by subject in-charge"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -4120,7 +4234,7 @@ class InstituteSubjectAddLectureView(APIView):
 
 class InstituteSubjectEditLectureView(APIView):
     """View for editing subject lecture by subject in-charge"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -4164,7 +4278,7 @@ class InstituteSubjectEditLectureView(APIView):
 
 class InstituteSubjectDeleteLectureView(APIView):
     """View for deleting subject lecture by subject in-charge"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -4188,6 +4302,8 @@ class InstituteSubjectDeleteLectureView(APIView):
         ).only('pk').first()
 
         size = 0.0
+        # Storage of blobs is freed from institute when their last material is deleted
+        blob_size = 0.0
 
         lecture_materials = models.SubjectLectureMaterials.objects.filter(
             lecture=lecture
@@ -4197,14 +4313,20 @@ class InstituteSubjectDeleteLectureView(APIView):
         ).only('content_type')
 
         for lm in lecture_materials:
+            file_material = None
             if lm.content_type == models.SubjectLectureMaterialsContentType.PDF:
-                size += models.SubjectLecturePdfMaterial.objects.filter(
+                file_material = models.SubjectLecturePdfMaterial.objects.filter(
                     lecture_material__pk=lm.pk
-                ).only('file').first().file.size
-            elif lm.content_type == models.SubjectLectureMaterialContentType.IMAGE:
-                size += models.SubjectLectureImageMaterial.objects.filter(
+                ).only('file', 'blob').first()
+            elif lm.content_type == models.SubjectLectureMaterialsContentType.IMAGE:
+                file_material = models.SubjectLectureImageMaterial.objects.filter(
                     lecture_material__pk=lm.pk
-                ).only('file').first().file.size
+                ).only('file', 'blob').first()
+
+            if file_material:
+                size += file_material.file.size
+                if file_material.blob_id:
+                    blob_size += file_material.file.size
 
         try:
             lecture.delete()
@@ -4213,20 +4335,20 @@ class InstituteSubjectDeleteLectureView(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
 
         if size:
-            size = size / 1000000000  # Converting in to GB
             models.InstituteSubjectStatistics.objects.filter(
                 statistics_subject=subject
-            ).update(storage=F('storage') - Decimal(size))
+            ).update(storage=F('storage') - Decimal(size / 1000000000))  # Converting in to GB
+        if size - blob_size:
             models.InstituteStatistics.objects.filter(
                 institute__pk=subject.subject_class.class_institute.pk
-            ).update(storage=F('storage') - Decimal(size))
+            ).update(storage=F('storage') - Decimal((size - blob_size) / 1000000000))
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class InstituteSubjectAddIntroductoryContentView(APIView):
     """Adds MI and CO introductory contents"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
     parser_classes = (JSONParser, MultiPartParser)
 
@@ -4361,7 +4483,7 @@ class InstituteSubjectAddIntroductoryContentView(APIView):
 
 class InstituteSubjectEditIntroductoryContentView(APIView):
     """Edits MI and CO introductory contents"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -4417,7 +4539,7 @@ class InstituteSubjectEditIntroductoryContentView(APIView):
 
 class InstituteSubjectDeleteIntroductoryContentView(APIView):
     """Deletes MI and CO introductory contents"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -4467,7 +4589,7 @@ class InstituteSubjectDeleteIntroductoryContentView(APIView):
 
 class InstituteSubjectAddLectureMaterials(APIView):
     """Adds material to lectures"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
     parser_classes = (JSONParser, MultiPartParser)
 
@@ -4506,7 +4628,8 @@ class InstituteSubjectAddLectureMaterials(APIView):
 
         institute_stats = None
         if request.data.get('content_type') == models.SubjectLectureMaterialsContentType.IMAGE or\
-                request.data.get('content_type') == models.SubjectLectureMaterialsContentType.PDF:
+                request.data.get('content_type') == models.SubjectLectureMaterialsContentType.PDF or\
+                request.data.get('content_type') == models.SubjectLectureMaterialsContentType.VIDEO:
             institute_stats = models.InstituteStatistics.objects.filter(
                 institute=institute
             ).only('storage').first()
@@ -4524,56 +4647,17 @@ class InstituteSubjectAddLectureMaterials(APIView):
                 name=request.data.get('name'),
                 content_type=request.data.get('content_type'))
 
-            if request.data.get('content_type') == models.SubjectLectureMaterialsContentType.IMAGE:
-                validation_error = validate_image_file(request.data.get('file'))
+            if request.data.get('content_type') in LECTURE_FILE_MATERIAL_TYPES:
+                data, error = add_lecture_file_material(
+                    request, subject, institute_stats, subject_lecture_material,
+                    request.data.get('file'), request.data.get('can_download'))
 
-                if validation_error:
+                if error:
                     subject_lecture_material.delete()
-                    return Response(validation_error, status=status.HTTP_400_BAD_REQUEST)
+                    return error
 
-                ser = serializer.SubjectLectureImageSerializer(
-                    data={
-                        "lecture_material": subject_lecture_material.pk,
-                        "file": request.data.get('file'),
-                        "can_download": request.data.get('can_download')
-                    })
-
-                if ser.is_valid():
-                    ser.save()
-
-                    institute_stats.storage = Decimal(float(institute_stats.storage) +
-                                                      request.data.get('file').size / 1000000000)
-                    institute_stats.save()
-                    models.InstituteSubjectStatistics.objects.filter(
-                        statistics_subject=subject
-                    ).update(storage=F('storage') + Decimal(request.data.get('file').size / 1000000000))
-
-                    response['data'] = get_file_lecture_material_data(ser.data, 'SER', '')
-
-            elif request.data.get('content_type') == models.SubjectLectureMaterialsContentType.PDF:
-                validation_error = validate_pdf_file(request.data.get('file'), str(request.FILES['file']))
-
-                if validation_error:
-                    subject_lecture_material.delete()
-                    return Response(validation_error, status=status.HTTP_400_BAD_REQUEST)
-
-                ser = serializer.SubjectLecturePdfSerializer(data={
-                        "lecture_material": subject_lecture_material.pk,
-                        "file": request.data.get('file'),
-                        "can_download": request.data.get('can_download')
-                    })
-
-                if ser.is_valid():
-                    ser.save()
-
-                    institute_stats.storage = Decimal(float(institute_stats.storage) +
-                                                      request.data.get('file').size / 1000000000)
-                    institute_stats.save()
-                    models.InstituteSubjectStatistics.objects.filter(
-                        statistics_subject=subject
-                    ).update(storage=F('storage') + Decimal(request.data.get('file').size / 1000000000))
-
-                    response['data'] = get_file_lecture_material_data(ser.data, 'SER', '')
+                if data is not None:
+                    response['data'] = data
 
             elif request.data.get('content_type') == models.SubjectLectureMaterialsContentType.EXTERNAL_LINK or \
                     request.data.get('content_type') == models.SubjectLectureMaterialsContentType.YOUTUBE_LINK:
@@ -4603,7 +4687,7 @@ class InstituteSubjectAddLectureMaterials(APIView):
 
 class InstituteSubjectEditLectureMaterial(APIView):
     """Edit material of lectures"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -4686,7 +4770,7 @@ class InstituteSubjectEditLectureMaterial(APIView):
 
 class InstituteSubjectDeleteLectureMaterial(APIView):
     """Deletes material of lectures"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -4713,13 +4797,23 @@ class InstituteSubjectDeleteLectureMaterial(APIView):
         if not lecture_material:
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+        # Storage of blob is freed from institute when its last material is deleted
+        stored_as_blob = False
         try:
             if lecture_material.content_type == models.SubjectLectureMaterialsContentType.IMAGE:
-                size = models.SubjectLectureImageMaterial.objects.filter(
+                file_material = models.SubjectLectureImageMaterial.objects.filter(
                     lecture_material=lecture_material
-                ).only('file').first().file.size
+                ).only('file', 'blob').first()
+                size = file_material.file.size
+                stored_as_blob = file_material.blob_id is not None
             elif lecture_material.content_type == models.SubjectLectureMaterialsContentType.PDF:
-                size = models.SubjectLecturePdfMaterial.objects.filter(
+                file_material = models.SubjectLecturePdfMaterial.objects.filter(
+                    lecture_material=lecture_material
+                ).only('file', 'blob').first()
+                size = file_material.file.size
+                stored_as_blob = file_material.blob_id is not None
+            elif lecture_material.content_type == models.SubjectLectureMaterialsContentType.VIDEO:
+                size = models.SubjectLectureVideoMaterial.objects.filter(
                     lecture_material=lecture_material
                 ).only('file').first().file.size
 
@@ -4730,9 +4824,10 @@ class InstituteSubjectDeleteLectureMaterial(APIView):
                 models.InstituteSubjectStatistics.objects.filter(
                     statistics_subject=subject
                 ).update(storage=F('storage') - Decimal(size))
-                models.InstituteStatistics.objects.filter(
-                    institute__pk=subject.subject_class.class_institute.pk
-                ).update(storage=F('storage') - Decimal(size))
+                if not stored_as_blob:
+                    models.InstituteStatistics.objects.filter(
+                        institute__pk=subject.subject_class.class_institute.pk
+                    ).update(storage=F('storage') - Decimal(size))
 
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Exception:
@@ -4742,7 +4837,7 @@ class InstituteSubjectDeleteLectureMaterial(APIView):
 
 class InstituteAddLectureUseCaseOrAdditionalReading(APIView):
     """Adds additional reading or use case links to lectures"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -4787,7 +4882,7 @@ class InstituteAddLectureUseCaseOrAdditionalReading(APIView):
 
 class InstituteEditLectureUseCaseOrAdditionalReading(APIView):
     """Adds additional reading or use case links to lectures"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -4832,7 +4927,7 @@ class InstituteEditLectureUseCaseOrAdditionalReading(APIView):
 
 class InstituteDeleteLectureUseCaseOrAdditionalReading(APIView):
     """Deletes additional reading or use case links of lectures"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -4860,7 +4955,7 @@ class InstituteDeleteLectureUseCaseOrAdditionalReading(APIView):
 
 class InstituteAddLectureObjectiveOrUseCaseText(APIView):
     """Adds lecture objectives or use case text to lectures"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -4905,7 +5000,7 @@ class InstituteAddLectureObjectiveOrUseCaseText(APIView):
 
 class InstituteEditLectureObjectiveOrUseCaseText(APIView):
     """Edits lecture objectives or use case text to lectures"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -4948,7 +5043,7 @@ class InstituteEditLectureObjectiveOrUseCaseText(APIView):
 
 class InstituteDeleteLectureObjectiveOrUseCaseText(APIView):
     """Deletes lecture objectives or use case text of lectures"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -4976,7 +5071,7 @@ class InstituteDeleteLectureObjectiveOrUseCaseText(APIView):
 
 class InstituteSubjectDeleteModuleView(APIView):
     """View for deleting subject module"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, request, *args, **kwargs):
@@ -5018,27 +5113,33 @@ class InstituteSubjectDeleteModuleView(APIView):
         # Finding the statistics of the content to be deleted
         module_views = models.SubjectModuleView.objects.filter(view=view)
         total_size = 0
+        # Storage of blobs is freed from institute when their last material is deleted
+        blob_size = 0
+        lecture_pks = list()
 
         for mv in module_views:
             if mv.type == models.SubjectModuleViewType.LECTURE_VIEW:
+                lecture_pks.append(mv.lecture_id)
                 study_materials = models.SubjectLectureMaterials.objects.filter(
                     lecture__pk=mv.lecture.pk
                 ).filter(
                     Q(content_type=models.SubjectLectureMaterialsContentType.IMAGE) | Q(
                         content_type=models.SubjectLectureMaterialsContentType.PDF))
                 for material in study_materials:
-                    if material.content_type == models.StudyMaterialContentType.IMAGE:
-                        total_size += float(
-                            models.SubjectLectureImageMaterial.objects.filter(
-                                lecture_material__pk=material.pk
-                            ).first().file.size
-                        )
-                    elif material.content_type == models.StudyMaterialContentType.PDF:
-                        total_size += float(
-                            models.SubjectLecturePdfMaterial.objects.filter(
-                                lecture_material__pk=material.pk
-                            ).first().file.size
-                        )
+                    file_material = None
+                    if material.content_type == models.SubjectLectureMaterialsContentType.IMAGE:
+                        file_material = models.SubjectLectureImageMaterial.objects.filter(
+                            lecture_material__pk=material.pk
+                        ).first()
+                    elif material.content_type == models.SubjectLectureMaterialsContentType.PDF:
+                        file_material = models.SubjectLecturePdfMaterial.objects.filter(
+                            lecture_material__pk=material.pk
+                        ).first()
+
+                    if file_material:
+                        total_size += float(file_material.file.size)
+                        if file_material.blob_id:
+                            blob_size += float(file_material.file.size)
                 # Find size of assignments
                 # Find size of tests
             elif mv.type == models.SubjectModuleViewType.TEST_VIEW:
@@ -5047,16 +5148,18 @@ class InstituteSubjectDeleteModuleView(APIView):
 
         try:
             view.delete()
+            # Lectures are not deleted with their module view
+            models.SubjectLecture.objects.filter(pk__in=lecture_pks).delete()
 
             # Updating statistics
             if total_size:
-                total_size = Decimal(total_size / 1000000000)  # Converting into GB
                 models.InstituteSubjectStatistics.objects.filter(
                     statistics_subject=subject
-                ).update(storage=F('storage') - total_size)
+                ).update(storage=F('storage') - Decimal(total_size / 1000000000))  # Converting into GB
+            if total_size - blob_size:
                 models.InstituteStatistics.objects.filter(
                     institute=institute
-                ).update(storage=F('storage') - total_size)
+                ).update(storage=F('storage') - Decimal((total_size - blob_size) / 1000000000))
 
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Exception:
@@ -5066,7 +5169,7 @@ class InstituteSubjectDeleteModuleView(APIView):
 
 class InstituteEditSubjectModuleViewName(APIView):
     """View for editing subject module name"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -5112,7 +5215,7 @@ class InstituteStudentCourseListView(APIView):
     """
     View for listing all course of institute.
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsStudent)
 
     def get(self, *args, **kwargs):
@@ -5185,7 +5288,7 @@ class InstituteStudentCourseListView(APIView):
 
 class BookmarkInstituteCourse(APIView):
     """View for bookmarking course by authenticated user"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsStudent)
 
     def post(self, request, *args, **kwargs):
@@ -5229,7 +5332,7 @@ class BookmarkInstituteCourse(APIView):
 
 class ListSubjectPeers(APIView):
     """View for listing students and faculties of subject"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsStudent)
 
     def get(self, *args, **kwargs):
@@ -5312,7 +5415,7 @@ class InstituteSubjectCoursePreviewMinDetails(APIView):
     View for getting min course statistics by admin, subject incharge and
     permitted student.
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacherOrStudent)
 
     def get(self, *args, **kwargs):
@@ -5419,7 +5522,7 @@ class InstituteSubjectCoursePreviewMinDetails(APIView):
 
 class PreviewInstituteSubjectSpecificViewContents(APIView):
     """View for getting course content of a specific subject by teacher or permitted student"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacherOrStudent)
 
     def _get_data(self, content_type, data_id):
@@ -5477,10 +5580,7 @@ class PreviewInstituteSubjectSpecificViewContents(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
 
         if self.request.user.is_student:
-            if not models.InstituteSubjectStudents.objects.filter(
-                    institute_subject__pk=subject.pk,
-                    institute_student__invitee=self.request.user
-            ).exists():
+            if not can_view_subject(self.request.user, subject.pk):
                 return Response({'error': _('Permission denied.')},
                                 status=status.HTTP_400_BAD_REQUEST)
 
@@ -5489,18 +5589,10 @@ class PreviewInstituteSubjectSpecificViewContents(APIView):
                                 status=status.HTTP_400_BAD_REQUEST)
 
         elif self.request.user.is_teacher:
-            if not models.InstituteSubjectPermission.objects.filter(
-                    to=subject,
-                    invitee=self.request.user
-            ).exists():
-                if not models.InstitutePermission.objects.filter(
-                        institute=institute,
-                        invitee=self.request.user,
-                        role=models.InstituteRole.ADMIN,
-                        active=True
-                ).exists():
-                    return Response({'error': _('Permission denied.')},
-                                    status=status.HTTP_400_BAD_REQUEST)
+            access = get_access(self.request)
+            if not access.has_subject_perm(subject.pk) and not access.is_admin(institute.pk):
+                return Response({'error': _('Permission denied.')},
+                                status=status.HTTP_400_BAD_REQUEST)
 
             if not get_active_common_license(institute):
                 return Response({'error': _('Institute license expired or not found.')},
@@ -5551,7 +5643,7 @@ class PreviewInstituteSubjectSpecificViewContents(APIView):
 
 class InstituteSubjectCourseContentAskQuestionView(APIView):
     """View for asking question"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsStudent)
 
     def post(self, request, *args, **kwargs):
@@ -5640,7 +5732,7 @@ class InstituteSubjectCourseContentAskQuestionView(APIView):
 
 class InstituteSubjectCourseContentAnswerQuestionView(APIView):
     """View for answering question"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacherOrStudent)
 
     def post(self, request, *args, **kwargs):
@@ -5748,7 +5840,7 @@ class InstituteSubjectCourseContentAnswerQuestionView(APIView):
 
 class InstituteSubjectUpvoteDownvoteQuestionView(APIView):
     """View for upvoting and downvoting question by permitted instructor and student"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacherOrStudent)
 
     def post(self, request, *args, **kwargs):
@@ -5825,7 +5917,7 @@ class InstituteSubjectUpvoteDownvoteQuestionView(APIView):
 
 class InstituteSubjectUpvoteDownvoteAnswerView(APIView):
     """View for upvoting and downvoting answer by permitted instructor and student"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacherOrStudent)
 
     def post(self, request, *args, **kwargs):
@@ -5901,7 +5993,7 @@ class InstituteSubjectUpvoteDownvoteAnswerView(APIView):
 
 class InstituteSubjectCourseContentDeleteQuestionView(APIView):
     """View for deleting question by self"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacherOrStudent)
 
     def delete(self, *args, **kwargs):
@@ -5926,7 +6018,7 @@ class InstituteSubjectCourseContentDeleteQuestionView(APIView):
 
 class InstituteSubjectCourseContentDeleteAnswerView(APIView):
     """View for deleting answer by self"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacherOrStudent)
 
     def delete(self, *args, **kwargs):
@@ -5959,7 +6051,7 @@ class InstituteSubjectCourseContentDeleteAnswerView(APIView):
 
 class InstituteSubjectCourseContentEditAnswerView(APIView):
     """View for editing answer by self"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacherOrStudent)
 
     def patch(self, request, *args, **kwargs):
@@ -6048,7 +6140,7 @@ class InstituteSubjectCourseContentEditAnswerView(APIView):
 
 class InstituteSubjectCourseContentEditQuestionView(APIView):
     """View for editing question by question asker"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsStudent)
 
     def patch(self, request, *args, **kwargs):
@@ -6125,7 +6217,7 @@ class InstituteSubjectCourseContentEditQuestionView(APIView):
 
 class InstituteSubjectCourseContentPinUnpinAnswerView(APIView):
     """View for pinning answer by asker of question"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacherOrStudent)
 
     def patch(self, request, *args, **kwargs):
@@ -6166,7 +6258,7 @@ class InstituteSubjectCourseContentPinUnpinAnswerView(APIView):
 
 class InstituteSubjectCourseQuestionListAnswerView(APIView):
     """View for listing answer by permitted student, instructor and admin"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacherOrStudent)
 
     def get(self, *args, **kwargs):
@@ -6280,7 +6372,7 @@ class InstituteSubjectCourseQuestionListAnswerView(APIView):
 
 class InstituteSubjectCourseListQuestionView(APIView):
     """View for listing question by instructor, admin and permitted student"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacherOrStudent)
 
     def get(self, *args, **kwargs):
@@ -6380,7 +6472,7 @@ class InstituteSubjectCourseListQuestionView(APIView):
 
 class GetUserProfileDetailsOfInstituteView(APIView):
     """View to get name, gender, and date of birth of student in institute"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsStudent)
 
     def get(self, *args, **kwargs):
@@ -6431,7 +6523,7 @@ class GetUserProfileDetailsOfInstituteView(APIView):
 
 class StudentJoinInstituteView(APIView):
     """View for student to join institute"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsStudent)
 
     def post(self, request, *args, **kwargs):
@@ -6492,7 +6584,7 @@ class StudentJoinInstituteView(APIView):
 #####################################################
 class InstituteSubjectAddTestView(APIView):
     """View for adding test in institute"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -6617,7 +6709,7 @@ class InstituteSubjectAddTestView(APIView):
 
 class InstituteTestMinDetailsView(APIView):
     """View for getting min details of test"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -6677,7 +6769,7 @@ class InstituteTestMinDetailsView(APIView):
 
 class InstituteTestFullDetailsView(APIView):
     """View for getting full details of test"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -6767,7 +6859,7 @@ class InstituteTestFullDetailsView(APIView):
 
 class InstituteTestMinDetailsForQuestionCreationView(APIView):
     """View for getting min details of test for question paper creation"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
@@ -6838,160 +6930,24 @@ class InstituteTestMinDetailsForQuestionCreationView(APIView):
 
         if len(response['test_sets']) > 0:
             # Find the questions of first set
-            # File type question paper
-            if test.question_mode == models.QuestionMode.FILE:
-                question_set = models.SubjectFileTestQuestion.objects.filter(
-                    test=test,
-                    set__pk=response['test_sets'][0]['id']
-                ).first()
-
-                if question_set:
-                    response['first_set_questions'] = {
-                        'id': question_set.pk,
-                        'file': self.request.build_absolute_uri('/').strip('/') + MEDIA_URL + '/' + str(question_set.file)
-                    }
-                else:
-                    response['first_set_questions'] = None
-
-            # Image mode or typed question paper
-            elif test.question_mode == models.QuestionMode.IMAGE or test.question_mode == models.QuestionMode.TYPED:
-                response['first_set_questions'] = list()
-
-                for qs in models.SubjectTestQuestionSection.objects.filter(
-                    test=test,
-                    set__pk=response['test_sets'][0]['id']
-                ).order_by('order'):
-                    res = {
-                        'section_id': qs.pk,
-                        'name': qs.name,
-                        'order': qs.order,
-                        'view': qs.view,
-                        'no_of_question_to_attempt': qs.no_of_question_to_attempt,
-                        'answer_all_questions': qs.answer_all_questions,
-                        'section_mandatory': qs.section_mandatory
-                    }
-                    questions = list()
-
-                    if test.question_mode == models.QuestionMode.IMAGE:
-                        for q in models.SubjectPictureTestQuestion.objects.filter(
-                            test_section__pk=qs.pk
-                        ).order_by('order'):
-                            question_data = {
-                                'question_id': q.pk,
-                                'order': q.order,
-                                'text': q.text,
-                                'marks': q.marks,
-                                'file': self.request.build_absolute_uri('/').strip('/') + MEDIA_URL + '/' + str(q.file)
-                            }
-                            if q.concept_label:
-                                question_data['concept_label_id'] = q.concept_label.pk
-                            questions.append(question_data)
-                    else:
-                        # Find typed test questions
-                        for q in models.SubjectTypedTestQuestion.objects.filter(
-                            test_section__pk=qs.pk
-                        ).order_by('order'):
-                            question_data = {
-                                'question_id': q.pk,
-                                'order': q.order,
-                                'question': q.question,
-                                'marks': q.marks,
-                                'has_picture': q.has_picture,
-                                'type': q.type
-                            }
-
-                            if q.concept_label:
-                                question_data['concept_label_id'] = q.concept_label.pk
-
-                            if q.has_picture:
-                                picture = models.SubjectTestQuestionImage.objects.filter(
-                                    question__pk=q.pk
-                                ).first()
-
-                                if picture:
-                                    question_data['image'] = self.request.build_absolute_uri(
-                                        '/').strip('/') + MEDIA_URL + '/' + str(picture.file)
-
-                            # Find data according to question type
-                            if q.type == models.QuestionType.MCQ:
-                                question_data['options'] = list()
-
-                                for option in models.SubjectTestMcqOptions.objects.filter(
-                                        question__pk=q.pk
-                                ):
-                                    question_data['options'].append({
-                                        'option_id': option.pk,
-                                        'option': option.option,
-                                        'correct_answer': option.correct_answer
-                                    })
-
-                            elif q.type == models.QuestionType.SELECT_MULTIPLE_CHOICE:
-                                question_data['options'] = list()
-                                for option in models.SubjectTestSelectMultipleCorrectAnswer.objects.filter(
-                                        question__pk=q.pk
-                                ):
-                                    question_data['options'].append({
-                                        'option_id': option.pk,
-                                        'option': option.option,
-                                        'correct_answer': option.correct_answer
-                                    })
-
-                            elif q.type == models.QuestionType.TRUE_FALSE:
-                                true_false_correct_answer = models.SubjectTestTrueFalseCorrectAnswer.objects.filter(
-                                    question__pk=q.pk
-                                ).first()
-
-                                if true_false_correct_answer:
-                                    question_data['correct_answer'] = true_false_correct_answer.correct_answer
-
-                            elif q.type == models.QuestionType.ASSERTION:
-                                assertion_correct_answer = models.SubjectTestAssertionCorrectAnswer.objects.filter(
-                                    question__pk=q.pk
-                                ).first()
-
-                                if assertion_correct_answer:
-                                    question_data['correct_answer'] = assertion_correct_answer.correct_answer
-
-                            elif q.type == models.QuestionType.NUMERIC_ANSWER:
-                                numeric_correct_answer = models.SubjectTestNumericCorrectAnswer.objects.filter(
-                                    question__pk=q.pk
-                                ).first()
-
-                                if numeric_correct_answer:
-                                    question_data['correct_answer'] = numeric_correct_answer.correct_answer
-
-                            elif q.type == models.QuestionType.FILL_IN_THE_BLANK:
-                                fill_in_the_blank = models.SubjectTestFillInTheBlankCorrectAnswer.objects.filter(
-                                    question__pk=q.pk
-                                ).first()
-
-                                if fill_in_the_blank:
-                                    question_data['fill_in_the_blank_answer'] = {
-                                        'correct_answer': fill_in_the_blank.correct_answer,
-                                        'manual_checking': fill_in_the_blank.manual_checking,
-                                        'enable_strict_checking': fill_in_the_blank.enable_strict_checking,
-                                        'ignore_grammar': fill_in_the_blank.ignore_grammar,
-                                        'ignore_special_characters': fill_in_the_blank.ignore_special_characters
-                                    }
-
-                            questions.append(question_data)
-
-                    res['questions'] = questions
-                    response['first_set_questions'].append(res)
+            response['first_set_questions'] = assemble_question_paper(
+                test,
+                response['test_sets'][0]['id'],
+                get_media_prefix(self.request))
 
         return Response(response, status=status.HTTP_200_OK)
 
 
 class InstituteGetQuestionSetQuestionsView(APIView):
     """View for getting question set questions"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def get(self, *args, **kwargs):
         """Subject incharge, class incharge, admin can view."""
         subject = models.InstituteSubject.objects.filter(
             subject_slug=kwargs.get('subject_slug')
-        ).only('subject_slug').first()
+        ).only('subject_slug', 'subject_class').first()
 
         if not subject:
             return Response({'error': _('Subject not found.')},
@@ -7005,22 +6961,10 @@ class InstituteGetQuestionSetQuestionsView(APIView):
             return Response({'error': _('Institute not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        if not models.InstituteSubjectPermission.objects.filter(
-            to=subject,
-            invitee=self.request.user
-        ).exists():
-            if not models.InstituteClassPermission.objects.filter(
-                to__pk=subject.subject_class.pk,
-                invitee=self.request.user
-            ).exists():
-                if not models.InstitutePermission.objects.filter(
-                    institute=institute,
-                    invitee=self.request.user,
-                    role=models.InstituteRole.Admin,
-                    active=True
-                ).exists():
-                    return Response({'error': _('Permission denied [Subject, Class in-charge, Admin, only]')},
-                                    status=status.HTTP_400_BAD_REQUEST)
+        if not get_access(self.request).can_manage_subject(
+                institute.pk, subject.subject_class_id, subject.pk):
+            return Response({'error': _('Permission denied [Subject, Class in-charge, Admin, only]')},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         if not get_active_or_expired_common_license(institute):
             return Response({'error': _('LMS CMS license not found.')},
@@ -7034,157 +6978,41 @@ class InstituteGetQuestionSetQuestionsView(APIView):
         set_ = models.SubjectTestSets.objects.filter(
             pk=kwargs.get('set_id'),
             test=test
-        ).only('set_name').first()
+        ).only('set_name', 'mark_as_final').first()
 
         if not set_:
             return Response({'error': _('Question set not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        if test.question_mode == models.QuestionMode.FILE:
-            # Find file test questions
-            response = dict()
-            question_set = models.SubjectFileTestQuestion.objects.filter(
-                test=test,
-                set=set_
-            ).first()
+        if set_.mark_as_final:
+            # Finalized sets are served from compiled snapshot
+            media_prefix = get_media_prefix(self.request)
+            snapshot = get_paper_snapshot(set_.pk, TEACHER_PAPER, media_prefix)
 
-            if question_set:
-                response.update({
-                    'id': question_set.pk,
-                    'file': self.request.build_absolute_uri('/').strip('/') + MEDIA_URL + '/' + str(question_set.file)
-                })
+            if not snapshot:
+                compile_paper_snapshot(test, set_.pk)
+                snapshot = get_paper_snapshot(
+                    set_.pk, TEACHER_PAPER, media_prefix)
+
+            etag, body = snapshot
+            etags = parse_etags(self.request.META.get('HTTP_IF_NONE_MATCH', ''))
+            # Weak comparison of if-none-match, as in conditional get of django
+            if '*' in etags or etag in etags or 'W/' + etag in etags:
+                response = HttpResponseNotModified()
             else:
-                response = None
-        elif test.question_mode == models.QuestionMode.IMAGE or test.question_mode == models.QuestionMode.TYPED:
-            response = list()
+                response = HttpResponse(body, content_type='application/json')
+            response['ETag'] = etag
+            return response
 
-            for qs in models.SubjectTestQuestionSection.objects.filter(
-                test=test,
-                set=set_
-            ).order_by('order'):
-                res = {
-                    'section_id': qs.pk,
-                    'name': qs.name,
-                    'order': qs.order,
-                    'view': qs.view,
-                    'no_of_question_to_attempt': qs.no_of_question_to_attempt,
-                    'answer_all_questions': qs.answer_all_questions,
-                    'section_mandatory': qs.section_mandatory
-                }
-                questions = list()
-
-                if test.question_mode == models.QuestionMode.IMAGE:
-                    # Find image test questions
-                    for q in models.SubjectPictureTestQuestion.objects.filter(
-                            test_section__pk=qs.pk
-                    ).order_by('order'):
-                        question_data = {
-                            'question_id': q.pk,
-                            'order': q.order,
-                            'text': q.text,
-                            'marks': q.marks,
-                            'file': self.request.build_absolute_uri('/').strip('/') + MEDIA_URL + '/' + str(q.file)
-                        }
-                        if q.concept_label:
-                            question_data['concept_label_id'] = q.concept_label.pk
-                        questions.append(question_data)
-                else:
-                    # Find typed test questions
-                    for q in models.SubjectTypedTestQuestion.objects.filter(
-                            test_section__pk=qs.pk
-                    ).order_by('order'):
-                        question_data = {
-                            'question_id': q.pk,
-                            'order': q.order,
-                            'question': q.question,
-                            'marks': q.marks,
-                            'type': q.type,
-                            'has_picture': q.has_picture
-                        }
-
-                        if q.concept_label:
-                            question_data['concept_label_id'] = q.concept_label.pk
-
-                        if q.has_picture:
-                            picture = models.SubjectTestQuestionImage.objects.filter(
-                                question__pk=q.pk
-                            ).first()
-                            if picture:
-                                question_data['image'] = self.request.build_absolute_uri(
-                                    '/').strip('/') + MEDIA_URL + '/' + str(picture.file)
-
-                        # Find appropriate options according to question
-                        if q.type == models.QuestionType.MCQ:
-                            question_data['options'] = list()
-                            for option in models.SubjectTestMcqOptions.objects.filter(
-                                question__pk=q.pk
-                            ):
-                                question_data['options'].append({
-                                    'option_id': option.pk,
-                                    'option': option.option,
-                                    'correct_answer': option.correct_answer
-                                })
-
-                        elif q.type == models.QuestionType.TRUE_FALSE:
-                            true_false_correct_answer = models.SubjectTestTrueFalseCorrectAnswer.objects.filter(
-                                question__pk=q.pk
-                            ).first()
-
-                            if true_false_correct_answer:
-                                question_data['correct_answer'] = true_false_correct_answer.correct_answer
-
-                        elif q.type == models.QuestionType.ASSERTION:
-                            assertion_correct_answer = models.SubjectTestAssertionCorrectAnswer.objects.filter(
-                                question__pk=q.pk
-                            ).first()
-
-                            if assertion_correct_answer:
-                                question_data['correct_answer'] = assertion_correct_answer.correct_answer
-
-                        elif q.type == models.QuestionType.SELECT_MULTIPLE_CHOICE:
-                            question_data['options'] = list()
-                            for option in models.SubjectTestSelectMultipleCorrectAnswer.objects.filter(
-                                    question__pk=q.pk
-                            ):
-                                question_data['options'].append({
-                                    'option_id': option.pk,
-                                    'option': option.option,
-                                    'correct_answer': option.correct_answer
-                                })
-
-                        elif q.type == models.QuestionType.NUMERIC_ANSWER:
-                            numeric_correct_answer = models.SubjectTestNumericCorrectAnswer.objects.filter(
-                                question__pk=q.pk
-                            ).first()
-
-                            if numeric_correct_answer:
-                                question_data['correct_answer'] = numeric_correct_answer.correct_answer
-
-                        elif q.type == models.QuestionType.FILL_IN_THE_BLANK:
-                            fill_in_the_blank = models.SubjectTestFillInTheBlankCorrectAnswer.objects.filter(
-                                question__pk=q.pk
-                            ).first()
-
-                            if fill_in_the_blank:
-                                question_data['fill_in_the_blank_answer'] = {
-                                    'correct_answer': fill_in_the_blank.correct_answer,
-                                    'manual_checking': fill_in_the_blank.manual_checking,
-                                    'enable_strict_checking': fill_in_the_blank.enable_strict_checking,
-                                    'ignore_grammar': fill_in_the_blank.ignore_grammar,
-                                    'ignore_special_characters': fill_in_the_blank.ignore_special_characters
-                                }
-
-                        questions.append(question_data)
-
-                res['questions'] = questions
-                response.append(res)
+        response = assemble_question_paper(
+            test, set_.pk, get_media_prefix(self.request))
 
         return Response(response, status=status.HTTP_200_OK)
 
 
 class InstituteAddQuestionSetView(APIView):
     """View for adding question set"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -7244,7 +7072,7 @@ class InstituteAddQuestionSetView(APIView):
 
 class InstituteUploadFileQuestionPaperView(APIView):
     """View for adding file question paper"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -7320,47 +7148,265 @@ class InstituteUploadFileQuestionPaperView(APIView):
             return Response({'error': _('Question set is MARKED AS FINAL. Uploading question is not allowed.')},
                             status.HTTP_400_BAD_REQUEST)
 
+        return add_file_question_paper(
+            request, subject, institute_stats, test, test_set, request.data.get('file'))
+
+
+def complete_chunked_upload(request, upload):
+    """
+    Hands assembled file of completed upload to serializer of its material.
+    Upload is removed either way.
+    """
+    metadata = json.loads(upload.metadata)
+    subject = models.InstituteSubject.objects.filter(pk=upload.subject_id).first()
+    institute_stats = models.InstituteStatistics.objects.filter(
+        institute__pk=upload.institute_id
+    ).only('storage').first()
+    file = assembled_file(upload)
+
+    try:
+        if upload.purpose == models.ChunkedUploadPurpose.LECTURE_MATERIAL:
+            lecture = models.SubjectLecture.objects.filter(
+                pk=metadata['lecture_id']
+            ).only('name').first()
+
+            if not lecture:
+                return Response({'error': _('Lecture not found.')},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            material = models.SubjectLectureMaterials.objects.create(
+                lecture=lecture,
+                name=metadata['name'],
+                content_type=metadata['content_type'])
+            data, error = add_lecture_file_material(
+                request, subject, institute_stats, material, file, metadata['can_download'])
+
+            if error:
+                material.delete()
+                return error
+
+            response = {
+                'id': material.pk,
+                'name': material.name,
+                'content_type': material.content_type
+            }
+            if data is not None:
+                response['data'] = data
+            return Response(response, status=status.HTTP_201_CREATED)
+
+        pdf_error = validate_pdf_file(file, upload.file_name)
+
+        if pdf_error:
+            return pdf_error
+
+        test_set = models.SubjectTestSets.objects.filter(
+            pk=metadata['set_id'],
+            test__pk=metadata['test_id']
+        ).select_related('test').first()
+
+        if not test_set:
+            return Response({'error': _('Question paper set not found.')},
+                            status.HTTP_400_BAD_REQUEST)
+
+        if test_set.mark_as_final:
+            return Response({'error': _('Question set is MARKED AS FINAL. Uploading question is not allowed.')},
+                            status.HTTP_400_BAD_REQUEST)
+
+        return add_file_question_paper(
+            request, subject, institute_stats, test_set.test, test_set, file)
+    finally:
+        file.close()
+        delete_upload(upload)
+
+
+class CreateChunkedUploadView(APIView):
+    """
+    Starts resumable upload of lecture material file or file question
+    paper of subject. Declared size is checked against storage before any
+    chunk is sent.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def post(self, request, *args, **kwargs):
+        subject = models.InstituteSubject.objects.filter(
+            subject_slug=kwargs.get('subject_slug')
+        ).only('subject_class').first()
+
+        if not subject:
+            return Response({'error': _('Subject not found.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if not models.InstituteSubjectPermission.objects.filter(
+            to=subject,
+            invitee=self.request.user
+        ).exists():
+            return Response({'error': _('Permission denied [Subject in-charge only]')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        institute_pk = models.InstituteClass.objects.filter(
+            pk=subject.subject_class_id
+        ).values_list('class_institute', flat=True).first()
+
+        if not get_active_common_license(institute_pk):
+            return Response({'error': _('Institute LMS CMS license expired or not found.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            ser = serializer.SubjectTestFileQuestionPaperUploadSerializer(
-                data={
-                    'file': request.data.get('file'),
-                    'test': test.pk,
-                    'set': test_set.pk
-                }, context={'request': request}
-            )
-            if ser.is_valid():
-                ser.save()
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            size = 0
 
-                file_size = request.data.get('file').size / 1000000000  # Size in GB
+        file_name = str(request.data.get('file_name') or '').strip()
 
-                institute_stats.storage = Decimal(float(institute_stats.storage) + file_size)
-                institute_stats.save()
+        if size <= 0 or not file_name or len(file_name) > 255:
+            return Response({'error': _('File name and size are required.')},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-                models.InstituteSubjectStatistics.objects.filter(
-                    statistics_subject=subject
-                ).update(storage=F('storage') + Decimal(file_size))
+        purpose = request.data.get('purpose')
 
-                return Response({
-                    'id': ser.data['id'],
-                    'file': ser.data['file']
-                }, status=status.HTTP_201_CREATED)
-            else:
-                return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
-        except IntegrityError as e:
-            if 'unique_question_paper_for_single_question_set' in str(e):
-                return Response({'error': _('Question paper for this question set already uploaded. Please refresh.')},
+        if purpose == models.ChunkedUploadPurpose.LECTURE_MATERIAL:
+            if not models.SubjectLecture.objects.filter(
+                pk=request.data.get('lecture_id')
+            ).exists():
+                return Response({'error': _('Lecture not found.')},
                                 status=status.HTTP_400_BAD_REQUEST)
-            else:
-                return Response({'error': _('Unhandled error occurred.')},
-                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        except Exception:
-            return Response({'error': _('Unhandled error occurred.')},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            if request.data.get('content_type') not in LECTURE_FILE_MATERIAL_TYPES:
+                return Response({'error': _('Invalid content type.')},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            if not str(request.data.get('name') or '').strip():
+                return Response({'error': _('Name of material is required and can not be blank.')},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            metadata = {
+                'lecture_id': int(request.data.get('lecture_id')),
+                'name': request.data.get('name'),
+                'content_type': request.data.get('content_type'),
+                'can_download': request.data.get('can_download')
+            }
+        elif purpose == models.ChunkedUploadPurpose.FILE_QUESTION_PAPER:
+            test_set = models.SubjectTestSets.objects.filter(
+                pk=request.data.get('set_id'),
+                test__test_slug=request.data.get('test_slug'),
+                test__subject=subject
+            ).only('mark_as_final', 'test').first()
+
+            if not test_set:
+                return Response({'error': _('Question paper set not found.')},
+                                status.HTTP_400_BAD_REQUEST)
+
+            if test_set.mark_as_final:
+                return Response({'error': _('Question set is MARKED AS FINAL. Uploading question is not allowed.')},
+                                status.HTTP_400_BAD_REQUEST)
+
+            if not file_name.endswith('.pdf'):
+                return Response({'error': _('Not a valid pdf file.')},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            metadata = {'test_id': test_set.test_id, 'set_id': test_set.pk}
+        else:
+            return Response({'error': _('Invalid purpose.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload = create_upload(
+                request.user, subject.pk, institute_pk, purpose, file_name, size, metadata)
+        except ValueError as e:
+            return Response({'error': str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'upload_id': upload.upload_id,
+            'offset': 0,
+            'max_chunk_size': CHUNKED_UPLOAD_MAX_CHUNK_SIZE
+        }, status=status.HTTP_201_CREATED, headers={
+            'Upload-Offset': '0',
+            'Upload-Length': str(size)
+        })
+
+
+class ChunkedUploadView(APIView):
+    """
+    Resumable upload of teacher. GET (and HEAD) returns offset to resume
+    from, PATCH writes chunk in request body at offset in Upload-Offset
+    header and completes upload with its last chunk, DELETE cancels it.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def get_upload(self, request, kwargs):
+        return models.ChunkedUpload.objects.filter(
+            upload_id=kwargs.get('upload_id'),
+            user=request.user
+        ).first()
+
+    def get(self, request, *args, **kwargs):
+        upload = self.get_upload(request, kwargs)
+
+        if not upload:
+            return Response({'error': _('Upload not found.')},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'offset': upload.offset,
+            'size': upload.size
+        }, status=status.HTTP_200_OK, headers={
+            'Upload-Offset': str(upload.offset),
+            'Upload-Length': str(upload.size)
+        })
+
+    def patch(self, request, *args, **kwargs):
+        upload = self.get_upload(request, kwargs)
+
+        if not upload:
+            return Response({'error': _('Upload not found.')},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            offset = int(request.META.get('HTTP_UPLOAD_OFFSET'))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (TypeError, ValueError):
+            return Response({'error': _('Upload offset is required.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if length > CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+            return Response({'error': _('Chunk too large.')},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        if length <= 0 or offset + length > upload.size:
+            return Response({'error': _('Chunk exceeds declared size of upload.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Body is read from stream, it is never parsed into request.data
+            offset = write_chunk(upload, offset, request.stream, length)
+        except ValueError as e:
+            return Response({'error': str(e), 'offset': upload.offset},
+                            status=status.HTTP_409_CONFLICT,
+                            headers={'Upload-Offset': str(upload.offset)})
+
+        if offset < upload.size:
+            return Response({'offset': offset}, status=status.HTTP_200_OK,
+                            headers={'Upload-Offset': str(offset)})
+
+        return complete_chunked_upload(request, upload)
+
+    def delete(self, request, *args, **kwargs):
+        upload = self.get_upload(request, kwargs)
+
+        if not upload:
+            return Response({'error': _('Upload not found.')},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        delete_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class InstituteUploadImageQuestionView(APIView):
     """View for adding image question paper"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -7499,7 +7545,7 @@ class InstituteUploadImageQuestionView(APIView):
 
 class InstituteTypedTestAddQuestionView(APIView):
     """View for adding typed test question"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -7613,7 +7659,7 @@ class InstituteTypedTestAddQuestionView(APIView):
 
 class InstituteEditTypedTestQuestionView(APIView):
     """View for editing typed test question paper"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -7706,7 +7752,7 @@ class InstituteEditTypedTestQuestionView(APIView):
 
 class InstituteDeleteTypedQuestionView(APIView):
     """View for deleting typed question paper"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -7742,6 +7788,10 @@ class InstituteDeleteTypedQuestionView(APIView):
             return Response({'error': _('Question not found. Please refresh and try again.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(question_pk=question.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Deleting question is not allowed.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         file_size = 0.0
 
         if question.has_picture:
@@ -7767,7 +7817,7 @@ class InstituteDeleteTypedQuestionView(APIView):
 
 class InstituteTestAddUpdateTrueFalseCorrectAnswer(APIView):
     """View for adding true false correct answer"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -7795,6 +7845,10 @@ class InstituteTestAddUpdateTrueFalseCorrectAnswer(APIView):
             return Response({'error': _('Question not found.')},
                             status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(question_pk=question.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Editing question is not allowed.')},
+                            status.HTTP_400_BAD_REQUEST)
+
         try:
             answer = models.SubjectTestTrueFalseCorrectAnswer.objects.filter(
                 question=question
@@ -7828,7 +7882,7 @@ class InstituteTestAddUpdateTrueFalseCorrectAnswer(APIView):
 
 class InstituteTestAddUpdateAssertTrueFalseCorrectAnswer(APIView):
     """View for adding assert true false correct answer"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -7856,6 +7910,10 @@ class InstituteTestAddUpdateAssertTrueFalseCorrectAnswer(APIView):
             return Response({'error': _('Question not found.')},
                             status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(question_pk=question.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Editing question is not allowed.')},
+                            status.HTTP_400_BAD_REQUEST)
+
         try:
             answer = models.SubjectTestAssertionCorrectAnswer.objects.filter(
                 question=question
@@ -7889,7 +7947,7 @@ class InstituteTestAddUpdateAssertTrueFalseCorrectAnswer(APIView):
 
 class InstituteTestAddUpdateFillInTheBlankChecking(APIView):
     """View for adding assert fill in the blank correct answer"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -7917,6 +7975,10 @@ class InstituteTestAddUpdateFillInTheBlankChecking(APIView):
             return Response({'error': _('Question not found.')},
                             status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(question_pk=question.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Editing question is not allowed.')},
+                            status.HTTP_400_BAD_REQUEST)
+
         try:
             answer = models.SubjectTestFillInTheBlankCorrectAnswer.objects.filter(
                 question=question
@@ -7960,7 +8022,7 @@ class InstituteTestAddUpdateFillInTheBlankChecking(APIView):
 
 class InstituteTestAddUpdateNumericCorrectAnswer(APIView):
     """View for adding numeric correct answer"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -7988,6 +8050,10 @@ class InstituteTestAddUpdateNumericCorrectAnswer(APIView):
             return Response({'error': _('Question not found.')},
                             status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(question_pk=question.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Editing question is not allowed.')},
+                            status.HTTP_400_BAD_REQUEST)
+
         try:
             answer = models.SubjectTestNumericCorrectAnswer.objects.filter(
                 question=question
@@ -8021,7 +8087,7 @@ class InstituteTestAddUpdateNumericCorrectAnswer(APIView):
 
 class InstituteTestAddUpdateMCQOption(APIView):
     """View for adding or updating mcq options"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -8049,6 +8115,10 @@ class InstituteTestAddUpdateMCQOption(APIView):
             return Response({'error': _('Question not found.')},
                             status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(question_pk=question.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Editing question is not allowed.')},
+                            status.HTTP_400_BAD_REQUEST)
+
         try:
             if request.data.get('option_id'):
                 option = models.SubjectTestMcqOptions.objects.filter(
@@ -8094,7 +8164,7 @@ class InstituteTestAddUpdateMCQOption(APIView):
 
 class InstituteTestDeleteMCQOption(APIView):
     """View for deleting mcq options"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -8122,6 +8192,10 @@ class InstituteTestDeleteMCQOption(APIView):
             return Response({'error': _('Question not found.')},
                             status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(question_pk=question.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Editing question is not allowed.')},
+                            status.HTTP_400_BAD_REQUEST)
+
         option = models.SubjectTestMcqOptions.objects.filter(
             pk=kwargs.get('option_id'),
             question=kwargs.get('question_id')
@@ -8137,7 +8211,7 @@ class InstituteTestDeleteMCQOption(APIView):
 
 class InstituteTestAddUpdateSelectMultipleOption(APIView):
     """View for adding or updating select multiple options"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -8165,6 +8239,10 @@ class InstituteTestAddUpdateSelectMultipleOption(APIView):
             return Response({'error': _('Question not found.')},
                             status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(question_pk=question.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Editing question is not allowed.')},
+                            status.HTTP_400_BAD_REQUEST)
+
         try:
             if request.data.get('option_id'):
                 option = models.SubjectTestSelectMultipleCorrectAnswer.objects.filter(
@@ -8207,7 +8285,7 @@ class InstituteTestAddUpdateSelectMultipleOption(APIView):
 
 class InstituteTestDeleteMultipleChoiceOption(APIView):
     """View for deleting multiple choice options"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -8235,6 +8313,10 @@ class InstituteTestDeleteMultipleChoiceOption(APIView):
             return Response({'error': _('Question not found.')},
                             status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(question_pk=question.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Editing question is not allowed.')},
+                            status.HTTP_400_BAD_REQUEST)
+
         option = models.SubjectTestSelectMultipleCorrectAnswer.objects.filter(
             pk=kwargs.get('option_id'),
             question=kwargs.get('question_id')
@@ -8250,7 +8332,7 @@ class InstituteTestDeleteMultipleChoiceOption(APIView):
 
 class InstituteTypedTestAddTestQuestionImage(APIView):
     """View for adding typed test question image"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -8312,6 +8394,10 @@ class InstituteTypedTestAddTestQuestionImage(APIView):
             return Response({'error': _('Question not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(question_pk=question.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Uploading image is not allowed.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         if not question.has_picture:
             return Response({'error': _('Uploading picture to this question not allowed.')},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -8351,7 +8437,7 @@ class InstituteTypedTestAddTestQuestionImage(APIView):
 
 class InstituteTypedTestDeleteTestQuestionImage(APIView):
     """View for deleting typed test question image"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -8387,6 +8473,10 @@ class InstituteTypedTestDeleteTestQuestionImage(APIView):
             return Response({'error': _('Image not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(question_pk=question_image.question_id):
+            return Response({'error': _('Question set is MARKED AS FINAL. Deleting image is not allowed.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         try:
             file_size = question_image.file.size / 1000000000  # In GB
             question_image.delete()
@@ -8407,7 +8497,7 @@ class InstituteTypedTestDeleteTestQuestionImage(APIView):
 
 class InstituteEditImageQuestionView(APIView):
     """View for editing image question paper"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -8501,7 +8591,7 @@ class InstituteEditImageQuestionView(APIView):
 
 class InstituteDeleteImageQuestionView(APIView):
     """View for deleting image question paper"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -8571,13 +8661,14 @@ class InstituteDeleteImageQuestionView(APIView):
         question_set.active = False
         question_set.mark_as_final = False
         question_set.save()
+        invalidate_paper_snapshot(question_set.pk)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class InstituteDeleteFileQuestionPaperView(APIView):
     """View for deleting file question paper"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -8642,13 +8733,14 @@ class InstituteDeleteFileQuestionPaperView(APIView):
         question_set.active = False
         question_set.mark_as_final = False
         question_set.save()
+        invalidate_paper_snapshot(question_set.pk)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class InstituteAddTestConceptLabelView(APIView):
     """View for adding test concept label"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -8702,7 +8794,7 @@ class InstituteAddTestConceptLabelView(APIView):
 
 class InstituteDeleteTestConceptLabelView(APIView):
     """View for deleting test concept label"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -8746,6 +8838,16 @@ class InstituteDeleteTestConceptLabelView(APIView):
                 return Response({'error': _('Concept label not found.')},
                                 status=status.HTTP_400_BAD_REQUEST)
 
+            if models.SubjectTypedTestQuestion.objects.filter(
+                concept_label=label,
+                test_section__set__mark_as_final=True
+            ).exists() or models.SubjectPictureTestQuestion.objects.filter(
+                concept_label=label,
+                test_section__set__mark_as_final=True
+            ).exists():
+                return Response({'error': _('Concept label is used in question set MARKED AS FINAL. Deleting it is not allowed.')},
+                                status=status.HTTP_400_BAD_REQUEST)
+
             label.delete()
 
             return Response(status.HTTP_204_NO_CONTENT)
@@ -8755,7 +8857,7 @@ class InstituteDeleteTestConceptLabelView(APIView):
 
 class InstituteAddTestQuestionSectionView(APIView):
     """View for adding test question section"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def post(self, request, *args, **kwargs):
@@ -8799,12 +8901,16 @@ class InstituteAddTestQuestionSectionView(APIView):
         question_set = models.SubjectTestSets.objects.filter(
             pk=kwargs.get('set_id'),
             test=test
-        ).only('pk').first()
+        ).only('mark_as_final').first()
 
         if not question_set:
             return Response({'error': _('Question set not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        if question_set.mark_as_final:
+            return Response({'error': _('Question set is MARKED AS FINAL. Adding question group is not allowed.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         try:
             question_section = models.SubjectTestQuestionSection.objects.create(
                 test=test,
@@ -8834,7 +8940,7 @@ class InstituteAddTestQuestionSectionView(APIView):
 
 class InstituteEditTestQuestionSectionView(APIView):
     """View for editing test question section"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -8884,6 +8990,10 @@ class InstituteEditTestQuestionSectionView(APIView):
             return Response({'error': _('Question group not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(section_pk=question_section.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Editing question group is not allowed.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         try:
             if request.data.get('no_of_question_to_attempt'):
                 question_section.no_of_question_to_attempt = request.data.get('no_of_question_to_attempt')
@@ -8912,7 +9022,7 @@ class InstituteEditTestQuestionSectionView(APIView):
 
 class InstituteEditQuestionSetName(APIView):
     """View for editing test question set name"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -8978,9 +9088,339 @@ class InstituteEditQuestionSetName(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
 
 
+class InstituteMarkQuestionSetFinalView(APIView):
+    """
+    View for marking test question set as final or not final. Question
+    paper of final set is compiled into an immutable snapshot.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def patch(self, request, *args, **kwargs):
+        """Only subject in-charge can access."""
+        path = resolve_slug_path(kwargs.get('institute_slug'))
+
+        if not path:
+            return Response({'error': _('Institute not found.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        subject = models.InstituteSubject.objects.filter(
+            subject_slug=kwargs.get('subject_slug'),
+            subject_class__class_institute__pk=path.institute
+        ).only('subject_slug').first()
+
+        if not subject:
+            return Response({'error': _('Subject not found.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if not get_access(request).has_subject_perm(subject.pk):
+            return Response({'error': _('Permission denied [Subject in-charge only]')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if not get_active_common_license(path.institute):
+            return Response({'error': _('Active LMS CMS license not found or expired.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        test = models.SubjectTest.objects.filter(
+            test_slug=kwargs.get('test_slug'),
+            subject=subject
+        ).only('question_mode').first()
+
+        if not test:
+            return Response({'error': _('Test not found.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        question_set = models.SubjectTestSets.objects.filter(
+            pk=kwargs.get('set_id'),
+            test=test
+        ).first()
+
+        if not question_set:
+            return Response({'error': _('Question set not found.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        mark_as_final = request.data.get('mark_as_final')
+        if not isinstance(mark_as_final, bool):
+            return Response({'error': _('mark_as_final should be true or false.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = {
+            'id': question_set.pk,
+            'mark_as_final': mark_as_final
+        }
+
+        with transaction.atomic():
+            question_set.mark_as_final = mark_as_final
+            question_set.save()
+
+            if mark_as_final:
+                response['version'] = compile_paper_snapshot(
+                    test, question_set.pk).version
+            else:
+                invalidate_paper_snapshot(question_set.pk)
+
+        return Response(response, status=status.HTTP_200_OK)
+
+
+def _get_managed_test(request, kwargs):
+    """
+    Returns (test, None) if user is subject in-charge of subject of test
+    and institute has active license else (None, error response)
+    """
+    path = resolve_slug_path(kwargs.get('institute_slug'))
+
+    if not path:
+        return None, Response({'error': _('Institute not found.')},
+                              status=status.HTTP_400_BAD_REQUEST)
+
+    subject = models.InstituteSubject.objects.filter(
+        subject_slug=kwargs.get('subject_slug'),
+        subject_class__class_institute__pk=path.institute
+    ).only('subject_slug').first()
+
+    if not subject:
+        return None, Response({'error': _('Subject not found.')},
+                              status=status.HTTP_400_BAD_REQUEST)
+
+    if not get_access(request).has_subject_perm(subject.pk):
+        return None, Response({'error': _('Permission denied [Subject in-charge only]')},
+                              status=status.HTTP_400_BAD_REQUEST)
+
+    if not get_active_common_license(path.institute):
+        return None, Response({'error': _('Active LMS CMS license not found or expired.')},
+                              status=status.HTTP_400_BAD_REQUEST)
+
+    test = models.SubjectTest.objects.filter(
+        test_slug=kwargs.get('test_slug'),
+        subject=subject
+    ).only('subject', 'question_mode', 'question_category').first()
+
+    if not test:
+        return None, Response({'error': _('Test not found.')},
+                              status=status.HTTP_400_BAD_REQUEST)
+
+    return test, None
+
+
+class IssueTestCredentialsView(APIView):
+    """
+    View for issuing test credentials to every enrolled student of
+    subject who has none, sets are allocated with strategy in request
+    (round_robin, shuffled or separated). Plaintext passwords are
+    returned once as a credential sheet.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def post(self, request, *args, **kwargs):
+        """Only subject in-charge can access."""
+        test, error = _get_managed_test(request, kwargs)
+        if error:
+            return error
+
+        try:
+            rows = issue_test_credentials(
+                test, request.data.get('strategy') or ROUND_ROBIN)
+        except ValueError as e:
+            return Response({'error': str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = {'issued': len(rows)}
+        if rows:
+            response['sheet'] = store_credential_sheet(
+                request.user.pk, test.pk, rows)
+
+        return Response(response, status=status.HTTP_201_CREATED)
+
+
+class TestCredentialSheetView(APIView):
+    """View for downloading credential sheet once after issuance"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def get(self, request, *args, **kwargs):
+        """Only subject in-charge who issued credentials can access."""
+        test, error = _get_managed_test(request, kwargs)
+        if error:
+            return error
+
+        content = pop_credential_sheet(
+            kwargs.get('token'), request.user.pk, test.pk)
+
+        if content is None:
+            return Response({'error': _('Credential sheet not found or already downloaded.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = HttpResponse(content, content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="{}-credentials.csv"'.format(
+            kwargs.get('test_slug'))
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class GradeTestSubmissionsView(APIView):
+    """View for queueing auto grading of submissions of typed test"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def post(self, request, *args, **kwargs):
+        """Only subject in-charge can access."""
+        test, error = _get_managed_test(request, kwargs)
+        if error:
+            return error
+
+        if test.question_mode != models.QuestionMode.TYPED:
+            return Response({'error': _('Only typed tests can be auto graded.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        task = grade_test_submissions.delay(
+            test.pk, request.data.get('regrade') is True)
+
+        return Response({'task_id': task.id},
+                        status=status.HTTP_202_ACCEPTED)
+
+
+class TestLoginStatsView(APIView):
+    """
+    View for getting login counts of test per state, country, attempt
+    and net speed from rollups maintained during the test
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def get(self, request, *args, **kwargs):
+        """Only subject in-charge can access."""
+        test, error = _get_managed_test(request, kwargs)
+        if error:
+            return error
+
+        return Response(get_login_rollups(test.pk),
+                        status=status.HTTP_200_OK)
+
+
+class TestConceptMasteryView(APIView):
+    """
+    View for getting concept matrix of test, mastery of class and of
+    every graded student in each concept label of the test
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def get(self, request, *args, **kwargs):
+        """Only subject in-charge can access."""
+        test, error = _get_managed_test(request, kwargs)
+        if error:
+            return error
+
+        return Response(get_concept_matrix(test.pk),
+                        status=status.HTTP_200_OK)
+
+
+class ClassConceptMasteryView(APIView):
+    """View for getting mastery of class in concept labels of its tests"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def get(self, request, *args, **kwargs):
+        """Only class in-charge or admin can access."""
+        path = resolve_slug_path(
+            kwargs.get('institute_slug'),
+            kwargs.get('class_slug'))
+
+        if not path:
+            return Response({'error': _('Class not found.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if not get_access(request).can_manage_class(path.institute, path.class_):
+            return Response({'error': _('Permission denied.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(get_class_concept_mastery(path.class_),
+                        status=status.HTTP_200_OK)
+
+
+class ImportQuestionBankView(APIView):
+    """
+    View for adding sections and typed questions with their options and
+    answers to question set in bulk. Takes csv, json or ndjson file
+    ('file') or json list ('questions'). Nothing is added if any
+    question is invalid.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+    parser_classes = (JSONParser, MultiPartParser)
+
+    def post(self, request, *args, **kwargs):
+        """Only subject in-charge can access."""
+        test, error = _get_managed_test(request, kwargs)
+        if error:
+            return error
+
+        if test.question_mode != models.QuestionMode.TYPED:
+            return Response({'error': _('Questions can be imported only in typed test.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            if request.data.get('file'):
+                file = request.data['file']
+                file_type = os.path.splitext(file.name)[1][1:].lower()
+                if file_type not in BANK_FILE_TYPES:
+                    raise ValueError(
+                        _('Only csv, json and ndjson files are supported.'))
+                records = parse_bank(file.read(), file_type)
+            else:
+                records = parse_bank(request.data.get('questions'), 'json')
+        except ValueError as e:
+            return Response({'error': str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        sections, errors = validate_bank(records, test.question_category)
+        if errors:
+            return Response({'error': _('Questions are invalid.'),
+                             'errors': errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            report = import_bank(test.pk, kwargs.get('set_id'), sections)
+        except ValueError as e:
+            return Response({'error': str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(report, status=status.HTTP_201_CREATED)
+
+
+class ExportQuestionBankView(APIView):
+    """View for streaming typed questions of every set of test as file"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def get(self, request, *args, **kwargs):
+        """Only subject in-charge can access."""
+        test, error = _get_managed_test(request, kwargs)
+        if error:
+            return error
+
+        if test.question_mode != models.QuestionMode.TYPED:
+            return Response({'error': _('Questions can be exported only from typed test.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        file_type = request.query_params.get('file_type', 'csv')
+        try:
+            lines = export_bank_lines(test.pk, file_type)
+        except ValueError as e:
+            return Response({'error': str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            lines, content_type=EXPORT_FILE_TYPES[file_type][0])
+        response['Content-Disposition'] = 'attachment; filename="{}.{}"'.format(
+            kwargs.get('test_slug'), file_type)
+        return response
+
+
 class InstituteRemoveConceptLabelFromQuestion(APIView):
     """View for removing concept label from question"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def patch(self, request, *args, **kwargs):
@@ -9036,6 +9476,10 @@ class InstituteRemoveConceptLabelFromQuestion(APIView):
             return Response({'error': _('Question not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(section_pk=question.test_section_id):
+            return Response({'error': _('Question set is MARKED AS FINAL. Editing question is not allowed.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         try:
             question.concept_label = None
             question.save()
@@ -9049,7 +9493,7 @@ class InstituteRemoveConceptLabelFromQuestion(APIView):
 
 class InstituteDeleteQuestionSection(APIView):
     """View for deleting question section"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
@@ -9086,6 +9530,10 @@ class InstituteDeleteQuestionSection(APIView):
             return Response({'error': _('Question group not found.')},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        if is_question_set_final(section_pk=question_paper_section.pk):
+            return Response({'error': _('Question set is MARKED AS FINAL. Deleting question group is not allowed.')},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         file_size = 0.0
 
         if question_paper_section.test.question_mode == models.QuestionMode.IMAGE:
@@ -9129,7 +9577,7 @@ class InstituteDeleteQuestionSection(APIView):
 
 class InstituteDeleteQuestionSet(APIView):
     """View for deleting question paper"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsTeacher)
 
     def delete(self, *args, **kwargs):
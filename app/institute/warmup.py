@@ -0,0 +1,188 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BigIntegerField, ExpressionWrapper, F
+
+from .exam_session import TEST_LIVE, broadcast_test_event
+from .license import get_license_snapshot
+from .question_paper import STUDENT_PAPER, TEACHER_PAPER,\
+    compile_paper_snapshot, get_paper_snapshot
+from core import models
+
+# Scheduled tests are warmed up this many minutes before they start
+TEST_WARMUP_MINUTES = getattr(settings, 'TEST_WARMUP_MINUTES', 10)
+
+SCHEDULED_TEST_TYPES = (
+    models.TestScheduleType.SPECIFIC_DATE_AND_TIME,
+    models.TestScheduleType.SPECIFIC_DATE
+)
+
+
+def _warmup_lock_key(test_pk):
+    return 'test-warmup-lock:' + str(test_pk)
+
+
+def _roster_cache_key(test_pk):
+    return 'test-roster:' + str(test_pk)
+
+
+def _test_state_cache_key(test_pk):
+    return 'test-state:' + str(test_pk)
+
+
+def _now():
+    return int(time.time()) * 1000
+
+
+def _end_of_test(test):
+    return test.test_schedule + test.total_duration * 60 * 1000
+
+
+def tests_to_warm_up(now=None):
+    """Returns scheduled tests which are not live and start soon"""
+    now = now or _now()
+    return models.SubjectTest.objects.filter(
+        test_schedule_type__in=SCHEDULED_TEST_TYPES,
+        test_live=False,
+        test_schedule__gte=now,
+        test_schedule__lte=now + TEST_WARMUP_MINUTES * 60 * 1000
+    )
+
+
+def tests_to_start(now=None):
+    """Returns scheduled tests which should be live but are not"""
+    now = now or _now()
+    return models.SubjectTest.objects.annotate(
+        end_date=ExpressionWrapper(
+            F('test_schedule') + F('total_duration') * 60 * 1000,
+            output_field=BigIntegerField())
+    ).filter(
+        test_schedule_type__in=SCHEDULED_TEST_TYPES,
+        test_live=False,
+        test_schedule__lte=now,
+        end_date__gt=now
+    )
+
+
+def build_test_roster(test):
+    """
+    Returns dict of user pk -> (institute student pk, credential pk,
+    set pk, password lookup key, question order) of every enrolled
+    student of subject of test who can view the subject. Credential
+    fields are None until credential is issued.
+    """
+    students = dict(models.InstituteSubjectStudents.objects.filter(
+        institute_subject__pk=test.subject_id
+    ).values_list('institute_student__invitee', 'institute_student'))
+
+    permitted = set(models.InstituteSubjectAccess.objects.filter(
+        subject__pk=test.subject_id,
+        user__pk__in=students.keys(),
+        can_view=True
+    ).values_list('user', flat=True))
+
+    credentials = {
+        student_pk: (credential_pk, set_pk, lookup_key, question_order)
+        for credential_pk, student_pk, set_pk, lookup_key, question_order in
+        models.StudentTestCredential.objects.filter(
+            test__pk=test.pk
+        ).values_list('pk', 'student', 'set', 'lookup_key', 'question_order')
+    }
+
+    return {
+        user_pk: (student_pk,) + credentials.get(
+            student_pk, (None, None, None, None))
+        for user_pk, student_pk in students.items()
+        if user_pk in permitted
+    }
+
+
+def get_test_roster(test):
+    """Returns roster of test from cache, builds and caches it on miss"""
+    roster = cache.get(_roster_cache_key(test.pk))
+
+    if roster is None:
+        roster = build_test_roster(test)
+        cache.set(_roster_cache_key(test.pk), roster,
+                  max(60, (_end_of_test(test) - _now()) // 1000))
+
+    return roster
+
+
+def invalidate_test_roster(test_pk):
+    """Removes cached roster of test, it is built again on next read"""
+    cache.delete(_roster_cache_key(test_pk))
+
+
+def cache_test_state(test_pk):
+    """Caches live state, schedule and duration of test till it ends"""
+    state = models.SubjectTest.objects.filter(pk=test_pk).values(
+        'test_live', 'test_schedule', 'total_duration').first()
+
+    if state and state['test_schedule']:
+        cache.set(_test_state_cache_key(test_pk), state, max(
+            60, (state['test_schedule'] + state['total_duration'] * 60 * 1000 -
+                 _now()) // 1000))
+
+
+def get_test_state(test_pk):
+    """
+    Returns dict of test_live, test_schedule and total_duration of test.
+    State of warmed up test is read from cache, others from database.
+    """
+    state = cache.get(_test_state_cache_key(test_pk))
+
+    if state is None:
+        state = models.SubjectTest.objects.filter(pk=test_pk).values(
+            'test_live', 'test_schedule', 'total_duration').first()
+    return state
+
+
+def warm_up_test(test):
+    """
+    Loads everything students need when test starts into cache: license
+    of institute, compiled paper of every final set, state of test and
+    roster of students with their credentials and sets.
+    Returns number of students in roster.
+    """
+    get_license_snapshot(models.InstituteSubject.objects.filter(
+        pk=test.subject_id
+    ).values_list('subject_class__class_institute', flat=True).first())
+
+    for set_pk in models.SubjectTestSets.objects.filter(
+        test__pk=test.pk,
+        mark_as_final=True
+    ).values_list('pk', flat=True):
+        if not get_paper_snapshot(set_pk, STUDENT_PAPER, ''):
+            compile_paper_snapshot(test, set_pk)
+            get_paper_snapshot(set_pk, STUDENT_PAPER, '')
+        get_paper_snapshot(set_pk, TEACHER_PAPER, '')
+
+    cache_test_state(test.pk)
+    roster = build_test_roster(test)
+    cache.set(_roster_cache_key(test.pk), roster,
+              max(60, (_end_of_test(test) - _now()) // 1000))
+    return len(roster)
+
+
+def lock_warm_up(test):
+    """Returns True only for the first caller warming up test"""
+    return cache.add(_warmup_lock_key(test.pk), True,
+                     TEST_WARMUP_MINUTES * 60 * 2)
+
+
+def start_test(test_pk):
+    """
+    Makes scheduled test live and notifies connected students.
+    Returns True if it was not live.
+    """
+    started = bool(models.SubjectTest.objects.filter(
+        pk=test_pk,
+        test_live=False
+    ).update(test_live=True))
+
+    if started:
+        cache_test_state(test_pk)
+        broadcast_test_event(test_pk, TEST_LIVE)
+    return started
@@ -1,9 +1,7 @@
 from django.contrib.auth import get_user_model
 
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
 from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
@@ -17,6 +15,8 @@ from .serializer import CreateUserSerializer, LoginUserSerializer,\
     ListProfilePictureSerializer, ManageUserProfileSerializer
 
 from core.models import ProfilePictures
+from core.authentication import CachedTokenAuthentication,\
+    get_or_create_token_key
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -33,9 +33,8 @@ class LoginUserView(ObtainAuthToken):
                                          context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
         return Response({
-            'token': token.key,
+            'token': get_or_create_token_key(user),
             'id': user.id,
             'email': user.email,
             'username': user.username,
@@ -49,7 +48,7 @@ class LoginUserView(ObtainAuthToken):
 class ManageUserProfileView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = ManageUserProfileSerializer
-    authentication_classes = [TokenAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication, ]
     permission_classes = [IsAuthenticated, ]
 
     def get_object(self):
@@ -69,7 +68,7 @@ class ManageUserProfileView(generics.RetrieveUpdateAPIView):
 class ListProfilePictureView(ListAPIView):
     """View for listing all profile pictures"""
     serializer_class = ListProfilePictureSerializer
-    authentication_classes = [TokenAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication, ]
     permission_classes = [IsAuthenticated, ]
     queryset = ProfilePictures.objects.all()
 
@@ -86,7 +85,7 @@ class ListProfilePictureView(ListAPIView):
 class UploadProfilePictureView(APIView):
     """View for uploading profile picture"""
     serializer_class = UploadUserProfilePictureSerializer
-    authentication_classes = [TokenAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication, ]
     permission_classes = [IsAuthenticated, ]
     parser_classes = [JSONParser, MultiPartParser]
 
@@ -140,7 +139,7 @@ class UploadProfilePictureView(APIView):
 class SetDeleteProfilePictureView(APIView):
     """View for setting or deleting profile picture"""
     serializer_class = SetUserProfilePictureSerializer
-    authentication_classes = [TokenAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication, ]
     permission_classes = [IsAuthenticated, ]
     parser_classes = [JSONParser, MultiPartParser]
 
@@ -258,7 +257,7 @@ class SetDeleteProfilePictureView(APIView):
 
 class RemoveClassProfilePictureView(APIView):
     """View for removing class profile picture"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
 
     def post(self, request, *args, **kwargs):
@@ -286,7 +285,7 @@ class RemoveClassProfilePictureView(APIView):
 
 class RemovePublicProfilePictureView(APIView):
     """View for removing public profile picture"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
 
     def post(self, request, *args, **kwargs):
@@ -314,7 +313,7 @@ class RemovePublicProfilePictureView(APIView):
 
 class ProfilePictureCountView(APIView):
     """View for returning count of class profile picture"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
 
     def get(self, request, *args, **kwargs):
@@ -330,7 +329,7 @@ class ProfilePictureCountView(APIView):
 class CheckProfileDataExists(APIView):
     """View for checking whether user has filled
     first name, last name, gender, date of birth, contact no in user profile"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get(self, *args, **kwargs):